@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Audio Textures - Texturas de espectro para presets de audio
+Almacenamiento inmutable (glTexStorage) + subida por PBO con glTexSubImage.
+El remapeo lineal/logarítmico se hace en CPU con una tabla precalculada.
+
+Uso:
+    self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=512, mapping='log')
+    ...
+    self.spectrum.update(np.abs(np.fft.rfft(self.audio_buffer)) / SAMPLES)
+    self.spectrum.bind(0)
+    glUniform1i(self.u_spectrum, 0)   # uniform sampler1D iSpectrum;
+"""
+
+from __future__ import division
+import ctypes
+from OpenGL.GL import *
+import numpy as np
+
+# Número de slots del PBO persistente (evita escribir sobre datos que la GPU aún lee)
+PBO_SLOTS = 3
+
+
+def build_index_table(n_bins, size, mapping='linear', min_bin=1):
+    """
+    Precalcula la tabla de remapeo FFT -> textura.
+    Devuelve (idx0, idx1, frac) para interpolar: out = m[idx0] * (1 - frac) + m[idx1] * frac
+    """
+    if mapping == 'log':
+        # Escala logarítmica: más resolución en graves (donde está la música)
+        lo = max(1, min_bin)
+        pos = lo * (float(n_bins - 1) / lo) ** (np.arange(size) / float(max(size - 1, 1)))
+    elif mapping == 'linear':
+        pos = np.arange(size) * (n_bins / float(size))
+    else:
+        raise ValueError(f"Mapping desconocido: {mapping}")
+
+    pos = np.clip(pos, 0, n_bins - 1)
+    idx0 = np.floor(pos).astype(np.intp)
+    idx1 = np.minimum(idx0 + 1, n_bins - 1)
+    frac = (pos - idx0).astype(np.float32)
+    return idx0, idx1, frac
+
+
+def allocate_texture_storage(target, internal_format, width, height=None):
+    """
+    Reserva almacenamiento inmutable para la textura ligada a `target`.
+    Usa glTexStorage (GL 4.2 / ARB_texture_storage) y cae a glTexImage (una sola vez) si no existe.
+    """
+    if target == GL_TEXTURE_1D:
+        if bool(glTexStorage1D):
+            glTexStorage1D(GL_TEXTURE_1D, 1, internal_format, width)
+        else:
+            glTexImage1D(GL_TEXTURE_1D, 0, internal_format, width, 0, GL_RED, GL_FLOAT, None)
+    else:
+        if bool(glTexStorage2D):
+            glTexStorage2D(target, 1, internal_format, width, height)
+        else:
+            glTexImage2D(target, 0, internal_format, width, height, 0, GL_RED, GL_FLOAT, None)
+
+
+class StreamingPBO:
+    """
+    Pixel Buffer Object para subir datos de textura cada frame.
+    Con GL 4.4 (ARB_buffer_storage) queda mapeado de forma persistente y los datos
+    se escriben directamente en memoria de la GPU; si no, se usa glBufferSubData.
+    """
+
+    def __init__(self, nbytes, persistent=True):
+        self.nbytes = nbytes
+        self.slot = 0
+        self.mapped = None
+
+        self.pbo = glGenBuffers(1)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self.pbo)
+
+        if persistent and bool(glBufferStorage) and bool(glMapBufferRange):
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+            glBufferStorage(GL_PIXEL_UNPACK_BUFFER, nbytes * PBO_SLOTS, None, flags)
+            ptr = glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, nbytes * PBO_SLOTS, flags)
+            buf = (ctypes.c_ubyte * (nbytes * PBO_SLOTS)).from_address(ptr)
+            self.mapped = np.frombuffer(buf, dtype=np.uint8)
+        else:
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, nbytes, None, GL_STREAM_DRAW)
+
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+    def write(self, data):
+        """Copia `data` al PBO. Devuelve el offset (bytes) a pasar a glTexSubImage"""
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self.pbo)
+        if self.mapped is not None:
+            self.slot = (self.slot + 1) % PBO_SLOTS
+            offset = self.slot * self.nbytes
+            self.mapped[offset:offset + data.nbytes] = data.view(np.uint8)
+            return offset
+        glBufferSubData(GL_PIXEL_UNPACK_BUFFER, 0, data.nbytes, data)
+        return 0
+
+    def release(self):
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+
+class SpectrumTexture:
+    """
+    Textura 1D R32F con el espectro completo (FFT_SIZE bins).
+    Se reserva una sola vez y cada frame solo se actualiza con glTexSubImage1D.
+    """
+
+    def __init__(self, n_bins, size=512, mapping='linear', smoothing=0.0,
+                 use_pbo=True, persistent=True, min_bin=1):
+        self.size = size
+        self.smoothing = smoothing
+        self.idx0, self.idx1, self.frac = build_index_table(n_bins, size, mapping, min_bin)
+
+        # Workspaces preasignados (sin allocations por frame)
+        self.data = np.zeros(size, dtype=np.float32)
+        self._lo = np.zeros(size, dtype=np.float32)
+        self._hi = np.zeros(size, dtype=np.float32)
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        allocate_texture_storage(GL_TEXTURE_1D, GL_R32F, size)
+
+        self.pbo = StreamingPBO(self.data.nbytes, persistent) if use_pbo else None
+
+    def remap(self, magnitudes):
+        """Remapea magnitudes FFT a self.data usando la tabla precalculada"""
+        np.take(magnitudes, self.idx0, out=self._lo)
+        np.take(magnitudes, self.idx1, out=self._hi)
+        self._hi -= self._lo
+        self._hi *= self.frac
+        self._lo += self._hi
+
+        if self.smoothing > 0.0:
+            # Suavizado temporal: data = data * s + nuevo * (1 - s)
+            self.data *= self.smoothing
+            self._lo *= (1.0 - self.smoothing)
+            self.data += self._lo
+        else:
+            self.data[:] = self._lo
+        return self.data
+
+    def update(self, magnitudes):
+        """Remapea y sube el espectro a la textura"""
+        self.remap(magnitudes)
+        self.upload()
+
+    def upload(self):
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+        if self.pbo is not None:
+            offset = self.pbo.write(self.data)
+            glTexSubImage1D(GL_TEXTURE_1D, 0, 0, self.size, GL_RED, GL_FLOAT, ctypes.c_void_p(offset))
+            self.pbo.release()
+        else:
+            glTexSubImage1D(GL_TEXTURE_1D, 0, 0, self.size, GL_RED, GL_FLOAT, self.data)
+
+    def bind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_1D, self.texture)
+
+
+class SpectrogramRing:
+    """
+    Historial del espectro (waterfall) en una textura 2D R32F de bins x rows.
+    Cada hop de análisis escribe exactamente una fila con glTexSubImage2D (coste O(1)),
+    sin copias de historial en CPU. El shader recibe la fila más reciente (head):
+
+        uniform sampler2D iSpectrogram;
+        uniform float iSpectrogramHead;   // fila más reciente
+        uniform float iSpectrogramRows;
+
+        // freq 0..1, age 0..1 (0 = ahora, 1 = fila más antigua)
+        float spectrogram(float freq, float age) {
+            float row = iSpectrogramHead - age * (iSpectrogramRows - 1.0);
+            return texture(iSpectrogram, vec2(freq, (row + 0.5) / iSpectrogramRows)).r;
+        }
+
+    El wrap GL_REPEAT en T resuelve la vuelta del anillo en el propio sampler.
+    """
+
+    def __init__(self, bins=512, rows=256, use_pbo=True, persistent=True):
+        self.bins = bins
+        self.rows = rows
+        self.head = rows - 1
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        allocate_texture_storage(GL_TEXTURE_2D, GL_R32F, bins, rows)
+
+        # Limpiar el historial una sola vez (glTexStorage deja el contenido indefinido)
+        zeros = np.zeros(bins * rows, dtype=np.float32)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, bins, rows, GL_RED, GL_FLOAT, zeros)
+
+        self.pbo = StreamingPBO(bins * 4, persistent) if use_pbo else None
+
+    def push(self, row):
+        """Escribe una fila (float32, `bins` valores) y avanza el head"""
+        self.head = (self.head + 1) % self.rows
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        if self.pbo is not None:
+            offset = self.pbo.write(row)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, self.head, self.bins, 1,
+                            GL_RED, GL_FLOAT, ctypes.c_void_p(offset))
+            self.pbo.release()
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, self.head, self.bins, 1, GL_RED, GL_FLOAT, row)
+
+    def bind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark Lissajous (Preset 31)
+Compara la generación antigua (una llamada por banda, con temporales)
+contra LissajousBatch (3 bandas en una pasada, workspaces preasignados).
+Mide tiempo y pico de memoria temporal asignada por frame (tracemalloc).
+"""
+
+import time
+import tracemalloc
+import numpy as np
+
+from visuales_shader_31 import LissajousBatch, DRAW_SAMPLES, SAMPLES, BANDS
+
+FRAMES = 500
+
+
+def reference_pattern(samples, band, energy, trail_len):
+    """Implementación original de create_lissajous_pattern (una banda)"""
+    t = np.linspace(0, 2 * np.pi, len(samples))
+
+    if band == 0:
+        phase_offset = trail_len * (0.008 + energy * 0.008)
+        freq_x = 0.8 + energy * 0.2 + np.sin(phase_offset * 0.3) * 0.12
+        freq_y = 0.8 + energy * 0.15 + np.cos(phase_offset * 0.25) * 0.1
+        x = samples * np.cos(t * freq_x + phase_offset) * (1.3 + energy * 0.5)
+        y = samples * np.sin(t * freq_y + phase_offset) * (1.3 + energy * 0.5)
+        x += np.sin(t * 7.3 + phase_offset * 0.8) * 0.02 * (0.3 + energy * 0.4)
+        y += np.cos(t * 6.7 + phase_offset * 0.7) * 0.02 * (0.3 + energy * 0.4)
+    elif band == 1:
+        phase_offset = trail_len * (0.01 + energy * 0.01)
+        freq_x = 1.5 + energy * 0.8 + np.sin(phase_offset * 0.35) * 0.15
+        freq_y = 0.9 + energy * 0.6 + np.cos(phase_offset * 0.28) * 0.12
+        morph = energy * 0.5 + np.sin(phase_offset * 0.2) * 0.15
+        x = samples * (np.sin(t * freq_x + phase_offset) * (1.0 - morph) +
+                       np.sin(t * freq_x * 1.5 + phase_offset) * morph) * (0.85 + energy * 0.5)
+        y = samples * (np.cos(t * freq_y + phase_offset) * (1.0 - morph) +
+                       np.sin(t * freq_y * 1.3 + phase_offset * 1.5) * morph) * (0.85 + energy * 0.5)
+        x += np.sin(t * 8.1 + phase_offset) * 0.015 * (0.4 + energy * 0.3)
+        y += np.cos(t * 7.9 + phase_offset * 0.9) * 0.015 * (0.4 + energy * 0.3)
+    else:
+        phase_offset = trail_len * (0.012 + energy * 0.012)
+        freq_x = 2.2 + energy * 0.4 + np.sin(phase_offset * 0.4) * 0.1
+        freq_y = 1.6 + energy * 0.3 + np.cos(phase_offset * 0.32) * 0.08
+        x = samples * np.sin(t * freq_x + phase_offset) * (1.0 + energy * 0.7)
+        y = samples * np.cos(t * freq_y + phase_offset) * (1.0 + energy * 0.7)
+        x += np.sin(t * 9.7 + phase_offset * 1.1) * 0.01 * (0.5 + energy * 0.3)
+        y += np.cos(t * 8.3 + phase_offset * 0.95) * 0.01 * (0.5 + energy * 0.3)
+
+    x = np.convolve(x, np.ones(5) / 5, mode='same')
+    y = np.convolve(y, np.ones(5) / 5, mode='same')
+    x = np.clip(x, -1.0, 1.0)
+    y = np.clip(y, -1.0, 1.0)
+    return np.column_stack((x, y)).astype(np.float32)
+
+
+def run(label, frame_fn):
+    """Ejecuta FRAMES frames; devuelve (ms/frame, pico de memoria temporal por frame en bytes)"""
+    frame_fn(0)  # warm-up
+
+    # Pico de memoria asignada durante un frame (temporales NumPy + objetos Python)
+    tracemalloc.start()
+    worst = 0
+    for f in range(1, 50):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = frame_fn(f)
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+        worst = max(worst, peak - base)
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for f in range(FRAMES):
+        frame_fn(f)
+    ms = (time.perf_counter() - start) * 1000.0 / FRAMES
+
+    print(f"{label:<10} {ms:8.3f} ms/frame   {worst:8d} B temporales/frame")
+    return ms, worst
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(SAMPLES) * 0.3).astype(np.float32)
+    samples = audio[::SAMPLES // DRAW_SAMPLES][:DRAW_SAMPLES]
+    energies = (0.6, 0.4, 0.2)
+
+    batch = LissajousBatch(DRAW_SAMPLES)
+    out = np.zeros((BANDS, DRAW_SAMPLES, 2), dtype=np.float32)
+
+    # Correctitud: ambas implementaciones deben coincidir
+    for trail_len in (0, 17, 99):
+        batch.generate(samples, energies, trail_len, out)
+        for b in range(BANDS):
+            ref = reference_pattern(samples, b, energies[b], trail_len)
+            assert np.allclose(out[b], ref, atol=1e-5), f"banda {b} difiere (trail_len={trail_len})"
+    print("✓ LissajousBatch coincide con la implementación original")
+
+    print("=" * 70)
+    print(f"BENCHMARK LISSAJOUS - {BANDS} bandas x {DRAW_SAMPLES} puntos, {FRAMES} frames")
+    print("=" * 70)
+    run("original", lambda f: [reference_pattern(samples, b, energies[b], f % 100) for b in range(BANDS)])
+    run("batch", lambda f: batch.generate(samples, energies, f % 100, out))
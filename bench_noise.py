@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark Ruido (noisetex.py)
+ms/frame de cada preset con el ruido ALU original (hash con sin()) y con las
+texturas de ruido compartidas, cambiando solo uNoiseTextures en el mismo programa.
+Los presets de pantalla completa dibujan su fragment shader a WIDTH x HEIGHT en
+un FBO; el 37 (ruido por partícula) avanza y dibuja su ParticleSystem.
+
+Antes comprueba que noiseTex() es la interpolación suave de la retícula (referencia
+NumPy) y que tiene la misma media y desviación que el ruido ALU.
+"""
+
+import importlib
+import time
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+from noisetex import NoiseTextures, NOISE_TEX_GLSL, NOISE_2D_SIZE, noise_data
+from raybounds import RayBounds
+from particles import ParticleSystem
+
+WIDTH, HEIGHT = 1080, 1920
+FRAMES = 30
+PRESETS = ['visuales_shader', 'visuales_shader_12', 'visuales_shader_19',
+           'visuales_shader_22', 'visuales_shader_33']
+PARTICLE_PRESETS = ['visuales_shader_37']
+
+CHECK_SIZE = 512
+CHECK_SCALE = 0.37  # Celdas de ruido por píxel en la comprobación
+
+QUAD_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 position;
+void main() { gl_Position = vec4(position, 0.0, 1.0); }
+"""
+
+CHECK_FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+uniform float uScale;
+""" + NOISE_TEX_GLSL + """
+float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
+
+float noiseALU(vec2 p) {
+    vec2 i = floor(p), f = fract(p);
+    f = f * f * (3.0 - 2.0 * f);
+    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
+}
+
+void main() {
+    vec2 p = gl_FragCoord.xy * uScale;
+    fragColor = vec4(uNoiseTextures == 1 ? noiseTex(p) : noiseALU(p));
+}
+"""
+
+
+def create_quad():
+    vao = glGenVertexArrays(1)
+    glBindVertexArray(vao)
+    vbo = glGenBuffers(1)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, np.array([-1, -1, 1, -1, -1, 1, 1, 1], dtype=np.float32), GL_STATIC_DRAW)
+    glEnableVertexAttribArray(0)
+    glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
+    return vao
+
+
+def create_target(w, h, internal_format, fmt, dtype):
+    tex = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, tex)
+    glTexImage2D(GL_TEXTURE_2D, 0, internal_format, w, h, 0, fmt, dtype, None)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+    fbo = glGenFramebuffers(1)
+    glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+    glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex, 0)
+    glViewport(0, 0, w, h)
+    return fbo
+
+
+def reference_noise(p):
+    """noiseTex() en NumPy: interpolación suave de la retícula NOISE_2D_SIZE² (repetible)"""
+    lattice = noise_data()['noise2d'] / 255.0
+    i = np.floor(p).astype(np.int64) % NOISE_2D_SIZE
+    f = p - np.floor(p)
+    f = f * f * (3.0 - 2.0 * f)
+    x0, y0 = i[..., 0], i[..., 1]
+    x1, y1 = (x0 + 1) % NOISE_2D_SIZE, (y0 + 1) % NOISE_2D_SIZE
+    bottom = lattice[y0, x0] * (1 - f[..., 0]) + lattice[y0, x1] * f[..., 0]
+    top = lattice[y1, x0] * (1 - f[..., 0]) + lattice[y1, x1] * f[..., 0]
+    return bottom * (1 - f[..., 1]) + top * f[..., 1]
+
+
+def check_noise():
+    """noiseTex() frente a la referencia NumPy y frente a la estadística del ruido ALU"""
+    program = shaders.compileProgram(shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER),
+                                     shaders.compileShader(CHECK_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+    noise = NoiseTextures(program, unit=1)
+    create_target(CHECK_SIZE, CHECK_SIZE, GL_R32F, GL_RED, GL_FLOAT)
+    vao = create_quad()
+
+    images = {}
+    for enabled in (False, True):
+        noise.set_enabled(enabled)
+        glUseProgram(program)
+        glUniform1f(glGetUniformLocation(program, 'uScale'), CHECK_SCALE)
+        noise.bind()
+        glBindVertexArray(vao)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        data = glReadPixels(0, 0, CHECK_SIZE, CHECK_SIZE, GL_RED, GL_FLOAT)
+        images[enabled] = np.frombuffer(data, np.float32).reshape(CHECK_SIZE, CHECK_SIZE)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    y, x = np.mgrid[0:CHECK_SIZE, 0:CHECK_SIZE] + 0.5
+    ref = reference_noise(np.stack((x, y), -1) * CHECK_SCALE)
+    # El filtro bilineal de la GPU usa pesos de 8 bits: ~1/256 de la diferencia entre esquinas
+    err = np.abs(images[True] - ref).max()
+    assert err < 1e-2, f"noiseTex difiere de la referencia (error máx {err:.2e})"
+    print(f"✓ noiseTex coincide con la retícula en NumPy (error máx {err:.2e})")
+
+    alu, tex = images[False], images[True]
+    print(f"  media / desviación: ALU {alu.mean():.3f} / {alu.std():.3f}   textura {tex.mean():.3f} / {tex.std():.3f}")
+    assert abs(alu.mean() - tex.mean()) < 0.02 and abs(alu.std() - tex.std()) < 0.02, \
+        "el ruido de textura no tiene la estadística del ALU"
+
+
+def timed(frame_fn):
+    """ms por frame (FRAMES frames tras 3 de calentamiento)"""
+    for f in range(3):
+        frame_fn(f)
+    glFinish()
+    start = time.perf_counter()
+    for f in range(FRAMES):
+        frame_fn(f)
+    glFinish()
+    return (time.perf_counter() - start) * 1000.0 / FRAMES
+
+
+def report(name, ms):
+    print(f"{name:<22} {ms[False]:9.2f} {ms[True]:9.2f} {ms[False] / ms[True]:8.2f}x")
+
+
+def bench_fullscreen(name):
+    """Fragment shader del preset a WIDTH x HEIGHT, uniforms de audio/MIDI en 0"""
+    mod = importlib.import_module(name)
+    program = shaders.compileProgram(shaders.compileShader(mod.VERTEX_SHADER, GL_VERTEX_SHADER),
+                                     shaders.compileShader(mod.FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+    noise = NoiseTextures(program, unit=1)
+    create_target(WIDTH, HEIGHT, GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE)
+    vao = create_quad()
+    u_time = glGetUniformLocation(program, 'iTime')
+
+    def frame(f):
+        glUniform1f(u_time, f / 60.0)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+
+    ms = {}
+    for enabled in (False, True):
+        noise.set_enabled(enabled)
+        glUseProgram(program)
+        glUniform2f(glGetUniformLocation(program, 'iResolution'), float(WIDTH), float(HEIGHT))
+        RayBounds(program).apply()    # Sin volumen envolvente: nada descartado
+        noise.bind()
+        glBindVertexArray(vao)
+        ms[enabled] = timed(frame)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    report(name, ms)
+
+
+def bench_particles(name):
+    """Paso + dibujo del ParticleSystem del preset (ruido en los vertex shaders)"""
+    mod = importlib.import_module(name)
+    particles = ParticleSystem(mod.PARTICLE_COUNT, mod.PARTICLE_UPDATE, mod.PARTICLE_RENDER)
+    noise = NoiseTextures([particles.update_shader, particles.render_shader], unit=1)
+    create_target(WIDTH, HEIGHT, GL_RGBA8, GL_RGBA, GL_UNSIGNED_BYTE)
+
+    def frame(f):
+        t = f / 60.0
+        particles.step(uTime=t, uDelta=1.0 / 60.0, iLow=0.0, iTurbulence=1.0, uRadius=mod.SWARM_RADIUS)
+        particles.draw(uTime=t, iLow=0.0, iHigh=0.0, iTurbulence=1.0,
+                       uAspect=WIDTH / HEIGHT, uPointScale=HEIGHT / 900.0)
+
+    ms = {}
+    for enabled in (False, True):
+        noise.set_enabled(enabled)
+        noise.bind()
+        ms[enabled] = timed(frame)
+    glBindFramebuffer(GL_FRAMEBUFFER, 0)
+    report(name, ms)
+
+
+if __name__ == '__main__':
+    try:
+        pygame.init()
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        pygame.display.set_mode((64, 64), OPENGL | DOUBLEBUF | HIDDEN)
+    except pygame.error as e:
+        print(f"Sin contexto OpenGL: {e}")
+    else:
+        check_noise()
+        print("=" * 70)
+        print(f"BENCHMARK RUIDO ALU vs TEXTURA - {WIDTH}x{HEIGHT}, {FRAMES} frames")
+        print("=" * 70)
+        print(f"{'preset':<22} {'alu ms':>9} {'tex ms':>9} {'mejora':>9}")
+        for name in PRESETS:
+            bench_fullscreen(name)
+        for name in PARTICLE_PRESETS:
+            bench_particles(name)
+        pygame.quit()
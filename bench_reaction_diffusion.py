@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark Reaction-Diffusion (Preset 16)
+Pasos/segundo de la referencia NumPy (gray_scott_step) y del solver GPU (GrayScottGPU).
+Si hay contexto OpenGL, compara el resultado GPU (RG32F) con la referencia:
+mismas ecuaciones, bordes periódicos, anisotropía e inyección.
+"""
+
+import time
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+
+from visuales_shader_16 import (GrayScottGPU, gray_scott_step, initial_state, diffusion_tensor,
+                                SIM_WIDTH, SIM_HEIGHT, FEED_KILL)
+
+NUMPY_STEPS = 200
+GPU_STEPS = 2000
+CHECK_STEPS = 100
+
+
+def bench_numpy():
+    a, b = initial_state(SIM_WIDTH, SIM_HEIGHT)
+    gray_scott_step(a, b, *FEED_KILL)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(NUMPY_STEPS):
+        a, b = gray_scott_step(a, b, *FEED_KILL)
+    sps = NUMPY_STEPS / (time.perf_counter() - start)
+    print(f"{'numpy':<10} {sps:10.1f} pasos/s")
+    return sps
+
+
+def check_gpu():
+    """GPU (RG32F) frente a la referencia NumPy con anisotropía e inyección"""
+    tensor = diffusion_tensor(0.7, 0.4)
+    inject = (SIM_WIDTH * 0.3, SIM_HEIGHT * 0.6, 8.0)
+
+    sim = GrayScottGPU(SIM_WIDTH, SIM_HEIGHT, GL_RG32F)
+    a, b = initial_state(SIM_WIDTH, SIM_HEIGHT)
+    sim.reset(a, b)
+
+    sim.step(1, *FEED_KILL, tensor, inject)
+    sim.step(CHECK_STEPS - 1, *FEED_KILL, tensor)
+    a, b = gray_scott_step(a, b, *FEED_KILL, tensor=tensor, inject=inject)
+    for _ in range(CHECK_STEPS - 1):
+        a, b = gray_scott_step(a, b, *FEED_KILL, tensor=tensor)
+
+    ga, gb = sim.read()
+    err = max(np.abs(ga - a).max(), np.abs(gb - b).max())
+    assert err < 1e-3, f"GPU difiere de la referencia (error máx {err:.2e})"
+    print(f"✓ GPU coincide con la referencia NumPy ({CHECK_STEPS} pasos, error máx {err:.2e})")
+
+
+def bench_gpu(label, internal_format):
+    sim = GrayScottGPU(SIM_WIDTH, SIM_HEIGHT, internal_format)
+    sim.step(10, *FEED_KILL)
+    glFinish()
+
+    start = time.perf_counter()
+    sim.step(GPU_STEPS, *FEED_KILL)
+    glFinish()
+    sps = GPU_STEPS / (time.perf_counter() - start)
+    print(f"{label:<10} {sps:10.1f} pasos/s")
+    return sps
+
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print(f"BENCHMARK GRAY-SCOTT - {SIM_WIDTH}x{SIM_HEIGHT}")
+    print("=" * 70)
+    bench_numpy()
+
+    try:
+        pygame.init()
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MAJOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_MINOR_VERSION, 3)
+        pygame.display.gl_set_attribute(pygame.GL_CONTEXT_PROFILE_MASK, pygame.GL_CONTEXT_PROFILE_CORE)
+        pygame.display.set_mode((64, 64), OPENGL | DOUBLEBUF | HIDDEN)
+    except pygame.error as e:
+        print(f"Sin contexto OpenGL, se omite la GPU: {e}")
+    else:
+        check_gpu()
+        bench_gpu("gpu rg16f", GL_RG16F)
+        bench_gpu("gpu rg32f", GL_RG32F)
+        pygame.quit()
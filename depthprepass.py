@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+DepthPrepass - Prepass de profundidad a baja resolución para raymarchers
+El mismo shader del preset se dibuja dos veces:
+
+1. A 1/scale de resolución (1/4 por defecto) marcha con cono: cada texel cubre
+   un bloque de scale x scale píxeles y el rayo central se para en cuanto el
+   cono del bloque toca la superficie (d < t * cono). Escribe en una textura
+   R32F la distancia recorrida menos el radio del cono: una cota inferior de
+   la distancia a la superficie para todos los rayos del bloque.
+2. A resolución completa cada rayo empieza en el mínimo de los 2x2 texels más
+   cercanos y solo da los pasos finales de refinado. La aproximación larga
+   (vacía) se marcha una vez por bloque en lugar de una vez por píxel.
+
+Es opcional por preset. GLSL (PREPASS_GLSL):
+
+    #define fragCoord prepassCoord()      // coordenada de pantalla en ambos pases
+    ...
+    if(d < max(0.001, prepassCone(t))) break;   // en el raymarch
+    ...
+    if (prepassWriting()) { fragColor = vec4(prepassDepth(t)); return; }
+    float t = raymarch(ro, rd, prepassStart(tNear, fragCoord), tFar);
+
+Python:
+
+    self.prepass = DepthPrepass(self.shader, unit=1)    # Unidad de textura libre en el preset
+    ...
+    # pixel_angle: apertura de un píxel en la cámara del preset (1 / vw si rd = normalize(fw + p.x*rt + p.y*up))
+    self.prepass.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), (vx, vy, vw, vh), 1.0 / vw)
+    glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+import numpy as np
+
+PREPASS_GLSL = """
+uniform int uPrepassMode;          // 0 = sin prepass, 1 = escribiendo (baja resolución), 2 = leyendo
+uniform sampler2D uPrepassDepth;
+uniform float uPrepassScale;       // Píxeles de pantalla por texel del prepass
+uniform float uPrepassCone;        // Radio del cono por unidad de distancia (0 fuera del prepass)
+uniform vec2 uPrepassOrigin;       // Origen del viewport del pase completo (el prepass se dibuja en 0, 0)
+
+bool prepassWriting() { return uPrepassMode == 1; }
+
+// Coordenada de pantalla a resolución completa (en el prepass, el centro del bloque).
+// Incluye el origen del viewport como gl_FragCoord en el pase completo: mismos rayos
+vec2 prepassCoord() {
+    return uPrepassMode == 1 ? gl_FragCoord.xy * uPrepassScale + uPrepassOrigin : gl_FragCoord.xy;
+}
+
+// Umbral de parada del cono (0 a resolución completa)
+float prepassCone(float t) { return t * uPrepassCone; }
+
+// Lo que escribe el prepass: la distancia menos el radio del cono
+float prepassDepth(float t) { return max(t - prepassCone(t), 0.0); }
+
+// Inicio del rayo a resolución completa: mínimo de los 2x2 texels más cercanos a
+// `coord`, el píxel cuyo rayo en el prepass es este (gl_FragCoord.xy salvo que el
+// preset desplace sus rayos por filas, como el tearing). Fuera de pantalla, tMin
+float prepassStart(float tMin, vec2 coord) {
+    if (uPrepassMode != 2) return tMin;
+    coord -= uPrepassOrigin;
+    ivec2 size = textureSize(uPrepassDepth, 0) - 1;
+    if (any(lessThan(coord, vec2(0.0))) || any(greaterThan(coord, vec2(size + 1) * uPrepassScale))) return tMin;
+    ivec2 i0 = ivec2(floor(coord / uPrepassScale - 0.5));
+    ivec2 a = clamp(i0, ivec2(0), size), b = clamp(i0 + 1, ivec2(0), size);
+    float d = min(min(texelFetch(uPrepassDepth, a, 0).r, texelFetch(uPrepassDepth, ivec2(b.x, a.y), 0).r),
+                  min(texelFetch(uPrepassDepth, ivec2(a.x, b.y), 0).r, texelFetch(uPrepassDepth, b, 0).r));
+    return max(tMin, d);
+}
+"""
+
+CONE_MARGIN = 1.5   # El cono cubre 1.5 bloques: el rayo de cualquier píxel cae en el del texel más cercano
+
+
+class DepthPrepass:
+    """Textura R32F a 1/scale de resolución + uniforms del prepass de profundidad"""
+
+    def __init__(self, program, scale=4, unit=0, enabled=True):
+        self.locs = {name: glGetUniformLocation(program, name)
+                     for name in ('uPrepassMode', 'uPrepassDepth', 'uPrepassScale', 'uPrepassCone', 'uPrepassOrigin')}
+        self.scale = scale
+        self.unit = unit
+        self.enabled = enabled
+        self.size = (0, 0)
+        self.fbo = None
+        self.texture = None
+
+    def ensure(self, w, h):
+        """Crea la textura o la reasigna solo si cambia el tamaño de pantalla"""
+        size = (max(1, -(-w // self.scale)), max(1, -(-h // self.scale)))
+        if self.fbo is not None and self.size == size:
+            return
+        if self.fbo is None:
+            self.fbo = int(np.atleast_1d(glGenFramebuffers(1))[0])
+            self.texture = int(np.atleast_1d(glGenTextures(1))[0])
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R32F, size[0], size[1], 0, GL_RED, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.size = size
+
+    def draw(self, draw, viewport, pixel_angle):
+        """
+        Dibuja el prepass con draw() (programa del preset en uso) y deja los uniforms
+        listos para el pase completo en `viewport` (x, y, w, h).
+        Desactivado, solo pone el modo 0 y el pase completo marcha como siempre.
+        """
+        if not self.enabled:
+            glUniform1i(self.locs['uPrepassMode'], 0)
+            glUniform1f(self.locs['uPrepassCone'], 0.0)
+            return
+        x, y, w, h = viewport
+        self.ensure(w, h)
+
+        # El pase completo vuelve al framebuffer que estuviera ligado (pantalla o FBO de postfx)
+        target = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.size[0], self.size[1])
+        glUniform1i(self.locs['uPrepassMode'], 1)
+        glUniform1f(self.locs['uPrepassScale'], float(self.scale))
+        glUniform1f(self.locs['uPrepassCone'], pixel_angle * self.scale * CONE_MARGIN)
+        # gl_FragCoord del pase completo incluye (x, y); el prepass marcha esos mismos rayos
+        glUniform2f(self.locs['uPrepassOrigin'], float(x), float(y))
+        draw()
+
+        glBindFramebuffer(GL_FRAMEBUFFER, int(target))
+        glViewport(x, y, w, h)
+        glActiveTexture(GL_TEXTURE0 + self.unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(self.locs['uPrepassDepth'], self.unit)
+        glUniform1i(self.locs['uPrepassMode'], 2)
+        glUniform1f(self.locs['uPrepassCone'], 0.0)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Feedback - Buffers ping-pong para efectos con memoria del frame anterior
+Dos texturas + FBO que se intercambian cada frame: se lee el frame anterior
+mientras se escribe el actual. Se reasignan solo al cambiar el tamaño.
+
+Cualquier preset puede leer su frame anterior (iPrevFrame):
+    self.feedback = FeedbackBuffer(GL_RGBA8)     # o GL_RGBA16F
+    ...
+    self.feedback.ensure(vw, vh)                 # solo reasigna si cambia el tamaño
+    self.feedback.begin()                        # escribir el frame actual
+    self.feedback.bind_previous(0)               # uniform sampler2D iPrevFrame; (unidad 0)
+    glDrawArrays(...)
+    self.feedback.end()
+    self.feedback.blit(vx, vy, vw, vh)           # copiar a pantalla
+
+PhosphorPersistence implementa la persistencia de fósforo de un CRT:
+cada frame multiplica la imagen acumulada por un factor de decaimiento
+(con blur y desplazamiento opcionales) y encima se dibuja solo la traza nueva.
+La geometría por frame es O(1) y la estela puede ser tan larga como se quiera.
+
+Uso:
+    self.phosphor = PhosphorPersistence(decay=0.9)
+    ...
+    self.phosphor.begin(w, h)      # FBO ligado, frame anterior ya decaído
+    glUseProgram(self.shader)
+    ...                            # dibujar solo la traza más reciente
+    self.phosphor.end()
+    glClear(GL_COLOR_BUFFER_BIT)
+    self.phosphor.present()        # suma aditiva sobre la pantalla
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+QUAD_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 vPos;
+out vec2 vUV;
+void main() {
+    vUV = vPos * 0.5 + 0.5;
+    gl_Position = vec4(vPos, 0.0, 1.0);
+}
+"""
+
+# Decaimiento del frame anterior (+ blur en cruz y desplazamiento opcionales)
+DECAY_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uPrev;
+uniform float uDecay;
+uniform float uBlur;        // 0 = sin blur, 1 = solo el promedio de los 4 vecinos
+uniform vec2 uTexel;        // 1 / resolución
+uniform vec2 uOffset;       // Desplazamiento por frame (UV)
+
+void main() {
+    vec2 uv = vUV - uOffset;
+    vec3 col = texture(uPrev, uv).rgb;
+
+    if (uBlur > 0.0) {
+        vec3 n = texture(uPrev, uv + vec2(uTexel.x, 0.0)).rgb
+               + texture(uPrev, uv - vec2(uTexel.x, 0.0)).rgb
+               + texture(uPrev, uv + vec2(0.0, uTexel.y)).rgb
+               + texture(uPrev, uv - vec2(0.0, uTexel.y)).rgb;
+        col = mix(col, n * 0.25, uBlur);
+    }
+
+    fragColor = vec4(col * uDecay, 1.0);
+}
+"""
+
+PRESENT_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uTex;
+uniform vec3 uTint;
+
+void main() {
+    fragColor = vec4(texture(uTex, vUV).rgb * uTint, 1.0);
+}
+"""
+
+
+def create_fullscreen_quad():
+    """VAO con un quad de pantalla completa (GL_TRIANGLE_FAN, 4 vértices)"""
+    verts = np.array([-1, -1, 1, -1, 1, 1, -1, 1], dtype=np.float32)
+    vao = glGenVertexArrays(1)
+    glBindVertexArray(vao)
+    vbo = glGenBuffers(1)
+    glBindBuffer(GL_ARRAY_BUFFER, vbo)
+    glBufferData(GL_ARRAY_BUFFER, verts, GL_STATIC_DRAW)
+    glEnableVertexAttribArray(0)
+    glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
+    glBindVertexArray(0)
+    return vao
+
+
+class FeedbackBuffer:
+    """
+    Par de texturas/FBO ping-pong.
+    `texture` es siempre el último frame completo: entre begin() y end() es el
+    frame anterior (lectura) y el FBO ligado escribe el actual.
+    """
+
+    def __init__(self, internal_format=GL_RGBA16F, wrap=GL_CLAMP_TO_EDGE, filter=GL_LINEAR, depth=False):
+        # GL_RGBA8 (mitad de ancho de banda) o GL_RGBA16F (HDR, decaimientos largos sin banding)
+        self.internal_format = internal_format
+        self.pixel_type = GL_UNSIGNED_BYTE if internal_format == GL_RGBA8 else GL_FLOAT
+        self.wrap = wrap
+        self.filter = filter  # GL_NEAREST para datos que no se deben interpolar (coordenadas, IDs)
+        self.depth = depth    # Depth buffer (uno compartido por los dos FBO) para escenas con depth test
+        self.depth_rb = None
+        self.size = (0, 0)
+        self.read = 0
+        self.fbos = None
+        self.textures = None
+
+    def ensure(self, w, h):
+        """Crea los buffers o los reasigna solo si cambia el tamaño. Devuelve True si se reasignaron"""
+        if self.fbos is not None and self.size == (w, h):
+            return False
+        if self.fbos is None:
+            self.fbos = [int(f) for f in np.atleast_1d(glGenFramebuffers(2))]
+            self.textures = [int(t) for t in np.atleast_1d(glGenTextures(2))]
+            if self.depth:
+                self.depth_rb = int(glGenRenderbuffers(1))
+
+        if self.depth_rb is not None:
+            glBindRenderbuffer(GL_RENDERBUFFER, self.depth_rb)
+            glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, w, h)
+            glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        for fbo, tex in zip(self.fbos, self.textures):
+            glBindTexture(GL_TEXTURE_2D, tex)
+            glTexImage2D(GL_TEXTURE_2D, 0, self.internal_format, w, h, 0, GL_RGBA, self.pixel_type, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, self.filter)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, self.filter)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, self.wrap)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, self.wrap)
+            if self.wrap == GL_CLAMP_TO_BORDER:
+                glTexParameterfv(GL_TEXTURE_2D, GL_TEXTURE_BORDER_COLOR, (0.0, 0.0, 0.0, 0.0))
+
+            glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex, 0)
+            if self.depth_rb is not None:
+                glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_rb)
+
+        self.size = (w, h)
+        self.clear()
+        return True
+
+    def clear(self):
+        """Borra ambos buffers (historial vacío) respetando el color de fondo del preset"""
+        clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+        glClearColor(0.0, 0.0, 0.0, 0.0)
+        for fbo in self.fbos:
+            glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+            glClear(GL_COLOR_BUFFER_BIT)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glClearColor(*clear_color)
+
+    @property
+    def texture(self):
+        return self.textures[self.read]
+
+    def begin(self):
+        """Liga el FBO de escritura con el viewport completo"""
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbos[1 - self.read])
+        glViewport(0, 0, self.size[0], self.size[1])
+
+    def end(self):
+        """Vuelve a la pantalla e intercambia: lo escrito pasa a ser `texture`"""
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.read = 1 - self.read
+
+    def bind_previous(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+
+    def blit(self, x, y, w, h):
+        """
+        Copia el último frame a la pantalla en el rectángulo dado (glBlitFramebuffer).
+        La pantalla no debe ser multisample; en ese caso dibujar la textura con un quad.
+        """
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbos[self.read])
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        sw, sh = self.size
+        filt = GL_NEAREST if (sw, sh) == (w, h) else GL_LINEAR
+        glBlitFramebuffer(0, 0, sw, sh, x, y, x + w, y + h, GL_COLOR_BUFFER_BIT, filt)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+
+class PhosphorPersistence:
+    """
+    Persistencia de fósforo con un FeedbackBuffer.
+    RGBA16F por defecto: con RGBA8 el decaimiento se queda atascado en valores bajos
+    (round(v * decay) == v) y las estelas nunca terminan de apagarse.
+    """
+
+    def __init__(self, decay=0.9, blur=0.0, offset=(0.0, 0.0), internal_format=GL_RGBA16F):
+        self.decay = decay
+        self.blur = blur
+        self.offset = offset
+        # Borde negro: con offset no se arrastran los píxeles del borde
+        self.buffer = FeedbackBuffer(internal_format, wrap=GL_CLAMP_TO_BORDER)
+        self.quad_vao = create_fullscreen_quad()
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(DECAY_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.decay_shader = shaders.compileProgram(vs, fs)
+        self.u_prev = glGetUniformLocation(self.decay_shader, 'uPrev')
+        self.u_decay = glGetUniformLocation(self.decay_shader, 'uDecay')
+        self.u_blur = glGetUniformLocation(self.decay_shader, 'uBlur')
+        self.u_texel = glGetUniformLocation(self.decay_shader, 'uTexel')
+        self.u_offset = glGetUniformLocation(self.decay_shader, 'uOffset')
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(PRESENT_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.present_shader = shaders.compileProgram(vs, fs)
+        self.u_tex = glGetUniformLocation(self.present_shader, 'uTex')
+        self.u_tint = glGetUniformLocation(self.present_shader, 'uTint')
+
+    @property
+    def texture(self):
+        """Imagen acumulada (válida después de end())"""
+        return self.buffer.texture
+
+    def begin(self, w, h):
+        """Liga el FBO de acumulación y escribe en él el frame anterior ya decaído"""
+        self.buffer.ensure(w, h)
+        self.buffer.begin()
+
+        # El pase de decaimiento sobrescribe el destino (sin blending)
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_BLEND)
+        glUseProgram(self.decay_shader)
+        self.buffer.bind_previous(0)
+        glUniform1i(self.u_prev, 0)
+        glUniform1f(self.u_decay, self.decay)
+        glUniform1f(self.u_blur, self.blur)
+        glUniform2f(self.u_texel, 1.0 / w, 1.0 / h)
+        glUniform2f(self.u_offset, *self.offset)
+        glBindVertexArray(self.quad_vao)
+        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        if blend:
+            glEnable(GL_BLEND)
+
+    def end(self):
+        self.buffer.end()
+
+    def present(self, tint=(1.0, 1.0, 1.0)):
+        """Dibuja la acumulación en el framebuffer actual (blending del preset, aditivo)"""
+        glUseProgram(self.present_shader)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glUniform1i(self.u_tex, 0)
+        glUniform3f(self.u_tint, *tint)
+        glBindVertexArray(self.quad_vao)
+        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
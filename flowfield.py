@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+FlowField - Campos vectoriales precalculados en texturas que se repiten (tiling)
+El campo (curl noise, turbulencia...) se evalúa una sola vez al arrancar, en GPU,
+y se guarda en una textura 2D o 3D con GL_REPEAT. Partículas y fondos lo leen
+con un solo texture() en lugar de recalcular ruido y derivadas por píxel.
+En 3D el tercer eje es el tiempo: desplazarse por él anima el campo (en bucle).
+
+El preset aporta la función del campo en coordenadas de tile p en [0, 1)^3
+(p.z = 0.5 en 2D). Para que la textura se repita sin costuras el ruido debe ser
+periódico: basta con envolver la celda del retículo antes del hash,
+p.ej. hash(mod(i, PERIOD)) con PERIOD celdas por tile.
+
+    vec4 flowField(vec3 p) { ... }
+
+Uso:
+    self.flow = FlowFieldTexture(FIELD_GLSL, (64, 64, 64))
+    ...
+    self.flow.bind(0)                      # uniform sampler3D uFlowField; (unidad 0)
+    // GLSL: texture(uFlowField, coords / PERIOD)
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+from feedback import QUAD_VERTEX_SHADER, create_fullscreen_quad
+
+BAKE_FRAGMENT_TEMPLATE = """
+#version 330 core
+out vec4 fragColor;
+uniform vec2 uSize;
+uniform float uLayer;   // Coordenada z del tile (centro de la capa)
+
+{FIELD}
+
+void main() {
+    // Centro de cada texel: la textura devuelve exactamente flowField(p) en esos puntos
+    fragColor = flowField(vec3(gl_FragCoord.xy / uSize, uLayer));
+}
+"""
+
+
+class FlowFieldTexture:
+    """Textura 2D (size = (w, h)) o 3D (size = (w, h, d)) con el campo horneado"""
+
+    def __init__(self, field_glsl, size, internal_format=GL_RGBA16F):
+        self.size = tuple(size)
+        self.target = GL_TEXTURE_3D if len(self.size) == 3 else GL_TEXTURE_2D
+        w, h = self.size[:2]
+        depth = self.size[2] if len(self.size) == 3 else 1
+
+        self.texture = glGenTextures(1)
+        glBindTexture(self.target, self.texture)
+        if self.target == GL_TEXTURE_3D:
+            glTexImage3D(GL_TEXTURE_3D, 0, internal_format, w, h, depth, 0, GL_RGBA, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_WRAP_R, GL_REPEAT)
+        else:
+            glTexImage2D(GL_TEXTURE_2D, 0, internal_format, w, h, 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(self.target, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(self.target, GL_TEXTURE_WRAP_T, GL_REPEAT)
+        glTexParameteri(self.target, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(self.target, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glBindTexture(self.target, 0)
+
+        self.bake(field_glsl, depth)
+
+    def bake(self, field_glsl, depth):
+        """Evalúa el campo capa a capa dibujando un quad en un FBO"""
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(BAKE_FRAGMENT_TEMPLATE.replace('{FIELD}', field_glsl), GL_FRAGMENT_SHADER)
+        program = shaders.compileProgram(vs, fs)
+        quad_vao = create_fullscreen_quad()
+
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        glViewport(0, 0, self.size[0], self.size[1])
+        glUseProgram(program)
+        glUniform2f(glGetUniformLocation(program, 'uSize'), float(self.size[0]), float(self.size[1]))
+        u_layer = glGetUniformLocation(program, 'uLayer')
+        glBindVertexArray(quad_vao)
+
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_BLEND)
+        for layer in range(depth):
+            if self.target == GL_TEXTURE_3D:
+                glFramebufferTextureLayer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, self.texture, 0, layer)
+            else:
+                glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+            glUniform1f(u_layer, (layer + 0.5) / depth)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        if blend:
+            glEnable(GL_BLEND)
+
+        # El programa de horneado no se vuelve a usar
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(*viewport)
+        glDeleteFramebuffers(1, [fbo])
+        glDeleteVertexArrays(1, [quad_vao])
+        glDeleteProgram(program)
+
+    def bind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(self.target, self.texture)
+
+    def read(self):
+        """Copia del campo en CPU (depth, h, w, 4) o (h, w, 4), para comprobaciones"""
+        glBindTexture(self.target, self.texture)
+        data = glGetTexImage(self.target, 0, GL_RGBA, GL_FLOAT)
+        glBindTexture(self.target, 0)
+        return np.asarray(data, dtype=np.float32).reshape(tuple(reversed(self.size)) + (4,))
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+NoiseTex - Texturas de ruido compartidas para los presets
+El ruido de valor de los presets (hash con sin() en las 4 esquinas de la celda,
+4-6 octavas de fbm) cuesta ~24 senos por llamada a fbm. Aquí la retícula de
+valores aleatorios vive en una textura repetible y el filtro bilineal de la GPU
+interpola las esquinas: una lectura por octava.
+
+- uNoise2D: retícula 2D (NOISE_2D_SIZE²) para noiseTex(vec2) / fbmTex(vec2, n).
+- uNoise3D: retícula 3D (NOISE_3D_SIZE³) para noiseTex(vec3) / fbmTex(vec3, n).
+- uBlueNoise: máscara de ruido azul (void-and-cluster) para grano y dither.
+
+Se generan una vez por proceso (semilla fija) y se guardan en CACHE_DIR; el ruido
+azul es lo único caro de generar. El patrón no es el mismo que el del hash (otros
+valores en la retícula), pero sí la forma: misma interpolación suave por celda.
+
+GLSL (NOISE_TEX_GLSL), drop-in en el noise() del preset:
+
+    float noise(vec2 p) {
+        if (uNoiseTextures == 1) return noiseTex(p);
+        ...                                     // ruido ALU original
+    }
+
+Python:
+
+    self.noise = NoiseTextures(self.shader, unit=1)    # Unidades libres: unit, unit + 1, unit + 2
+    ...
+    self.noise.bind()                                   # Cada frame, antes de dibujar
+
+El uniform uNoiseTextures (enabled) permite comparar con el ruido ALU
+(bench_noise.py) sin recompilar.
+"""
+
+from __future__ import division
+import os
+from OpenGL.GL import *
+import numpy as np
+
+NOISE_2D_SIZE = 256
+NOISE_3D_SIZE = 64
+BLUE_NOISE_SIZE = 64
+NOISE_SEED = 1337
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'junglelab')
+
+NOISE_TEX_GLSL = """
+uniform int uNoiseTextures;     // 1 = texturas, 0 = ruido ALU del preset
+uniform sampler2D uNoise2D;
+uniform sampler3D uNoise3D;
+uniform sampler2D uBlueNoise;
+
+const float NOISE_2D_SIZE = %(noise_2d).1f;
+const float NOISE_3D_SIZE = %(noise_3d).1f;
+const int BLUE_NOISE_SIZE = %(blue)d;
+
+// Ruido de valor en [0, 1]: el suavizado se aplica a la coordenada dentro de la
+// celda y el filtro bilineal mezcla las 4 esquinas en una sola lectura
+float noiseTex(vec2 p) {
+    vec2 i = mod(floor(p), NOISE_2D_SIZE);
+    vec2 f = fract(p);
+    f = f * f * (3.0 - 2.0 * f);
+    return textureLod(uNoise2D, (i + f + 0.5) / NOISE_2D_SIZE, 0.0).r;
+}
+
+float noiseTex(vec3 p) {
+    vec3 i = mod(floor(p), NOISE_3D_SIZE);
+    vec3 f = fract(p);
+    f = f * f * (3.0 - 2.0 * f);
+    return textureLod(uNoise3D, (i + f + 0.5) / NOISE_3D_SIZE, 0.0).r;
+}
+
+// fbm clásico: frecuencia x2 y amplitud x0.5 por octava, empezando en 0.5
+float fbmTex(vec2 p, int octaves) {
+    float value = 0.0;
+    float amplitude = 0.5;
+    for (int i = 0; i < octaves; i++) {
+        value += amplitude * noiseTex(p);
+        p *= 2.0;
+        amplitude *= 0.5;
+    }
+    return value;
+}
+
+float fbmTex(vec3 p, int octaves) {
+    float value = 0.0;
+    float amplitude = 0.5;
+    for (int i = 0; i < octaves; i++) {
+        value += amplitude * noiseTex(p);
+        p *= 2.0;
+        amplitude *= 0.5;
+    }
+    return value;
+}
+
+// Ruido azul en [0, 1) para el píxel `coord` (se repite cada BLUE_NOISE_SIZE píxeles)
+float blueNoiseTex(vec2 coord) {
+    return texelFetch(uBlueNoise, ivec2(floor(coord)) & (BLUE_NOISE_SIZE - 1), 0).r;
+}
+""" % {'noise_2d': NOISE_2D_SIZE, 'noise_3d': NOISE_3D_SIZE, 'blue': BLUE_NOISE_SIZE}
+
+
+def blue_noise(size, sigma=1.5, seed=0):
+    """
+    Máscara de ruido azul por void-and-cluster (Ulichney): rango de cada píxel
+    normalizado a [0, 1), repetible. La energía de cada píxel es la suma de una
+    gaussiana toroidal centrada en cada punto; se actualiza sumando o restando
+    el núcleo desplazado, sin recalcular la convolución.
+    """
+    rng = np.random.default_rng(seed)
+    n = size * size
+    d = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(d[:, None] ** 2 + d[None, :] ** 2) / (2.0 * sigma * sigma))
+
+    def splat(energy, index, sign):
+        energy += sign * np.roll(kernel, divmod(index, size), axis=(0, 1))
+
+    # Patrón inicial: un 10% de puntos al azar, redistribuidos moviendo el punto
+    # del cluster más denso al hueco más grande hasta que no cambia
+    mask = np.zeros(n, bool)
+    mask[rng.choice(n, n // 10, replace=False)] = True
+    energy = np.real(np.fft.ifft2(np.fft.fft2(mask.reshape(size, size)) * np.fft.fft2(kernel)))
+    for _ in range(n):
+        cluster = np.argmax(np.where(mask, energy.ravel(), -np.inf))
+        mask[cluster] = False
+        splat(energy, cluster, -1.0)
+        void = np.argmin(np.where(mask, np.inf, energy.ravel()))
+        mask[void] = True
+        splat(energy, void, 1.0)
+        if void == cluster:
+            break
+
+    rank = np.zeros(n, np.int32)
+    ones = int(mask.sum())
+
+    # Fase 1: los puntos iniciales, del cluster más denso hacia abajo
+    m, e = mask.copy(), energy.copy()
+    for r in range(ones - 1, -1, -1):
+        cluster = np.argmax(np.where(m, e.ravel(), -np.inf))
+        m[cluster] = False
+        splat(e, cluster, -1.0)
+        rank[cluster] = r
+
+    # Fases 2 y 3: el resto, siempre en el hueco más grande (el cluster más denso
+    # de ceros es el hueco más grande de unos: la misma energía)
+    m, e = mask, energy
+    for r in range(ones, n):
+        void = np.argmin(np.where(m, np.inf, e.ravel()))
+        m[void] = True
+        splat(e, void, 1.0)
+        rank[void] = r
+
+    return (rank.reshape(size, size) + 0.5) / n
+
+
+def noise_data():
+    """Retículas 2D / 3D y ruido azul en uint8; de la caché si existe"""
+    path = os.path.join(CACHE_DIR, 'noise_%d_%d_%d_%d.npz' % (NOISE_2D_SIZE, NOISE_3D_SIZE,
+                                                             BLUE_NOISE_SIZE, NOISE_SEED))
+    try:
+        with np.load(path) as cached:
+            return {name: cached[name] for name in ('noise2d', 'noise3d', 'blue')}
+    except (OSError, KeyError, ValueError):
+        pass
+
+    rng = np.random.default_rng(NOISE_SEED)
+    data = {
+        'noise2d': rng.integers(0, 256, (NOISE_2D_SIZE, NOISE_2D_SIZE), dtype=np.uint8),
+        'noise3d': rng.integers(0, 256, (NOISE_3D_SIZE,) * 3, dtype=np.uint8),
+        'blue': (blue_noise(BLUE_NOISE_SIZE, seed=NOISE_SEED) * 256.0).astype(np.uint8),
+    }
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.savez(path, **data)
+    except OSError as e:
+        print(f"⚠ No se pudo guardar la caché de ruido: {e}")
+    return data
+
+
+_textures = None
+
+
+def noise_textures():
+    """Texturas GL (2D, 3D, ruido azul), creadas una sola vez por proceso"""
+    global _textures
+    if _textures is not None:
+        return _textures
+
+    data = noise_data()
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+    tex2d, tex3d, blue = [int(t) for t in np.atleast_1d(glGenTextures(3))]
+
+    for tex, name, filt in ((tex2d, 'noise2d', GL_LINEAR), (blue, 'blue', GL_NEAREST)):
+        image = np.ascontiguousarray(data[name])
+        glBindTexture(GL_TEXTURE_2D, tex)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R8, image.shape[1], image.shape[0], 0, GL_RED, GL_UNSIGNED_BYTE, image)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, filt)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, filt)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_REPEAT)
+
+    volume = np.ascontiguousarray(data['noise3d'])
+    glBindTexture(GL_TEXTURE_3D, tex3d)
+    glTexImage3D(GL_TEXTURE_3D, 0, GL_R8, NOISE_3D_SIZE, NOISE_3D_SIZE, NOISE_3D_SIZE, 0,
+                 GL_RED, GL_UNSIGNED_BYTE, volume)
+    glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    for wrap in (GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_WRAP_R):
+        glTexParameteri(GL_TEXTURE_3D, wrap, GL_REPEAT)
+
+    glBindTexture(GL_TEXTURE_3D, 0)
+    glBindTexture(GL_TEXTURE_2D, 0)
+    glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+    _textures = (tex2d, tex3d, blue)
+    return _textures
+
+
+class NoiseTextures:
+    """Uniforms de NOISE_TEX_GLSL en uno o varios programas + bind de las texturas compartidas"""
+
+    def __init__(self, programs, unit=1, enabled=True):
+        self.programs = programs if isinstance(programs, (list, tuple)) else [programs]
+        self.unit = unit
+        self.textures = noise_textures()
+        self.set_enabled(enabled)
+
+    def set_enabled(self, enabled):
+        """Texturas (True) o ruido ALU (False) en todos los programas; deja el programa 0 en uso"""
+        self.enabled = enabled
+        for program in self.programs:
+            glUseProgram(program)
+            glUniform1i(glGetUniformLocation(program, 'uNoiseTextures'), 1 if enabled else 0)
+            for i, name in enumerate(('uNoise2D', 'uNoise3D', 'uBlueNoise')):
+                glUniform1i(glGetUniformLocation(program, name), self.unit + i)
+        glUseProgram(0)
+
+    def bind(self):
+        tex2d, tex3d, blue = self.textures
+        glActiveTexture(GL_TEXTURE0 + self.unit)
+        glBindTexture(GL_TEXTURE_2D, tex2d)
+        glActiveTexture(GL_TEXTURE0 + self.unit + 1)
+        glBindTexture(GL_TEXTURE_3D, tex3d)
+        glActiveTexture(GL_TEXTURE0 + self.unit + 2)
+        glBindTexture(GL_TEXTURE_2D, blue)
+        glActiveTexture(GL_TEXTURE0)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Particles - Motor de partículas en GPU con transform feedback (GL 3.3)
+El estado (posición / velocidad) vive en dos VBO ping-pong: un pase de vertex shader
+con GL_RASTERIZER_DISCARD lo avanza y otro lo dibuja como point sprites aditivos.
+El coste pasa de píxeles x partículas (bucles en el fragment shader) a
+partículas + relleno, con decenas de miles de partículas a 60 FPS.
+
+Cada preset aporta dos fragmentos GLSL:
+
+    // Actualización: pos.w = vida, vel.w = semilla aleatoria fija (0..1)
+    void updateParticle(inout vec4 pos, inout vec4 vel) { ... }
+
+    // Render: posición en clip space, color (premultiplicado) y tamaño en píxeles
+    vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) { ... }
+
+Uniforms disponibles en ambos: uTime, uDelta (más los que declare el preset).
+
+Uso:
+    self.particles = ParticleSystem(20000, UPDATE_GLSL, RENDER_GLSL)
+    ...
+    self.particles.step(uTime=t, uDelta=dt, uKick=self.kick_pulse)
+    self.particles.draw(uTime=t, uAspect=vw / vh)
+
+Sistemas con interacción entre partículas (vecinos) pueden simular en CPU
+(update_glsl=None) y subir el estado con upload(); el render es el mismo.
+neighbor_pairs() da los pares de vecinos con una rejilla uniforme (spatial hash)
+en O(n) en lugar de comparar todos contra todos.
+"""
+
+from __future__ import division
+import ctypes
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import itertools
+import numpy as np
+
+FLOATS_PER_PARTICLE = 8  # pos (xyz, vida) + vel (xyz, semilla)
+
+COMMON_GLSL = """
+#version 330 core
+uniform float uTime;
+uniform float uDelta;
+
+float particleHash(float n) { return fract(sin(n) * 43758.5453123); }
+"""
+
+UPDATE_TEMPLATE = COMMON_GLSL + """
+layout(location = 0) in vec4 aPos;
+layout(location = 1) in vec4 aVel;
+out vec4 vPos;
+out vec4 vVel;
+
+{UPDATE}
+
+void main() {
+    vec4 pos = aPos;
+    vec4 vel = aVel;
+    updateParticle(pos, vel);
+    vPos = pos;
+    vVel = vel;
+}
+"""
+
+RENDER_VERTEX_TEMPLATE = COMMON_GLSL + """
+layout(location = 0) in vec4 aPos;
+layout(location = 1) in vec4 aVel;
+out vec3 vColor;
+
+{RENDER}
+
+void main() {
+    float size;
+    gl_Position = renderParticle(aPos, aVel, vColor, size);
+    gl_PointSize = size;
+}
+"""
+
+SPRITE_FRAGMENT_SHADER = """
+#version 330 core
+in vec3 vColor;
+out vec4 fragColor;
+
+void main() {
+    // Sprite redondo con caída suave (glow)
+    float d = length(gl_PointCoord * 2.0 - 1.0);
+    if (d > 1.0) discard;
+    float glow = exp(-d * d * 4.0) * (1.0 - d);
+    fragColor = vec4(vColor * glow, 1.0);
+}
+"""
+
+
+def random_state(count, low=(-1.0, -1.0, 0.0), high=(1.0, 1.0, 0.0), seed=None):
+    """Estado inicial: posiciones uniformes en la caja [low, high], vida y semilla aleatorias, velocidad 0"""
+    rng = np.random.default_rng(seed)
+    state = np.zeros((count, FLOATS_PER_PARTICLE), dtype=np.float32)
+    state[:, 0:3] = rng.uniform(low, high, size=(count, 3))
+    state[:, 3] = rng.random(count)
+    state[:, 7] = rng.random(count)
+    return state
+
+
+def neighbor_pairs(points, radius, box=None):
+    """
+    Pares de vecinos (i < j) a distancia < radius con una rejilla uniforme de celda >= radius:
+    cada punto solo se compara con los de su celda y las adyacentes (3^dim celdas, la
+    mitad por par al recorrer solo las vecinas "hacia delante").
+    points: (n, dim). box: tamaño del dominio periódico (posiciones en [0, box)) o None.
+    Devuelve (i, j, delta, dist2) con delta = points[j] - points[i] (imagen mínima si es periódico).
+    """
+    points = np.asarray(points, dtype=np.float32)
+    n, dim = points.shape
+    if box is None:
+        cells = np.floor((points - points.min(axis=0)) / radius).astype(np.int64)
+        dims = cells.max(axis=0) + 1
+        offsets = [(-1, 0, 1)] * dim
+    else:
+        box = np.asarray(box, dtype=np.float32)
+        dims = np.maximum((box // radius).astype(np.int64), 1)
+        cells = np.floor(points / box * dims).astype(np.int64) % dims
+        # Con menos de 3 celdas en un eje, -1 y +1 serían la misma celda (pares duplicados)
+        offsets = [(-1, 0, 1) if d >= 3 else tuple(range(d)) for d in dims]
+
+    # Puntos ordenados por celda + inicio y tamaño de cada celda
+    strides = np.cumprod(np.concatenate(([1], dims[:-1])))
+    keys = (cells * strides).sum(axis=1)
+    order = np.argsort(keys, kind='stable')
+    cell_count = np.bincount(keys, minlength=int(np.prod(dims)))
+    cell_start = np.cumsum(cell_count) - cell_count
+
+    # Media plantilla: la propia celda y las vecinas "hacia delante" (desplazamiento
+    # lexicográficamente > 0), así cada par de celdas se recorre una sola vez. Con menos
+    # de 3 celdas en un eje periódico o y -o son la misma celda: plantilla completa
+    stencil = list(itertools.product(*offsets))
+    half = box is None or all(d >= 3 for d in dims)
+    if half:
+        stencil = [o for o in stencil if o >= (0,) * dim]
+    own = np.array([o == (0,) * dim for o in stencil])
+
+    # Todas las celdas vecinas de todos los puntos a la vez: (n, len(stencil))
+    nb = cells[:, None, :] + np.array(stencil, dtype=np.int64)[None]
+    if box is None:
+        valid = np.all((nb >= 0) & (nb < dims), axis=2)
+    else:
+        nb %= dims
+        valid = np.ones(nb.shape[:2], dtype=bool)
+    nb_keys = np.where(valid, (nb * strides).sum(axis=2), 0).ravel()
+    start = cell_start[nb_keys]
+    counts = np.where(valid.ravel(), cell_count[nb_keys], 0)
+
+    # Expandir los rangos [start, start + count) sin bucles de Python
+    total = counts.sum()
+    i = np.repeat(np.repeat(np.arange(n), nb.shape[1]), counts)
+    j = order[np.repeat(start - (np.cumsum(counts) - counts), counts) + np.arange(total)]
+    if half:
+        # Solo en la propia celda aparece cada par dos veces (y cada punto consigo mismo)
+        keep = (i < j) | ~np.repeat(np.tile(own, n), counts)
+        i, j = i[keep], j[keep]
+        i, j = np.minimum(i, j), np.maximum(i, j)
+    else:
+        keep = i < j
+        i, j = i[keep], j[keep]
+
+    # Eje a eje sobre columnas contiguas: indexar filas (n, dim) y difundir box sobre
+    # el eje corto es varias veces más lento con cientos de miles de candidatos
+    axes = []
+    dist2 = np.zeros(len(i), dtype=np.float32)
+    for k in range(dim):
+        column = np.ascontiguousarray(points[:, k])
+        d = column[j] - column[i]
+        if box is not None:
+            d -= box[k] * np.rint(d / box[k])
+        dist2 += d * d
+        axes.append(d)
+    close = np.flatnonzero(dist2 < radius * radius)
+    delta = np.stack([d[close] for d in axes], axis=1)
+    return i[close], j[close], delta, dist2[close]
+
+
+class ParticleSystem:
+    """Estado de partículas en dos VBO ping-pong avanzado por transform feedback"""
+
+    def __init__(self, count, update_glsl, render_glsl, initial_state=None):
+        self.count = count
+        self.read = 0
+        self.update_shader = None
+
+        # Programa de actualización: solo vertex shader + varyings capturados
+        # (None: el estado se simula en CPU y llega con upload())
+        if update_glsl is not None:
+            vs = shaders.compileShader(UPDATE_TEMPLATE.replace('{UPDATE}', update_glsl), GL_VERTEX_SHADER)
+            self.update_shader = glCreateProgram()
+            glAttachShader(self.update_shader, vs)
+            varyings = (ctypes.c_char_p * 2)(b'vPos', b'vVel')
+            glTransformFeedbackVaryings(self.update_shader, 2,
+                                        ctypes.cast(varyings, ctypes.POINTER(ctypes.POINTER(GLchar))),
+                                        GL_INTERLEAVED_ATTRIBS)
+            glLinkProgram(self.update_shader)
+            if not glGetProgramiv(self.update_shader, GL_LINK_STATUS):
+                raise RuntimeError(glGetProgramInfoLog(self.update_shader))
+
+        vs = shaders.compileShader(RENDER_VERTEX_TEMPLATE.replace('{RENDER}', render_glsl), GL_VERTEX_SHADER)
+        fs = shaders.compileShader(SPRITE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        # Sin validación: samplers de distinto tipo (ruido, espectro) comparten unidad 0 hasta
+        # que el preset los asigna
+        self.render_shader = shaders.compileProgram(vs, fs, validate=False)
+
+        self.locations = {self.update_shader: {}, self.render_shader: {}}
+
+        if initial_state is None:
+            initial_state = random_state(count)
+        state = np.ascontiguousarray(initial_state, dtype=np.float32)
+
+        # Dos VBO con su VAO (mismo layout para actualizar y dibujar)
+        self.vbos = [int(b) for b in np.atleast_1d(glGenBuffers(2))]
+        self.vaos = [int(a) for a in np.atleast_1d(glGenVertexArrays(2))]
+        stride = FLOATS_PER_PARTICLE * 4
+        for vao, vbo in zip(self.vaos, self.vbos):
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, vbo)
+            glBufferData(GL_ARRAY_BUFFER, state.nbytes, state, GL_DYNAMIC_COPY)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16))
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def set_uniforms(self, program, uniforms):
+        """Asigna uniforms float / vecN por nombre (localizaciones cacheadas)"""
+        cache = self.locations[program]
+        for name, value in uniforms.items():
+            loc = cache.get(name)
+            if loc is None:
+                loc = cache[name] = glGetUniformLocation(program, name)
+            if isinstance(value, (tuple, list)):
+                (glUniform2f, glUniform3f, glUniform4f)[len(value) - 2](loc, *value)
+            else:
+                glUniform1f(loc, value)
+
+    def step(self, **uniforms):
+        """Avanza todas las partículas un paso (sin rasterizar)"""
+        glUseProgram(self.update_shader)
+        self.set_uniforms(self.update_shader, uniforms)
+
+        write = 1 - self.read
+        glEnable(GL_RASTERIZER_DISCARD)
+        glBindVertexArray(self.vaos[self.read])
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, self.vbos[write])
+        glBeginTransformFeedback(GL_POINTS)
+        glDrawArrays(GL_POINTS, 0, self.count)
+        glEndTransformFeedback()
+        glBindBufferBase(GL_TRANSFORM_FEEDBACK_BUFFER, 0, 0)
+        glDisable(GL_RASTERIZER_DISCARD)
+        self.read = write
+
+    def upload(self, state):
+        """Sustituye el estado desde CPU (float32, (n <= count, 8)) para sistemas simulados en NumPy"""
+        state = np.ascontiguousarray(state, dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbos[self.read])
+        glBufferSubData(GL_ARRAY_BUFFER, 0, state.nbytes, state)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self, count=None, **uniforms):
+        """Dibuja las primeras `count` partículas como sprites aditivos"""
+        glUseProgram(self.render_shader)
+        self.set_uniforms(self.render_shader, uniforms)
+
+        # Estado de blending del preset (activación y funciones), restaurado tras el draw
+        blend = glIsEnabled(GL_BLEND)
+        blend_func = [int(glGetIntegerv(name)) for name in
+                      (GL_BLEND_SRC_RGB, GL_BLEND_DST_RGB, GL_BLEND_SRC_ALPHA, GL_BLEND_DST_ALPHA)]
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_ONE, GL_ONE)
+        glEnable(GL_PROGRAM_POINT_SIZE)
+        glBindVertexArray(self.vaos[self.read])
+        glDrawArrays(GL_POINTS, 0, self.count if count is None else count)
+        glBlendFuncSeparate(*blend_func)
+        if not blend:
+            glDisable(GL_BLEND)
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+PostFX - Cadena de post-proceso en GPU sobre la textura de escena del preset
+El preset dibuja su escena una sola vez en un buffer RGBA16F (HDR) y la cadena
+aplica, en orden: glitch de filas, RGB split, bloom, scanlines, viñeta, grano y
+tonemap + gamma. Los efectos se apilan sin recalcular la escena por píxel.
+
+Solo los efectos que leen píxeles vecinos (glitch, rgb_split, bloom) tienen pase
+de pantalla completa propio, que lee la textura que deja el anterior. Los que
+solo transforman el color de su píxel (PIXEL_PASSES: scanlines, viñeta, grano,
+tonemap) se funden: cada tramo de ellos consecutivos en la lista es un único
+pase de composición (CompositePass), sin ida y vuelta por un FBO entre efectos.
+Si justo antes hay un glitch o RGB split activo, la composición va en su mismo
+pase: ['rgb_split', 'vignette', 'tonemap'] es un solo pase tras la escena.
+
+El bloom es un glow real sobre lo que haya en pantalla: umbral suave y cadena
+de mips dual-Kawase (bajar a 1/2, 1/4... y volver a subir sumando cada nivel),
+con coste de ~1/4 de resolución. Con midi_map {'bloom.amount': ('kick_pulse', k)}
+el kick marca la intensidad.
+
+Los pases cuya intensidad está a ~0 se saltan (tonemap siempre se aplica); en
+una composición, las etapas inactivas son la identidad.
+Los parámetros se ponen a mano cada frame o se mapean a MIDI con midi_map:
+{'pase.parámetro': (atributo_del_motor, escala[, offset])}.
+
+Uso:
+    self.post = PostChain(['rgb_split', 'vignette', 'tonemap'],
+                          midi_map={'rgb_split.angle': ('hat_glitch', 1.0)})
+    self.post.set('vignette', amount=0.4)
+    ...
+    self.post.begin(vw, vh)                  # FBO de escena, viewport (0, 0, vw, vh)
+    glDrawArrays(...)                        # escena del preset (sin post-proceso)
+    self.post.apply_midi(self)
+    self.post.end(vx, vy, vw, vh, time)      # pases + último pase a pantalla
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+from feedback import FeedbackBuffer, QUAD_VERTEX_SHADER, create_fullscreen_quad
+
+PASS_TEMPLATE = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uScene;
+uniform vec2 uResolution;
+uniform float uTime;
+{UNIFORMS}
+
+float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
+float noise(vec2 p) {
+    vec2 i = floor(p), f = fract(p);
+    f = f * f * (3.0 - 2.0 * f);
+    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
+}
+mat2 rot(float a) { return mat2(cos(a), -sin(a), sin(a), cos(a)); }
+
+{BODY}
+
+void main() { fragColor = vec4(postFx(vUV), 1.0); }
+"""
+
+# nombre: (cuerpo GLSL con vec3 postFx(vec2 uv), parámetros por defecto,
+#          parámetros de intensidad: el pase se salta si todos están a ~0; vacío = siempre)
+# Cada parámetro es un uniform float u<Nombre> (amount -> uAmount).
+# Pases que leen píxeles vecinos: cada uno es un pase de pantalla completa
+PASSES = {
+    # Scanline Corruption (preset 14): filas desplazadas (hat), sync (kick), roll (tom2)
+    'glitch': ("""
+vec3 postFx(vec2 uv) {
+    if (uAmount > 0.1) {
+        float row = floor(uv.y * uResolution.y / 2.0);
+        float frame = floor(uTime * 10.0);
+        if (hash(vec2(row, frame)) > 0.8 - uAmount * 0.3) {
+            uv.x += (hash(vec2(row + 1.0, frame)) - 0.5) * uAmount * 0.2;
+        }
+    }
+    if (uSync > 0.2 && hash(vec2(uv.y * 50.0, uTime)) > 0.98) {
+        uv.x += (hash(vec2(uv.y, uTime + 1.0)) - 0.5) * uSync * 0.3;
+    }
+    uv.y += uRoll * sin(uTime * 5.0) * 0.1;
+    return texture(uScene, fract(uv)).rgb;
+}
+""", {'amount': 0.0, 'sync': 0.0, 'roll': 0.0}, ('amount', 'sync', 'roll')),
+
+    # RGB Displacement (preset 13): R y B desplazados en sentidos opuestos.
+    # amount en unidades de ancho; angle gira el desplazamiento con ruido; spin lo rota
+    'rgb_split': ("""
+vec3 postFx(vec2 uv) {
+    vec2 toUV = vec2(1.0, uResolution.x / uResolution.y);
+    vec2 p = (uv - 0.5) / toUV;
+    float angle = uAngle * 3.14 * noise(p * 3.0 + uTime);
+    vec2 offsetR = vec2(cos(angle), sin(angle)) * uAmount;
+    vec2 offsetB = -offsetR;
+    if (uSpin > 0.1) {
+        offsetR = rot(uSpin * 6.28) * offsetR;
+        offsetB = rot(-uSpin * 6.28) * offsetB;
+    }
+    return vec3(texture(uScene, uv + offsetR * toUV).r,
+                texture(uScene, uv).g,
+                texture(uScene, uv + offsetB * toUV).b);
+}
+""", {'amount': 0.0, 'angle': 0.0, 'spin': 0.0}, ('amount',)),
+
+    # Composición del bloom: la cadena de mips (uBloom) la prepara BloomPass.
+    # threshold/knee: umbral suave de brillo a partir del cual algo brilla
+    'bloom': ("""
+uniform sampler2D uBloom;
+uniform float uLevels;
+vec3 postFx(vec2 uv) {
+    return texture(uScene, uv).rgb + texture(uBloom, uv).rgb * (uAmount / uLevels);
+}
+""", {'amount': 0.0, 'threshold': 1.0, 'knee': 0.5}, ('amount',)),
+}
+
+# Pases por píxel: vec3 postPixel(vec3 color, vec2 uv) transforma el color de su
+# propio píxel. Se funden en CompositePass; con la intensidad a 0 son la identidad
+PIXEL_PASSES = {
+    # amount = profundidad (0..1); frequency en radianes por alto de pantalla;
+    # sharpness estrecha la transición entre línea y hueco (0 = senoidal)
+    'scanlines': ("""
+vec3 postPixel(vec3 color, vec2 uv) {
+    float scanline = 0.5 + 0.5 * sin(uv.y * uFrequency + uTime * uSpeed);
+    float edge = 0.5 - 0.5 * uSharpness;
+    scanline = uSharpness > 0.0 ? smoothstep(0.5 - edge, 0.5 + edge, scanline) : scanline;
+    return color * mix(1.0, scanline, uAmount);
+}
+""", {'amount': 0.0, 'frequency': 400.0, 'speed': 0.0, 'sharpness': 0.0}, ('amount',)),
+
+    'vignette': ("""
+vec3 postPixel(vec3 color, vec2 uv) {
+    return color * (1.0 - uAmount * length(uv - 0.5));
+}
+""", {'amount': 0.0}, ('amount',)),
+
+    'grain': ("""
+vec3 postPixel(vec3 color, vec2 uv) {
+    return color + (hash(uv * uResolution + fract(uTime) * 100.0) - 0.5) * uAmount;
+}
+""", {'amount': 0.0}, ('amount',)),
+
+    # Reinhard + gamma (siempre el último); gain multiplica después de la gamma
+    'tonemap': ("""
+vec3 postPixel(vec3 color, vec2 uv) {
+    color = color / (color + 1.0);
+    return pow(color, vec3(1.0 / uGamma)) * uGain;
+}
+""", {'gamma': 2.2, 'gain': 1.0}, ()),
+}
+
+# Bajada dual-Kawase: centro + 4 diagonales (cada lectura bilineal promedia 2x2).
+# En el primer nivel se aplica el umbral suave (solo lo brillante entra al bloom)
+BLOOM_DOWN_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uSource;
+uniform vec2 uTexel;        // 1 / tamaño del nivel de origen
+uniform float uThreshold;
+uniform float uKnee;
+uniform int uPrefilter;
+
+vec3 prefilter(vec3 c) {
+    float brightness = max(c.r, max(c.g, c.b));
+    float soft = clamp(brightness - uThreshold + uKnee, 0.0, 2.0 * uKnee);
+    soft = soft * soft / (4.0 * uKnee + 1e-5);
+    return c * max(soft, brightness - uThreshold) / max(brightness, 1e-5);
+}
+
+void main() {
+    vec3 sum = texture(uSource, vUV).rgb * 4.0;
+    sum += texture(uSource, vUV - uTexel).rgb;
+    sum += texture(uSource, vUV + uTexel).rgb;
+    sum += texture(uSource, vUV + vec2(uTexel.x, -uTexel.y)).rgb;
+    sum += texture(uSource, vUV - vec2(uTexel.x, -uTexel.y)).rgb;
+    sum *= 0.125;
+    fragColor = vec4(uPrefilter == 1 ? prefilter(sum) : sum, 1.0);
+}
+"""
+
+# Subida dual-Kawase: 8 lecturas en rombo; se suma (blending aditivo) al nivel mayor
+BLOOM_UP_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uSource;
+uniform vec2 uTexel;        // 1 / tamaño del nivel de origen (el menor)
+
+void main() {
+    vec2 h = uTexel;
+    vec3 sum = texture(uSource, vUV + vec2(-2.0 * h.x, 0.0)).rgb;
+    sum += texture(uSource, vUV + vec2(-h.x, h.y)).rgb * 2.0;
+    sum += texture(uSource, vUV + vec2(0.0, 2.0 * h.y)).rgb;
+    sum += texture(uSource, vUV + vec2(h.x, h.y)).rgb * 2.0;
+    sum += texture(uSource, vUV + vec2(2.0 * h.x, 0.0)).rgb;
+    sum += texture(uSource, vUV + vec2(h.x, -h.y)).rgb * 2.0;
+    sum += texture(uSource, vUV + vec2(0.0, -2.0 * h.y)).rgb;
+    sum += texture(uSource, vUV + vec2(-h.x, -h.y)).rgb * 2.0;
+    fragColor = vec4(sum / 12.0, 1.0);
+}
+"""
+
+
+def _uniform_name(param):
+    return 'u' + ''.join(part.capitalize() for part in param.split('_'))
+
+
+def _compile_pass(uniforms, body):
+    """Programa de pantalla completa con PASS_TEMPLATE: uniforms float + cuerpo con postFx()"""
+    uniforms = '\n'.join('uniform float %s;' % name for name in uniforms)
+    fs_src = PASS_TEMPLATE.replace('{UNIFORMS}', uniforms).replace('{BODY}', body)
+    vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+    fs = shaders.compileShader(fs_src, GL_FRAGMENT_SHADER)
+    return shaders.compileProgram(vs, fs)
+
+
+class PixelStage:
+    """Parámetros de un pase por píxel; lo dibuja el CompositePass que lo contiene"""
+
+    def __init__(self, name):
+        self.body, defaults, self.gates = PIXEL_PASSES[name]
+        self.name = name
+        self.params = dict(defaults)
+
+    @property
+    def active(self):
+        return not self.gates or any(abs(self.params[g]) > 1e-3 for g in self.gates)
+
+    def uniform_name(self, param):
+        """Uniforms con el nombre del pase delante: varias etapas comparten programa"""
+        return _uniform_name(self.name + '_' + param)
+
+    def glsl(self):
+        """Cuerpo renombrado a postPixel_<nombre>, con sus uniforms prefijados"""
+        renames = [('postPixel', 'postPixel_' + self.name)]
+        renames += [(_uniform_name(p), self.uniform_name(p)) for p in self.params]
+        return ('\n'.join('#define %s %s' % r for r in renames) + self.body +
+                '\n'.join('#undef %s' % old for old, _ in renames) + '\n')
+
+
+class PostPass:
+    """Un pase de la cadena: programa compilado + valores de sus parámetros"""
+
+    fused = None    # Variante con la composición siguiente en el mismo pase (la pone PostChain)
+
+    def __init__(self, name):
+        body, defaults, self.gates = PASSES[name]
+        self.name = name
+        self.params = dict(defaults)
+        self.shader = _compile_pass([_uniform_name(p) for p in defaults], body)
+        self.u_scene = glGetUniformLocation(self.shader, 'uScene')
+        self.u_resolution = glGetUniformLocation(self.shader, 'uResolution')
+        self.u_time = glGetUniformLocation(self.shader, 'uTime')
+        self.u_params = {p: glGetUniformLocation(self.shader, _uniform_name(p)) for p in defaults}
+
+    @property
+    def active(self):
+        return not self.gates or any(abs(self.params[g]) > 1e-3 for g in self.gates)
+
+    def prepare(self, source, w, h):
+        """Trabajo previo fuera de la cadena (texturas auxiliares); por defecto nada"""
+        pass
+
+    def draw(self, w, h, time):
+        glUseProgram(self.shader)
+        glUniform1i(self.u_scene, 0)
+        glUniform2f(self.u_resolution, float(w), float(h))
+        glUniform1f(self.u_time, time)
+        for param, value in self.params.items():
+            glUniform1f(self.u_params[param], value)
+        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+
+class CompositePass(PostPass):
+    """
+    Tramo de pases por píxel consecutivos fundidos en un solo pase de pantalla completa.
+    Con `source` (un PostPass simple) el color de partida es su postFx() en lugar de la escena.
+    """
+
+    def __init__(self, stages, source=None):
+        self.stages = stages
+        self.source = source
+        self.name = '+'.join(p.name for p in ([source] if source else []) + stages)
+        body, uniforms, owners = '', [], []
+        if source is not None:
+            body += '#define postFx postFx_source' + PASSES[source.name][0] + '#undef postFx\n'
+            uniforms += [_uniform_name(p) for p in source.params]
+            owners += [(source, p, _uniform_name(p)) for p in source.params]
+        body += ''.join(stage.glsl() for stage in stages)
+        body += 'vec3 postFx(vec2 uv) {\n    vec3 color = %s;\n' % (
+            'postFx_source(uv)' if source is not None else 'texture(uScene, uv).rgb')
+        body += ''.join('    color = postPixel_%s(color, uv);\n' % stage.name for stage in stages)
+        body += '    return color;\n}\n'
+        uniforms += [s.uniform_name(p) for s in stages for p in s.params]
+        owners += [(s, p, s.uniform_name(p)) for s in stages for p in s.params]
+        self.shader = _compile_pass(uniforms, body)
+        self.u_scene = glGetUniformLocation(self.shader, 'uScene')
+        self.u_resolution = glGetUniformLocation(self.shader, 'uResolution')
+        self.u_time = glGetUniformLocation(self.shader, 'uTime')
+        self.u_params = {(owner, p): glGetUniformLocation(self.shader, name) for owner, p, name in owners}
+
+    @property
+    def active(self):
+        return any(stage.active for stage in self.stages)
+
+    def draw(self, w, h, time):
+        glUseProgram(self.shader)
+        glUniform1i(self.u_scene, 0)
+        glUniform2f(self.u_resolution, float(w), float(h))
+        glUniform1f(self.u_time, time)
+        for (owner, param), loc in self.u_params.items():
+            glUniform1f(loc, owner.params[param])
+        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+
+class BloomPass(PostPass):
+    """Bloom: cadena de mips dual-Kawase a partir de 1/2 de resolución + composición"""
+
+    def __init__(self, name, levels=5):
+        PostPass.__init__(self, name)
+        self.max_levels = levels
+        self.u_bloom = glGetUniformLocation(self.shader, 'uBloom')
+        self.u_levels = glGetUniformLocation(self.shader, 'uLevels')
+        self.size = (0, 0)
+        self.mips = []              # [(fbo, textura, (w, h)), ...] de mayor a menor
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(BLOOM_DOWN_SHADER, GL_FRAGMENT_SHADER)
+        self.down_shader = shaders.compileProgram(vs, fs)
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(BLOOM_UP_SHADER, GL_FRAGMENT_SHADER)
+        self.up_shader = shaders.compileProgram(vs, fs)
+        self.u_down = {n: glGetUniformLocation(self.down_shader, n)
+                       for n in ('uSource', 'uTexel', 'uThreshold', 'uKnee', 'uPrefilter')}
+        self.u_up = {n: glGetUniformLocation(self.up_shader, n) for n in ('uSource', 'uTexel')}
+
+    def ensure(self, w, h):
+        """(Re)crea los niveles solo al cambiar el tamaño"""
+        if self.size == (w, h):
+            return
+        for fbo, tex, _ in self.mips:
+            glDeleteFramebuffers(1, [fbo])
+            glDeleteTextures([tex])
+        self.mips = []
+        mw, mh = w // 2, h // 2
+        while len(self.mips) < self.max_levels and min(mw, mh) >= 8:
+            tex = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, tex)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, mw, mh, 0, GL_RGBA, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+            fbo = glGenFramebuffers(1)
+            glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+            glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex, 0)
+            self.mips.append((fbo, tex, (mw, mh)))
+            mw, mh = mw // 2, mh // 2
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.size = (w, h)
+
+    def prepare(self, source, w, h):
+        self.ensure(w, h)
+        glActiveTexture(GL_TEXTURE0)
+
+        # Bajada: escena -> 1/2 (con umbral) -> 1/4 -> ...
+        glUseProgram(self.down_shader)
+        glUniform1i(self.u_down['uSource'], 0)
+        glUniform1f(self.u_down['uThreshold'], self.params['threshold'])
+        glUniform1f(self.u_down['uKnee'], max(self.params['knee'], 1e-3))
+        src_tex, src_size = source, (w, h)
+        for i, (fbo, tex, size) in enumerate(self.mips):
+            glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+            glViewport(0, 0, size[0], size[1])
+            glBindTexture(GL_TEXTURE_2D, src_tex)
+            glUniform2f(self.u_down['uTexel'], 1.0 / src_size[0], 1.0 / src_size[1])
+            glUniform1i(self.u_down['uPrefilter'], 1 if i == 0 else 0)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+            src_tex, src_size = tex, size
+
+        # Subida: cada nivel se suma al mayor; al final mips[0] tiene el bloom completo
+        glUseProgram(self.up_shader)
+        glUniform1i(self.u_up['uSource'], 0)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_ONE, GL_ONE)
+        for (fbo, _, size), (_, src_tex, src_size) in reversed(list(zip(self.mips, self.mips[1:]))):
+            glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+            glViewport(0, 0, size[0], size[1])
+            glBindTexture(GL_TEXTURE_2D, src_tex)
+            glUniform2f(self.u_up['uTexel'], 1.0 / src_size[0], 1.0 / src_size[1])
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        glDisable(GL_BLEND)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def draw(self, w, h, time):
+        glUseProgram(self.shader)
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D, self.mips[0][1] if self.mips else 0)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(self.u_bloom, 1)
+        glUniform1f(self.u_levels, float(max(len(self.mips), 1)))
+        PostPass.draw(self, w, h, time)
+
+
+# Pases con trabajo propio además de la composición
+PASS_CLASSES = {'bloom': BloomPass}
+
+
+class PostChain:
+    """Lista ordenada de pases sobre la escena del preset"""
+
+    def __init__(self, passes, midi_map=None, internal_format=GL_RGBA16F, wrap=GL_CLAMP_TO_EDGE, depth=False):
+        # Los pases por píxel consecutivos se agrupan en un CompositePass
+        self.passes = []
+        self.by_name = {}
+        stages = []
+        for name in passes:
+            if name in PIXEL_PASSES:
+                stages.append(PixelStage(name))
+                self.by_name[name] = stages[-1]
+                continue
+            if stages:
+                self.passes.append(CompositePass(stages))
+                stages = []
+            self.passes.append(PASS_CLASSES.get(name, PostPass)(name))
+            self.by_name[name] = self.passes[-1]
+        if stages:
+            self.passes.append(CompositePass(stages))
+
+        # Glitch / RGB split seguidos de una composición: variante con ambos en un pase
+        for post_pass, composite in zip(self.passes, self.passes[1:]):
+            if type(post_pass) is PostPass and isinstance(composite, CompositePass):
+                post_pass.fused = CompositePass(composite.stages, source=post_pass)
+        self.midi_map = dict(midi_map or {})
+        # depth=True: la escena del preset usa depth test (FBO con depth buffer)
+        self.buffer = FeedbackBuffer(internal_format, wrap=wrap, depth=depth)
+        self.quad_vao = create_fullscreen_quad()
+
+    def set(self, name, **params):
+        for param, value in params.items():
+            if param not in self.by_name[name].params:
+                raise KeyError('%s.%s' % (name, param))
+            self.by_name[name].params[param] = float(value)
+
+    def apply_midi(self, engine):
+        """Copia en los parámetros mapeados los valores MIDI del motor (kick_pulse, hat_glitch...)"""
+        for key, mapping in self.midi_map.items():
+            name, param = key.split('.')
+            attr, scale = mapping[0], mapping[1]
+            offset = mapping[2] if len(mapping) > 2 else 0.0
+            self.set(name, **{param: getattr(engine, attr) * scale + offset})
+
+    def begin(self, w, h):
+        """Liga el FBO de escena (viewport 0, 0, w, h); el preset dibuja encima"""
+        self.buffer.ensure(w, h)
+        self.buffer.begin()
+
+    def end(self, x, y, w, h, time):
+        """Aplica los pases activos; el último escribe directamente en la pantalla"""
+        self.buffer.end()
+        active = []
+        for post_pass in self.passes:
+            if not post_pass.active:
+                continue
+            if active and active[-1].fused is not None and active[-1].fused.stages is getattr(post_pass, 'stages', None):
+                active[-1] = active[-1].fused       # La composición va en el pase anterior
+                continue
+            active.append(post_pass)
+        if not active:
+            self.buffer.blit(x, y, w, h)
+            return
+
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_BLEND)
+        glBindVertexArray(self.quad_vao)
+        for i, post_pass in enumerate(active):
+            last = i == len(active) - 1
+            post_pass.prepare(self.buffer.texture, w, h)
+            if last:
+                glBindFramebuffer(GL_FRAMEBUFFER, 0)
+                glViewport(x, y, w, h)
+            else:
+                self.buffer.begin()
+            self.buffer.bind_previous(0)
+            post_pass.draw(w, h, time)
+            if not last:
+                self.buffer.end()
+        if blend:
+            glEnable(GL_BLEND)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+RayBounds - Volumen envolvente analítico para los presets de raymarching
+Antes de marchar, el rayo se corta con una esfera, una caja o un tubo que
+contiene el objeto (el preset lo dimensiona cada frame con su escala actual:
+kick, Tom1, glitch...). Si no lo toca, el píxel es fondo sin dar un solo paso;
+si lo toca, el raymarch empieza en la entrada y termina en la salida.
+
+El tubo es una corteza cilíndrica alrededor del eje z (radios interior y
+exterior), para túneles infinitos que ni una esfera ni una caja acotan.
+
+GLSL (BOUNDS_GLSL):
+
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+    float t = hit ? raymarch(ro, rd, tNear, tFar) : MAX_DIST;
+    ...
+    color = boundsDebugTint(color, !hit);
+
+Python:
+
+    self.bounds = RayBounds(self.shader)
+    ...
+    self.bounds.sphere(1.5 * scale)
+    self.bounds.apply()
+    self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), vw * vh)
+
+Con debug activo (tecla B en los presets) los píxeles descartados se tiñen y un
+segundo pase barato (solo el test del volumen) los cuenta con una query
+GL_SAMPLES_PASSED; el porcentaje va al título de la ventana.
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+
+BOUNDS_GLSL = """
+uniform int uBoundsShape;    // 0 = esfera, 1 = caja, 2 = tubo (eje z)
+uniform vec3 uBoundsCenter;
+uniform vec3 uBoundsSize;    // Esfera: radio en x; caja: semiejes; tubo: radios interior/exterior en xy
+uniform int uBoundsDebug;    // 0 = normal, 1 = tinte en lo descartado, 2 = pase de conteo
+
+// Intervalo del rayo 2D (o + t d) dentro del círculo de radio r; vacío si x > y
+vec2 boundsCircle(vec2 o, vec2 d, float r) {
+    float a = dot(d, d);
+    float b = dot(o, d);
+    float c = dot(o, o) - r * r;
+    if (a < 1e-8) return c < 0.0 ? vec2(-1e9, 1e9) : vec2(1.0, -1.0);
+    float h = b * b - a * c;
+    if (h < 0.0) return vec2(1.0, -1.0);
+    h = sqrt(h);
+    return vec2(-b - h, -b + h) / a;
+}
+
+// Intervalo [entrada, salida] del rayo en el volumen, con entrada >= 0; vacío si x > y
+vec2 boundsInterval(vec3 ro, vec3 rd) {
+    vec3 o = ro - uBoundsCenter;
+    if (uBoundsShape == 0) {
+        float b = dot(o, rd);
+        float h = b * b - dot(o, o) + uBoundsSize.x * uBoundsSize.x;
+        if (h < 0.0) return vec2(1.0, -1.0);
+        h = sqrt(h);
+        return vec2(max(-b - h, 0.0), -b + h);
+    }
+    if (uBoundsShape == 1) {
+        vec3 inv = 1.0 / rd;
+        vec3 t0 = (-uBoundsSize - o) * inv;
+        vec3 t1 = (uBoundsSize - o) * inv;
+        vec3 tmin = min(t0, t1), tmax = max(t0, t1);
+        return vec2(max(max(tmin.x, tmin.y), max(tmin.z, 0.0)), min(tmax.x, min(tmax.y, tmax.z)));
+    }
+    // Tubo: dentro del cilindro exterior; si el rayo nace en el hueco, entra al salir de él
+    vec2 outer = boundsCircle(o.xy, rd.xy, uBoundsSize.y);
+    vec2 inner = boundsCircle(o.xy, rd.xy, uBoundsSize.x);
+    float entry = max(outer.x, 0.0);
+    if (inner.x < 0.0 && inner.y > 0.0) entry = inner.y;
+    return vec2(entry, outer.y);
+}
+
+bool rayBounds(vec3 ro, vec3 rd, out float tNear, out float tFar) {
+    vec2 t = boundsInterval(ro, rd);
+    tNear = t.x;
+    tFar = t.y;
+    return t.x <= t.y;
+}
+
+// Pase de conteo (GL_SAMPLES_PASSED): solo sobreviven los píxeles descartados
+bool boundsCounting(bool culled) {
+    if (uBoundsDebug != 2) return false;
+    if (!culled) discard;
+    return true;
+}
+
+vec3 boundsDebugTint(vec3 color, bool culled) {
+    return (uBoundsDebug == 1 && culled) ? mix(color, vec3(1.0, 0.0, 0.3), 0.35) : color;
+}
+"""
+
+SHAPES = {'sphere': 0, 'box': 1, 'tube': 2}
+
+
+class RayBounds:
+    """Uniforms del volumen envolvente + porcentaje de píxeles descartados (debug)"""
+
+    def __init__(self, program, debug=False):
+        self.program = program
+        self.locs = {name: glGetUniformLocation(program, name)
+                     for name in ('uBoundsShape', 'uBoundsCenter', 'uBoundsSize', 'uBoundsDebug')}
+        self.debug = debug
+        self.shape = SHAPES['sphere']
+        self.center = (0.0, 0.0, 0.0)
+        self.size = (1e9, 0.0, 0.0)       # Hasta el primer set: nada se descarta
+        self.query = int(glGenQueries(1)[0])
+        self.pending_pixels = 0           # Píxeles del conteo en vuelo (se lee un frame tarde)
+        self.culled = 0.0                 # Fracción de píxeles descartados en el último conteo
+
+    def sphere(self, radius, center=(0.0, 0.0, 0.0)):
+        self.shape, self.center, self.size = SHAPES['sphere'], center, (radius, 0.0, 0.0)
+
+    def box(self, half, center=(0.0, 0.0, 0.0)):
+        half = (half, half, half) if isinstance(half, (int, float)) else tuple(half)
+        self.shape, self.center, self.size = SHAPES['box'], center, half
+
+    def tube(self, inner, outer, center=(0.0, 0.0, 0.0)):
+        self.shape, self.center, self.size = SHAPES['tube'], center, (inner, outer, 0.0)
+
+    def apply(self):
+        """Sube los uniforms (con el programa del preset en uso)"""
+        glUniform1i(self.locs['uBoundsShape'], self.shape)
+        glUniform3f(self.locs['uBoundsCenter'], *[float(c) for c in self.center])
+        glUniform3f(self.locs['uBoundsSize'], *[float(s) for s in self.size])
+        glUniform1i(self.locs['uBoundsDebug'], 1 if self.debug else 0)
+
+    def draw(self, draw, pixels):
+        """Dibuja con draw(); en debug repite el draw como pase de conteo sin escribir color"""
+        draw()
+        if not self.debug:
+            return
+        if self.pending_pixels:
+            samples = glGetQueryObjectuiv(self.query, GL_QUERY_RESULT)
+            self.culled = samples / self.pending_pixels
+        glUniform1i(self.locs['uBoundsDebug'], 2)
+        glColorMask(GL_FALSE, GL_FALSE, GL_FALSE, GL_FALSE)
+        glBeginQuery(GL_SAMPLES_PASSED, self.query)
+        draw()
+        glEndQuery(GL_SAMPLES_PASSED)
+        glColorMask(GL_TRUE, GL_TRUE, GL_TRUE, GL_TRUE)
+        glUniform1i(self.locs['uBoundsDebug'], 1)
+        self.pending_pixels = pixels
+
+    def label(self):
+        """Texto para el título de la ventana"""
+        return ' | culled %d%%' % round(self.culled * 100.0) if self.debug else ''
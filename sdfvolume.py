@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SDFVolume - Distancia de un fractal horneada en una textura 3D
+El estimador de distancia (DE) completo se evalúa una vez por vóxel en GPU y se
+guarda en una textura 3D (128^3 R16F por defecto) que cubre la caja
+[-bounds, bounds]^3. El raymarching usa la lectura trilineal para los pasos
+lejanos y solo llama al DE exacto cerca de la superficie.
+
+El preset aporta la función sdf(p) en coordenadas de objeto; sus parámetros de
+morph son uniforms normales (int o float) que se pasan como diccionario:
+
+    uniform float uPower;
+    float sdf(vec3 p) { return mandelbulb(p, uPower); }
+
+Solo se rehornea cuando cambian los parámetros, y de forma incremental: unas
+pocas capas por frame sobre un segundo volumen, que pasa a ser el visible
+cuando está completo (nunca se ve un volumen a medias). Un horneado en curso
+no se reinicia si los parámetros vuelven a cambiar: termina y después se
+hornean los más recientes.
+
+El volumen solo vale para los parámetros con los que se horneó: update()
+devuelve si el visible coincide con los actuales y el shader debe recibirlo en
+uSDFReady (con 0 se usa siempre el DE exacto; uSDFMargin solo cubre el error
+de la lectura, no un volumen de otra potencia/escala).
+
+Uso:
+    self.sdf_volume = SDFVolume(SDF_GLSL, bounds=1.5)
+    ...
+    ready = self.sdf_volume.update({'uPower': round(power * 4.0) / 4.0})
+    glUniform1i(self.uni_sdf_ready, int(ready))
+    self.sdf_volume.bind(0)
+    // GLSL (SAMPLE_GLSL): float d = uSDFReady == 1 ? sdfVolume(q) : 0.0; if (d < 2.0 * uSDFMargin) d = map(p);
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+from feedback import QUAD_VERTEX_SHADER, create_fullscreen_quad
+
+BAKE_FRAGMENT_TEMPLATE = """
+#version 330 core
+out vec4 fragColor;
+uniform vec2 uSize;
+uniform float uLayer;    // Coordenada z de la capa en [0, 1] (centro del vóxel)
+uniform float uBounds;
+
+{SDF}
+
+void main() {
+    vec3 p = (vec3(gl_FragCoord.xy / uSize, uLayer) * 2.0 - 1.0) * uBounds;
+    fragColor = vec4(sdf(p), 0.0, 0.0, 1.0);
+}
+"""
+
+# Lectura en el shader del preset. Fuera de la caja se usa la mejor de dos cotas
+# inferiores: distancia a la caja (el objeto está dentro) y valor en el borde
+# menos lo que falta hasta él. uSDFMargin es el error máximo de la lectura
+# (trilineal + R16F): por debajo de un par de márgenes hay que usar el DE exacto;
+# por encima, el factor de paso < 1 del raymarch ya absorbe el error.
+SAMPLE_GLSL = """
+uniform sampler3D uSDFVolume;
+uniform float uSDFBounds;
+uniform float uSDFMargin;
+uniform int uSDFReady;      // 1 si el volumen visible se horneó con los parámetros actuales
+
+float sdfVolume(vec3 p) {
+    float outside = length(max(abs(p) - vec3(uSDFBounds), 0.0));
+    float d = texture(uSDFVolume, clamp(p / (2.0 * uSDFBounds) + 0.5, 0.0, 1.0)).r;
+    return max(outside, d - outside);
+}
+"""
+
+
+class SDFVolume:
+    """Textura 3D con sdf(p) en [-bounds, bounds]^3, con doble buffer para rehornear"""
+
+    def __init__(self, sdf_glsl, bounds, size=128, internal_format=GL_R16F, layers_per_frame=32):
+        self.bounds = bounds
+        self.size = size
+        self.layers_per_frame = layers_per_frame
+        # Error máximo de la interpolación trilineal (diagonal de medio vóxel) con holgura
+        self.margin = np.sqrt(3.0) * bounds / size * 1.5
+
+        self.textures = list(glGenTextures(2))
+        for texture in self.textures:
+            glBindTexture(GL_TEXTURE_3D, texture)
+            glTexImage3D(GL_TEXTURE_3D, 0, internal_format, size, size, size, 0, GL_RED, GL_FLOAT, None)
+            for wrap in (GL_TEXTURE_WRAP_S, GL_TEXTURE_WRAP_T, GL_TEXTURE_WRAP_R):
+                glTexParameteri(GL_TEXTURE_3D, wrap, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_3D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glBindTexture(GL_TEXTURE_3D, 0)
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(BAKE_FRAGMENT_TEMPLATE.replace('{SDF}', sdf_glsl), GL_FRAGMENT_SHADER)
+        self.bake_shader = shaders.compileProgram(vs, fs)
+        self.u_layer = glGetUniformLocation(self.bake_shader, 'uLayer')
+        glUseProgram(self.bake_shader)
+        glUniform2f(glGetUniformLocation(self.bake_shader, 'uSize'), float(size), float(size))
+        glUniform1f(glGetUniformLocation(self.bake_shader, 'uBounds'), float(bounds))
+        self.quad_vao = create_fullscreen_quad()
+        self.fbo = glGenFramebuffers(1)
+
+        self.params = None          # Parámetros del volumen visible (textures[0])
+        self.baking = None          # Parámetros del volumen en curso (textures[1])
+        self.pending = None         # Últimos parámetros pedidos durante el horneado en curso
+        self.next_layer = 0
+
+    @property
+    def texture(self):
+        return self.textures[0]
+
+    @property
+    def ready(self):
+        return self.params is not None
+
+    def update(self, params):
+        """
+        Avanza el horneado y devuelve True si el volumen visible se horneó con params.
+        Si params cambia durante un horneado, este termina y luego se hornea el último
+        params pedido (reiniciar en cada cambio no dejaría terminar ninguno).
+        La primera vez hornea el volumen completo en el mismo frame.
+        """
+        params = dict(params)
+        if self.baking is None:
+            if params != self.params:
+                self.baking, self.next_layer = params, 0
+        elif params == self.params:
+            # Vuelta a lo visible: el horneado en curso ya no hace falta
+            self.baking = self.pending = None
+        else:
+            self.pending = None if params == self.baking else params
+
+        if self.baking is not None:
+            self._bake(self.size if self.params is None else self.layers_per_frame)
+            if self.baking is None and self.pending is not None:
+                self.baking, self.pending, self.next_layer = self.pending, None, 0
+        return self.params == params
+
+    def _bake(self, layers):
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_BLEND)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.size, self.size)
+        glUseProgram(self.bake_shader)
+        for name, value in self.baking.items():
+            location = glGetUniformLocation(self.bake_shader, name)
+            if isinstance(value, int):
+                glUniform1i(location, value)
+            else:
+                glUniform1f(location, float(value))
+        glBindVertexArray(self.quad_vao)
+
+        end = min(self.next_layer + layers, self.size)
+        for layer in range(self.next_layer, end):
+            glFramebufferTextureLayer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, self.textures[1], 0, layer)
+            glUniform1f(self.u_layer, (layer + 0.5) / self.size)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.next_layer = end
+
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glViewport(*viewport)
+        if blend:
+            glEnable(GL_BLEND)
+
+        # Volumen completo: pasa a ser el visible
+        if self.next_layer == self.size:
+            self.textures.reverse()
+            self.params, self.baking = self.baking, None
+
+    def bind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_3D, self.texture)
+
+    def set_uniforms(self, program):
+        """uSDFBounds / uSDFMargin de SAMPLE_GLSL (el sampler se asigna aparte)"""
+        glUniform1f(glGetUniformLocation(program, 'uSDFBounds'), float(self.bounds))
+        glUniform1f(glGetUniformLocation(program, 'uSDFMargin'), float(self.margin))
+
+    def read(self):
+        """Copia del volumen visible en CPU (size, size, size), para comprobaciones"""
+        glBindTexture(GL_TEXTURE_3D, self.texture)
+        data = glGetTexImage(GL_TEXTURE_3D, 0, GL_RGBA, GL_FLOAT)
+        glBindTexture(GL_TEXTURE_3D, 0)
+        return np.asarray(data, dtype=np.float32).reshape(self.size, self.size, self.size, 4)[..., 0]
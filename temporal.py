@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Temporal - Render en damero temporal con historial
+El shader del preset sombrea solo una parte de los píxeles cada frame, en un
+buffer reducido, y un pase de resolve reconstruye la imagen completa:
+
+- 'half': damero; cada frame la mitad de los píxeles, alternando (2 frames).
+- 'quarter': entrelazado 2x2; un píxel de cada bloque, rotando (4 frames).
+
+Los píxeles no sombreados salen del frame resuelto anterior (FeedbackBuffer),
+acotado al rango de las muestras nuevas que lo rodean (sin estelas cuando la
+imagen se mueve). Si una señal (iKickPulse, iHatGlitch...) sube de golpe, el
+historial se descarta durante un ciclo completo del patrón y los huecos se
+interpolan de las muestras del frame: los golpes se ven en el mismo frame.
+
+No es reproyección con vectores de movimiento: sirve para presets cuya imagen
+cambia poco de un frame a otro (cámaras lentas, fractales, volumétricos).
+
+GLSL (TEMPORAL_GLSL):
+
+    #define fragCoord temporalCoord()    // píxel de pantalla que sombrea este fragmento
+
+Python:
+
+    self.temporal = TemporalCheckerboard(self.shader, mode='half')
+    ...
+    glUseProgram(self.shader)
+    self.temporal.begin(vw, vh, self.kick_pulse, self.hat_glitch)
+    glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+    self.temporal.end(vx, vy, vw, vh)    # resolve + copia al viewport
+"""
+
+from __future__ import division
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+from feedback import FeedbackBuffer, QUAD_VERTEX_SHADER, create_fullscreen_quad
+
+MODES = {'off': 0, 'half': 1, 'quarter': 2}
+PATTERN = {0: 1, 1: 2, 2: 4}       # Frames hasta sombrear todos los píxeles
+
+TEMPORAL_GLSL = """
+uniform int uTemporalMode;    // 0 = todos los píxeles, 1 = damero, 2 = entrelazado 2x2
+uniform int uTemporalPhase;   // Frame dentro del patrón
+
+const ivec2 TEMPORAL_OFFSETS[4] = ivec2[4](ivec2(0, 0), ivec2(1, 1), ivec2(1, 0), ivec2(0, 1));
+
+// Píxel de pantalla (centro) que sombrea este fragmento del buffer reducido
+vec2 temporalCoord() {
+    ivec2 c = ivec2(gl_FragCoord.xy);
+    if (uTemporalMode == 1) return vec2(2 * c.x + ((c.y + uTemporalPhase) & 1), c.y) + 0.5;
+    if (uTemporalMode == 2) return vec2(2 * c + TEMPORAL_OFFSETS[uTemporalPhase]) + 0.5;
+    return gl_FragCoord.xy;
+}
+"""
+
+RESOLVE_FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+uniform sampler2D uCurrent;   // Buffer reducido del frame actual
+uniform sampler2D uHistory;   // Frame resuelto anterior
+uniform int uMode;
+uniform int uPhase;
+uniform float uReject;        // 1 = sin historial: solo interpolación de las muestras nuevas
+
+const ivec2 OFFSETS[4] = ivec2[4](ivec2(0, 0), ivec2(1, 1), ivec2(1, 0), ivec2(0, 1));
+
+vec3 current(ivec2 c) {
+    return texelFetch(uCurrent, clamp(c, ivec2(0), textureSize(uCurrent, 0) - 1), 0).rgb;
+}
+
+void main() {
+    ivec2 p = ivec2(gl_FragCoord.xy);
+    vec3 a, b, c, d, spatial;
+
+    if (uMode == 1) {
+        // Damero: sombreado este frame si la paridad de x coincide con la de la fila
+        if ((p.x & 1) == ((p.y + uPhase) & 1)) { fragColor = vec4(current(ivec2(p.x >> 1, p.y)), 1.0); return; }
+        // Los cuatro vecinos en cruz sí son de este frame
+        a = current(ivec2((p.x - 1) >> 1, p.y));
+        b = current(ivec2((p.x + 1) >> 1, p.y));
+        c = current(ivec2(p.x >> 1, p.y - 1));
+        d = current(ivec2(p.x >> 1, p.y + 1));
+        spatial = (a + b + c + d) * 0.25;
+    } else {
+        // Entrelazado 2x2: las muestras de este frame están en 2k + offset
+        ivec2 o = OFFSETS[uPhase];
+        if (all(equal(p & 1, o))) { fragColor = vec4(current(p >> 1), 1.0); return; }
+        ivec2 k = (p - o) >> 1;
+        a = current(k);
+        b = current(k + ivec2(1, 0));
+        c = current(k + ivec2(0, 1));
+        d = current(k + ivec2(1, 1));
+        vec2 w = vec2((p - o) & 1) * 0.5;
+        spatial = mix(mix(a, b, w.x), mix(c, d, w.x), w.y);
+    }
+
+    // Historial acotado al rango de las muestras nuevas vecinas
+    vec3 lo = min(min(a, b), min(c, d));
+    vec3 hi = max(max(a, b), max(c, d));
+    vec3 history = clamp(texelFetch(uHistory, p, 0).rgb, lo, hi);
+    fragColor = vec4(mix(history, spatial, uReject), 1.0);
+}
+"""
+
+
+class TemporalCheckerboard:
+    """Buffer reducido + historial + resolve del render en damero temporal"""
+
+    def __init__(self, program, mode='half', threshold=0.05):
+        self.locs = {name: glGetUniformLocation(program, name)
+                     for name in ('uTemporalMode', 'uTemporalPhase')}
+        self.mode = MODES[mode]
+        self.threshold = threshold    # Subida por frame de una señal que descarta el historial
+        self.phase = 0
+        self.signals = None
+        self.reject_frames = 0
+        self.size = (0, 0)
+        self.fbo = None
+        self.texture = None
+        self.history = FeedbackBuffer(GL_RGBA8, filter=GL_NEAREST)
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(RESOLVE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.resolve = shaders.compileProgram(vs, fs)
+        self.resolve_locs = {name: glGetUniformLocation(self.resolve, name)
+                             for name in ('uCurrent', 'uHistory', 'uMode', 'uPhase', 'uReject')}
+        self.quad_vao = create_fullscreen_quad()
+
+    @property
+    def pixels(self):
+        """Píxeles sombreados por frame (para contadores como RayBounds.draw)"""
+        return self.size[0] * self.size[1]
+
+    def ensure(self, w, h):
+        """Buffer reducido e historial; reasigna solo si cambia el tamaño"""
+        if self.mode == 1:
+            size = ((w + 1) // 2, h)
+        else:
+            size = ((w + 1) // 2, (h + 1) // 2)
+        if self.history.ensure(w, h):
+            self.reject_frames = PATTERN[self.mode]   # Historial vacío
+        if self.fbo is not None and self.size == size:
+            return
+        if self.fbo is None:
+            self.fbo = int(np.atleast_1d(glGenFramebuffers(1))[0])
+            self.texture = int(np.atleast_1d(glGenTextures(1))[0])
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, size[0], size[1], 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.texture, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.size = size
+
+    def begin(self, w, h, *signals):
+        """
+        Con el programa del preset en uso: liga el buffer reducido y sube los uniforms.
+        `signals` son los valores de este frame de las señales de golpe (kick, hat...).
+        En modo 'off' no cambia nada: el preset dibuja en su viewport como siempre.
+        """
+        if self.signals is not None and any(s - p > self.threshold for s, p in zip(signals, self.signals)):
+            self.reject_frames = PATTERN[self.mode]
+        self.signals = signals
+
+        glUniform1i(self.locs['uTemporalMode'], self.mode)
+        glUniform1i(self.locs['uTemporalPhase'], self.phase)
+        if self.mode == 0:
+            self.size = (w, h)
+            return
+        self.ensure(w, h)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.size[0], self.size[1])
+
+    def end(self, x, y, w, h):
+        """Resolve al historial y copia al viewport (x, y, w, h) de la pantalla"""
+        if self.mode == 0:
+            return
+        self.history.begin()
+        glUseProgram(self.resolve)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glUniform1i(self.resolve_locs['uCurrent'], 0)
+        self.history.bind_previous(1)
+        glUniform1i(self.resolve_locs['uHistory'], 1)
+        glUniform1i(self.resolve_locs['uMode'], self.mode)
+        glUniform1i(self.resolve_locs['uPhase'], self.phase)
+        glUniform1f(self.resolve_locs['uReject'], 1.0 if self.reject_frames > 0 else 0.0)
+        glBindVertexArray(self.quad_vao)
+        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        glActiveTexture(GL_TEXTURE0)
+        self.history.end()
+        self.history.blit(x, y, w, h)
+
+        self.reject_frames = max(0, self.reject_frames - 1)
+        self.phase = (self.phase + 1) % PATTERN[self.mode]
@@ -3,6 +3,10 @@
 Shader-based Visual Engine con MIDI
 Controlado por Focusrite-Novation Circuit Tracks
 Preset 2: OpenGL Shaders VFX Generativos
+OPTIMIZADO: Esfera envolvente (raybounds.py): el fondo no marcha (B = debug)
+OPTIMIZADO: Ruido y grano desde texturas compartidas (noisetex.py, NOISE_TEXTURES)
+OPTIMIZADO: Glow con bloom de postfx.py (cadena de mips) en vez de exp() por píxel;
+            el kick marca su intensidad. El shader sale en HDR y el tonemap va en la cadena
 """
 
 from __future__ import division
@@ -13,6 +17,9 @@ from OpenGL.GL import shaders
 import mido
 from sys import exit as exitsystem
 from numpy import array
+from raybounds import RayBounds, BOUNDS_GLSL
+from noisetex import NoiseTextures, NOISE_TEX_GLSL
+from postfx import PostChain
 
 # Notas MIDI
 KICK_NOTE = 60
@@ -20,6 +27,13 @@ CLOSEHAT_NOTE = 62
 TOM1_NOTE = 64
 TOM2_NOTE = 65
 
+# Ruido de valor y grano desde texturas compartidas (noisetex.py); False = hash con sin()
+NOISE_TEXTURES = True
+
+# Bloom: intensidad en reposo y extra con el kick a tope
+BLOOM_BASE = 0.3
+BLOOM_KICK = 1.5
+
 # Vertex Shader (fullscreen quad)
 VERTEX_SHADER = """
 #version 330 core
@@ -46,13 +60,15 @@ uniform float iTom1Morph;
 uniform float iTom2Spin;
 
 out vec4 fragColor;
-
+""" + BOUNDS_GLSL + """
+""" + NOISE_TEX_GLSL + """
 // === NOISE FUNCTIONS ===
 float hash(vec2 p) {
     return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453);
 }
 
 float noise(vec2 p) {
+    if (uNoiseTextures == 1) return noiseTex(p);
     vec2 i = floor(p);
     vec2 f = fract(p);
     f = f * f * (3.0 - 2.0 * f);
@@ -66,6 +82,7 @@ float noise(vec2 p) {
 }
 
 float fbm(vec2 p) {
+    if (uNoiseTextures == 1) return fbmTex(p, 6);
     float value = 0.0;
     float amplitude = 0.5;
     for(int i = 0; i < 6; i++) {
@@ -142,14 +159,16 @@ vec3 calcNormal(vec3 p) {
     ));
 }
 
-float raymarch(vec3 ro, vec3 rd) {
-    float t = 0.0;
+// Solo dentro de la esfera envolvente
+float raymarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float t = tNear;
+    float tMax = min(tFar, 20.0);
     for(int i = 0; i < 80; i++) {
         vec3 p = ro + rd * t;
         float d = map(p);
         if(d < 0.001) break;
         t += d;
-        if(t > 20.0) break;
+        if(t > tMax) return 20.0;
     }
     return t;
 }
@@ -224,8 +243,11 @@ void main()
         rd = normalize(rd);
     }
 
-    // Raymarch
-    float t = raymarch(ro, rd);
+    // Raymarch (sin cortar la esfera envolvente no hay nada que marchar)
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+    float t = hit ? raymarch(ro, rd, tNear, tFar) : 20.0;
 
     vec3 color = vec3(0.0);
 
@@ -244,6 +266,9 @@ void main()
         float bg = fbm(p * 2.0 + iTime * 0.1);
         color = vec3(bg * 0.1);
 
+        // Tinte de color que ciclaba con el antiguo glow (el halo real lo pone el bloom)
+        color += 0.15 * (0.5 + 0.5 * cos(iTime + vec3(0, 2, 4)));
+
         // Kick ilumina el fondo
         color += iKickPulse * 0.2;
     }
@@ -259,24 +284,16 @@ void main()
         color *= chromaticAberration(uv, iHatGlitch);
     }
 
-    // Glow en los bordes
-    float glow = exp(-length(p) * 0.8) * 0.3;
-    color += glow * (0.5 + 0.5 * cos(iTime + vec3(0, 2, 4)));
-
     // Scanlines sutiles
     color *= 0.95 + 0.05 * sin(uv.y * iResolution.y * 2.0);
 
-    // Noise grain
-    float grain = hash(uv * iTime) * 0.05;
+    // Noise grain (con texturas: ruido azul, sin grumos, desplazado cada frame)
+    float grain = (uNoiseTextures == 1 ? blueNoiseTex(fragCoord + floor(iTime * 60.0) * vec2(23.0, 41.0))
+                                       : hash(uv * iTime)) * 0.05;
     color += grain;
 
-    // Tone mapping
-    color = color / (color + vec3(1.0));
-
-    // Gamma correction
-    color = pow(color, vec3(1.0 / 2.2));
-
-    fragColor = vec4(color, 1.0);
+    // Salida HDR: bloom, tone mapping y gamma van en el post-proceso
+    fragColor = vec4(boundsDebugTint(color, !hit), 1.0);
 }
 """
 
@@ -320,6 +337,12 @@ class ShaderVisualEngine:
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
 
+        # Volumen envolvente del raymarch (tecla B: debug)
+        self.bounds = RayBounds(self.shader)
+
+        # Texturas de ruido compartidas (unidades 1-3)
+        self.noise = NoiseTextures(self.shader, unit=1, enabled=NOISE_TEXTURES)
+
         # Create fullscreen quad
         self.vertices = array([-1.0, -1.0, 0.0,
                                 1.0, -1.0, 0.0,
@@ -338,6 +361,11 @@ class ShaderVisualEngine:
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
 
+        # Post-proceso: bloom (lo brillante de la superficie) + tonemap/gamma
+        self.post = PostChain(['bloom', 'tonemap'],
+                              midi_map={'bloom.amount': ('kick_pulse', BLOOM_KICK, BLOOM_BASE)})
+        self.post.set('bloom', threshold=0.7, knee=0.4)
+
         # MIDI state
         self.kick_pulse = 0.0
         self.kick_target = 0.0
@@ -470,21 +498,23 @@ class ShaderVisualEngine:
             glClearColor(0.0, 0.0, 0.0, 1.0)
             glClear(GL_COLOR_BUFFER_BIT)
 
-            # Setear viewport solo para la región vertical
-            glViewport(vp_x, vp_y, vp_width, vp_height)
-
             for event in pygame.event.get():
                 if (event.type == QUIT) or (event.type == KEYUP and event.key == K_ESCAPE):
                     if self.midi_input:
                         self.midi_input.close()
                     pygame.quit()
                     exitsystem()
+                if event.type == KEYDOWN and event.key == K_b:
+                    self.bounds.debug = not self.bounds.debug
 
             # Handle MIDI
             self.handle_midi()
             self.update_midi_params()
 
+            # Escena en el FBO del post-proceso (viewport 0, 0 del tamaño de la región vertical)
+            self.post.begin(vp_width, vp_height)
             glUseProgram(self.shader)
+            self.noise.bind()
 
             # Send uniform values
             # La resolución siempre es la target (1080x1920) independiente del tamaño de ventana
@@ -498,13 +528,28 @@ class ShaderVisualEngine:
             glUniform1f(self.uni_tom1, self.tom1_morph)
             glUniform1f(self.uni_tom2, self.tom2_spin)
 
+            # Esfera envolvente: la forma más grande del morph (caja, toro) con el kick,
+            # el empuje del smooth union, el desplazamiento FBM (Tom1) y las esferas del hat
+            kick_scale = 1.0 + self.kick_pulse * 0.8
+            radius = max(0.6 * kick_scale * 3 ** 0.5, 0.7 * kick_scale + 0.3)
+            if self.hat_glitch > 0.1:
+                radius = max(radius, self.hat_glitch * (3 ** 0.5 + 0.2))
+            radius += 0.075 + 3 * 0.05 + self.tom1_morph * 0.3 * 3 ** 0.5
+            self.bounds.sphere(radius + 0.01)
+            self.bounds.apply()
+
             # Draw fullscreen quad
             glBindVertexArray(self.vao)
-            glDrawArrays(GL_QUADS, 0, 4)
+            self.bounds.draw(lambda: glDrawArrays(GL_QUADS, 0, 4), vp_width * vp_height)
+
+            # Bloom + tonemap, a la región vertical de la ventana
+            self.post.apply_midi(self)
+            self.post.end(vp_x, vp_y, vp_width, vp_height, pygame.time.get_ticks() / 1000.0)
 
             pygame.display.set_caption(
                 f"VFX Shader [9:16] | FPS: {int(self.clock.get_fps())} | "
                 f"Window: {window_width}x{window_height} | Viewport: {vp_width}x{vp_height}"
+                f"{self.bounds.label()}"
             )
             pygame.display.flip()
 
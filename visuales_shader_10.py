@@ -2,7 +2,9 @@
 """
 Preset 10: Turbulence Field - Chaotic Particle Motion
 Category: Particle/Flow Field
-OPTIMIZADO: Menos partículas, centrado en formato vertical
+Partículas en GPU (particles.py): transform feedback + point sprites aditivos,
+centrado en formato vertical. El fragment shader solo pinta el campo de fondo.
+La turbulencia se hornea al arrancar en una textura 2D periódica (flowfield.py).
 """
 
 from __future__ import division
@@ -12,34 +14,55 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from particles import ParticleSystem, random_state
+from flowfield import FlowFieldTexture
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+PARTICLE_COUNT = 20000  # Activas: 40% en reposo, 100% con kick
+
+# Turbulencia horneada: celdas de ruido por tile y resolución de la textura
+FIELD_PERIOD = (8.0, 8.0)
+FIELD_SIZE = (256, 256)
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
-FRAGMENT_SHADER = """
-#version 330 core
-#define fragCoord gl_FragCoord.xy
-uniform float iTime;
-uniform vec2  iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
-out vec4 fragColor;
+PERIOD_GLSL = "const vec2 FIELD_PERIOD = vec2(%.1f, %.1f);\n" % FIELD_PERIOD
 
+# Horneado: dos canales de value noise periódico (retículo envuelto con FIELD_PERIOD)
+FIELD_GLSL = PERIOD_GLSL + """
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
 
 float noise(vec2 p) {
     vec2 i = floor(p), f = fract(p);
     f = f * f * (3.0 - 2.0 * f);
-    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x),
-               mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
+    #define H(o) hash(mod(i + o, FIELD_PERIOD))
+    return mix(mix(H(vec2(0,0)), H(vec2(1,0)), f.x),
+               mix(H(vec2(0,1)), H(vec2(1,1)), f.x), f.y);
 }
 
-// Turbulent flow field
+vec4 flowField(vec3 p) {
+    vec2 q = p.xy * FIELD_PERIOD;
+    return vec4(noise(q), noise(q + 100.0), 0.0, 0.0);
+}
+"""
+
+# Turbulent flow field: el tiempo desplaza el ruido en diagonal,
+# así que basta un tile 2D y un solo texture() por muestra
+TURBULENCE_GLSL = PERIOD_GLSL + """
+uniform sampler2D uFlowField;  // Unidad 0
 vec2 turbulence(vec2 p, float time) {
-    float n1 = noise(p * 3.0 + time);
-    float n2 = noise(p * 3.0 + time + 100.0);
-    return vec2(n1, n2) * 2.0 - 1.0;
+    return texture(uFlowField, (p * 3.0 + time) / FIELD_PERIOD).rg * 2.0 - 1.0;
 }
+"""
 
+FRAGMENT_SHADER = """
+#version 330 core
+#define fragCoord gl_FragCoord.xy
+uniform float iTime;
+uniform vec2  iResolution;
+uniform float iKickPulse;
+out vec4 fragColor;
+""" + TURBULENCE_GLSL + """
+// Fondo: las partículas se dibujan encima como sprites
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
 
@@ -48,39 +71,6 @@ void main() {
 
     vec3 color = vec3(0.0);
 
-    // OPTIMIZADO: Menos partículas (20-50 en vez de 40-100)
-    float turbIntensity = 0.5 + iKickPulse * 1.5;
-    int numParticles = 20 + int(iKickPulse * 30.0);
-
-    for(int i = 0; i < 50; i++) {
-        if(i >= numParticles) break;
-
-        float id = float(i);
-        vec2 seed = vec2(hash(vec2(id, 0.0)), hash(vec2(id, 1.0)));
-
-        // Inicializar partículas en espacio vertical centrado
-        vec2 pos = (seed * 2.0 - 1.0) * 0.8;
-
-        // OPTIMIZADO: Menos iteraciones en el flow (reducido factor de tiempo)
-        for(float t = 0.0; t < iTime * turbIntensity * 0.5; t += 0.15) {
-            vec2 flow = turbulence(pos + iTom1Morph, t + iTom2Spin * 2.0);
-            pos += flow * 0.04;
-
-            // Hat glitch (menos frecuente)
-            if(iHatGlitch > 0.2 && hash(vec2(t, id)) > 0.97 - iHatGlitch * 0.05) {
-                pos += (vec2(hash(vec2(t, id + 100.0)), hash(vec2(t, id + 200.0))) - 0.5) * 0.4;
-            }
-        }
-
-        // Wrap particles en espacio centrado
-        pos = fract(pos * 0.5 + 0.5) * 2.0 - 1.0;
-
-        float dist = length(p - pos);
-        float particle = 0.025 / (dist + 0.025);
-
-        color += particle * 0.04;
-    }
-
     // Visualizar flow field (más sutil)
     vec2 flow = turbulence(p * 0.5, iTime * 0.5);
     color += length(flow) * 0.03;
@@ -99,6 +89,39 @@ void main() {
 }
 """
 
+# Partículas en espacio centrado p (x en [-0.5, 0.5], y en [-0.5, 0.5] / aspecto)
+PARTICLE_UPDATE = TURBULENCE_GLSL + """
+uniform float uFlowTime;      // Tiempo del campo (avanza con la intensidad de turbulencia)
+uniform float uTurbulence;
+uniform float uHat, uTom1, uAspect;
+
+void updateParticle(inout vec4 pos, inout vec4 vel) {
+    vel.xy = turbulence(pos.xy + uTom1, uFlowTime) * 0.133 * uTurbulence;
+    pos.xy += vel.xy * uDelta;
+
+    // Hat glitch (menos frecuente)
+    float r = particleHash(vel.w * 91.7 + uTime);
+    if (uHat > 0.2 && r > 0.995 - uHat * 0.01) {
+        pos.xy += (vec2(particleHash(r * 13.1), particleHash(r * 47.3)) - 0.5) * 0.4;
+    }
+
+    // Wrap particles en espacio centrado
+    vec2 halfSize = vec2(0.5, 0.5 / uAspect);
+    pos.xy = mod(pos.xy + halfSize, halfSize * 2.0) - halfSize;
+}
+"""
+
+PARTICLE_RENDER = """
+uniform float uKick, uAspect, uPointScale;
+
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    float speed = clamp(length(vel.xy) * 4.0, 0.0, 1.0);
+    color = vec3(0.6 + speed * 0.4) * (0.3 + uKick * 0.2);
+    size = (4.0 + uKick * 3.0) * uPointScale;
+    return vec4(pos.x * 2.0, pos.y * 2.0 * uAspect, 0.0, 1.0);
+}
+"""
+
 # Shader para franjas con líneas
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
@@ -128,9 +151,18 @@ class ShaderVisualEngine:
         self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+
+        # Turbulencia horneada una vez (textura 2D periódica)
+        self.flow_field = FlowFieldTexture(FIELD_GLSL, FIELD_SIZE, GL_RG16F)
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'uFlowField'), 0)
+
+        # Partículas en GPU (semillas en el espacio centrado 9:16)
+        half_h = 0.5 / self.target_aspect
+        state = random_state(PARTICLE_COUNT, low=(-0.5, -half_h, 0.0), high=(0.5, half_h, 0.0))
+        self.particles = ParticleSystem(PARTICLE_COUNT, PARTICLE_UPDATE, PARTICLE_RENDER, state)
+        self.flow_time = 0.0
+        self.last_ticks = pygame.time.get_ticks()
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -214,17 +246,31 @@ class ShaderVisualEngine:
             glViewport(vx + vw, 0, w - (vx + vw), h)
             glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal en viewport centrado
+        ticks = pygame.time.get_ticks()
+        t = (ticks - self.start_time) / 1000.0
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Avanzar partículas: el campo evoluciona más rápido con el kick
+        turb_intensity = 0.5 + self.kick_pulse * 1.5
+        self.flow_time += dt * turb_intensity * 0.5
+        self.flow_field.bind(0)
+        self.particles.step(uTime=t, uDelta=dt, uFlowTime=self.flow_time + self.tom2_spin * 2.0,
+                            uTurbulence=turb_intensity, uHat=self.hat_glitch, uTom1=self.tom1_morph,
+                            uAspect=vw / vh)
+
+        # Dibujar fondo en viewport centrado
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, t)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # Partículas activas como sprites aditivos
+        active = int(PARTICLE_COUNT * (0.4 + 0.6 * min(self.kick_pulse, 1.0)))
+        self.particles.draw(active, uKick=self.kick_pulse, uAspect=vw / vh, uPointScale=vh / 900.0)
         pygame.display.flip()
 
     def run(self):
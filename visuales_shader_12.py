@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
-"""Preset 12: Datamosh - Buffer Feedback Loops | Category: Glitch/Feedback"""
+"""Preset 12: Datamosh - Buffer Feedback Loops | Category: Glitch/Feedback
+Feedback real: el frame anterior (iPrevFrame, FeedbackBuffer ping-pong) se arrastra con
+vectores de movimiento, un fetch de textura por píxel en lugar de iterar ruido. El ruido de valor sale de la
+textura compartida de noisetex.py (NOISE_TEXTURES)."""
 from __future__ import division
 import pygame
 from pygame.locals import *
@@ -7,8 +10,12 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from feedback import FeedbackBuffer
+from noisetex import NoiseTextures, NOISE_TEX_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+FEEDBACK_FORMAT = GL_RGBA8  # Color final ya tonemapeado; GL_RGBA16F si se quiere más precisión
+NOISE_TEXTURES = True     # Ruido de valor desde texturas compartidas (noisetex.py); False = hash con sin()
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
@@ -17,10 +24,12 @@ FRAGMENT_SHADER = """
 uniform float iTime;
 uniform vec2 iResolution;
 uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform sampler2D iPrevFrame;
 out vec4 fragColor;
-
+""" + NOISE_TEX_GLSL + """
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
 float noise(vec2 p) {
+    if (uNoiseTextures == 1) return noiseTex(p);
     vec2 i = floor(p), f = fract(p);
     f = f * f * (3.0 - 2.0 * f);
     return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
@@ -30,30 +39,27 @@ void main() {
     vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
-    // Simulated feedback displacement
-    vec2 feedback = p;
-    float feedbackAmount = iTom1Morph * 0.3;
-
-    for(int i = 0; i < 5; i++) {
-        float n = noise(feedback * 3.0 + iTime * 0.1 + float(i));
-        feedback += vec2(n - 0.5) * feedbackAmount;
-    }
+    // Base pattern (frame nuevo)
+    float pattern = noise(p * 5.0);
 
-    // Base pattern with feedback
-    float pattern = noise(feedback * 5.0);
+    // Motion vectors: el frame anterior se arrastra y el desplazamiento se acumula frame a frame
+    float feedbackAmount = iTom1Morph * 0.3;
+    float n = noise(p * 3.0 + iTime * 0.1);
+    vec2 motion = vec2(n - 0.5, hash(floor(p * 3.0)) - 0.5) * feedbackAmount * 0.05;
+    vec3 prev = texture(iPrevFrame, uv - motion).rgb;
+    float persistence = min(iTom1Morph * 1.5, 0.9);
 
-    // Hat creates motion vector glitches
+    // Hat creates motion vector glitches (bloques copiados del frame anterior)
+    bool moshBlock = false;
     if(iHatGlitch > 0.1) {
         float blockSize = 8.0 - iHatGlitch * 6.0;
         vec2 blockPos = floor(uv * iResolution.xy / blockSize);
         float blockRand = hash(blockPos + floor(iTime * 10.0));
 
         if(blockRand > 0.7) {
-            vec2 motionVec = (hash(blockPos) - 0.5) * iHatGlitch * 0.3;
-            vec2 displacedUV = uv + vec2(motionVec.x, 0.0);
-            displacedUV = fract(displacedUV);
-            vec2 displacedP = (2.0 * displacedUV * iResolution.xy - iResolution.xy) / iResolution.y;
-            pattern = noise(displacedP * 5.0);
+            float motionX = (hash(blockPos) - 0.5) * iHatGlitch * 0.3;
+            prev = texture(iPrevFrame, fract(uv + vec2(motionX, 0.0))).rgb;
+            moshBlock = true;
         }
     }
 
@@ -76,6 +82,9 @@ void main() {
     color *= 1.0 - 0.4 * length(uv - 0.5);
     color = color / (color + 1.0);
     color = pow(color, vec3(0.4545));
+
+    // Feedback sobre el color final (mezcla convexa: estable, sin acumular tonemap)
+    color = moshBlock ? prev : mix(color, prev, persistence);
     fragColor = vec4(color, 1.0);
 }
 """
@@ -111,6 +120,11 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_prev = glGetUniformLocation(self.shader, 'iPrevFrame')
+        self.noise = NoiseTextures(self.shader, unit=1, enabled=NOISE_TEXTURES)
+
+        # Frame anterior: dos FBO ping-pong del tamaño del viewport 9:16
+        self.feedback = FeedbackBuffer(FEEDBACK_FORMAT)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -186,9 +200,13 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
-        glViewport(vx, vy, vw, vh)
+        # Dibujar shader principal en el FBO de feedback (lee el frame anterior)
+        self.feedback.ensure(vw, vh)
+        self.feedback.begin()
         glUseProgram(self.shader)
+        self.feedback.bind_previous(0)
+        glUniform1i(self.uni_prev, 0)
+        self.noise.bind()
         glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
@@ -197,6 +215,8 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.feedback.end()
+        self.feedback.blit(vx, vy, vw, vh)
         pygame.display.flip()
 
     def run(self):
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-"""Preset 13: RGB Displacement - Channel Separation Glitch"""
+"""Preset 13: RGB Displacement - Channel Separation Glitch
+La escena se dibuja una sola vez (en gris) y la separación de canales, la
+viñeta y el tonemap son pases de postfx.py, apilables en cualquier preset."""
 from __future__ import division
 import pygame
 from pygame.locals import *
@@ -7,6 +9,7 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from postfx import PostChain
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
@@ -16,7 +19,7 @@ FRAGMENT_SHADER = """
 #define fragCoord gl_FragCoord.xy
 uniform float iTime;
 uniform vec2 iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform float iKickPulse;
 out vec4 fragColor;
 
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
@@ -29,46 +32,18 @@ float noise(vec2 p) {
 float sdCircle(vec2 p, vec2 c, float r) { return length(p - c) - r; }
 
 void main() {
-    vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
-    // Kick creates displacement amount
-    float displaceAmt = iKickPulse * 0.1;
-
-    // Hat creates angular displacement
-    float angle = iHatGlitch * 3.14 * noise(p * 3.0 + iTime);
-
-    // RGB channel offsets
-    vec2 offsetR = vec2(cos(angle), sin(angle)) * displaceAmt * (1.0 + iTom1Morph);
-    vec2 offsetG = vec2(0.0);
-    vec2 offsetB = vec2(cos(angle + 3.14), sin(angle + 3.14)) * displaceAmt * (1.0 + iTom1Morph);
-
-    // Tom2 adds rotational offset
-    if(iTom2Spin > 0.1) {
-        float rot = iTom2Spin * 6.28;
-        offsetR = mat2(cos(rot), -sin(rot), sin(rot), cos(rot)) * offsetR;
-        offsetB = mat2(cos(-rot), -sin(-rot), sin(-rot), cos(-rot)) * offsetB;
-    }
-
-    // Sample pattern at different offsets per channel
-    float r = noise((p + offsetR) * 4.0 + iTime * 0.1);
-    float g = noise((p + offsetG) * 4.0 + iTime * 0.1);
-    float b = noise((p + offsetB) * 4.0 + iTime * 0.1);
+    // Patrón base: R, G y B salen del mismo patrón desplazado (pase rgb_split)
+    float pattern = noise(p * 4.0 + iTime * 0.1);
 
     // Add circular shapes
-    float circle = sdCircle(p, vec2(0.0), 0.5 + sin(iTime) * 0.2);
-    float circleR = smoothstep(0.02, 0.0, abs(sdCircle(p + offsetR, vec2(0.0), 0.5 + sin(iTime) * 0.2)));
-    float circleG = smoothstep(0.02, 0.0, abs(sdCircle(p + offsetG, vec2(0.0), 0.5 + sin(iTime) * 0.2)));
-    float circleB = smoothstep(0.02, 0.0, abs(sdCircle(p + offsetB, vec2(0.0), 0.5 + sin(iTime) * 0.2)));
+    float circle = smoothstep(0.02, 0.0, abs(sdCircle(p, vec2(0.0), 0.5 + sin(iTime) * 0.2)));
 
-    vec3 color = vec3(r + circleR * 0.8, g + circleG * 0.8, b + circleB * 0.8);
+    vec3 color = vec3(pattern + circle * 0.8);
 
     // Kick flash
     color += iKickPulse * 0.3;
-
-    color *= 1.0 - 0.4 * length(uv - 0.5);
-    color = color / (color + 1.0);
-    color = pow(color, vec3(0.4545));
     fragColor = vec4(color, 1.0);
 }
 """
@@ -101,9 +76,12 @@ class ShaderVisualEngine:
         self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+
+        # Hat -> ángulo del desplazamiento, Tom2 -> rotación R/B (la cantidad se pone en render)
+        self.post = PostChain(['rgb_split', 'vignette', 'tonemap'],
+                              midi_map={'rgb_split.angle': ('hat_glitch', 1.0),
+                                        'rgb_split.spin': ('tom2_spin', 1.0)})
+        self.post.set('vignette', amount=0.4)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -179,17 +157,20 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
-        glViewport(vx, vy, vw, vh)
+        # Escena a textura; el post-proceso escribe en el viewport
+        current_time = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        self.post.begin(vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, current_time)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # Kick creates displacement amount (Tom1 lo amplía)
+        self.post.apply_midi(self)
+        self.post.set('rgb_split', amount=self.kick_pulse * 0.1 * (1.0 + self.tom1_morph))
+        self.post.end(vx, vy, vw, vh, current_time)
         pygame.display.flip()
 
     def run(self):
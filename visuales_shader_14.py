@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-"""Preset 14: Scanline Corruption - CRT Glitch | Category: Glitch/Feedback"""
+"""Preset 14: Scanline Corruption - CRT Glitch | Category: Glitch/Feedback
+La escena se dibuja una sola vez; filas corruptas, sync, roll, scanlines,
+viñeta y tonemap son pases de postfx.py mapeados a MIDI."""
 from __future__ import division
 import pygame
 from pygame.locals import *
@@ -7,6 +9,7 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from postfx import PostChain
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
@@ -16,7 +19,7 @@ FRAGMENT_SHADER = """
 #define fragCoord gl_FragCoord.xy
 uniform float iTime;
 uniform vec2 iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform float iKickPulse;
 out vec4 fragColor;
 
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
@@ -27,65 +30,13 @@ float noise(vec2 p) {
 }
 
 void main() {
-    vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
-    // Base pattern
-    float pattern = noise(p * 5.0 + iTime * 0.3);
-
-    // Scanlines
-    float scanlineFreq = 200.0 + iTom1Morph * 300.0;
-    float scanline = sin(uv.y * scanlineFreq) * 0.5 + 0.5;
-    scanline = smoothstep(0.3, 0.7, scanline);
-
-    // Hat creates corrupted scanline segments
-    if(iHatGlitch > 0.1) {
-        float row = floor(uv.y * iResolution.y / 2.0);
-        float rowHash = hash(vec2(row, floor(iTime * 10.0)));
-
-        if(rowHash > 0.8 - iHatGlitch * 0.3) {
-            // Horizontal displacement
-            float offset = (hash(vec2(row + 1.0, floor(iTime * 10.0))) - 0.5) * iHatGlitch * 0.2;
-            vec2 glitchUV = uv + vec2(offset, 0.0);
-            glitchUV = fract(glitchUV);
-            vec2 glitchP = (2.0 * glitchUV * iResolution.xy - iResolution.xy) / iResolution.y;
-            pattern = noise(glitchP * 5.0 + iTime * 0.3);
-        }
-    }
-
-    // Kick creates sync glitches
-    if(iKickPulse > 0.2) {
-        float syncGlitch = step(0.98, hash(vec2(uv.y * 50.0, iTime)));
-        if(syncGlitch > 0.5) {
-            float offset = (hash(vec2(uv.y, iTime + 1.0)) - 0.5) * iKickPulse * 0.3;
-            vec2 syncUV = uv + vec2(offset, 0.0);
-            syncUV = fract(syncUV);
-            vec2 syncP = (2.0 * syncUV * iResolution.xy - iResolution.xy) / iResolution.y;
-            pattern = noise(syncP * 5.0 + iTime * 0.3);
-        }
-    }
-
-    // Tom2 adds rolling effect
-    float roll = iTom2Spin * sin(iTime * 5.0) * 0.1;
-    uv.y += roll;
-    uv = fract(uv);
-    p = (2.0 * uv * iResolution.xy - iResolution.xy) / iResolution.y;
-
-    vec3 color = vec3(pattern);
-
-    // Apply scanlines
-    color *= mix(1.0, scanline, 0.3);
-
-    // CRT curvature glow
-    float edge = length(uv - 0.5);
-    color *= 1.0 - edge * 0.5;
+    // Base pattern (la corrupción de filas la hace el pase glitch sobre la textura)
+    vec3 color = vec3(noise(p * 5.0 + iTime * 0.3));
 
     // Phosphor glow
     color += exp(-length(p) * 1.5) * 0.3 * iKickPulse;
-
-    color *= 1.0 - 0.4 * length(uv - 0.5);
-    color = color / (color + 1.0);
-    color = pow(color, vec3(0.4545));
     fragColor = vec4(color, 1.0);
 }
 """
@@ -118,9 +69,16 @@ class ShaderVisualEngine:
         self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+
+        # Hat -> filas corruptas, Kick -> sync, Tom2 -> roll, Tom1 -> densidad de scanlines
+        self.post = PostChain(['glitch', 'scanlines', 'vignette', 'tonemap'],
+                              midi_map={'glitch.amount': ('hat_glitch', 1.0),
+                                        'glitch.sync': ('kick_pulse', 1.0),
+                                        'glitch.roll': ('tom2_spin', 1.0),
+                                        'scanlines.frequency': ('tom1_morph', 300.0, 200.0)})
+        self.post.set('scanlines', amount=0.3, sharpness=0.6)
+        # CRT (1 - 0.5 e) * viñeta (1 - 0.4 e) en un solo pase
+        self.post.set('vignette', amount=0.8)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -196,17 +154,17 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
-        glViewport(vx, vy, vw, vh)
+        # Escena a textura; el post-proceso escribe en el viewport
+        current_time = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        self.post.begin(vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, current_time)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.post.apply_midi(self)
+        self.post.end(vx, vy, vw, vh, current_time)
         pygame.display.flip()
 
     def run(self):
@@ -1,14 +1,24 @@
 #!/usr/bin/env python3
-"""Preset 15: Voronoi Cells - Organic Cell Division | Category: Generative Patterns"""
+"""Preset 15: Voronoi Cells - Organic Cell Division | Category: Generative Patterns
+Miles de semillas animadas en NumPy; el campo de celdas sale de Jump Flooding
+(voronoi.py) a 1/4 de resolución y el fragment shader elige la semilla entre
+los 2x2 texels vecinos (voronoiCell). El campo lleva una banda de guarda
+alrededor del viewport: las semillas de fuera siguen limitando las celdas del borde."""
 from __future__ import division
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
+import numpy as np
 from numpy import array
+from voronoi import JumpFloodVoronoi, VORONOI_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+SEED_COUNT = 2048            # Activas: 10% en reposo, 100% con kick
+SEED_EXTENT = 1.05           # Semillas en [-E, E]^2 (cubre el viewport girado con Tom2)
+VORONOI_SCALE = 4            # Píxeles de pantalla por texel del campo JFA
+VORONOI_GUARD = 0.15         # Banda del campo fuera del viewport (~1 celda en reposo, unidades de ancho)
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
@@ -16,69 +26,41 @@ FRAGMENT_SHADER = """
 #define fragCoord gl_FragCoord.xy
 uniform float iTime;
 uniform vec2 iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform float iKickPulse, iHatGlitch;
+uniform float iCellSize;      // Separación media entre semillas (unidades de ancho)
 out vec4 fragColor;
+""" + VORONOI_GLSL + """
 
 vec2 hash2(vec2 p) {
     p = vec2(dot(p, vec2(127.1, 311.7)), dot(p, vec2(269.5, 183.3)));
     return fract(sin(p) * 43758.5453);
 }
 
-// Voronoi distance field
-vec2 voronoi(vec2 p, float animSpeed) {
-    vec2 i = floor(p);
-    vec2 f = fract(p);
+float hash1(float n) { return fract(sin(n * 12.9898) * 43758.5453); }
 
-    float minDist = 10.0;
-    vec2 minPoint;
-
-    for(int y = -1; y <= 1; y++) {
-        for(int x = -1; x <= 1; x++) {
-            vec2 neighbor = vec2(float(x), float(y));
-            vec2 cellPoint = hash2(i + neighbor);
-
-            // Animate cell centers
-            cellPoint = 0.5 + 0.5 * sin(animSpeed + 6.2831 * cellPoint);
-
-            vec2 diff = neighbor + cellPoint - f;
-            float dist = length(diff);
-
-            if(dist < minDist) {
-                minDist = dist;
-                minPoint = cellPoint;
-            }
-        }
-    }
-
-    return vec2(minDist, minPoint.x);
+// Distancia a la semilla más cercana en celdas (unidades de ancho / iCellSize)
+float cellDistance(vec2 uv, vec4 cell) {
+    vec2 d = (uv - cell.xy) * vec2(1.0, iResolution.y / iResolution.x);
+    return length(d) / iCellSize;
 }
 
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
-    // Kick increases cell count
-    float scale = 3.0 + iKickPulse * 7.0;
+    float edge;
+    vec4 cell = voronoiCell(uv, vec2(1.0, iResolution.y / iResolution.x), edge);
+    float cellDist = cellDistance(uv, cell);
+    float cellID = hash1(cell.z);
 
-    // Tom1 changes animation speed
-    float animSpeed = iTime * (0.5 + iTom1Morph * 2.0);
-
-    // Tom2 rotates the grid
-    float angle = iTom2Spin * 6.28;
-    mat2 rot = mat2(cos(angle), -sin(angle), sin(angle), cos(angle));
-    p = rot * p;
-
-    vec2 vor = voronoi(p * scale, animSpeed);
-
-    // Cell visualization
-    float cellDist = vor.x;
-    float cellID = vor.y;
-
-    // Cell edges
-    float edges = smoothstep(0.05, 0.0, cellDist / scale);
+    // Núcleo de la celda (alrededor de la semilla)
+    float edges = smoothstep(0.25, 0.0, cellDist);
 
     // Cell fill
-    float fill = smoothstep(0.1, 0.0, cellDist / scale);
+    float fill = smoothstep(0.5, 0.0, cellDist);
+
+    // Membrana: a menos de un píxel de la frontera con la celda vecina
+    float membrane = smoothstep(1.0 / iResolution.x, 0.0, edge);
 
     vec3 color = vec3(0.0);
 
@@ -87,11 +69,13 @@ void main() {
 
     // Cell shading based on ID
     color += fill * (0.3 + cellID * 0.2);
+    color += membrane * 0.15;
 
     // Hat glitch shuffles cells
     if(iHatGlitch > 0.1) {
-        vec2 glitchVor = voronoi(p * scale + hash2(floor(p * scale)) * iHatGlitch, animSpeed);
-        float glitchEdges = smoothstep(0.05, 0.0, glitchVor.x / scale);
+        vec2 offset = (hash2(floor(uv * 24.0) + floor(iTime * 8.0)) - 0.5) * iHatGlitch * 0.05;
+        vec4 glitchCell = texture(iVoronoi, voronoiUV(uv + offset));
+        float glitchEdges = smoothstep(0.25, 0.0, cellDistance(uv + offset, glitchCell));
         color += glitchEdges * iHatGlitch * 0.5;
     }
 
@@ -106,6 +90,31 @@ void main() {
 """
 
 
+class CellSeeds:
+    """Semillas animadas: posición base aleatoria + oscilación dentro de su celda"""
+
+    def __init__(self, count=SEED_COUNT, seed=0):
+        rng = np.random.default_rng(seed)
+        self.base = rng.uniform(-SEED_EXTENT, SEED_EXTENT, (count, 2)).astype(np.float32)
+        self.phase = rng.random((count, 2)).astype(np.float32) * np.float32(2.0 * np.pi)
+
+    @staticmethod
+    def cell_size(active):
+        return 2.0 * SEED_EXTENT / np.sqrt(active)
+
+    def positions(self, active, anim, angle, aspect):
+        """uv [0, 1] del viewport de las `active` primeras semillas"""
+        # Animate cell centers
+        cell = self.cell_size(active)
+        p = self.base[:active] + cell * 0.4 * np.sin(anim + self.phase[:active])
+
+        # Tom2 rota la rejilla (inversa de p = rot * p del shader original)
+        c, s = np.cos(angle), np.sin(angle)
+        x = c * p[:, 0] - s * p[:, 1]
+        y = s * p[:, 0] + c * p[:, 1]
+        return np.stack([x + 0.5, y * aspect + 0.5], axis=1)
+
+
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
 #version 330 core
@@ -134,8 +143,15 @@ class ShaderVisualEngine:
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_cell = glGetUniformLocation(self.shader, 'iCellSize')
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'iVoronoi'), 0)
+
+        # Voronoi por Jump Flooding
+        self.seeds = CellSeeds()
+        self.voronoi = JumpFloodVoronoi(SEED_COUNT, scale=VORONOI_SCALE, guard=VORONOI_GUARD)
+        self.anim_time = 0.0
+        self.last_ticks = pygame.time.get_ticks()
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -211,15 +227,26 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        ticks = pygame.time.get_ticks()
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Kick increases cell count, Tom1 changes animation speed, Tom2 rotates the grid
+        active = int(SEED_COUNT * (0.1 + 0.9 * min(self.kick_pulse, 1.0)))
+        self.anim_time += dt * (0.5 + self.tom1_morph * 2.0)
+        self.voronoi.ensure(vw, vh)
+        self.voronoi.update(self.seeds.positions(active, self.anim_time, self.tom2_spin * 6.28, vw / vh),
+                            CellSeeds.cell_size(active))
+
         # Dibujar shader principal
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, (ticks - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
         glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
+        glUniform1f(self.uni_cell, CellSeeds.cell_size(active))
+        self.voronoi.bind(0, self.shader)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
         pygame.display.flip()
@@ -1,87 +1,89 @@
 #!/usr/bin/env python3
-"""Preset 16: Reaction-Diffusion - Gray-Scott Model | Category: Generative Patterns"""
+"""Preset 16: Reaction-Diffusion - Gray-Scott Model | Category: Generative Patterns
+Simulación Gray-Scott real en GPU (texturas RG ping-pong, varios substeps por frame).
+Kick inyecta químico B, Tom1 modula feed/kill, Tom2 rota la anisotropía de la difusión,
+Hat siembra puntos de inyección en órbita. gray_scott_step es la referencia NumPy."""
 from __future__ import division
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
+import numpy as np
 from numpy import array
+from feedback import FeedbackBuffer
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
-FRAGMENT_SHADER = """
+# Simulación Gray-Scott en GPU (un paso por draw; el estado RG = concentraciones A, B)
+SIM_WIDTH, SIM_HEIGHT = 270, 480   # Resolución de simulación (9:16), independiente de la ventana
+SIM_SUBSTEPS = 12                  # Pasos de integración por frame
+SIM_FORMAT = GL_RG16F              # GL_RG16F o GL_RG32F
+DIFFUSION = (0.2, 0.1)             # Da, Db (Laplaciano de 5 puntos, dt = 1)
+FEED_KILL = (0.0545, 0.0620)       # Coral
+FEED_KILL_TOM1 = (0.0290, 0.0570)  # Tom1 lleva hacia gusanos/laberinto
+ANISOTROPY = 0.6                   # Anisotropía máxima de la difusión (Tom2)
+KICK_RADIUS = 6.0                  # Radio de inyección del kick (texels de simulación)
+INJECT_AMOUNT = 0.5                # Concentración de B inyectada
+
+STEP_FRAGMENT_SHADER = """
 #version 330 core
-#define fragCoord gl_FragCoord.xy
-uniform float iTime;
-uniform vec2 iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform sampler2D uState;
+uniform ivec2 uSize;
+uniform vec2 uFeedKill;
+uniform vec2 uDiffusion;
+uniform vec3 uTensor;       // Tensor de difusión (dxx, dyy, dxy)
+uniform vec3 uInject;       // (x, y, radio) en texels; radio 0 = sin inyección
+uniform float uInjectAmount;
 out vec4 fragColor;
 
-float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
-float noise(vec2 p) {
-    vec2 i = floor(p), f = fract(p);
-    f = f * f * (3.0 - 2.0 * f);
-    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
-}
-
-// Simplified reaction-diffusion pattern
-float reactionDiffusion(vec2 p, float time) {
-    float pattern = 0.0;
-
-    // Multiple layers of reaction
-    for(int i = 0; i < 4; i++) {
-        float scale = pow(2.0, float(i));
-        vec2 q = p * scale;
-
-        float a = noise(q + time * 0.1);
-        float b = noise(q + time * 0.1 + 100.0);
+vec2 state(ivec2 p) { return texelFetch(uState, (p + uSize) % uSize, 0).rg; }
 
-        // Reaction term (simplified Gray-Scott)
-        float reaction = a * b * b;
-        pattern += reaction / scale;
+void main() {
+    ivec2 c = ivec2(gl_FragCoord.xy);
+    vec2 s = state(c);
+
+    // Laplaciano anisótropo: D : Hessiano (con D = I es el de 5 puntos)
+    vec2 uxx = state(c + ivec2(1, 0)) + state(c - ivec2(1, 0)) - 2.0 * s;
+    vec2 uyy = state(c + ivec2(0, 1)) + state(c - ivec2(0, 1)) - 2.0 * s;
+    vec2 uxy = (state(c + ivec2(1, 1)) - state(c + ivec2(1, -1))
+              - state(c + ivec2(-1, 1)) + state(c - ivec2(1, 1))) * 0.25;
+    vec2 lap = uTensor.x * uxx + uTensor.y * uyy + 2.0 * uTensor.z * uxy;
+
+    float a = s.r;
+    float b = s.g;
+    float reaction = a * b * b;
+    a += uDiffusion.x * lap.x - reaction + uFeedKill.x * (1.0 - a);
+    b += uDiffusion.y * lap.y + reaction - (uFeedKill.x + uFeedKill.y) * b;
+
+    if (uInject.z > 0.0 && distance(gl_FragCoord.xy, uInject.xy) < uInject.z) {
+        b = max(b, uInjectAmount);
     }
 
-    return pattern;
+    fragColor = vec4(clamp(a, 0.0, 1.0), clamp(b, 0.0, 1.0), 0.0, 1.0);
 }
+"""
+
+FRAGMENT_SHADER = """
+#version 330 core
+#define fragCoord gl_FragCoord.xy
+uniform vec2 iResolution;
+uniform float iKickPulse;
+uniform sampler2D iState;
+out vec4 fragColor;
 
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
-    vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
-
-    // Kick drives reaction speed
-    float reactionTime = iTime * (0.5 + iKickPulse * 2.0);
-
-    // Tom1 modulates scale
-    float scale = 2.0 + iTom1Morph * 3.0;
+    vec2 s = texture(iState, uv).rg;
 
-    // Tom2 adds rotation
-    float angle = iTom2Spin * 6.28;
-    mat2 rot = mat2(cos(angle), -sin(angle), sin(angle), cos(angle));
-    p = rot * p;
+    // Visualize pattern (concentración de B)
+    float pattern = smoothstep(0.05, 0.35, s.g);
+    vec3 color = vec3(pattern);
 
-    float pattern = reactionDiffusion(p * scale, reactionTime);
-
-    // Hat adds injection points
-    if(iHatGlitch > 0.1) {
-        for(int i = 0; i < 5; i++) {
-            vec2 injectPos = vec2(
-                sin(float(i) * 2.4 + iTime),
-                cos(float(i) * 2.4 + iTime)
-            ) * 0.5;
-
-            float dist = length(p - injectPos);
-            pattern += (0.1 / (dist + 0.1)) * iHatGlitch * 0.3;
-        }
-    }
-
-    // Visualize pattern
-    float bands = sin(pattern * 20.0) * 0.5 + 0.5;
-    vec3 color = vec3(bands);
-
-    // Highlight active regions
-    color += smoothstep(0.5, 0.7, pattern) * 0.3;
+    // Highlight active regions (frente de reacción)
+    float front = smoothstep(0.2, 0.3, s.g) * (1.0 - smoothstep(0.3, 0.4, s.g));
+    color += front * 0.3;
 
     // Kick flash
     color += iKickPulse * 0.2;
@@ -94,6 +96,122 @@ void main() {
 """
 
 
+def diffusion_tensor(angle, strength):
+    """Tensor de difusión D = R diag(1 + s, 1 - s) R^T -> (dxx, dyy, dxy). Traza constante (estable)"""
+    c, s = np.cos(angle), np.sin(angle)
+    l1, l2 = 1.0 + strength, 1.0 - strength
+    return (l1 * c * c + l2 * s * s, l1 * s * s + l2 * c * c, (l1 - l2) * c * s)
+
+
+def initial_state(width, height, seeds=24, rng_seed=0):
+    """Estado inicial: A = 1, B = 0 con semillas cuadradas de B cerca del centro (float32, (h, w))"""
+    rng = np.random.default_rng(rng_seed)
+    a = np.ones((height, width), dtype=np.float32)
+    b = np.zeros((height, width), dtype=np.float32)
+    for _ in range(seeds):
+        x = int(rng.uniform(0.3, 0.7) * width)
+        y = int(rng.uniform(0.3, 0.7) * height)
+        a[y - 3:y + 3, x - 3:x + 3] = 0.5
+        b[y - 3:y + 3, x - 3:x + 3] = 0.25
+    return a, b
+
+
+def gray_scott_step(a, b, feed, kill, diffusion=DIFFUSION, tensor=(1.0, 1.0, 0.0), inject=None,
+                    inject_amount=INJECT_AMOUNT):
+    """
+    Referencia NumPy vectorizada de un paso (mismas ecuaciones que STEP_FRAGMENT_SHADER).
+    Bordes periódicos con np.roll. inject = (x, y, radio) en texels o None.
+    """
+    def laplacian(u):
+        e, w = np.roll(u, -1, axis=1), np.roll(u, 1, axis=1)
+        uxx = e + w - 2.0 * u
+        uyy = np.roll(u, -1, axis=0) + np.roll(u, 1, axis=0) - 2.0 * u
+        uxy = (np.roll(e, -1, axis=0) - np.roll(e, 1, axis=0)
+               - np.roll(w, -1, axis=0) + np.roll(w, 1, axis=0)) * 0.25
+        return tensor[0] * uxx + tensor[1] * uyy + 2.0 * tensor[2] * uxy
+
+    reaction = a * b * b
+    a_next = a + diffusion[0] * laplacian(a) - reaction + feed * (1.0 - a)
+    b_next = b + diffusion[1] * laplacian(b) + reaction - (feed + kill) * b
+
+    if inject is not None and inject[2] > 0.0:
+        h, w = a.shape
+        yy, xx = np.mgrid[0:h, 0:w]
+        # Centro del texel, igual que gl_FragCoord
+        mask = np.hypot(xx + 0.5 - inject[0], yy + 0.5 - inject[1]) < inject[2]
+        b_next[mask] = np.maximum(b_next[mask], inject_amount)
+
+    np.clip(a_next, 0.0, 1.0, out=a_next)
+    np.clip(b_next, 0.0, 1.0, out=b_next)
+    return a_next.astype(np.float32), b_next.astype(np.float32)
+
+
+class GrayScottGPU:
+    """Solver Gray-Scott en texturas RG ping-pong (FeedbackBuffer) a resolución fija"""
+
+    def __init__(self, width=SIM_WIDTH, height=SIM_HEIGHT, internal_format=SIM_FORMAT):
+        self.width, self.height = width, height
+        self.buffer = FeedbackBuffer(internal_format, wrap=GL_REPEAT)
+        self.buffer.ensure(width, height)
+
+        vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(STEP_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.shader = shaders.compileProgram(vs, fs)
+        self.u = {name: glGetUniformLocation(self.shader, name)
+                  for name in ('uState', 'uSize', 'uFeedKill', 'uDiffusion', 'uTensor',
+                               'uInject', 'uInjectAmount')}
+        glUseProgram(self.shader)
+        glUniform1i(self.u['uState'], 0)
+        glUniform2i(self.u['uSize'], width, height)
+        glUniform2f(self.u['uDiffusion'], *DIFFUSION)
+        glUniform1f(self.u['uInjectAmount'], INJECT_AMOUNT)
+
+        verts = array([-1, -1, 0, 1, -1, 0, 1, 1, 0, -1, 1, 0], dtype='f')
+        self.vao = glGenVertexArrays(1)
+        glBindVertexArray(self.vao)
+        vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, verts, GL_STATIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+
+        self.reset(*initial_state(width, height))
+
+    @property
+    def texture(self):
+        return self.buffer.texture
+
+    def reset(self, a, b):
+        """Sube un estado (A, B) float32 de forma (h, w)"""
+        data = np.ascontiguousarray(np.stack((a, b), axis=-1), dtype=np.float32)
+        glBindTexture(GL_TEXTURE_2D, self.buffer.texture)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, self.width, self.height, GL_RG, GL_FLOAT, data)
+
+    def step(self, substeps, feed, kill, tensor=(1.0, 1.0, 0.0), inject=None):
+        """Avanza `substeps` pasos; la inyección se aplica solo en el primero. Cambia el viewport"""
+        glUseProgram(self.shader)
+        glUniform2f(self.u['uFeedKill'], feed, kill)
+        glUniform3f(self.u['uTensor'], *tensor)
+        glUniform3f(self.u['uInject'], *(inject if inject is not None else (0.0, 0.0, 0.0)))
+        glBindVertexArray(self.vao)
+
+        for i in range(substeps):
+            if i == 1 and inject is not None:
+                glUniform3f(self.u['uInject'], 0.0, 0.0, 0.0)
+            self.buffer.begin()
+            self.buffer.bind_previous(0)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+            self.buffer.end()
+
+    def read(self):
+        """Estado actual como (A, B) float32 de forma (h, w)"""
+        glBindTexture(GL_TEXTURE_2D, self.buffer.texture)
+        # PyOpenGL no reconoce GL_RG en lecturas: se lee como RGBA
+        data = glGetTexImage(GL_TEXTURE_2D, 0, GL_RGBA, GL_FLOAT)
+        data = np.frombuffer(data, dtype=np.float32).reshape(self.height, self.width, 4)
+        return data[..., 0].copy(), data[..., 1].copy()
+
+
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
 #version 330 core
@@ -118,12 +236,14 @@ class ShaderVisualEngine:
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
-        self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_state = glGetUniformLocation(self.shader, 'iState')
+
+        # Simulación Gray-Scott
+        self.sim = GrayScottGPU(SIM_WIDTH, SIM_HEIGHT, SIM_FORMAT)
+        self.rng = np.random.default_rng()
+        self.pending_inject = None
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -168,11 +288,39 @@ class ShaderVisualEngine:
             for msg in self.midi_input.iter_pending():
                 if msg.type == 'note_on' and msg.velocity > 0:
                     v = msg.velocity / 127.0
-                    if msg.note == KICK_NOTE: self.kick_target = min(1.0, self.kick_target + v * 0.7)
+                    if msg.note == KICK_NOTE:
+                        self.kick_target = min(1.0, self.kick_target + v * 0.7)
+                        self.queue_injection(v)
                     elif msg.note == CLOSEHAT_NOTE: self.hat_glitch = min(1.0, self.hat_glitch + v * 0.8)
                     elif msg.note == TOM1_NOTE: self.tom1_morph = min(1.0, self.tom1_morph + v * 0.6)
                     elif msg.note == TOM2_NOTE: self.tom2_spin = min(1.0, self.tom2_spin + v * 0.7)
 
+    def queue_injection(self, velocity=1.0):
+        """Kick: disco de químico B en una posición aleatoria (se aplica en el siguiente paso)"""
+        x = self.rng.uniform(0.15, 0.85) * SIM_WIDTH
+        y = self.rng.uniform(0.15, 0.85) * SIM_HEIGHT
+        self.pending_inject = (x, y, KICK_RADIUS * (0.5 + velocity))
+
+    def step_simulation(self, t):
+        # Tom1: feed/kill hacia el régimen de gusanos
+        m = self.tom1_morph
+        feed = FEED_KILL[0] + (FEED_KILL_TOM1[0] - FEED_KILL[0]) * m
+        kill = FEED_KILL[1] + (FEED_KILL_TOM1[1] - FEED_KILL[1]) * m
+
+        # Tom2: rotación (y fuerza) de la anisotropía
+        tensor = diffusion_tensor(self.tom2_spin * 6.28, ANISOTROPY * self.tom2_spin)
+
+        # Kick pendiente o, con Hat, uno de los 5 puntos de inyección en órbita
+        inject = self.pending_inject
+        self.pending_inject = None
+        if inject is None and self.hat_glitch > 0.1:
+            i = int(t * 60.0) % 5
+            x = (0.5 + np.sin(i * 2.4 + t) * 0.25) * SIM_WIDTH
+            y = (0.5 + np.cos(i * 2.4 + t) * 0.25 * SIM_WIDTH / SIM_HEIGHT) * SIM_HEIGHT
+            inject = (x, y, 2.0 + self.hat_glitch * 3.0)
+
+        self.sim.step(SIM_SUBSTEPS, feed, kill, tensor, inject)
+
     def update_params(self):
         self.kick_pulse += (self.kick_target - self.kick_pulse) * 0.15
         self.kick_target *= 0.92
@@ -199,15 +347,17 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Avanzar la simulación (usa su propio viewport)
+        self.step_simulation((pygame.time.get_ticks() - self.start_time) / 1000.0)
+
         # Dibujar shader principal
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.sim.texture)
+        glUniform1i(self.uni_state, 0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
         pygame.display.flip()
@@ -219,7 +369,9 @@ class ShaderVisualEngine:
                 if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
                     running = False
                 elif event.type == KEYDOWN:
-                    if event.key == K_k: self.kick_target = min(1.0, self.kick_target + 0.7)
+                    if event.key == K_k:
+                        self.kick_target = min(1.0, self.kick_target + 0.7)
+                        self.queue_injection()
                     elif event.key == K_h: self.hat_glitch = min(1.0, self.hat_glitch + 0.8)
                     elif event.key == K_t: self.tom1_morph = min(1.0, self.tom1_morph + 0.6)
                     elif event.key == K_y: self.tom2_spin = min(1.0, self.tom2_spin + 0.7)
@@ -1,63 +1,72 @@
 #!/usr/bin/env python3
-"""Preset 20: Liquid Metal - Metaball Morphing"""
+"""Preset 20: Liquid Metal - Metaball Morphing
+Las órbitas, fases y glitches de las bolas se calculan una vez por frame en
+NumPy (MetaballSwarm) y se suben como array de uniforms vec4; el shader solo
+suma el campo. Con MAX_BALLS > TILED_MIN_BALLS las bolas usan un núcleo de
+soporte compacto y se reparten en tiles: cada píxel suma solo las de su tile."""
 from __future__ import division
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
+import numpy as np
 from numpy import array
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+MAX_BALLS = 10               # 10 = look original (3 + kick*7 bolas); hasta 192 (array de uniforms)
+TILED_MIN_BALLS = 16         # A partir de aquí: núcleo compacto + binning por tiles
+TILES = (9, 16)              # Rejilla de tiles sobre el viewport (9:16)
+MAX_PER_TILE = 48            # Bolas por tile (si hay más se quedan las más cercanas)
+BALL_REACH = 2.0             # Alcance del núcleo compacto, en radios de isosuperficie
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
 #version 330 core
 #define fragCoord gl_FragCoord.xy
-uniform float iTime;
+#define MAX_BALLS {MAX_BALLS}
+#define TILED {TILED}
+#define TILES ivec2({TILES_X}, {TILES_Y})
 uniform vec2 iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform float iKickPulse;
+uniform vec4 uBalls[MAX_BALLS];  // xy = centro, z = tamaño, w = alcance^2 (solo TILED)
+uniform int uNumBalls;
+uniform sampler2D uTiles;        // Fila por tile: [n, índice0, índice1, ...]
 out vec4 fragColor;
 
-float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
-
 float metaball(vec2 p, vec2 center, float radius) {
     float dist = length(p - center);
     return radius / (dist * dist + 0.01);
 }
 
+// Mismo campo con ventana (1 - d^2/R^2)^2: exactamente 0 fuera del alcance
+float metaballCompact(vec2 p, vec4 ball) {
+    vec2 d = p - ball.xy;
+    float d2 = dot(d, d);
+    float window = max(1.0 - d2 / ball.w, 0.0);
+    return ball.z / (d2 + 0.01) * window * window;
+}
+
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
-    // Kick adds metaballs
-    int numBalls = 3 + int(iKickPulse * 7.0);
-
     float field = 0.0;
 
-    for(int i = 0; i < 10; i++) {
-        if(i >= numBalls) break;
-
-        float id = float(i);
-
-        // Organic motion
-        float angle = id * 2.4 + iTime * (0.5 + iTom2Spin) + hash(vec2(id, 0.0)) * 6.28;
-        float radius = 0.3 + 0.2 * sin(iTime * 0.7 + id);
-        vec2 center = vec2(cos(angle), sin(angle)) * radius;
-
-        // Ball size modulated by Tom1
-        float ballSize = 0.1 + iTom1Morph * 0.15;
-
-        // Hat creates unstable balls
-        if(iHatGlitch > 0.1) {
-            float glitchOffset = hash(vec2(id, iTime * 10.0));
-            if(glitchOffset > 0.8 - iHatGlitch * 0.2) {
-                center += (vec2(hash(vec2(id, iTime)), hash(vec2(id + 10.0, iTime))) - 0.5) * iHatGlitch * 0.5;
-            }
-        }
-
-        field += metaball(p, center, ballSize);
+#if TILED
+    // Solo las bolas cuyo alcance toca este tile (listas hechas en CPU)
+    ivec2 tile = clamp(ivec2(floor(uv * vec2(TILES))), ivec2(0), TILES - 1);
+    int row = tile.y * TILES.x + tile.x;
+    int count = int(texelFetch(uTiles, ivec2(0, row), 0).r);
+    for(int k = 0; k < count; k++) {
+        int i = int(texelFetch(uTiles, ivec2(k + 1, row), 0).r);
+        field += metaballCompact(p, uBalls[i]);
     }
+#else
+    for(int i = 0; i < uNumBalls; i++) {
+        field += metaball(p, uBalls[i].xy, uBalls[i].z);
+    }
+#endif
 
     // Threshold for liquid metal surface
     float threshold = 1.0;
@@ -82,7 +91,70 @@ void main() {
     color = pow(color, vec3(0.4545));
     fragColor = vec4(color, 1.0);
 }
-"""
+""".replace('{MAX_BALLS}', str(MAX_BALLS)).replace('{TILED}', str(int(MAX_BALLS > TILED_MIN_BALLS))) \
+   .replace('{TILES_X}', str(TILES[0])).replace('{TILES_Y}', str(TILES[1]))
+
+
+class MetaballSwarm:
+    """Centros y tamaños de las bolas (coordenadas p: centro 0, unidades de ancho)"""
+
+    def __init__(self, n=MAX_BALLS, seed=0):
+        self.rng = np.random.default_rng(seed)
+        ids = np.arange(n, dtype=np.float32)
+        self.ids = ids
+        # Fase fija por bola (el hash(vec2(id, 0.0)) que antes se hacía por píxel)
+        self.phase = (np.sin(ids * np.float32(127.1)) * np.float32(43758.5453)) % 1.0 * 6.28
+        # Con muchas bolas se encogen (más rápido que 1/sqrt(n): las colas 1/d^2 se suman)
+        self.size_scale = (10.0 / max(n, 10)) ** 0.75
+        self.balls = np.zeros((n, 4), dtype=np.float32)
+        self.count = 0
+
+    def update(self, t, kick, hat, tom1, tom2):
+        """Rellena balls[:count] (xy, tamaño, alcance^2) con el estado del frame"""
+        n = len(self.ids)
+        # Kick adds metaballs
+        self.count = count = int(n * 0.3) + int(kick * n * 0.7)
+        ids = self.ids[:count]
+
+        # Organic motion
+        angle = ids * 2.4 + t * (0.5 + tom2) + self.phase[:count]
+        radius = 0.3 + 0.2 * np.sin(t * 0.7 + ids)
+        center = np.stack([np.cos(angle), np.sin(angle)], axis=1) * radius[:, None]
+
+        # Hat creates unstable balls
+        if hat > 0.1:
+            unstable = self.rng.random(count) > 0.8 - hat * 0.2
+            jitter = (self.rng.random((count, 2)) - 0.5) * hat * 0.5
+            center += jitter * unstable[:, None]
+
+        # Ball size modulated by Tom1
+        size = (0.1 + tom1 * 0.15) * self.size_scale
+        iso = np.sqrt(max(size - 0.01, 1e-4))   # Radio donde una bola sola llega a 1.0
+        self.balls[:count, :2] = center
+        self.balls[:count, 2] = size
+        self.balls[:count, 3] = (iso * BALL_REACH) ** 2
+        return self.balls
+
+    def bin(self, aspect, out):
+        """Listas por tile en out ((tiles, MAX_PER_TILE + 1): cuenta + índices, más cercanas primero).
+        Los tiles del borde se extienden hasta el infinito (fuera del viewport también se pinta)"""
+        tx, ty = TILES
+        half_y = 0.5 / aspect
+        x_edges = np.linspace(-0.5, 0.5, tx + 1); x_edges[[0, -1]] = [-np.inf, np.inf]
+        y_edges = np.linspace(-half_y, half_y, ty + 1); y_edges[[0, -1]] = [-np.inf, np.inf]
+
+        balls = self.balls[:self.count]
+        cx, cy = balls[:, 0:1], balls[:, 1:2]
+        dx = np.maximum(np.maximum(x_edges[None, :-1] - cx, cx - x_edges[None, 1:]), 0.0)
+        dy = np.maximum(np.maximum(y_edges[None, :-1] - cy, cy - y_edges[None, 1:]), 0.0)
+        d2 = dy[:, :, None] ** 2 + dx[:, None, :] ** 2             # (bolas, ty, tx)
+        d2 = np.where(d2 < balls[:, 3, None, None], d2, np.inf).reshape(self.count, -1).T
+
+        order = np.argsort(d2, axis=1)[:, :MAX_PER_TILE]
+        counts = np.minimum(np.isfinite(d2).sum(axis=1), MAX_PER_TILE)
+        out[:, 0] = counts
+        out[:, 1:1 + order.shape[1]] = order
+        return out
 
 
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
@@ -109,12 +181,21 @@ class ShaderVisualEngine:
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
-        self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_balls = glGetUniformLocation(self.shader, 'uBalls')
+        self.uni_num_balls = glGetUniformLocation(self.shader, 'uNumBalls')
+
+        # Bolas calculadas en CPU; tabla de tiles (solo con muchas bolas)
+        self.swarm = MetaballSwarm()
+        self.tiled = MAX_BALLS > TILED_MIN_BALLS
+        if self.tiled:
+            self.tile_table = np.zeros((TILES[0] * TILES[1], MAX_PER_TILE + 1), dtype=np.float32)
+            self.tile_texture = glGenTextures(1)
+            glBindTexture(GL_TEXTURE_2D, self.tile_texture)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_R32F, MAX_PER_TILE + 1, len(self.tile_table), 0, GL_RED, GL_FLOAT, None)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -190,15 +271,22 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Bolas del frame (una vez, no por píxel)
+        t = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        balls = self.swarm.update(t, self.kick_pulse, self.hat_glitch, self.tom1_morph, self.tom2_spin)
+        if self.tiled:
+            self.swarm.bin(vw / vh, self.tile_table)
+            glBindTexture(GL_TEXTURE_2D, self.tile_texture)
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, MAX_PER_TILE + 1, len(self.tile_table),
+                            GL_RED, GL_FLOAT, self.tile_table)
+
         # Dibujar shader principal
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
+        glUniform4fv(self.uni_balls, self.swarm.count, balls)
+        glUniform1i(self.uni_num_balls, self.swarm.count)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
         pygame.display.flip()
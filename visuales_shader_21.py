@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
-"""Preset 21: Crystal Growth - Cellular Automata"""
+"""Preset 21: Crystal Growth - Cellular Automata
+Los granos nuclean y crecen en NumPy entre frames; el reparto de píxeles entre
+granos es un Voronoi por Jump Flooding (voronoi.py) que solo se reconstruye
+cuando aparecen o desaparecen núcleos, como mucho cada REBUILD_FRAMES frames.
+Crecer solo cambia los radios."""
 from __future__ import division
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
+import numpy as np
 from numpy import array
+from voronoi import JumpFloodVoronoi, VORONOI_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+MAX_GRAINS = 1024
+VORONOI_SCALE = 4            # Píxeles de pantalla por texel del campo JFA
+REBUILD_FRAMES = 6           # Los núcleos nuevos se acumulan y el JFA se repite como mucho cada N frames
+GROWTH_RATE = 0.04           # Avance del frente (unidades de ancho por segundo, sin kick)
+NUCLEATION_RATE = 6.0        # Núcleos nuevos por segundo (x5 con Tom1)
+EPOCH_SECONDS = 40.0         # Tras este tiempo (o al llenar MAX_GRAINS) el cristal se funde
+MELT_RATE = 0.25             # Encogimiento de los granos al fundirse
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
@@ -17,74 +30,59 @@ FRAGMENT_SHADER = """
 uniform float iTime;
 uniform vec2 iResolution;
 uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform sampler2D iGrains;    // MAX_GRAINS x 1: radio de cada grano
 out vec4 fragColor;
+""" + VORONOI_GLSL + """
 
-float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
-
-// Simulated crystal growth
-float crystalGrowth(vec2 p, float time) {
-    vec2 cell = floor(p);
-    vec2 frac = fract(p);
-
-    float state = hash(cell);
-
-    // Growth simulation
-    float neighbors = 0.0;
-    for(int y = -1; y <= 1; y++) {
-        for(int x = -1; x <= 1; x++) {
-            if(x == 0 && y == 0) continue;
-            vec2 offset = vec2(float(x), float(y));
-            float neighborState = hash(cell + offset + floor(time * 0.1));
-            neighbors += step(0.5, neighborState);
-        }
-    }
-
-    // Growth rules (crystal-like)
-    if(state > 0.5) {
-        // Crystal cell
-        return 1.0;
-    } else {
-        // Empty cell - grows if enough neighbors
-        return step(3.0, neighbors);
-    }
-}
+float hash(float n) { return fract(sin(n * 12.9898) * 43758.5453); }
 
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
+    float aspect = iResolution.y / iResolution.x;
 
-    // Kick drives growth speed
-    float growthTime = iTime * (0.2 + iKickPulse * 1.5);
+    // Grano al que pertenece el píxel y distancia a su núcleo
+    float edge;
+    vec4 cell = voronoiCell(uv, vec2(1.0, aspect), edge);
+    vec2 local = (uv - cell.xy) * vec2(1.0, aspect);
+    float dist = length(local);
+    float radius = cell.w > 0.0 ? texelFetch(iGrains, ivec2(int(cell.z), 0), 0).r : 0.0;
+    float crystal = smoothstep(radius, radius - 0.004, dist);
 
     // Tom1 modulates crystal density
     float scale = 10.0 + iTom1Morph * 30.0;
 
-    // Tom2 rotates crystal
-    float angle = iTom2Spin * 6.28;
+    // Cada grano con su propia orientación de red; Tom2 rota todas
+    float angle = iTom2Spin * 6.28 + hash(cell.z) * 6.28;
     mat2 rot = mat2(cos(angle), -sin(angle), sin(angle), cos(angle));
-    p = rot * p;
-
-    float crystal = crystalGrowth(p * scale, growthTime);
-
-    // Hat creates seed points
-    if(iHatGlitch > 0.1) {
-        for(int i = 0; i < 5; i++) {
-            vec2 seed = vec2(sin(float(i) * 2.4), cos(float(i) * 2.4)) * 0.5;
-            float dist = length(p - seed);
-            crystal += (0.2 / (dist + 0.2)) * iHatGlitch;
-        }
-    }
+    vec2 q = rot * local;
 
     // Hexagonal structure overlay
-    vec2 hex = abs(fract(p * scale) * 2.0 - 1.0);
+    vec2 hex = abs(fract(q * scale) * 2.0 - 1.0);
     float hexPattern = max(hex.x, hex.y);
     hexPattern = step(0.9, hexPattern);
 
-    vec3 color = vec3(crystal * 0.7);
+    vec3 color = vec3(crystal * (0.45 + hash(cell.z + 0.5) * 0.35));
 
     // Crystal edges
     color += hexPattern * crystal * (0.3 + iKickPulse * 0.4);
 
+    // Frente de crecimiento
+    color += crystal * exp(-(radius - dist) * 120.0) * (0.4 + iKickPulse * 0.6);
+
+    // Juntas de grano: a menos de un píxel de la frontera con el grano vecino
+    float joint = smoothstep(1.0 / iResolution.x, 0.0, edge);
+    color *= 1.0 - joint * crystal * 0.6;
+
+    // Hat creates seed points
+    if(iHatGlitch > 0.1) {
+        for(int i = 0; i < 5; i++) {
+            vec2 seed = vec2(sin(float(i) * 2.4), cos(float(i) * 2.4)) * 0.5;
+            float d = length(p - seed);
+            color += (0.02 / (d + 0.02)) * iHatGlitch * 0.3;
+        }
+    }
+
     // Growth glow
     color += exp(-length(p) * 1.5) * 0.3 * iKickPulse;
 
@@ -95,6 +93,76 @@ void main() {
 }
 """
 
+# Posiciones de nucleación del hat (mismas que el shader)
+HAT_SEEDS = np.array([[np.sin(i * 2.4), np.cos(i * 2.4)] for i in range(5)], dtype=np.float32) * 0.5
+
+
+class CrystalField:
+    """Núcleos en coordenadas p (centro 0, unidades de ancho) y radio de cada grano"""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.pos = np.zeros((0, 2), dtype=np.float32)
+        self.radius = np.zeros(MAX_GRAINS, dtype=np.float32)
+        self.visible = 0        # Núcleos ya en el campo JFA; los demás esperan con radio 0
+        self.pending = 0.0
+        self.age = 0.0
+        self.melting = False
+
+    @property
+    def count(self):
+        return len(self.pos)
+
+    def spacing(self, aspect):
+        """Separación media entre núcleos (unidades de ancho) en el viewport de 1 x 1/aspect"""
+        return np.sqrt(1.0 / (aspect * self.count)) if self.count else None
+
+    def nucleate(self, points):
+        """Añade núcleos (radio 0) fuera de los granos existentes. Devuelve si cambió el conjunto"""
+        points = np.asarray(points, dtype=np.float32)[:MAX_GRAINS - self.count]
+        if self.melting or not len(points):
+            return False
+        if self.count:
+            d = np.linalg.norm(points[:, None, :] - self.pos[None, :, :], axis=2)
+            points = points[(d > self.radius[:self.count]).all(axis=1)]
+        if not len(points):
+            return False
+        self.radius[self.count:self.count + len(points)] = 0.0
+        self.pos = np.concatenate([self.pos, points])
+        return True
+
+    def step(self, dt, kick, tom1, aspect):
+        """Avanza crecimiento, nucleación y fundido. Devuelve si el conjunto de núcleos cambió"""
+        n = self.count
+        if self.melting:
+            self.radius[:n] -= dt * MELT_RATE
+            if n and self.radius[:n].max() > 0.0:
+                return False
+            self.pos = self.pos[:0]
+            self.visible = 0
+            self.age = 0.0
+            self.melting = False
+            return True
+
+        # Kick drives growth speed (solo los granos que ya están en el campo)
+        self.radius[:self.visible] += dt * GROWTH_RATE * (1.0 + kick * 7.5)
+        self.age += dt
+        if n >= MAX_GRAINS or self.age > EPOCH_SECONDS:
+            self.melting = True
+            return False
+
+        # Tom1 acelera la nucleación (proceso de Poisson)
+        self.pending += dt * NUCLEATION_RATE * (1.0 + tom1 * 4.0)
+        births = int(self.pending)
+        self.pending -= births
+        if not births:
+            return False
+        half = np.array([0.5, 0.5 / aspect], dtype=np.float32)
+        return self.nucleate(self.rng.uniform(-half, half, (births, 2)))
+
+    def seeds_uv(self, aspect):
+        return np.stack([self.pos[:, 0] + 0.5, self.pos[:, 1] * aspect + 0.5], axis=1)
+
 
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
@@ -126,6 +194,24 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'iVoronoi'), 0)
+        glUniform1i(glGetUniformLocation(self.shader, 'iGrains'), 1)
+
+        # Granos: Voronoi de núcleos (JFA) + radios en una textura MAX_GRAINS x 1
+        self.crystal = CrystalField()
+        self.voronoi = JumpFloodVoronoi(MAX_GRAINS, scale=VORONOI_SCALE)
+        self.grain_texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.grain_texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_R32F, MAX_GRAINS, 1, 0, GL_RED, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        self.voronoi_aspect = None
+        self.voronoi_dirty = False
+        self.rebuild_wait = 0
+        self.last_hat = 0.0
+        self.last_ticks = pygame.time.get_ticks()
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -201,15 +287,42 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        ticks = pygame.time.get_ticks()
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Crecimiento incremental: el JFA solo se repite si cambian los núcleos,
+        # acumulando los nuevos durante REBUILD_FRAMES frames
+        aspect = vw / vh
+        if self.crystal.step(dt, self.kick_pulse, self.tom1_morph, aspect):
+            self.voronoi_dirty = True
+        if self.hat_glitch > self.last_hat + 0.05 and self.crystal.nucleate(HAT_SEEDS):
+            self.voronoi_dirty = True
+        self.last_hat = self.hat_glitch
+        self.rebuild_wait = max(0, self.rebuild_wait - 1)
+        resized = self.voronoi.ensure(vw, vh)
+        if resized or aspect != self.voronoi_aspect or (self.voronoi_dirty and not self.rebuild_wait):
+            self.voronoi.update(self.crystal.seeds_uv(aspect), self.crystal.spacing(aspect))
+            self.crystal.visible = self.crystal.count
+            self.voronoi_aspect = aspect
+            self.voronoi_dirty = False
+            self.rebuild_wait = REBUILD_FRAMES
+        glBindTexture(GL_TEXTURE_2D, self.grain_texture)
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, MAX_GRAINS, 1, GL_RED, GL_FLOAT, self.crystal.radius)
+
         # Dibujar shader principal
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, (ticks - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
         glUniform1f(self.uni_hat, self.hat_glitch)
         glUniform1f(self.uni_tom1, self.tom1_morph)
         glUniform1f(self.uni_tom2, self.tom2_spin)
+        self.voronoi.bind(0, self.shader)
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D, self.grain_texture)
+        glActiveTexture(GL_TEXTURE0)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
         pygame.display.flip()
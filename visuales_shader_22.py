@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-"""Preset 22: Neural Noise - Multi-Octave Perlin Evolution"""
+"""Preset 22: Neural Noise - Multi-Octave Perlin Evolution
+fbm desde la textura de ruido compartida de noisetex.py (NOISE_TEXTURES)."""
 from __future__ import division
 import pygame
 from pygame.locals import *
@@ -7,8 +8,10 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from noisetex import NoiseTextures, NOISE_TEX_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+NOISE_TEXTURES = True     # Ruido de valor desde texturas compartidas (noisetex.py); False = hash con sin()
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
@@ -18,7 +21,7 @@ uniform float iTime;
 uniform vec2 iResolution;
 uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
 out vec4 fragColor;
-
+""" + NOISE_TEX_GLSL + """
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
 
 float noise(vec2 p) {
@@ -29,6 +32,7 @@ float noise(vec2 p) {
 
 // Multi-octave fractal noise
 float neuralNoise(vec2 p, int octaves) {
+    if (uNoiseTextures == 1) return fbmTex(p, octaves);
     float value = 0.0;
     float amplitude = 0.5;
     float frequency = 1.0;
@@ -129,6 +133,7 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.noise = NoiseTextures(self.shader, unit=1, enabled=NOISE_TEXTURES)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -213,6 +218,7 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_hat, self.hat_glitch)
         glUniform1f(self.uni_tom1, self.tom1_morph)
         glUniform1f(self.uni_tom2, self.tom2_spin)
+        self.noise.bind()
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
         pygame.display.flip()
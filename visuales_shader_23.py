@@ -3,6 +3,8 @@
 Preset 23: Fractal Morphing - Iterative Folding con Bassline
 Category: Fractal/SDF Advanced + MIDI Reactive
 OPTIMIZADO: Raymarching 64→60, centrado, franjas con líneas
+OPTIMIZADO: Esfera envolvente (raybounds.py): fuera de ella no hay glow que acumular (B = debug)
+OPTIMIZADO: Damero temporal (temporal.py): media pantalla por frame, el resto del historial
 
 Características:
 - Fondo negro con estructuras blancas brillantes
@@ -19,14 +21,20 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from raybounds import RayBounds, BOUNDS_GLSL
+from temporal import TemporalCheckerboard, TEMPORAL_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+CAPTION = 'Preset 23: Fractal Morphing [9:16]'
+FOLD_REACH = 1.1     # Máximo desplazamiento por iteración del folding (offset ~1.0 + hat 0.1)
+GLOW_REACH = 2.0     # |p| final por debajo del cual map() < 0.6 (el glow empieza en d < 0.3)
+TEMPORAL_MODE = 'half'   # 'off', 'half' (damero) o 'quarter' (2x2); kick y hat descartan el historial
 
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
 #version 330 core
-#define fragCoord gl_FragCoord.xy
+#define fragCoord temporalCoord()
 uniform float iTime;
 uniform vec2  iResolution;
 uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
@@ -35,7 +43,7 @@ uniform float iBassPulse; // Intensidad de la nota
 out vec4 fragColor;
 
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
-
+""" + BOUNDS_GLSL + TEMPORAL_GLSL + """
 // Color palette - tonos blancos/grises sobre fondo negro
 vec3 palette(float d) {
     // Tonos monocromáticos con variación sutil por kick
@@ -119,13 +127,14 @@ float map(vec3 p) {
     return dot(sign(p), p) / 5.0 * scale;  // Compensar escala
 }
 
-// OPTIMIZADO: 64→60 iterations
-vec4 raymarch(vec3 ro, vec3 rd) {
-    float t = 0.0;
+// OPTIMIZADO: 64→60 iterations, solo dentro de la esfera envolvente
+vec4 raymarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float t = tNear;
     vec3 col = vec3(0.0);
     float d;
 
     for(float i = 0.0; i < 60.0; i++) {
+        if(t > tFar) break;
         vec3 p = ro + rd * t;
         d = map(p) * 0.5;
 
@@ -161,8 +170,11 @@ void main() {
     vec3 uuv = ro + cf * 3.0 + p.x * cs + p.y * cu;
     vec3 rd = normalize(uuv - ro);
 
-    // Raymarch
-    vec4 col = raymarch(ro, rd);
+    // Raymarch (sin cortar la esfera envolvente no hay glow posible)
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+    vec4 col = hit ? raymarch(ro, rd, tNear, tFar) : vec4(0.0);
 
     // Vignette muy sutil solo en bordes extremos
     col.rgb *= 1.0 - 0.1 * length(uv - 0.5);
@@ -171,7 +183,7 @@ void main() {
     col.rgb = col.rgb / (col.rgb + 1.0);
     col.rgb = pow(col.rgb, vec3(0.4545));
 
-    fragColor = col;
+    fragColor = vec4(boundsDebugTint(col.rgb, !hit), col.a);
 }
 """
 
@@ -194,7 +206,7 @@ class ShaderVisualEngine:
         self.target_aspect = self.target_width / self.target_height
         pygame.display.gl_set_attribute(pygame.GL_SWAP_CONTROL, 1)
         self.screen = pygame.display.set_mode((int(900 * self.target_aspect), 900), DOUBLEBUF | OPENGL | RESIZABLE)
-        pygame.display.set_caption('Preset 23: Fractal Morphing [9:16]')
+        pygame.display.set_caption(CAPTION)
 
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
@@ -207,6 +219,8 @@ class ShaderVisualEngine:
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
         self.uni_bass_note = glGetUniformLocation(self.shader, 'iBassNote')
         self.uni_bass_pulse = glGetUniformLocation(self.shader, 'iBassPulse')
+        self.bounds = RayBounds(self.shader)
+        self.temporal = TemporalCheckerboard(self.shader, mode=TEMPORAL_MODE)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -307,8 +321,19 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_tom2, self.tom2_spin)
         glUniform1f(self.uni_bass_note, self.bass_note)
         glUniform1f(self.uni_bass_pulse, self.bass_pulse)
+
+        # Esfera envolvente: cada iteración de map() aleja el punto como mucho
+        # FOLD_REACH, así que fuera de este radio el glow no llega a acumularse
+        iterations = min(13, 6 + int(self.tom1_morph * 4.0) + int(self.bass_note * 3.0 * self.bass_pulse))
+        self.bounds.sphere(1.5 * (iterations * FOLD_REACH + GLOW_REACH) + 0.01)
+        self.bounds.apply()
+
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.temporal.begin(vw, vh, self.kick_pulse, self.hat_glitch)
+        self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), self.temporal.pixels)
+        self.temporal.end(vx, vy, vw, vh)
+        if self.bounds.debug:
+            pygame.display.set_caption(CAPTION + self.bounds.label())
         pygame.display.flip()
 
     def run(self):
@@ -322,6 +347,9 @@ class ShaderVisualEngine:
                     elif event.key == K_h: self.hat_glitch = min(1.0, self.hat_glitch + 0.8)
                     elif event.key == K_t: self.tom1_morph = min(1.0, self.tom1_morph + 0.6)
                     elif event.key == K_y: self.tom2_spin = min(1.0, self.tom2_spin + 0.7)
+                    elif event.key == K_b:
+                        self.bounds.debug = not self.bounds.debug
+                        pygame.display.set_caption(CAPTION)
             self.process_midi(); self.update_params(); self.render(); self.clock.tick(60)
         if self.midi_input: self.midi_input.close()
         pygame.quit()
@@ -12,6 +12,7 @@ Característiques:
 - Hat: Glitch/distorsió del path
 - Tom1: Intensitat dels fractals
 - Tom2: Rotació del box
+- OPTIMIZADO: Damero temporal (temporal.py): media pantalla por frame, el resto del historial
 """
 
 from __future__ import division
@@ -21,21 +22,23 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from temporal import TemporalCheckerboard, TEMPORAL_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+TEMPORAL_MODE = 'half'   # 'off', 'half' (damero) o 'quarter' (2x2); kick y hat descartan el historial
 
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
 #version 330 core
-#define fragCoord gl_FragCoord.xy
+#define fragCoord temporalCoord()
 uniform float iTime;
 uniform vec2  iResolution;
 uniform float iKickPulse, iHatGlitch, iTom1Fractal, iTom2Spin;
 uniform float iBassNote;  // Nota del bassline (normalizada 0-1)
 uniform float iBassPulse; // Intensidad de la nota
 out vec4 fragColor;
-
+""" + TEMPORAL_GLSL + """
 float det = 0.001, t, boxhit;
 vec3 adv, boxp;
 
@@ -124,7 +127,7 @@ vec3 march(vec3 from, vec3 dir) {
 
     for (int i = 0; i < 80; i++) {
         p = from + td * dir;
-        d = de(p) * (1.0 - hash(gl_FragCoord.xy + t) * 0.3);
+        d = de(p) * (1.0 - hash(fragCoord + t) * 0.3);
         if (d < det && boxhit < 0.5) break;
         td += max(det, abs(d));
 
@@ -207,6 +210,7 @@ class ShaderVisualEngine:
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
         self.uni_bass_note = glGetUniformLocation(self.shader, 'iBassNote')
         self.uni_bass_pulse = glGetUniformLocation(self.shader, 'iBassPulse')
+        self.temporal = TemporalCheckerboard(self.shader, mode=TEMPORAL_MODE)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -308,7 +312,9 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_bass_note, self.bass_note)
         glUniform1f(self.uni_bass_pulse, self.bass_pulse)
         glBindVertexArray(self.vao)
+        self.temporal.begin(vw, vh, self.kick_pulse, self.hat_glitch)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.temporal.end(vx, vy, vw, vh)
         pygame.display.flip()
 
     def run(self):
@@ -7,10 +7,11 @@ Simula un monitor vectorial CRT dañado o interferencias VHS.
 
 Característiques:
 - Mode XY: X=Audio, Y=Audio(Phase)
-- Estela: Persistencia de buffers anteriores
+- Estela: Persistencia de buffers anteriores (ring buffer en GPU, un multi-draw)
+  o fósforo con FBO de feedback (PERSISTENCE_MODE = 'phosphor')
 - VFX Audio Reactivos (Frecuencias Altas/Kick):
     1. Deflection Glitch: El haz se deforma y tiembla (Vertex Displacement)
-    2. RGB Split: Separación de canales de color (Chromatic Aberration vectorial)
+    2. RGB Split: Separación de canales de color (post-proceso sobre FBO, coste constante)
     3. Intensity Boost: El brillo aumenta con la intensidad
 """
 
@@ -21,13 +22,22 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
-import collections
+from feedback import PhosphorPersistence
 
 # Configuración
 SAMPLES = 1024        # Tamaño del buffer de audio
-HISTORY_LENGTH = 30   # Cuadros de estela (Reducido un poco para performance x3 draws)
+HISTORY_LENGTH = 30   # Cuadros de estela (slots del ring buffer en GPU)
 LINE_WIDTH = 2.0
 XY_PHASE = 15         # Desfase estéreo
+TRAIL_SAMPLES = 4     # MSAA del FBO de estelas (el mismo que pide la ventana)
+TRAIL_POINTS = SAMPLES - XY_PHASE  # Puntos por estela (un slot del ring buffer)
+
+# Persistencia: 'history' redibuja HISTORY_LENGTH estelas; 'phosphor' acumula en un FBO
+# de feedback con decaimiento y dibuja solo la traza nueva (geometría O(1) por frame)
+PERSISTENCE_MODE = 'history'
+PHOSPHOR_DECAY = 0.85         # Factor por frame (≈ mismo brillo acumulado que 30 estelas)
+PHOSPHOR_BLUR = 0.0           # 0..1, difuminado del fósforo
+PHOSPHOR_OFFSET = (0.0, 0.0)  # Deriva de la estela por frame (UV)
 
 VERTEX_SHADER = """
 #version 330 core
@@ -36,10 +46,18 @@ layout(location = 1) in float audio_val_y;
 
 uniform float uScale;
 uniform float uAspectRatio;
-uniform vec2 uOffset;       # Desplazamiento (para RGB split)
-uniform float uGlitch;      # Intensidad de glitch (0.0 - 1.0)
+uniform vec2 uOffset;       // Desplazamiento (para RGB split)
+uniform float uGlitch;      // Intensidad de glitch (0.0 - 1.0)
 uniform float uTime;
 
+// Ring buffer de estelas: cada slot son TRAIL_POINTS vértices
+uniform int uTrailPoints;
+uniform int uHistory;       // Slots totales (HISTORY_LENGTH)
+uniform int uHead;          // Slot más reciente
+uniform int uFilled;        // Slots con datos válidos
+
+out float vAlpha;
+
 // Pseudo-random
 float hash(float n) { return fract(sin(n) * 43758.5453123); }
 float noise(float p) {
@@ -49,6 +67,12 @@ float noise(float p) {
 }
 
 void main() {
+    // Edad de la estela a partir del slot (0 = frame actual)
+    int slot = gl_VertexID / uTrailPoints;
+    int age = (uHead - slot + uHistory) % uHistory;
+    float prog = float(uFilled - age) / float(uFilled);
+    vAlpha = prog * prog;
+
     vec2 pos = vec2(audio_val_x, audio_val_y);
     
     // Escalar
@@ -83,10 +107,45 @@ void main() {
 FRAGMENT_SHADER = """
 #version 330 core
 out vec4 fragColor;
-uniform vec4 uColor;
+in float vAlpha;
+uniform vec4 uColor;        // rgb base, a = multiplicador (flicker / punto)
+
+void main() {
+    float alpha = vAlpha * uColor.a;
+    fragColor = vec4(uColor.rgb * alpha, alpha);
+}
+"""
+
+# Post-proceso RGB Split: las estelas se dibujan una sola vez en un FBO
+POST_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 vPos;
+out vec2 vUV;
+void main() {
+    vUV = vPos * 0.5 + 0.5;
+    gl_Position = vec4(vPos, 0.0, 1.0);
+}
+"""
+
+POST_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+uniform sampler2D uTrails;  // Estelas renderizadas en blanco (intensidad HDR, sin saturar)
+uniform float uSplit;       // Desplazamiento horizontal por canal (UV)
+uniform float uFlicker;     // f² : los pases antiguos aplicaban f en rgb y en alpha (GL_SRC_ALPHA, GL_ONE)
 
 void main() {
-    fragColor = uColor;
+    // Mismos colores y offsets que los antiguos pases R/G/B
+    float r = texture(uTrails, vUV + vec2(uSplit, 0.0)).r;
+    float g = texture(uTrails, vUV).r;
+    float b = texture(uTrails, vUV - vec2(uSplit, 0.0)).r;
+
+    vec3 col = vec3(1.0, 0.2, 0.2) * r
+             + vec3(0.2, 1.0, 0.2) * g
+             + vec3(0.2, 0.2, 1.0) * b;
+
+    fragColor = vec4(col * uFlicker, 1.0);
 }
 """
 
@@ -114,7 +173,9 @@ class ShaderVisualEngine:
 
         # Audio & Data
         self.audio_buffer = np.zeros(SAMPLES, dtype=np.float32)
-        self.trail_history = collections.deque(maxlen=HISTORY_LENGTH)
+        self.trail_points = np.zeros((TRAIL_POINTS, 2), dtype=np.float32)
+        self.trail_head = HISTORY_LENGTH - 1  # Slot más reciente del ring buffer
+        self.trail_filled = 0
         self.high_freq_energy = 0.0 # Para detectar glitches
         
         self.setup_audio()
@@ -176,26 +237,105 @@ class ShaderVisualEngine:
         self.u_offset = glGetUniformLocation(self.shader, 'uOffset')
         self.u_glitch = glGetUniformLocation(self.shader, 'uGlitch')
         self.u_time = glGetUniformLocation(self.shader, 'uTime')
+        self.u_trail_points = glGetUniformLocation(self.shader, 'uTrailPoints')
+        self.u_history = glGetUniformLocation(self.shader, 'uHistory')
+        self.u_head = glGetUniformLocation(self.shader, 'uHead')
+        self.u_filled = glGetUniformLocation(self.shader, 'uFilled')
         
-        self.vbo = glGenBuffers(1)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, SAMPLES * 4 * 2, None, GL_DYNAMIC_DRAW)
-        
+        # Ring buffer en GPU: HISTORY_LENGTH slots de TRAIL_POINTS puntos (x, y)
         self.vao = glGenVertexArrays(1)
         glBindVertexArray(self.vao)
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, HISTORY_LENGTH * self.trail_points.nbytes, None, GL_DYNAMIC_DRAW)
         glEnableVertexAttribArray(0)
         glEnableVertexAttribArray(1)
+        glVertexAttribPointer(0, 1, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
+        glVertexAttribPointer(1, 1, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(4))
+
+        # Tablas para glMultiDrawArrays (una línea por slot)
+        self.trail_firsts = np.arange(HISTORY_LENGTH, dtype=np.int32) * TRAIL_POINTS
+        self.trail_counts = np.full(HISTORY_LENGTH, TRAIL_POINTS, dtype=np.int32)
+
+        # Post-proceso RGB Split
+        pvs = shaders.compileShader(POST_VERTEX_SHADER, GL_VERTEX_SHADER)
+        pfs = shaders.compileShader(POST_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.post_shader = shaders.compileProgram(pvs, pfs)
+        self.u_post_trails = glGetUniformLocation(self.post_shader, 'uTrails')
+        self.u_post_split = glGetUniformLocation(self.post_shader, 'uSplit')
+        self.u_post_flicker = glGetUniformLocation(self.post_shader, 'uFlicker')
+
+        verts = np.array([-1, -1, 1, -1, 1, 1, -1, 1], dtype=np.float32)
+        self.quad_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.quad_vao)
+        quad_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, quad_vbo)
+        glBufferData(GL_ARRAY_BUFFER, verts, GL_STATIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
+
+        # FBO de estelas (se crea/redimensiona en ensure_trail_fbo): se dibuja en el
+        # multisample y se resuelve en la textura que lee el post-proceso
+        self.trail_fbo = None
+        self.trail_tex = None
+        self.trail_msaa_fbo = None
+        self.trail_msaa_rbo = None
+        self.trail_fbo_size = (0, 0)
+
+        # Acumulación de fósforo (solo en modo 'phosphor')
+        self.phosphor = None
+        if PERSISTENCE_MODE == 'phosphor':
+            self.phosphor = PhosphorPersistence(PHOSPHOR_DECAY, PHOSPHOR_BLUR, PHOSPHOR_OFFSET)
+
+    def ensure_trail_fbo(self, w, h):
+        """
+        Crea el FBO de estelas o lo reasigna solo si cambia el tamaño.
+        RGBA16F: las estelas solapadas se acumulan por encima de 1.0 antes del tinte,
+        como cuando cada canal sumaba directamente en pantalla. Multisample como la
+        ventana para no perder el antialiasing de las líneas.
+        """
+        if self.trail_fbo is not None and self.trail_fbo_size == (w, h):
+            return
+        if self.trail_fbo is None:
+            self.trail_fbo = glGenFramebuffers(1)
+            self.trail_tex = glGenTextures(1)
+            self.trail_msaa_fbo = glGenFramebuffers(1)
+            self.trail_msaa_rbo = glGenRenderbuffers(1)
+
+        samples = min(TRAIL_SAMPLES, int(glGetIntegerv(GL_MAX_SAMPLES)))
+        glBindRenderbuffer(GL_RENDERBUFFER, self.trail_msaa_rbo)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, samples, GL_RGBA16F, w, h)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.trail_msaa_fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.trail_msaa_rbo)
+
+        glBindTexture(GL_TEXTURE_2D, self.trail_tex)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, w, h, 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.trail_fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.trail_tex, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.trail_fbo_size = (w, h)
 
     def update_trail(self):
         self.analyze_audio()
         
         data = self.audio_buffer
         offset = XY_PHASE
-        if len(data) > offset:
-            x = data[:-offset]
-            y = data[offset:]
-            points = np.column_stack((x, y)).astype(np.float32)
-            self.trail_history.append(points)
+        # Interleave (x, y) en el buffer preasignado
+        self.trail_points[:, 0] = data[:-offset]
+        self.trail_points[:, 1] = data[offset:]
+
+        # Un solo glBufferSubData en el slot siguiente del ring buffer
+        self.trail_head = (self.trail_head + 1) % HISTORY_LENGTH
+        self.trail_filled = min(self.trail_filled + 1, HISTORY_LENGTH)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, self.trail_head * self.trail_points.nbytes,
+                        self.trail_points.nbytes, self.trail_points)
 
     def render(self):
         w, h = self.screen.get_size()
@@ -215,75 +355,102 @@ class ShaderVisualEngine:
         glUniform1f(self.u_glitch, glitch_intensity)
         glUniform1f(self.u_aspect, 1.0) # Sin distorsión aspect
         
-        if len(self.trail_history) == 0:
+        if self.trail_filled == 0:
             pygame.display.flip()
             return
 
         glBindVertexArray(self.vao)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        
-        # Render Loop
-        total = len(self.trail_history)
+        glUniform1f(self.u_scale, 0.8)
+        glUniform1i(self.u_trail_points, TRAIL_POINTS)
+        glUniform1i(self.u_history, HISTORY_LENGTH)
+        glUniform1i(self.u_head, self.trail_head)
+        glUniform1i(self.u_filled, self.trail_filled)
         
-        # DECISIÓN: Si hay mucho glitch, dibujamos RGB Split (3 pases). Si no, normal (1 pase).
+        # DECISIÓN: Si hay mucho glitch, estelas en blanco a un FBO + RGB Split en post-proceso.
+        # Si no, normal directo a pantalla. Siempre un solo dibujado del historial.
         is_glitching = glitch_intensity > 0.2
-        passes = ['R', 'G', 'B'] if is_glitching else ['Normal']
-        
-        for p_type in passes:
-            
-            # Configurar Color y Offset por pase
-            if p_type == 'Normal':
-                base_col = (0.2, 1.0, 0.4) # Verde Scope
-                glUniform2f(self.u_offset, 0.0, 0.0)
-            elif p_type == 'R':
-                base_col = (1.0, 0.2, 0.2) # Rojo
-                off = glitch_intensity * 0.05
-                glUniform2f(self.u_offset, -off, 0.0)
-            elif p_type == 'G':
-                base_col = (0.2, 1.0, 0.2) # Verde
-                glUniform2f(self.u_offset, 0.0, 0.0)
-            elif p_type == 'B':
-                base_col = (0.2, 0.2, 1.0) # Azul
-                off = glitch_intensity * 0.05
-                glUniform2f(self.u_offset, off, 0.0)
-
-            # Dibujar historial
-            for i, points in enumerate(self.trail_history):
-                prog = (i + 1) / total
-                alpha = prog * prog
-                
-                # Si estamos en glitch, el alpha puede parpadear
-                if is_glitching:
-                    alpha *= (0.5 + 0.5 * np.sin(t * 50.0))
-                
-                glUniform4f(self.u_color, 
-                           base_col[0] * alpha, 
-                           base_col[1] * alpha, 
-                           base_col[2] * alpha, 
-                           alpha)
-                
-                glUniform1f(self.u_scale, 0.8)
-                
-                # Solo subir datos una vez por frame (optimización)
-                # Pero aquí iteramos pases. El VBO data es el mismo, no cambia.
-                # Debemos asegurarnos de no resubir datos en cada pase 'p_type'.
-                # Podemos subirlo solo en el primer pase del loop externo?
-                # Simplificación: Subir siempre. Python overhead > GPU bandwidth aquí.
-                if p_type == passes[0]: 
-                     glBufferData(GL_ARRAY_BUFFER, points.nbytes, points, GL_DYNAMIC_DRAW)
-                
-                glVertexAttribPointer(0, 1, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(0))
-                glVertexAttribPointer(1, 1, GL_FLOAT, GL_FALSE, 8, ctypes.c_void_p(4))
-                
-                glDrawArrays(GL_LINE_STRIP, 0, len(points))
-                
-                # Punto brillante al final (solo en pase G o Normal)
-                if i == total - 1 and (p_type == 'Normal' or p_type == 'G'):
-                    glPointSize(5.0 + glitch_intensity * 10.0) # Punto explota con glitch
-                    glDrawArrays(GL_POINTS, len(points)-1, 1)
+        tip_index = self.trail_head * TRAIL_POINTS + TRAIL_POINTS - 1
+        glUniform2f(self.u_offset, 0.0, 0.0)
+
+        if self.phosphor is not None:
+            self.render_phosphor(w, h, t, glitch_intensity, is_glitching, tip_index)
+        elif not is_glitching:
+            glUniform4f(self.u_color, 0.2, 1.0, 0.4, 1.0) # Verde Scope
+            glMultiDrawArrays(GL_LINE_STRIP, self.trail_firsts, self.trail_counts, self.trail_filled)
+
+            # Punto brillante al final
+            glPointSize(5.0 + glitch_intensity * 10.0)
+            glDrawArrays(GL_POINTS, tip_index, 1)
+        else:
+            # 1. Historial completo una sola vez (intensidad en blanco), MSAA resuelto a textura
+            self.ensure_trail_fbo(w, h)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.trail_msaa_fbo)
+            glClearColor(0.0, 0.0, 0.0, 0.0)
+            glClear(GL_COLOR_BUFFER_BIT)
+            glUniform4f(self.u_color, 1.0, 1.0, 1.0, 1.0)
+            glMultiDrawArrays(GL_LINE_STRIP, self.trail_firsts, self.trail_counts, self.trail_filled)
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.trail_msaa_fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.trail_fbo)
+            glBlitFramebuffer(0, 0, w, h, 0, 0, w, h, GL_COLOR_BUFFER_BIT, GL_NEAREST)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            glClearColor(0.05, 0.05, 0.05, 1.0)
+
+            # 2. RGB Split + flicker en un único pase de pantalla completa
+            glUseProgram(self.post_shader)
+            glActiveTexture(GL_TEXTURE0)
+            glBindTexture(GL_TEXTURE_2D, self.trail_tex)
+            glUniform1i(self.u_post_trails, 0)
+            # Offset en clip space (glitch * 0.05) -> UV (mitad)
+            glUniform1f(self.u_post_split, glitch_intensity * 0.05 * 0.5)
+            flicker = 0.5 + 0.5 * np.sin(t * 50.0)
+            glUniform1f(self.u_post_flicker, flicker * flicker)
+            glBindVertexArray(self.quad_vao)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+            # 3. Punto brillante al final (canal verde, explota con glitch)
+            glUseProgram(self.shader)
+            glBindVertexArray(self.vao)
+            glUniform4f(self.u_color, 0.2, 1.0, 0.2, 1.0)
+            glPointSize(5.0 + glitch_intensity * 10.0)
+            glDrawArrays(GL_POINTS, tip_index, 1)
 
         pygame.display.flip()
 
+    def render_phosphor(self, w, h, t, glitch_intensity, is_glitching, tip_index):
+        """Persistencia por feedback: solo la traza nueva entra en la acumulación"""
+        # 1. Frame anterior decaído + traza actual (intensidad en blanco)
+        self.phosphor.begin(w, h)
+        glUseProgram(self.shader)
+        glBindVertexArray(self.vao)
+        glUniform4f(self.u_color, 1.0, 1.0, 1.0, 1.0)
+        glDrawArrays(GL_LINE_STRIP, self.trail_head * TRAIL_POINTS, TRAIL_POINTS)
+        self.phosphor.end()
+        glViewport(0, 0, w, h)
+
+        # 2. Composición: verde scope o RGB Split sobre la acumulación
+        if not is_glitching:
+            self.phosphor.present(tint=(0.2, 1.0, 0.4))
+        else:
+            glUseProgram(self.post_shader)
+            glActiveTexture(GL_TEXTURE0)
+            glBindTexture(GL_TEXTURE_2D, self.phosphor.texture)
+            glUniform1i(self.u_post_trails, 0)
+            glUniform1f(self.u_post_split, glitch_intensity * 0.05 * 0.5)
+            flicker = 0.5 + 0.5 * np.sin(t * 50.0)
+            glUniform1f(self.u_post_flicker, flicker * flicker)
+            glBindVertexArray(self.quad_vao)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # 3. Punto brillante directo a pantalla (no deja estela)
+        glUseProgram(self.shader)
+        glBindVertexArray(self.vao)
+        if is_glitching:
+            glUniform4f(self.u_color, 0.2, 1.0, 0.2, 1.0)
+        else:
+            glUniform4f(self.u_color, 0.2, 1.0, 0.4, 1.0)
+        glPointSize(5.0 + glitch_intensity * 10.0)
+        glDrawArrays(GL_POINTS, tip_index, 1)
+
     def run(self):
         running = True
         while running:
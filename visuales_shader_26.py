@@ -6,7 +6,9 @@ Sistema de partículas volumétrico generado puramente en el Fragment Shader.
 Garantiza compatibilidad total (mismo método que los otros presets).
 
 Característiques:
-- Generación: "Raymarching" simplificado de capas de ruido 3D.
+- Generación: partículas 3D en GPU (particles.py) que viajan hacia la cámara,
+  avanzadas con transform feedback y dibujadas como point sprites aditivos.
+  El fragment shader solo pinta la nebulosa de fondo.
 - Reactividad:
     - Graves: Respiración y expansión del espacio.
     - Agudos: Destellos y turbulencia.
@@ -20,9 +22,11 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
+from particles import ParticleSystem, random_state
 
 # Configuración
 SAMPLES = 1024
+PARTICLE_COUNT = 20000
 
 VERTEX_SHADER = """
 #version 330 core
@@ -61,36 +65,6 @@ float noise(vec2 p) {
     return mix(a, b, u.x) + (c - a) * u.y * (1.0 - u.x) + (d - b) * u.x * u.y;
 }
 
-// Starfield Layer
-float starLayer(vec2 uv, float scale, float seed) {
-    vec2 id = floor(uv * scale);
-    vec2 pos = fract(uv * scale) - 0.5;
-    
-    // Random per cell
-    float n = hash(id + seed);
-    
-    // Threshold para decidir si hay estrella
-    // Menos es más estrellas
-    if (n > 0.9 + (0.08 * (1.0 - uVolume))) return 0.0; 
-    
-    // Posición offset random en la celda
-    vec2 offset = (vec2(hash(id + seed*2.0), hash(id + seed*3.0)) - 0.5) * 0.8;
-    
-    // Distancia
-    float d = length(pos - offset);
-    
-    // Brillo (Point shape)
-    // Modulado por audio (High Freq hace destellos)
-    float brightness = 0.02 / d;
-    brightness *= smoothstep(1.0, 0.1, d); // Soft limit
-    
-    // Twinkle
-    float twinkle = sin(iTime * 5.0 + n * 100.0) * 0.5 + 0.5;
-    brightness *= 0.5 + 0.5 * twinkle + uHighFreq * 2.0;
-    
-    return brightness;
-}
-
 void main() {
     vec2 uv = (gl_FragCoord.xy - 0.5 * iResolution.xy) / iResolution.y;
     
@@ -107,27 +81,6 @@ void main() {
     
     vec3 col = vec3(0.0);
     
-    // Generar capas de estrellas/polvo
-    // Parallax: Capas se mueven a diferentes velocidades
-    float t = iTime * (0.1 + uVolume * 0.2); // Velocidad global
-    
-    for (float i = 0.0; i < 5.0; i++) {
-        float depth = fract(i * 0.2 + t); // 0.0 a 1.0 moviéndose
-        float scale = mix(20.0, 0.5, depth); // Lejos (grande scale UV) -> Cerca (pequeño scale UV)
-        float fade = smoothstep(0.0, 0.2, depth) * smoothstep(1.0, 0.8, depth); // Fade in/out
-        
-        vec2 layerUV = uv * scale + i * 12.34; // Offset por capa
-        
-        // Añadir capa
-        float stars = starLayer(layerUV, 10.0, i); // Grid interno 10.0
-        
-        // Colorizar capa
-        // Las lejanas más azules, cercanas más blancas
-        vec3 layerCol = mix(vec3(0.2, 0.4, 0.8), vec3(0.8, 0.9, 1.0), depth);
-        
-        col += layerCol * stars * fade;
-    }
-    
     // Fondo: Ruido nebuloso muy sutil
     float nebula = noise(uv * 3.0 + vec2(iTime * 0.1));
     col += vec3(0.05, 0.05, 0.1) * nebula * (0.5 + uVolume);
@@ -139,6 +92,64 @@ void main() {
 }
 """
 
+# Polvo 3D: xy en [-1, 1], z = distancia a la cámara (1 lejos -> 0 cerca)
+PARTICLE_UPDATE = """
+uniform float uVolume;
+
+void updateParticle(inout vec4 pos, inout vec4 vel) {
+    // Viaje hacia la cámara (velocidad global con el volumen)
+    pos.z -= uDelta * (0.1 + uVolume * 0.2);
+
+    // Al pasar la cámara reaparece al fondo en otra posición
+    if (pos.z < 0.02) {
+        float r = particleHash(vel.w * 37.1 + uTime);
+        pos.xy = vec2(particleHash(r * 11.3), particleHash(r * 57.9)) * 2.0 - 1.0;
+        pos.z += 0.98;
+    }
+}
+"""
+
+PARTICLE_RENDER = """
+uniform float uVolume;
+uniform float uLowFreq;
+uniform float uHighFreq;
+uniform float uAspect;
+uniform float uPointScale;
+
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    // Proyección en perspectiva (uv normalizado por la altura, como el fondo)
+    vec2 uv = pos.xy * 0.5 / pos.z;
+
+    // Rotación lenta de cámara (inversa de la del fondo, que rota las coordenadas)
+    float ang = -uTime * 0.05;
+    float s = sin(ang);
+    float c = cos(ang);
+    uv = mat2(c, -s, s, c) * uv;
+
+    // Respiración (Zoom) con Bajos
+    uv *= 1.0 + uLowFreq * 0.2;
+
+    // Lejos -> cerca, con fade in/out
+    float depth = 1.0 - pos.z;
+    float fade = smoothstep(0.0, 0.2, depth) * smoothstep(1.0, 0.8, depth);
+
+    // Menos volumen, menos polvo visible
+    float visible = step(vel.w, 0.9 + 0.08 * uVolume);
+
+    // Twinkle (High Freq hace destellos)
+    float twinkle = sin(uTime * 5.0 + vel.w * 100.0) * 0.5 + 0.5;
+    float brightness = 0.5 + 0.5 * twinkle + uHighFreq * 2.0;
+
+    // Las lejanas más azules, cercanas más blancas
+    vec3 layerCol = mix(vec3(0.2, 0.4, 0.8), vec3(0.8, 0.9, 1.0), depth);
+    float vignette = max(1.0 - length(uv * 0.8), 0.0);
+    color = layerCol * brightness * fade * visible * vignette * 1.5;
+    size = mix(3.0, 16.0, depth * depth) * uPointScale;
+
+    return vec4(uv.x * 2.0 / uAspect, uv.y * 2.0, 0.0, 1.0);
+}
+"""
+
 class ShaderVisualEngine:
     def __init__(self):
         pygame.init()
@@ -225,6 +236,11 @@ class ShaderVisualEngine:
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
 
+        # Partículas en GPU
+        state = random_state(PARTICLE_COUNT, low=(-1.0, -1.0, 0.02), high=(1.0, 1.0, 1.0))
+        self.particles = ParticleSystem(PARTICLE_COUNT, PARTICLE_UPDATE, PARTICLE_RENDER, state)
+        self.last_ticks = pygame.time.get_ticks()
+
     def render(self):
         self.analyze_audio()
         w, h = self.screen.get_size()
@@ -232,15 +248,27 @@ class ShaderVisualEngine:
         glClearColor(0,0,0,1)
         glClear(GL_COLOR_BUFFER_BIT)
         
+        ticks = pygame.time.get_ticks()
+        t = (ticks - self.start_time) / 1000.0
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Avanzar partículas (transform feedback, sin rasterizar)
+        self.particles.step(uTime=t, uDelta=dt, uVolume=self.smoothed_vol)
+
         glUseProgram(self.shader)
         glUniform2f(self.u_res, float(w), float(h))
-        glUniform1f(self.u_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.u_time, t)
         glUniform1f(self.u_vol, self.smoothed_vol)
         glUniform1f(self.u_low, self.smoothed_low)
         glUniform1f(self.u_high, self.smoothed_high)
         
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # Polvo como sprites aditivos
+        self.particles.draw(uTime=t, uVolume=self.smoothed_vol, uLowFreq=self.smoothed_low,
+                            uHighFreq=self.smoothed_high, uAspect=w / h, uPointScale=h / 900.0)
         
         pygame.display.flip()
 
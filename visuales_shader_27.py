@@ -7,6 +7,7 @@ Inspirado en el shader "Music Visualizer" de Shadertoy, adaptado a Python/GLSL.
 Característiques:
 - Anillo central reactivo a frecuencias (FFT suave).
 - Líneas orbitales que rotan (Lissajous lines).
+- Ecos del espectro: historial (espectrograma) expandiéndose como túnel.
 - Coloración HSV dinámica basada en el ángulo y el tiempo.
 - Efecto "Glow" aditivo.
 - Reactividad: Frecuencias (FFT) modulan el brillo y el grosor.
@@ -19,10 +20,13 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
+from audio_textures import SpectrumTexture, SpectrogramRing
 
 # Configuración
 SAMPLES = 1024
 FFT_SIZE = 512 # Tamaño de la textura de FFT
+FFT_MAPPING = 'linear'  # 'linear' o 'log' (más resolución en graves)
+HISTORY_ROWS = 256 # Filas del espectrograma (~4s a 60fps)
 
 VERTEX_SHADER = """
 #version 330 core
@@ -40,11 +44,16 @@ uniform float iTime;
 uniform vec2 iResolution;
 uniform sampler1D iAudioFFT; // Textura 1D con datos FFT
 uniform float uVolume;
+uniform sampler2D iSpectrogram; // Historial del espectro (anillo de filas)
+uniform float iSpectrogramHead; // Fila más reciente
+uniform float iSpectrogramRows;
 
 #define PI 3.14159265359
 #define RADIUS 0.5
 #define SPEED 0.5
 #define BRIGHTNESS 0.2
+#define ECHOES 4
+#define ECHO_SPAN 0.25 // Fracción del historial usada por los ecos
 
 // HSV to RGB
 vec3 hsv2rgb(vec3 c) {
@@ -61,6 +70,12 @@ float getFrequency(float x) {
     return texture(iAudioFFT, x * 0.5).r; 
 }
 
+// Espectro de hace `age` (0 = ahora, 1 = fila más antigua del historial)
+float getPastFrequency(float x, float age) {
+    float row = iSpectrogramHead - age * (iSpectrogramRows - 1.0);
+    return texture(iSpectrogram, vec2(x * 0.5, (row + 0.5) / iSpectrogramRows)).r;
+}
+
 // Anillo central
 vec3 circleIllumination(vec2 uv, float radius) {
     float dist = length(uv);
@@ -87,6 +102,25 @@ vec3 circleIllumination(vec2 uv, float radius) {
     return col;
 }
 
+// Ecos: espectros pasados expandiéndose hacia fuera (efecto túnel)
+vec3 echoRings(vec2 uv, float radius) {
+    float dist = length(uv);
+    float angle = atan(uv.x, uv.y);
+    float normAngle = abs(angle / PI);
+
+    vec3 col = vec3(0.0);
+    for(int i = 1; i <= ECHOES; i++) {
+        float age = float(i) / float(ECHOES) * ECHO_SPAN;
+        float freq = getPastFrequency(normAngle, age);
+        float echoRadius = radius + age * 2.5;
+
+        float ring = 1.0 / abs(dist - echoRadius);
+        vec3 c = hsv2rgb(vec3((angle + iTime * 0.5) / (PI * 2.0) + age, 1.0, 1.0));
+        col += c * ring * BRIGHTNESS * 0.3 * freq * (1.0 - age / ECHO_SPAN * 0.8);
+    }
+    return col;
+}
+
 // Líneas rotativas
 vec3 doLine(vec2 uv, float radius) {
     // Color basado en tiempo
@@ -115,6 +149,7 @@ void main() {
     
     // 1. Círculo Central
     col += circleIllumination(uv, RADIUS);
+    col += echoRings(uv, RADIUS);
     
     // 2. Líneas Rotativas
     float t = iTime * SPEED;
@@ -164,7 +199,6 @@ class ShaderVisualEngine:
 
         # Audio
         self.audio_buffer = np.zeros(SAMPLES, dtype=np.float32)
-        self.fft_texture_data = np.zeros(FFT_SIZE, dtype=np.float32)
         self.setup_audio()
         
         self.vol_smoothed = 0.0
@@ -197,10 +231,11 @@ class ShaderVisualEngine:
         # Normalizar y suavizar
         fft = fft / SAMPLES * 10.0 # Boost visual
         
-        # Mapear al buffer de textura (interpolación simple o truncado)
+        # Remapear (tabla precalculada) y subir con glTexSubImage1D
         # FFT size real es SAMPLES/2 + 1 (513). Queremos 512.
-        l = min(len(fft), FFT_SIZE)
-        self.fft_texture_data[:l] = fft[:l]
+        self.spectrum.update(fft)
+        # Una fila nueva por hop en el historial (O(1), sin copias en CPU)
+        self.spectrogram.push(self.spectrum.data)
         
         # Volumen global
         rms = np.sqrt(np.mean(self.audio_buffer**2))
@@ -209,19 +244,25 @@ class ShaderVisualEngine:
     def setup_shaders(self):
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-        self.shader = shaders.compileProgram(vs, fs)
+        # Sin validación: sampler1D y sampler2D comparten unidad 0 hasta asignarlas abajo
+        self.shader = shaders.compileProgram(vs, fs, validate=False)
         
         self.u_res = glGetUniformLocation(self.shader, 'iResolution')
         self.u_time = glGetUniformLocation(self.shader, 'iTime')
         self.u_vol = glGetUniformLocation(self.shader, 'uVolume')
         self.u_fft = glGetUniformLocation(self.shader, 'iAudioFFT')
+        self.u_spectrogram = glGetUniformLocation(self.shader, 'iSpectrogram')
+        self.u_spec_head = glGetUniformLocation(self.shader, 'iSpectrogramHead')
+        self.u_spec_rows = glGetUniformLocation(self.shader, 'iSpectrogramRows')
+
+        # Unidades de textura fijas: 0 = FFT actual, 1 = historial
+        glUseProgram(self.shader)
+        glUniform1i(self.u_fft, 0)
+        glUniform1i(self.u_spectrogram, 1)
         
-        # Textura 1D para FFT
-        self.tex_fft = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_1D, self.tex_fft)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        # Textura 1D para FFT (almacenamiento inmutable, se reserva una sola vez)
+        self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING)
+        self.spectrogram = SpectrogramRing(bins=FFT_SIZE, rows=HISTORY_ROWS)
         
         # Quad
         verts = np.array([-1,-1, 1,-1, 1,1, -1,1], dtype=np.float32)
@@ -246,11 +287,11 @@ class ShaderVisualEngine:
         glUniform1f(self.u_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
         glUniform1f(self.u_vol, self.vol_smoothed)
         
-        # Actualizar textura FFT
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_1D, self.tex_fft)
-        glTexImage1D(GL_TEXTURE_1D, 0, GL_R32F, FFT_SIZE, 0, GL_RED, GL_FLOAT, self.fft_texture_data)
-        glUniform1i(self.u_fft, 0)
+        # Textura FFT (ya actualizada en update_fft)
+        self.spectrum.bind(0)
+        self.spectrogram.bind(1)
+        glUniform1f(self.u_spec_head, float(self.spectrogram.head))
+        glUniform1f(self.u_spec_rows, float(HISTORY_ROWS))
         
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
@@ -11,6 +11,10 @@ Característiques:
 - Rayos de Espectro (Reactivos a Frecuencias).
 - Ecos Geométricos (Ripples).
 - Colores Neón Alta Intensidad.
+
+El glow ya no es 1/distancia por píxel: el núcleo y los ecos son líneas de neón
+finas que emiten por encima de 1.0 y el resplandor lo pone el bloom de postfx.py
+(cadena de mips), con intensidad marcada por la envolvente de graves (el kick).
 """
 
 from __future__ import division
@@ -20,10 +24,15 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
+from audio_textures import SpectrumTexture
+from postfx import PostChain
 
 # Configuración
 SAMPLES = 1024
 FFT_SIZE = 512
+FFT_MAPPING = 'linear'  # 'linear' o 'log' (más resolución en graves)
+BLOOM_BASE = 0.6        # Bloom en reposo
+BLOOM_KICK = 2.5        # Bloom extra con la envolvente de graves a tope
 
 VERTEX_SHADER = """
 #version 330 core
@@ -118,10 +127,10 @@ void main() {
     float hexRadius = 0.2 + bass * 0.15;
     float hexDist = abs(sdHexagon(uv_folded, hexRadius));
     
-    // Glow intenso para el núcleo
-    float coreGlow = 0.02 / (hexDist + 0.001);
+    // Línea de neón del núcleo (HDR: el resplandor lo añade el bloom)
+    float coreLine = smoothstep(0.008, 0.0, hexDist) * 6.0 + smoothstep(0.04, 0.0, hexDist) * 0.5;
     vec3 coreCol = vec3(1.0, 0.2, 0.6); // Magenta/Red Neon
-    col += coreCol * coreGlow * (0.5 + bass);
+    col += coreCol * coreLine * (0.5 + bass);
     
     // 5. Ecos Hexagonales (Outer Ripples)
     // Múltiples hexágonos concéntricos que reaccionan a Medios/Agudos
@@ -133,7 +142,7 @@ void main() {
         
         // Grosor variable con la frecuencia de esa banda
         float bandFreq = getFreq(0.2 + fi * 0.15);
-        float ringGlow = 0.008 / (ringDist + 0.001);
+        float ringGlow = smoothstep(0.005, 0.0, ringDist) * 4.0 + smoothstep(0.02, 0.0, ringDist) * 0.3;
         
         // Color cíclico (Gold/Green/Cyan)
         vec3 ringCol = hsv2rgb(vec3(fi * 0.15 + t + bandFreq, 0.9, 1.0));
@@ -149,13 +158,8 @@ void main() {
         if (twinkle > 0.5) col += vec3(0.5) * uVolume;
     }
     
-    // Vignette para profundidad
+    // Vignette para profundidad (bloom y tonemap van en el post-proceso)
     col *= 1.0 - smoothstep(0.5, 1.5, r);
-    
-    // Tone Mapping simple para evitar saturación extrema blanca
-    col = col / (col + vec3(1.0));
-    col = pow(col, vec3(0.4545)); // Gamma correction
-    col *= 2.0; // Boost final
 
     fragColor = vec4(col, 1.0);
 }
@@ -182,10 +186,10 @@ class ShaderVisualEngine:
 
         # Audio
         self.audio_buffer = np.zeros(SAMPLES, dtype=np.float32)
-        self.fft_texture_data = np.zeros(FFT_SIZE, dtype=np.float32)
         self.setup_audio()
         
         self.vol_smoothed = 0.0
+        self.bass_env = 0.0
         
         self.setup_shaders()
         self.clock = pygame.time.Clock()
@@ -212,14 +216,17 @@ class ShaderVisualEngine:
         fft = np.abs(np.fft.rfft(self.audio_buffer))
         fft = fft / SAMPLES * 10.0 
         
-        l = min(len(fft), FFT_SIZE)
         # Suavizado temporal de la textura FFT para menos jitter
-        # Lerp entre estado anterior y nuevo
-        self.fft_texture_data[:l] = self.fft_texture_data[:l] * 0.3 + fft[:l] * 0.7
+        # Lerp entre estado anterior y nuevo (smoothing=0.3 en SpectrumTexture)
+        self.spectrum.update(fft)
         
         rms = np.sqrt(np.mean(self.audio_buffer**2))
         self.vol_smoothed += (rms - self.vol_smoothed) * 0.1
 
+        # Envolvente de graves: ataque inmediato, caída lenta (hace de kick)
+        bass = min(1.0, float(np.mean(fft[1:8])))
+        self.bass_env = max(bass, self.bass_env * 0.9)
+
     def setup_shaders(self):
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
@@ -230,11 +237,7 @@ class ShaderVisualEngine:
         self.u_vol = glGetUniformLocation(self.shader, 'uVolume')
         self.u_fft = glGetUniformLocation(self.shader, 'iAudioFFT')
         
-        self.tex_fft = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_1D, self.tex_fft)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING, smoothing=0.3)
         
         verts = np.array([-1,-1, 1,-1, 1,1, -1,1], dtype=np.float32)
         self.vao = glGenVertexArrays(1)
@@ -245,27 +248,31 @@ class ShaderVisualEngine:
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
 
+        # Bloom + tonemap (el ×2 final que antes iba en el shader es la ganancia)
+        self.post = PostChain(['bloom', 'tonemap'])
+        self.post.set('bloom', threshold=0.8, knee=0.4)
+        self.post.set('tonemap', gain=2.0)
+
     def render(self):
         self.update_fft()
         
         w, h = self.screen.get_size()
-        glViewport(0, 0, w, h)
-        glClearColor(0,0,0,1)
-        glClear(GL_COLOR_BUFFER_BIT)
-        
+        current_time = (pygame.time.get_ticks() - self.start_time) / 1000.0
+
+        self.post.begin(w, h)
         glUseProgram(self.shader)
         glUniform2f(self.u_res, float(w), float(h))
-        glUniform1f(self.u_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.u_time, current_time)
         glUniform1f(self.u_vol, self.vol_smoothed)
         
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_1D, self.tex_fft)
-        glTexImage1D(GL_TEXTURE_1D, 0, GL_R32F, FFT_SIZE, 0, GL_RED, GL_FLOAT, self.fft_texture_data)
+        self.spectrum.bind(0)
         glUniform1i(self.u_fft, 0)
         
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
-        
+
+        self.post.set('bloom', amount=BLOOM_BASE + BLOOM_KICK * self.bass_env)
+        self.post.end(0, 0, w, h, current_time)
         pygame.display.flip()
 
     def run(self):
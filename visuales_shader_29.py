@@ -8,9 +8,12 @@ Características:
 - Partículas que forman estructuras 3D complejas
 - Morphing entre geometrías (esfera, cubo, torus, etc)
 - Conexiones procedurales entre partículas
+- Puntos y morphing calculados una vez por frame en NumPy; vecinos con una rejilla
+  uniforme (particles.neighbor_pairs) y subidos como lista de puntos y de líneas
 - Bajos: Explosión y reorganización
 - Medios: Complejidad de la estructura
 - Volumen: Intensidad y brillo
+- Espectro completo (SpectrumTexture de audio_textures.py): cada punto late con su banda
 """
 
 from __future__ import division
@@ -19,237 +22,202 @@ import pygame._sdl2.audio as sdl_audio
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
+import ctypes
 import numpy as np
 from numpy import array
+from particles import ParticleSystem, FLOATS_PER_PARTICLE, neighbor_pairs
+from audio_textures import SpectrumTexture
 
 SAMPLES = 1024
+FFT_SIZE = 256          # Texels de la textura de espectro
+FFT_MAPPING = 'log'     # Punto i -> banda i / NUM_PARTICLES (graves primero)
+
+# Constelación
+NUM_PARTICLES = 600
+LINK_RADIUS = 0.3        # Distancia máxima de conexión con medios al máximo (iMid = 1)
+MAX_LINKS = 12000
+CAM_POS = np.array([0.0, 0.0, -3.5], dtype=np.float32)
 
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
 #version 330 core
 #define fragCoord gl_FragCoord.xy
-uniform float iTime;
 uniform vec2  iResolution;
-uniform float iBass;
-uniform float iMid;
 uniform float iVolume;
 out vec4 fragColor;
 
-#define PI 3.14159265359
-#define NUM_PARTICLES 60.0
+// Fondo: partículas y conexiones se dibujan encima como geometría
+void main() {
+    vec2 uv = (fragCoord - 0.5 * iResolution.xy) / iResolution.y;
+    vec3 col = vec3(0.0);
 
-mat2 rot(float a) {
-    float s = sin(a), c = cos(a);
-    return mat2(c, s, -s, c);
-}
+    // Glow general casi eliminado (fondo más negro)
+    float centerGlow = 1.0 / (1.0 + length(uv) * 3.0);
+    col += vec3(0.05, 0.1, 0.15) * centerGlow * (0.01 + iVolume * 0.02);
 
-// Hash para generar posiciones procedurales
-vec3 hash33(float p) {
-    vec3 p3 = fract(vec3(p) * vec3(0.1031, 0.1030, 0.0973));
-    p3 += dot(p3, p3.yxz + 33.33);
-    return fract((p3.xxy + p3.yxx) * p3.zyx);
-}
+    // Tone mapping
+    col = col / (col + 1.0);
 
-// Diferentes estructuras geométricas
-vec3 spherePattern(float id, float t) {
-    float theta = id * PI * 2.0 / NUM_PARTICLES;
-    float phi = asin(-1.0 + (2.0 * id) / NUM_PARTICLES);
-    return vec3(
-        cos(theta) * cos(phi),
-        sin(phi),
-        sin(theta) * cos(phi)
-    );
-}
+    // Gamma
+    col = pow(col, vec3(0.4545));
 
-vec3 cubePattern(float id, float t) {
-    vec3 p = hash33(id) * 2.0 - 1.0;
-    return normalize(p) * (abs(p.x) + abs(p.y) + abs(p.z)) * 0.5;
-}
+    // Vignette más suave (menos oscurecimiento en bordes)
+    float vignette = 1.0 - length(uv) * 0.3;
+    col *= vignette;
 
-vec3 torusPattern(float id, float t) {
-    float angle1 = id * PI * 2.0 / NUM_PARTICLES;
-    float angle2 = id * PI * 8.0 / NUM_PARTICLES;
-    float R = 1.0;
-    float r = 0.5;
-    return vec3(
-        (R + r * cos(angle2)) * cos(angle1),
-        r * sin(angle2),
-        (R + r * cos(angle2)) * sin(angle1)
-    );
+    fragColor = vec4(col, 1.0);
 }
+"""
 
-vec3 helixPattern(float id, float t) {
-    // Rotación ultra lenta del helix
-    float angle = id * PI * 4.0 / NUM_PARTICLES + t * 0.15;
-    float height = (id / NUM_PARTICLES - 0.5) * 3.0;
-    return vec3(
-        cos(angle),
-        height,
-        sin(angle)
-    );
+# Proyección común: cámara en CAM_POS mirando a +z, uv normalizado por la altura
+PROJECT_GLSL = """
+uniform vec3 uCamPos;
+uniform float uAspect;
+vec4 project(vec3 p) {
+    vec3 v = p - uCamPos;
+    if (v.z <= 0.0) return vec4(0.0, 0.0, 2.0, 1.0);  // Detrás de la cámara: recortado
+    vec2 s = v.xy / v.z;
+    return vec4(s.x * 2.0 / uAspect, s.y * 2.0, 0.0, 1.0);
 }
+"""
+
+# Puntos (simulados en CPU): vel.xyz = color; el tamaño late con la banda del punto
+POINT_RENDER = PROJECT_GLSL + """
+uniform float uSize;
+uniform float uCount;
+uniform sampler1D iSpectrum;
 
-vec3 expandingPattern(float id, float t) {
-    vec3 base = hash33(id) * 2.0 - 1.0;
-    // Pulsación ultra lenta y suave
-    float pulse = sin(t * 0.4 + id * 0.5) * 0.5 + 0.5;
-    return normalize(base) * (0.8 + pulse * 0.6);
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    color = vel.xyz;
+    size = uSize * (1.0 + texture(iSpectrum, (float(gl_VertexID) + 0.5) / uCount).r * 0.5);
+    return project(pos.xyz);
 }
+"""
 
-// Función principal de posición de partícula
-vec3 getParticlePos(float id, float t) {
-    // Morphing entre diferentes patrones - MUY LENTO
-    // Audio casi no afecta la velocidad
-    float morphSpeed = 0.05 + iBass * 0.005;
-    float morphPhase = t * morphSpeed;
-    float structureType = mod(floor(morphPhase), 5.0);
-    float blend = fract(morphPhase);
-    blend = smoothstep(0.05, 0.95, blend); // Transición ultra gradual
-
-    vec3 pos1, pos2;
-
-    // Seleccionar estructuras según morphPhase
-    if(structureType < 1.0) {
-        pos1 = spherePattern(id, t);
-        pos2 = cubePattern(id, t);
-    } else if(structureType < 2.0) {
-        pos1 = cubePattern(id, t);
-        pos2 = torusPattern(id, t);
-    } else if(structureType < 3.0) {
-        pos1 = torusPattern(id, t);
-        pos2 = helixPattern(id, t);
-    } else if(structureType < 4.0) {
-        pos1 = helixPattern(id, t);
-        pos2 = expandingPattern(id, t);
-    } else {
-        pos1 = expandingPattern(id, t);
-        pos2 = spherePattern(id, t);
-    }
-
-    // Blend entre estructuras
-    vec3 pos = mix(pos1, pos2, blend);
-
-    // Expansión muy sutil controlada por volumen (sin volumen más juntas, con volumen más separadas)
-    float separation = 0.7 + iVolume * 0.15;
-    pos *= separation;
-
-    // Rotación global muy lenta - velocidad casi no afectada por volumen
-    float rotSpeed = 0.08 + iVolume * 0.03;
-    pos.xy *= rot(t * rotSpeed * 0.5);
-    pos.yz *= rot(t * rotSpeed * 0.4);
-
-    return pos;
+# Conexiones: posición + color por vértice
+LINE_VERTEX = """
+#version 330 core
+layout(location = 0) in vec3 aPos;
+layout(location = 1) in vec3 aColor;
+out vec3 vColor;
+""" + PROJECT_GLSL + """
+void main() {
+    vColor = aColor;
+    gl_Position = project(aPos);
 }
+"""
 
-// Dibujar partícula
-float drawParticle(vec2 uv, vec3 particlePos, vec3 camPos, mat3 camRot) {
-    vec3 worldPos = particlePos;
-    vec3 viewPos = camRot * (worldPos - camPos);
+LINE_FRAGMENT = """
+#version 330 core
+in vec3 vColor;
+out vec4 fragColor;
+void main() { fragColor = vec4(vColor, 1.0); }
+"""
 
-    if(viewPos.z > 0.0) {
-        vec2 screenPos = viewPos.xy / viewPos.z;
-        float dist = length(uv - screenPos);
 
-        // Tamaño con reactividad muy sutil
-        float size = 0.02 + iVolume * 0.01;
-        float particle = smoothstep(size, 0.0, dist);
+def hash33(ids):
+    """Port vectorizado del hash33 de GLSL"""
+    p3 = np.modf(ids[:, None] * np.array([0.1031, 0.1030, 0.0973]))[0]
+    p3 += np.sum(p3 * (p3[:, [1, 0, 2]] + 33.33), axis=1, keepdims=True)
+    return np.modf((p3[:, [0, 0, 1]] + p3[:, [1, 0, 0]]) * p3[:, [2, 1, 0]])[0]
 
-        // Glow muy reducido (menos neblina)
-        float glow = 0.008 / (dist + 0.015) * (0.15 + iVolume * 0.1);
 
-        return particle + glow * 0.3;
-    }
+def rotate(a, b, angle):
+    """Equivalente a p.ab *= rot(angle) del shader original"""
+    s, c = np.sin(angle), np.cos(angle)
+    return a * c + b * s, b * c - a * s
 
-    return 0.0;
-}
 
-// Conexiones entre partículas
-float drawConnection(vec2 uv, vec3 p1, vec3 p2, vec3 camPos, mat3 camRot) {
-    vec3 v1 = camRot * (p1 - camPos);
-    vec3 v2 = camRot * (p2 - camPos);
+# Diferentes estructuras geométricas (ids = 0..n-1)
+def sphere_pattern(ids, t):
+    # Espiral de Fibonacci: reparto uniforme para cualquier número de partículas
+    n = len(ids)
+    phi = np.arcsin(-1.0 + (2.0 * ids + 1.0) / n)
+    theta = ids * np.pi * (3.0 - np.sqrt(5.0))
+    return np.stack([np.cos(theta) * np.cos(phi), np.sin(phi), np.sin(theta) * np.cos(phi)], axis=1)
 
-    if(v1.z > 0.0 && v2.z > 0.0) {
-        vec2 s1 = v1.xy / v1.z;
-        vec2 s2 = v2.xy / v2.z;
 
-        // Distancia del punto a la línea
-        vec2 pa = uv - s1;
-        vec2 ba = s2 - s1;
-        float h = clamp(dot(pa, ba) / dot(ba, ba), 0.0, 1.0);
-        float dist = length(pa - ba * h);
+def cube_pattern(ids, t):
+    p = hash33(ids) * 2.0 - 1.0
+    norm = np.linalg.norm(p, axis=1, keepdims=True)
+    return p / norm * np.abs(p).sum(axis=1, keepdims=True) * 0.5
 
-        float thickness = 0.002 * (1.0 + iMid * 0.15);
-        return smoothstep(thickness, 0.0, dist) * 0.3;
-    }
 
-    return 0.0;
-}
+def torus_pattern(ids, t):
+    # Retículo áureo sobre el toro (R = 1, r = 0.5)
+    angle1 = ids * np.pi * 2.0 / len(ids)
+    angle2 = ids * np.pi * (3.0 - np.sqrt(5.0))
+    R, r = 1.0, 0.5
+    return np.stack([(R + r * np.cos(angle2)) * np.cos(angle1),
+                     r * np.sin(angle2),
+                     (R + r * np.cos(angle2)) * np.sin(angle1)], axis=1)
 
-void main() {
-    vec2 uv = (fragCoord - 0.5 * iResolution.xy) / iResolution.y;
-    vec3 col = vec3(0.0);
 
-    float t = iTime;
-
-    // Cámara
-    vec3 camPos = vec3(0.0, 0.0, -3.5);
-    mat3 camRot = mat3(1.0);
-
-    // Fondo negro puro
-    vec3 bgColor = vec3(0.0, 0.0, 0.0);
-    col = bgColor;
-
-    // Dibujar partículas y conexiones
-    for(float i = 0.0; i < NUM_PARTICLES; i++) {
-        vec3 pos = getParticlePos(i, t);
-
-        // Color de la partícula
-        float hue = i / NUM_PARTICLES + t * 0.1 + iBass * 0.1;
-        vec3 particleColor = 0.5 + 0.5 * cos(hue * 6.28 + vec3(0.0, 2.0, 4.0));
-
-        // Intensidad con volumen muy sutil y controlada (menos neblina)
-        particleColor *= (0.8 + iVolume * 0.3);
-
-        // Dibujar partícula
-        float p = drawParticle(uv, pos, camPos, camRot);
-        col += particleColor * p;
-
-        // Conexiones con partículas cercanas
-        if(iMid > 0.1) {
-            for(float j = i + 1.0; j < min(i + 8.0, NUM_PARTICLES); j++) {
-                vec3 pos2 = getParticlePos(j, t);
-                float dist = length(pos - pos2);
-
-                // Solo conectar si están cerca
-                if(dist < 1.5) {
-                    float conn = drawConnection(uv, pos, pos2, camPos, camRot);
-                    vec3 connColor = mix(particleColor,
-                                        0.5 + 0.5 * cos((j / NUM_PARTICLES + t * 0.1) * 6.28 + vec3(0.0, 2.0, 4.0)),
-                                        0.5);
-                    col += connColor * conn * (1.0 - dist / 1.5);
-                }
-            }
-        }
-    }
+def helix_pattern(ids, t):
+    # Rotación ultra lenta del helix
+    n = len(ids)
+    angle = ids * np.pi * 4.0 / n + t * 0.15
+    height = (ids / n - 0.5) * 3.0
+    return np.stack([np.cos(angle), height, np.sin(angle)], axis=1)
 
-    // Glow general casi eliminado (fondo más negro)
-    float centerGlow = 1.0 / (1.0 + length(uv) * 3.0);
-    col += vec3(0.05, 0.1, 0.15) * centerGlow * (0.01 + iVolume * 0.02);
 
-    // Tone mapping
-    col = col / (col + 1.0);
+def expanding_pattern(ids, t):
+    base = hash33(ids) * 2.0 - 1.0
+    # Pulsación ultra lenta y suave
+    pulse = np.sin(t * 0.4 + ids * 0.5) * 0.5 + 0.5
+    return base / np.linalg.norm(base, axis=1, keepdims=True) * (0.8 + pulse * 0.6)[:, None]
 
-    // Gamma
-    col = pow(col, vec3(0.4545));
 
-    // Vignette más suave (menos oscurecimiento en bordes)
-    float vignette = 1.0 - length(uv) * 0.3;
-    col *= vignette;
+STRUCTURES = (sphere_pattern, cube_pattern, torus_pattern, helix_pattern, expanding_pattern)
+
+
+def constellation(t, bass, volume, count=NUM_PARTICLES):
+    """Posiciones (count, 3) y colores (count, 3) de la constelación en el instante t"""
+    ids = np.arange(count, dtype=np.float64)
+
+    # Morphing entre diferentes patrones - MUY LENTO
+    morph_phase = t * (0.05 + bass * 0.005)
+    structure = int(np.floor(morph_phase)) % len(STRUCTURES)
+    blend = morph_phase - np.floor(morph_phase)
+    blend = np.clip((blend - 0.05) / 0.9, 0.0, 1.0)
+    blend = blend * blend * (3.0 - 2.0 * blend)  # smoothstep(0.05, 0.95, ·)
+
+    pos1 = STRUCTURES[structure](ids, t)
+    pos2 = STRUCTURES[(structure + 1) % len(STRUCTURES)](ids, t)
+    pos = pos1 + (pos2 - pos1) * blend
+
+    # Expansión muy sutil controlada por volumen
+    pos *= 0.7 + volume * 0.15
+
+    # Rotación global muy lenta
+    rot_speed = 0.08 + volume * 0.03
+    pos[:, 0], pos[:, 1] = rotate(pos[:, 0], pos[:, 1], t * rot_speed * 0.5)
+    pos[:, 1], pos[:, 2] = rotate(pos[:, 1], pos[:, 2], t * rot_speed * 0.4)
+
+    # Color de la partícula
+    hue = ids / count + t * 0.1 + bass * 0.1
+    color = 0.5 + 0.5 * np.cos(hue[:, None] * 6.28 + np.array([0.0, 2.0, 4.0]))
+    color *= 0.8 + volume * 0.3
+
+    return pos.astype(np.float32), color.astype(np.float32)
+
+
+def constellation_links(pos, color, radius, max_links=MAX_LINKS):
+    """Vértices GL_LINES (xyz, rgb) entre partículas a distancia < radius (rejilla uniforme)"""
+    if radius <= 0.0:
+        return np.zeros((0, 6), dtype=np.float32)
+    i, j, delta, dist2 = neighbor_pairs(pos, radius)
+    # Las más cortas primero si hay que recortar
+    if len(i) > max_links:
+        keep = np.argpartition(dist2, max_links)[:max_links]
+        i, j, dist2 = i[keep], j[keep], dist2[keep]
+    fade = ((1.0 - np.sqrt(dist2) / radius) * 0.3)[:, None]
+    mixed = (color[i] + color[j]) * 0.5
+    a = np.hstack((pos[i], (color[i] + mixed) * 0.5 * fade))
+    b = np.hstack((pos[j], (color[j] + mixed) * 0.5 * fade))
+    return np.ascontiguousarray(np.stack([a, b], axis=1).reshape(-1, 6), dtype=np.float32)
 
-    fragColor = vec4(col, 1.0);
-}
-"""
 
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
@@ -276,12 +244,34 @@ class ShaderVisualEngine:
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
-        self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
-        self.uni_bass = glGetUniformLocation(self.shader, 'iBass')
-        self.uni_mid = glGetUniformLocation(self.shader, 'iMid')
         self.uni_volume = glGetUniformLocation(self.shader, 'iVolume')
 
+        # Puntos de la constelación (calculados en CPU, dibujados como sprites)
+        self.points = ParticleSystem(NUM_PARTICLES, None, POINT_RENDER,
+                                     np.zeros((NUM_PARTICLES, FLOATS_PER_PARTICLE), dtype=np.float32))
+        self.point_state = np.zeros((NUM_PARTICLES, FLOATS_PER_PARTICLE), dtype=np.float32)
+        self.point_state[:, 3] = 1.0
+        self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING, smoothing=0.3)
+        glUseProgram(self.points.render_shader)
+        glUniform1i(glGetUniformLocation(self.points.render_shader, 'iSpectrum'), 0)
+
+        # Conexiones: buffer dinámico de tamaño máximo (xyz + rgb por vértice)
+        lvs = shaders.compileShader(LINE_VERTEX, GL_VERTEX_SHADER)
+        lfs = shaders.compileShader(LINE_FRAGMENT, GL_FRAGMENT_SHADER)
+        self.line_shader = shaders.compileProgram(lvs, lfs)
+        self.line_cam = glGetUniformLocation(self.line_shader, 'uCamPos')
+        self.line_aspect = glGetUniformLocation(self.line_shader, 'uAspect')
+        self.line_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.line_vao)
+        self.line_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.line_vbo)
+        glBufferData(GL_ARRAY_BUFFER, MAX_LINKS * 2 * 6 * 4, None, GL_DYNAMIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(12))
+
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
         ffs = shaders.compileShader(FRANJA_FRAGMENT, GL_FRAGMENT_SHADER)
@@ -350,6 +340,9 @@ class ShaderVisualEngine:
         # Suavizado muy gradual de medios
         self.mid_smoothed += (mid - self.mid_smoothed) * 0.1
 
+        # Espectro completo para los puntos
+        self.spectrum.update(fft / SAMPLES * 10.0)
+
     def calculate_viewport(self, w, h):
         a = w / h
         if a > self.target_aspect:
@@ -380,17 +373,44 @@ class ShaderVisualEngine:
             glViewport(vx + vw, 0, w - (vx + vw), h)
             glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
+        # Constelación del frame: puntos + vecinos (rejilla uniforme)
+        t = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        pos, color = constellation(t, self.bass_smoothed, self.vol_smoothed)
+        self.point_state[:, 0:3] = pos
+        self.point_state[:, 4:7] = color
+        self.points.upload(self.point_state)
+
+        # Medios: distancia de conexión (sin conexiones por debajo de 0.1, como antes)
+        mid = self.mid_smoothed
+        link_radius = LINK_RADIUS * min(mid, 1.0) if mid > 0.1 else 0.0
+        lines = constellation_links(pos, color, link_radius)
+
+        # Dibujar fondo
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
-        glUniform1f(self.uni_bass, self.bass_smoothed)
-        glUniform1f(self.uni_mid, self.mid_smoothed)
         glUniform1f(self.uni_volume, self.vol_smoothed)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Conexiones (aditivas)
+        if len(lines):
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_ONE, GL_ONE)
+            glUseProgram(self.line_shader)
+            glUniform3f(self.line_cam, *CAM_POS)
+            glUniform1f(self.line_aspect, vw / vh)
+            glBindBuffer(GL_ARRAY_BUFFER, self.line_vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, lines.nbytes, lines)
+            glBindVertexArray(self.line_vao)
+            glDrawArrays(GL_LINES, 0, len(lines))
+            glDisable(GL_BLEND)
+
+        # Partículas (tamaño con reactividad muy sutil + su banda del espectro)
+        self.spectrum.bind(0)
+        self.points.draw(uCamPos=tuple(CAM_POS), uAspect=vw / vh, uCount=NUM_PARTICLES,
+                         uSize=(10.0 + self.vol_smoothed * 5.0) * vh / 900.0)
+
         pygame.display.flip()
 
     def run(self):
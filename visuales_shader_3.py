@@ -3,6 +3,8 @@
 Preset 3: Menger Sponge - Fractal Cube Evolution
 Category: Fractal/SDF Advanced
 OPTIMIZADO: Raymarching 100→60, centrado, franjas con líneas
+OPTIMIZADO: Pasos lejanos con la esponja horneada en un volumen 128^3 (sdfvolume.py)
+OPTIMIZADO: Caja envolvente (raybounds.py): el fondo no marcha (B = debug)
 """
 
 from __future__ import division
@@ -12,27 +14,14 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from sdfvolume import SDFVolume, SAMPLE_GLSL
+from raybounds import RayBounds, BOUNDS_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+SDF_BOUNDS = 1.1    # La esponja ocupa [-1, 1]^3 antes de escalar con Tom1
+CAPTION = 'Preset 3: Menger Sponge [9:16]'
 
-VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
-
-FRAGMENT_SHADER = """
-#version 330 core
-#define fragCoord gl_FragCoord.xy
-uniform float iTime;
-uniform vec2  iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
-out vec4 fragColor;
-
-float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
-
-float noise(vec2 p) {
-    vec2 i = floor(p), f = fract(p);
-    f = f * f * (3.0 - 2.0 * f);
-    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
-}
-
+MENGER_GLSL = """
 // Menger Sponge SDF
 float sdBox(vec3 p, vec3 b) {
     vec3 q = abs(p) - b;
@@ -59,16 +48,58 @@ float mengerSponge(vec3 p, int iterations) {
     }
     return d;
 }
+"""
+
+# Función horneada: la esponja sin escala ni glitch, solo con sus iteraciones
+SDF_GLSL = MENGER_GLSL + """
+uniform int uIterations;
+float sdf(vec3 p) { return mengerSponge(p, uIterations); }
+"""
+
+VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
+
+FRAGMENT_SHADER = """
+#version 330 core
+#define fragCoord gl_FragCoord.xy
+uniform float iTime;
+uniform vec2  iResolution;
+uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+out vec4 fragColor;
+
+float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
+
+float noise(vec2 p) {
+    vec2 i = floor(p), f = fract(p);
+    f = f * f * (3.0 - 2.0 * f);
+    return mix(mix(hash(i), hash(i + vec2(1,0)), f.x), mix(hash(i + vec2(0,1)), hash(i + vec2(1,1)), f.x), f.y);
+}
+
+""" + MENGER_GLSL + SAMPLE_GLSL + BOUNDS_GLSL + """
+vec3 warp(vec3 p) {
+    if (iHatGlitch > 0.1) {
+        p.xy += vec2(noise(p.xy * 5.0 + iTime) - 0.5, noise(p.xy * 5.0 + iTime + 10.0) - 0.5) * iHatGlitch * 0.3;
+    }
+    return p;
+}
 
 float map(vec3 p) {
     // OPTIMIZADO: Iterations 2 + kick*2 (era 3)
     int iterations = 2 + int(iKickPulse * 2.0);
     float scale = 0.8 + iTom1Morph * 0.6;
+    return mengerSponge(warp(p) / scale, iterations) * scale;
+}
 
-    if (iHatGlitch > 0.1) {
-        p.xy += vec2(noise(p.xy * 5.0 + iTime) - 0.5, noise(p.xy * 5.0 + iTime + 10.0) - 0.5) * iHatGlitch * 0.3;
+// Pasos lejanos con el volumen horneado; DE exacto solo cerca de la superficie.
+// Ya cerca se sigue con el DE exacto hasta alejarse de nuevo (sin pagar los dos)
+float mapFar(vec3 p, inout bool far) {
+    float scale = 0.8 + iTom1Morph * 0.6;
+    if (far && uSDFReady == 1) {
+        float d = sdfVolume(warp(p) / scale);
+        if (d > 2.0 * uSDFMargin) return d * scale;
     }
-    return mengerSponge(p / scale, iterations) * scale;
+    float d = map(p);
+    far = d > 4.0 * uSDFMargin * scale;
+    return d;
 }
 
 vec3 calcNormal(vec3 p) {
@@ -77,14 +108,16 @@ vec3 calcNormal(vec3 p) {
     return normalize(vec3(map(p + e.xyy) - map(p - e.xyy), map(p + e.yxy) - map(p - e.yxy), map(p + e.yyx) - map(p - e.yyx)));
 }
 
-// OPTIMIZADO: 100→60 iterations
-float raymarch(vec3 ro, vec3 rd) {
-    float t = 0.0;
+// OPTIMIZADO: 100→60 iterations, solo dentro de la caja envolvente
+float raymarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float t = tNear;
+    float tMax = min(tFar, 20.0);
+    bool far = true;
     for(int i = 0; i < 60; i++) {
-        float d = map(ro + rd * t);
+        float d = mapFar(ro + rd * t, far);
         if(d < 0.0005) break;
         t += d * 0.5;
-        if(t > 20.0) break;
+        if(t > tMax) return 20.0;
     }
     return t;
 }
@@ -114,7 +147,11 @@ void main() {
     rd.xz = rot * rd.xz;
     ro.xz = rot * ro.xz;
 
-    float t = raymarch(ro, rd);
+    // Sin cortar la caja envolvente no hay nada que marchar
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+    float t = hit ? raymarch(ro, rd, tNear, tFar) : 20.0;
     vec3 color = vec3(0.0);
 
     if (t < 20.0) {
@@ -129,7 +166,7 @@ void main() {
     color *= 1.0 - 0.4 * length(uv - 0.5);
     color = color / (color + 1.0);
     color = pow(color, vec3(0.4545));
-    fragColor = vec4(color, 1.0);
+    fragColor = vec4(boundsDebugTint(color, !hit), 1.0);
 }
 """
 
@@ -152,7 +189,7 @@ class ShaderVisualEngine:
         self.target_aspect = self.target_width / self.target_height
         pygame.display.gl_set_attribute(pygame.GL_SWAP_CONTROL, 1)
         self.screen = pygame.display.set_mode((int(900 * self.target_aspect), 900), DOUBLEBUF | OPENGL | RESIZABLE)
-        pygame.display.set_caption('Preset 3: Menger Sponge [9:16]')
+        pygame.display.set_caption(CAPTION)
 
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
@@ -163,6 +200,14 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_sdf_ready = glGetUniformLocation(self.shader, 'uSDFReady')
+
+        # Volumen SDF de la esponja (se rehornea al cambiar las iteraciones)
+        self.sdf_volume = SDFVolume(SDF_GLSL, SDF_BOUNDS)
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'uSDFVolume'), 0)
+        self.sdf_volume.set_uniforms(self.shader)
+        self.bounds = RayBounds(self.shader)
 
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
         ffs = shaders.compileShader(FRANJA_FRAGMENT, GL_FRAGMENT_SHADER)
@@ -237,6 +282,9 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Mismas iteraciones que map() en el shader
+        sdf_ready = self.sdf_volume.update({'uIterations': 2 + int(self.kick_pulse * 2.0)})
+
         glViewport(vx, vy, vw, vh)
         # Dibujar shader principal
         glUseProgram(self.shader)
@@ -246,8 +294,19 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_hat, self.hat_glitch)
         glUniform1f(self.uni_tom1, self.tom1_morph)
         glUniform1f(self.uni_tom2, self.tom2_spin)
+        glUniform1i(self.uni_sdf_ready, int(sdf_ready))  # Volumen de otros parámetros: solo DE exacto
+        self.sdf_volume.bind(0)
+
+        # Caja envolvente: la esponja escalada (Tom1) + el desplazamiento xy del hat
+        scale = 0.8 + self.tom1_morph * 0.6
+        warp = self.hat_glitch * 0.15 if self.hat_glitch > 0.1 else 0.0
+        self.bounds.box((scale + warp + 0.01, scale + warp + 0.01, scale + 0.01))
+        self.bounds.apply()
+
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), vw * vh)
+        if self.bounds.debug:
+            pygame.display.set_caption(CAPTION + self.bounds.label())
         pygame.display.flip()
 
     def run(self):
@@ -261,6 +320,9 @@ class ShaderVisualEngine:
                     elif event.key == K_h: self.hat_glitch = min(1.0, self.hat_glitch + 0.8)
                     elif event.key == K_t: self.tom1_morph = min(1.0, self.tom1_morph + 0.6)
                     elif event.key == K_y: self.tom2_spin = min(1.0, self.tom2_spin + 0.7)
+                    elif event.key == K_b:
+                        self.bounds.debug = not self.bounds.debug
+                        pygame.display.set_caption(CAPTION)
             self.process_midi(); self.update_params(); self.render(); self.clock.tick(60)
         if self.midi_input: self.midi_input.close()
         pygame.quit()
@@ -10,7 +10,8 @@ Características:
 - MIDI Kick: Cambios aleatorios de forma (4 formas diferentes)
 - Frecuencias altas: Glitch VHS, RGB split, distorsión
 - Colores vibrantes y ciclos suaves
-- Audio reactivo sutil
+- Audio reactivo sutil: cada partícula crece con su propia banda del espectro
+  completo (SpectrumTexture de audio_textures.py, escala log)
 - Optimizado para rendimiento
 """
 
@@ -23,8 +24,11 @@ from OpenGL.GL import shaders
 import mido
 import numpy as np
 from numpy import array
+from audio_textures import SpectrumTexture
 
 SAMPLES = 1024
+FFT_SIZE = 256          # Texels de la textura de espectro
+FFT_MAPPING = 'log'     # Partícula i -> banda i / NUM_PARTICLES (graves primero)
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
 
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
@@ -40,6 +44,7 @@ uniform float iVolume;
 uniform float iKick;
 uniform float iHiFreq;  // Frecuencias altas para glitch
 uniform float iFormMode;  // Modo de forma actual (0-3)
+uniform sampler1D iSpectrum;  // Espectro completo (log)
 out vec4 fragColor;
 
 #define PI 3.14159265359
@@ -113,6 +118,7 @@ float drawParticle(vec2 uv, vec2 particlePos, float id) {
     float dist = length(uv - particlePos);
     float size = 0.012 + hash(id + 50.0) * 0.008;
     size += iVolume * 0.006;
+    size += texture(iSpectrum, id / NUM_PARTICLES).r * 0.01;  // Su banda del espectro
 
     float particle = smoothstep(size, 0.0, dist);
     float glowSize = size * 2.5;
@@ -286,6 +292,7 @@ class ShaderVisualEngine:
         self.uni_kick = glGetUniformLocation(self.shader, 'iKick')
         self.uni_hifreq = glGetUniformLocation(self.shader, 'iHiFreq')
         self.uni_formmode = glGetUniformLocation(self.shader, 'iFormMode')
+        self.uni_spectrum = glGetUniformLocation(self.shader, 'iSpectrum')
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -319,6 +326,7 @@ class ShaderVisualEngine:
         self.mid_smoothed = 0.0
         self.vol_smoothed = 0.0
         self.hifreq_smoothed = 0.0
+        self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING, smoothing=0.3)
 
         # MIDI
         self.kick_pulse = 0.0
@@ -390,6 +398,9 @@ class ShaderVisualEngine:
         hifreq = np.mean(fft[50:150]) * 0.8
         self.hifreq_smoothed += (hifreq - self.hifreq_smoothed) * 0.15
 
+        # Espectro completo para el shader
+        self.spectrum.update(fft / SAMPLES * 10.0)
+
     def update_params(self):
         # Decay del kick
         self.kick_pulse += (self.kick_target - self.kick_pulse) * 0.2
@@ -437,6 +448,8 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_kick, self.kick_pulse)
         glUniform1f(self.uni_hifreq, self.hifreq_smoothed)
         glUniform1f(self.uni_formmode, self.form_mode)
+        self.spectrum.bind(0)
+        glUniform1i(self.uni_spectrum, 0)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
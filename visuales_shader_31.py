@@ -10,7 +10,11 @@ Características:
 - 3 osciloscopios independientes (bajos, medios, altos)
 - Cada uno con su propio color (verde, cyan, magenta)
 - Patrones Lissajous suaves y fluidos
-- Estela CRT clásica con persistencia
+- Estela CRT clásica con persistencia (ring buffer en GPU, un multi-draw por banda)
+- Generación Lissajous vectorizada de las 3 bandas sin arrays temporales por frame
+  (~200 B/frame de floats de Python, antes ~50 KB; ver bench_lissajous.py)
+- Modo 'gpu': síntesis de los puntos en el vertex shader (un draw instanciado)
+- Persistencia de fósforo opcional con FBO de feedback (PERSISTENCE_MODE = 'phosphor')
 - Todos parten desde el centro
 - Reactivo a frecuencias y dBs
 """
@@ -22,21 +26,57 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
-import collections
+import math
+from audio_textures import SpectrogramRing
+from feedback import PhosphorPersistence
 
 # Configuración
 SAMPLES = 2048  # Buffer más grande para mejor resolución de frecuencias
 HISTORY_LENGTH = 100  # Cuadros de estela (1.5-2 segundos a 60fps)
 LINE_WIDTH = 2.5
 DRAW_SAMPLES = 768  # Puntos por osciloscopio (mayor definición)
+BANDS = 3  # low, mid, high (un slot del ring buffer = BANDS * DRAW_SAMPLES puntos)
+TRAIL_SPARE_SLOTS = 2  # Slots del VBO mapeado fuera de la estela: la GPU aún puede estar leyéndolos
+SYNTH_MODE = 'gpu'  # 'cpu' (LissajousBatch + VBO) o 'gpu' (síntesis en el vertex shader)
+
+# Persistencia: 'history' redibuja HISTORY_LENGTH estelas; 'phosphor' acumula en un FBO
+# de feedback con decaimiento y dibuja solo la traza nueva (geometría O(1) por frame)
+PERSISTENCE_MODE = 'history'
+PHOSPHOR_DECAY = 0.93         # Factor por frame (≈ mismo brillo acumulado que 100 estelas)
+PHOSPHOR_BLUR = 0.0           # 0..1, difuminado del fósforo
+PHOSPHOR_OFFSET = (0.0, 0.0)  # Deriva de la estela por frame (UV)
 
 VERTEX_SHADER = """
 #version 330 core
 layout(location = 0) in vec2 position;
 uniform float uScale;
-uniform vec2 uOffset;
+
+// Ring buffer de estelas: slot = gl_VertexID / uSlotStride
+uniform int uSlotStride;    // BANDS * DRAW_SAMPLES
+uniform int uHistory;       // Slots del ring buffer (HISTORY_LENGTH + TRAIL_SPARE_SLOTS)
+uniform int uHead;          // Slot más reciente
+uniform int uFilled;        // Slots con datos válidos
+
+// Órbita (solo medios): radio 0.0 = fijo en el centro
+uniform float uOrbitRadius;
+uniform float uOrbitAngle;  // t * orbit_speed
+
+out float vFade;
+
 void main() {
-    vec2 pos = position * uScale + uOffset;
+    int slot = gl_VertexID / uSlotStride;
+    int age = (uHead - slot + uHistory) % uHistory;
+    float progress = float(uFilled - age) / float(uFilled);
+
+    // Fade cúbico para desvanecimiento más suave
+    vFade = progress * progress * progress;
+
+    // Ángulo de órbita progresivo según la posición en el historial
+    float i = float(uFilled - 1 - age);
+    float angle = uOrbitAngle + (i / float(uFilled)) * 6.28;
+    vec2 offset = vec2(cos(angle), sin(angle)) * uOrbitRadius;
+
+    vec2 pos = position * uScale + offset;
     gl_Position = vec4(pos, 0.0, 1.0);
 }
 """
@@ -44,12 +84,306 @@ void main() {
 FRAGMENT_SHADER = """
 #version 330 core
 out vec4 fragColor;
+in float vFade;
 uniform vec4 uColor;
 void main() {
-    fragColor = uColor;
+    fragColor = uColor * vFade;
+}
+"""
+
+# Modo 'gpu': solo se sube el bloque de audio (una fila por frame) y los parámetros por estela.
+# Cada punto se reconstruye en el vertex shader desde gl_VertexID / gl_InstanceID
+# (instancia = edad * BANDS + banda), todas las estelas en un solo draw instanciado.
+GPU_VERTEX_SHADER = """
+#version 330 core
+#define PI 3.14159265359
+#define TAU 6.28318530718
+#define HISTORY_LENGTH {HISTORY_LENGTH}
+
+uniform sampler2D uSamples;                     // DRAW_SAMPLES x HISTORY_LENGTH (fila = slot)
+uniform vec4 uTrailParams[HISTORY_LENGTH];      // (energía low, mid, high, longitud de estela)
+uniform int uPoints;                            // DRAW_SAMPLES
+uniform int uHead;
+uniform int uFilled;
+uniform vec3 uBandEnergy;                       // Energías actuales (brillo y órbita)
+uniform vec3 uBandIntensity;
+uniform vec3 uBandColor[3];
+uniform float uTime;
+uniform int uPointMode;                         // 1 = punto brillante final
+
+out vec4 vColor;
+
+// Parámetros por banda (mismos valores que LissajousBatch)
+const vec3 BASE_SPEED = vec3(0.008, 0.01, 0.012);
+const vec3 DRIFT_X_K = vec3(0.3, 0.35, 0.4);
+const vec3 DRIFT_X_A = vec3(0.12, 0.15, 0.1);
+const vec3 DRIFT_Y_K = vec3(0.25, 0.28, 0.32);
+const vec3 DRIFT_Y_A = vec3(0.1, 0.12, 0.08);
+const vec3 FREQ_X0 = vec3(0.8, 1.5, 2.2);
+const vec3 FREQ_XK = vec3(0.2, 0.8, 0.4);
+const vec3 FREQ_Y0 = vec3(0.8, 0.9, 1.6);
+const vec3 FREQ_YK = vec3(0.15, 0.6, 0.3);
+const vec3 AMP0 = vec3(1.3, 0.85, 1.0);
+const vec3 AMPK = vec3(0.5, 0.5, 0.7);
+const vec3 SHIFT_X = vec3(PI * 0.5, 0.0, 0.0);
+const vec3 SHIFT_Y = vec3(0.0, PI * 0.5, PI * 0.5);
+const vec3 NOISE_XF = vec3(7.3, 8.1, 9.7);
+const vec3 NOISE_XK = vec3(0.8, 1.0, 1.1);
+const vec3 NOISE_YF = vec3(6.7, 7.9, 8.3);
+const vec3 NOISE_YK = vec3(0.7, 0.9, 0.95);
+const vec3 NOISE_A = vec3(0.02, 0.015, 0.01);
+const vec3 NOISE_B = vec3(0.3, 0.4, 0.5);
+const vec3 NOISE_C = vec3(0.4, 0.3, 0.3);
+
+// Punto j de la banda sin suavizar (0 fuera de rango, como np.convolve mode='same')
+vec2 rawPoint(int j, int slot, int band, float e, float phase) {
+    if (j < 0 || j >= uPoints) return vec2(0.0);
+
+    float s = texelFetch(uSamples, ivec2(j, slot), 0).r;
+    float t = float(j) / float(uPoints - 1) * TAU;
+
+    float fx = FREQ_X0[band] + e * FREQ_XK[band] + sin(phase * DRIFT_X_K[band]) * DRIFT_X_A[band];
+    float fy = FREQ_Y0[band] + e * FREQ_YK[band] + cos(phase * DRIFT_Y_K[band]) * DRIFT_Y_A[band];
+
+    // Metamorfosis (solo medios)
+    float morph = (band == 1) ? e * 0.5 + sin(phase * 0.2) * 0.15 : 0.0;
+
+    vec2 p;
+    p.x = sin(t * fx + phase + SHIFT_X[band]) * (1.0 - morph) + sin(t * fx * 1.5 + phase) * morph;
+    p.y = sin(t * fy + phase + SHIFT_Y[band]) * (1.0 - morph) + sin(t * fy * 1.3 + phase * 1.5) * morph;
+    p *= s * (AMP0[band] + e * AMPK[band]);
+
+    // Ruido orgánico sutil
+    float namp = NOISE_A[band] * (NOISE_B[band] + e * NOISE_C[band]);
+    p.x += sin(t * NOISE_XF[band] + phase * NOISE_XK[band]) * namp;
+    p.y += cos(t * NOISE_YF[band] + phase * NOISE_YK[band]) * namp;
+    return p;
+}
+
+void main() {
+    int age = gl_InstanceID / 3;
+    int band = gl_InstanceID - age * 3;
+    int slot = (uHead - age + HISTORY_LENGTH) % HISTORY_LENGTH;
+
+    vec4 params = uTrailParams[slot];
+    float e = params[band];
+    float phase = params.w * (BASE_SPEED[band] + e * BASE_SPEED[band]);
+
+    // Media móvil de 5 puntos + clip
+    vec2 pos = vec2(0.0);
+    for (int k = -2; k <= 2; k++) {
+        pos += rawPoint(gl_VertexID + k, slot, band, e, phase);
+    }
+    pos = clamp(pos / 5.0, -1.0, 1.0);
+
+    float energy = uBandEnergy[band];
+    vec3 color = uBandColor[band];
+
+    // Órbita de los medios alrededor del centro
+    if (band == 1) {
+        float i = float(uFilled - 1 - age);
+        float angle = uTime * (0.08 + energy * 0.08) + (i / float(uFilled)) * 6.28;
+        pos += vec2(cos(angle), sin(angle)) * (0.28 + energy * 0.3);
+    }
+
+    if (uPointMode == 1) {
+        vColor = vec4(color * 1.2, 0.9);
+        gl_PointSize = 5.0 + energy * 6.0;
+    } else {
+        float progress = float(uFilled - age) / float(uFilled);
+        float fade = progress * progress * progress;
+        float alpha = (0.4 + energy * 0.4) * uBandIntensity[band];
+        vColor = vec4(color * alpha, alpha) * fade;
+    }
+
+    gl_Position = vec4(pos, 0.0, 1.0);
+}
+""".replace('{HISTORY_LENGTH}', str(HISTORY_LENGTH))
+
+GPU_FRAGMENT_SHADER = """
+#version 330 core
+in vec4 vColor;
+out vec4 fragColor;
+void main() {
+    fragColor = vColor;
 }
 """
 
+# Colores clásicos de osciloscopio e intensidad por banda
+BAND_COLORS = (
+    (0.2, 1.0, 0.3),    # Verde clásico (bajos)
+    (0.2, 0.8, 1.0),    # Cyan (medios)
+    (1.0, 0.3, 0.8),    # Magenta (altos)
+)
+BAND_INTENSITY = (0.4, 1.0, 1.0)  # Bajos con intensidad reducida
+
+
+class LissajousBatch:
+    """
+    Generador Lissajous de las tres bandas en una sola pasada vectorizada (BANDS, DRAW_SAMPLES).
+    Workspaces preasignados, tablas de fase cacheadas y ufuncs in-place: ningún array temporal
+    por frame; solo quedan ~200 B/frame de floats de Python en set_params (antes ~50 KB).
+    Escribe directamente en el destino (p.ej. el slot mapeado del VBO) con forma (BANDS, n, 2).
+    """
+
+    # Parámetros por banda: low, mid, high
+    BASE_SPEED = (0.008, 0.01, 0.012)
+    DRIFT_X = ((0.3, 0.12), (0.35, 0.15), (0.4, 0.1))     # sin(phase * k) * a
+    DRIFT_Y = ((0.25, 0.1), (0.28, 0.12), (0.32, 0.08))   # cos(phase * k) * a
+    FREQ_X = ((0.8, 0.2), (1.5, 0.8), (2.2, 0.4))         # base + energy * k
+    FREQ_Y = ((0.8, 0.15), (0.9, 0.6), (1.6, 0.3))
+    AMP = ((1.3, 0.5), (0.85, 0.5), (1.0, 0.7))
+    SHIFT_X = (math.pi / 2, 0.0, 0.0)                     # cos(a) = sin(a + pi/2)
+    SHIFT_Y = (0.0, math.pi / 2, math.pi / 2)
+    NOISE_X = ((7.3, 0.8), (8.1, 1.0), (9.7, 1.1))        # sin(t * f + phase * k)
+    NOISE_Y = ((6.7, 0.7), (7.9, 0.9), (8.3, 0.95))       # cos(t * f + phase * k)
+    NOISE_AMP = ((0.02, 0.3, 0.4), (0.015, 0.4, 0.3), (0.01, 0.5, 0.3))
+    SMOOTH_WINDOW = 5
+
+    def __init__(self, n=DRAW_SAMPLES):
+        self.n = n
+        t = np.linspace(0, 2 * np.pi, n)
+
+        # Tablas de fase cacheadas (constantes), ya expandidas a (BANDS, n)
+        self.t = np.tile(t, (BANDS, 1))
+        self.noise_tx = t * np.array([f for f, _ in self.NOISE_X])[:, None]
+        self.noise_ty = t * np.array([f for f, _ in self.NOISE_Y])[:, None]
+
+        # Parámetros por frame como planos completos (BANDS, n): las ufuncs in-place
+        # con broadcasting reservan buffers internos, con operandos de igual forma no
+        self.fx = np.zeros((BANDS, n))
+        self.fy = np.zeros((BANDS, n))
+        self.phx = np.zeros((BANDS, n))
+        self.phy = np.zeros((BANDS, n))
+        self.keep = np.ones((BANDS, n))   # 1 - morph
+        self.amp = np.zeros((BANDS, n))
+        self.nphx = np.zeros((BANDS, n))
+        self.nphy = np.zeros((BANDS, n))
+        self.namp = np.zeros((BANDS, n))
+        self.samples = np.zeros((BANDS, n))
+
+        # Workspaces
+        self.x = np.zeros((BANDS, n))
+        self.y = np.zeros((BANDS, n))
+        self.tmp = np.zeros((BANDS, n))
+        self.morph = np.zeros(n)
+        self.mid_morph = 0.0
+        self.mid_phase = 0.0
+        self.mid_fx = 0.0
+        self.mid_fy = 0.0
+        half = self.SMOOTH_WINDOW // 2
+        self.pad = np.zeros(n + 2 * half)
+
+        # Vistas cacheadas (crear vistas también asigna objetos)
+        self.rows = [
+            (self.fx[b], self.fy[b], self.phx[b], self.phy[b], self.keep[b],
+             self.amp[b], self.nphx[b], self.nphy[b], self.namp[b], self.samples[b])
+            for b in range(BANDS)
+        ]
+        self.t_row = t
+        self.x_mid = self.x[1]
+        self.y_mid = self.y[1]
+        # Ventanas 1D contiguas (sumar vistas 2D no contiguas también reserva buffers)
+        self.pad_inner = self.pad[half:half + n]
+        self.pad_windows = [self.pad[k:k + n] for k in range(self.SMOOTH_WINDOW)]
+        self.x_rows = [self.x[b] for b in range(BANDS)]
+        self.y_rows = [self.y[b] for b in range(BANDS)]
+
+    def set_params(self, samples, energies, trail_len):
+        """Rellena los planos de parámetros por banda (floats de Python, sin arrays temporales)"""
+        for b in range(BANDS):
+            fx, fy, phx, phy, keep, amp, nphx, nphy, namp, smp = self.rows[b]
+            e = energies[b]
+            phase = trail_len * (self.BASE_SPEED[b] + e * self.BASE_SPEED[b])
+
+            drift_x = math.sin(phase * self.DRIFT_X[b][0]) * self.DRIFT_X[b][1]
+            drift_y = math.cos(phase * self.DRIFT_Y[b][0]) * self.DRIFT_Y[b][1]
+            freq_x = self.FREQ_X[b][0] + e * self.FREQ_X[b][1] + drift_x
+            freq_y = self.FREQ_Y[b][0] + e * self.FREQ_Y[b][1] + drift_y
+            fx.fill(freq_x)
+            fy.fill(freq_y)
+            phx.fill(phase + self.SHIFT_X[b])
+            phy.fill(phase + self.SHIFT_Y[b])
+            amp.fill(self.AMP[b][0] + e * self.AMP[b][1])
+
+            nphx.fill(phase * self.NOISE_X[b][1])
+            nphy.fill(phase * self.NOISE_Y[b][1])
+            na = self.NOISE_AMP[b]
+            namp.fill(na[0] * (na[1] + e * na[2]))
+            np.copyto(smp, samples)
+
+            if b == 1:
+                # Medios: factor de metamorfosis (figura 8 -> patrón complejo)
+                self.mid_morph = e * 0.5 + math.sin(phase * 0.2) * 0.15
+                self.mid_phase = phase
+                self.mid_fx = freq_x
+                self.mid_fy = freq_y
+                keep.fill(1.0 - self.mid_morph)
+
+    def generate(self, samples, energies, trail_len, out):
+        """Calcula las tres bandas y las escribe en `out` (BANDS, n, 2)"""
+        self.set_params(samples, energies, trail_len)
+        x, y, tmp, m = self.x, self.y, self.tmp, self.morph
+
+        # Término principal: sin(t * f + phase) * (1 - morph)
+        np.multiply(self.t, self.fx, out=x)
+        x += self.phx
+        np.sin(x, out=x)
+        x *= self.keep
+        np.multiply(self.t, self.fy, out=y)
+        y += self.phy
+        np.sin(y, out=y)
+        y *= self.keep
+
+        # Metamorfosis (solo medios)
+        np.multiply(self.t_row, self.mid_fx * 1.5, out=m)
+        m += self.mid_phase
+        np.sin(m, out=m)
+        m *= self.mid_morph
+        self.x_mid += m
+        np.multiply(self.t_row, self.mid_fy * 1.3, out=m)
+        m += self.mid_phase * 1.5
+        np.sin(m, out=m)
+        m *= self.mid_morph
+        self.y_mid += m
+
+        x *= self.amp
+        x *= self.samples
+        y *= self.amp
+        y *= self.samples
+
+        # Ruido orgánico sutil (imperfecciones naturales)
+        np.add(self.noise_tx, self.nphx, out=tmp)
+        np.sin(tmp, out=tmp)
+        tmp *= self.namp
+        x += tmp
+        np.add(self.noise_ty, self.nphy, out=tmp)
+        np.cos(tmp, out=tmp)
+        tmp *= self.namp
+        y += tmp
+
+        # Suavizado (media móvil) y clip para evitar overflow
+        for b in range(BANDS):
+            self._smooth(self.x_rows[b])
+            self._smooth(self.y_rows[b])
+        np.minimum(x, 1.0, out=x)
+        np.maximum(x, -1.0, out=x)
+        np.minimum(y, 1.0, out=y)
+        np.maximum(y, -1.0, out=y)
+
+        np.copyto(out[:, :, 0], x, casting='same_kind')
+        np.copyto(out[:, :, 1], y, casting='same_kind')
+        return out
+
+    def _smooth(self, a):
+        """Media móvil (equivale a np.convolve(..., mode='same') con ventana SMOOTH_WINDOW)"""
+        np.copyto(self.pad_inner, a)
+        np.copyto(a, self.pad_windows[0])
+        for window in self.pad_windows[1:]:
+            a += window
+        a *= 1.0 / self.SMOOTH_WINDOW
+
+
 class ShaderVisualEngine:
     def __init__(self):
         pygame.init()
@@ -75,10 +409,10 @@ class ShaderVisualEngine:
         # Audio & Data
         self.audio_buffer = np.zeros(SAMPLES, dtype=np.float32)
 
-        # Tres historiales independientes (uno por osciloscopio)
-        self.trail_low = collections.deque(maxlen=HISTORY_LENGTH)
-        self.trail_mid = collections.deque(maxlen=HISTORY_LENGTH)
-        self.trail_high = collections.deque(maxlen=HISTORY_LENGTH)
+        # Historial de las tres bandas en un ring buffer en GPU (slot = frame)
+        self.lissajous = LissajousBatch(DRAW_SAMPLES)
+        self.trail_head = HISTORY_LENGTH - 1
+        self.trail_filled = 0
 
         # Análisis de frecuencias
         self.low_energy = 0.0
@@ -147,222 +481,264 @@ class ShaderVisualEngine:
         high = np.mean(fft_normalized[96:381]) * 20.0
         self.high_energy += (high - self.high_energy) * 0.08
 
-    def create_lissajous_pattern(self, band_type):
-        """
-        Crea patrones de Lissajous diferentes según la banda de frecuencia
-        Todos parten del centro (0, 0)
-        Con variaciones orgánicas para aspecto más natural
-        """
-        # Downsampling para mejor rendimiento
-        step = len(self.audio_buffer) // DRAW_SAMPLES
-        samples = self.audio_buffer[::step][:DRAW_SAMPLES]
-
-        t = np.linspace(0, 2 * np.pi, len(samples))
-
-        if band_type == 'low':
-            # Bajos: Patrón circular con modulación muy lenta y orgánica
-            # Más lento, se acelera con energía
-            base_speed = 0.008
-            energy_speed = self.low_energy * 0.008
-            phase_offset = len(self.trail_low) * (base_speed + energy_speed)
-
-            # Variación orgánica lenta en las frecuencias (respiración natural)
-            organic_drift_x = np.sin(phase_offset * 0.3) * 0.12
-            organic_drift_y = np.cos(phase_offset * 0.25) * 0.1
-
-            freq_x = 0.8 + self.low_energy * 0.2 + organic_drift_x
-            freq_y = 0.8 + self.low_energy * 0.15 + organic_drift_y
-
-            # Más grande y expansivo con ligera asimetría orgánica (1.3x más grande)
-            x = samples * np.cos(t * freq_x + phase_offset) * (1.3 + self.low_energy * 0.5)
-            y = samples * np.sin(t * freq_y + phase_offset) * (1.3 + self.low_energy * 0.5)
-
-            # Añadir ruido orgánico sutil (como imperfecciones naturales)
-            organic_noise_x = np.sin(t * 7.3 + phase_offset * 0.8) * 0.02
-            organic_noise_y = np.cos(t * 6.7 + phase_offset * 0.7) * 0.02
-            x += organic_noise_x * (0.3 + self.low_energy * 0.4)
-            y += organic_noise_y * (0.3 + self.low_energy * 0.4)
-
-        elif band_type == 'mid':
-            # Medios: Patrón que se metamorfosea según energía con flujo orgánico
-            # Más lento, se acelera con energía
-            base_speed = 0.01
-            energy_speed = self.mid_energy * 0.01
-            phase_offset = len(self.trail_mid) * (base_speed + energy_speed)
-
-            # Deriva orgánica más pronunciada para medios
-            organic_drift_x = np.sin(phase_offset * 0.35) * 0.15
-            organic_drift_y = np.cos(phase_offset * 0.28) * 0.12
-
-            freq_x = 1.5 + self.mid_energy * 0.8 + organic_drift_x
-            freq_y = 0.9 + self.mid_energy * 0.6 + organic_drift_y
-
-            # Factor de metamorfosis basado en energía con modulación orgánica
-            morph_factor = self.mid_energy * 0.5 + np.sin(phase_offset * 0.2) * 0.15
-
-            # Mezcla entre figura 8 y patrón más complejo (1.2x más grande)
-            x = samples * (np.sin(t * freq_x + phase_offset) * (1.0 - morph_factor) +
-                          np.sin(t * freq_x * 1.5 + phase_offset) * morph_factor) * (0.85 + self.mid_energy * 0.5)
-            y = samples * (np.cos(t * freq_y + phase_offset) * (1.0 - morph_factor) +
-                          np.sin(t * freq_y * 1.3 + phase_offset * 1.5) * morph_factor) * (0.85 + self.mid_energy * 0.5)
-
-            # Ruido orgánico para medios (más sutil)
-            organic_noise_x = np.sin(t * 8.1 + phase_offset) * 0.015
-            organic_noise_y = np.cos(t * 7.9 + phase_offset * 0.9) * 0.015
-            x += organic_noise_x * (0.4 + self.mid_energy * 0.3)
-            y += organic_noise_y * (0.4 + self.mid_energy * 0.3)
-
-        else:  # high
-            # Altos: Patrón complejo tipo trébol con imperfecciones naturales
-            # Más lento, se acelera con energía
-            base_speed = 0.012
-            energy_speed = self.high_energy * 0.012
-            phase_offset = len(self.trail_high) * (base_speed + energy_speed)
-
-            # Variaciones orgánicas sutiles para altos
-            organic_drift_x = np.sin(phase_offset * 0.4) * 0.1
-            organic_drift_y = np.cos(phase_offset * 0.32) * 0.08
-
-            freq_x = 2.2 + self.high_energy * 0.4 + organic_drift_x
-            freq_y = 1.6 + self.high_energy * 0.3 + organic_drift_y
-
-            # Más grande con asimetría natural (1.2x más grande)
-            x = samples * np.sin(t * freq_x + phase_offset) * (1.0 + self.high_energy * 0.7)
-            y = samples * np.cos(t * freq_y + phase_offset) * (1.0 + self.high_energy * 0.7)
-
-            # Ruido orgánico para altos (muy fino)
-            organic_noise_x = np.sin(t * 9.7 + phase_offset * 1.1) * 0.01
-            organic_noise_y = np.cos(t * 8.3 + phase_offset * 0.95) * 0.01
-            x += organic_noise_x * (0.5 + self.high_energy * 0.3)
-            y += organic_noise_y * (0.5 + self.high_energy * 0.3)
-
-        # Aplicar suavizado más fuerte (media móvil)
-        if len(x) > 5:
-            window_size = 5  # Más suavizado
-            x = np.convolve(x, np.ones(window_size)/window_size, mode='same')
-            y = np.convolve(y, np.ones(window_size)/window_size, mode='same')
-
-        # Clip para evitar overflow
-        x = np.clip(x, -1.0, 1.0)
-        y = np.clip(y, -1.0, 1.0)
-
-        points = np.column_stack((x, y)).astype(np.float32)
-        return points
-
     def update_trails(self):
         """Actualiza los tres historiales de trayectorias"""
         self.analyze_audio()
 
         # Solo añadir nuevos puntos si hay señal
         if self.overall_level > 0.01:
-            self.trail_low.append(self.create_lissajous_pattern('low'))
-            self.trail_mid.append(self.create_lissajous_pattern('mid'))
-            self.trail_high.append(self.create_lissajous_pattern('high'))
+            # Downsampling para mejor rendimiento (vista, sin copia)
+            step = len(self.audio_buffer) // DRAW_SAMPLES
+            samples = self.audio_buffer[::step][:DRAW_SAMPLES]
+            energies = (self.low_energy, self.mid_energy, self.high_energy)
+
+            # La fase avanza con la longitud de la estela (antes len(deque))
+            trail_len = self.trail_filled
+            self.trail_head = (self.trail_head + 1) % self.trail_slots
+            self.trail_filled = min(self.trail_filled + 1, HISTORY_LENGTH)
+
+            if SYNTH_MODE == 'gpu':
+                # Solo el bloque de audio (una fila) y 4 floats de parámetros
+                np.copyto(self.sample_row, samples)
+                self.sample_ring.push(self.sample_row)
+                self.trail_params[self.trail_head] = (*energies, trail_len)
+            elif self.trail_mapped is not None:
+                # Escribir directamente en el slot mapeado del VBO
+                self.wait_trail_fence(self.trail_head)
+                self.lissajous.generate(samples, energies, trail_len, self.trail_mapped[self.trail_head])
+            else:
+                self.lissajous.generate(samples, energies, trail_len, self.trail_staging)
+                glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+                glBufferSubData(GL_ARRAY_BUFFER, self.trail_head * self.trail_staging.nbytes,
+                                self.trail_staging.nbytes, self.trail_staging)
 
     def setup_shaders(self):
+        # Acumulación de fósforo (solo en modo 'phosphor')
+        self.phosphor = None
+        if PERSISTENCE_MODE == 'phosphor':
+            self.phosphor = PhosphorPersistence(PHOSPHOR_DECAY, PHOSPHOR_BLUR, PHOSPHOR_OFFSET)
+
+        if SYNTH_MODE == 'gpu':
+            self.setup_gpu_synthesis()
+            return
+
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
 
         self.u_scale = glGetUniformLocation(self.shader, 'uScale')
-        self.u_offset = glGetUniformLocation(self.shader, 'uOffset')
         self.u_color = glGetUniformLocation(self.shader, 'uColor')
+        self.u_slot_stride = glGetUniformLocation(self.shader, 'uSlotStride')
+        self.u_history = glGetUniformLocation(self.shader, 'uHistory')
+        self.u_head = glGetUniformLocation(self.shader, 'uHead')
+        self.u_filled = glGetUniformLocation(self.shader, 'uFilled')
+        self.u_orbit_radius = glGetUniformLocation(self.shader, 'uOrbitRadius')
+        self.u_orbit_angle = glGetUniformLocation(self.shader, 'uOrbitAngle')
+
+        # Ring buffer: (HISTORY_LENGTH + TRAIL_SPARE_SLOTS) slots x BANDS x DRAW_SAMPLES puntos (x, y).
+        # Se dibujan los HISTORY_LENGTH más recientes; el slot que se reescribe salió de la
+        # estela hace TRAIL_SPARE_SLOTS + 1 frames y su fence normalmente ya está señalado
+        self.trail_slots = HISTORY_LENGTH + TRAIL_SPARE_SLOTS
+        self.trail_staging = np.zeros((BANDS, DRAW_SAMPLES, 2), dtype=np.float32)
+        total_bytes = self.trail_slots * self.trail_staging.nbytes
 
+        self.vao = glGenVertexArrays(1)
+        glBindVertexArray(self.vao)
         self.vbo = glGenBuffers(1)
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, DRAW_SAMPLES * 8, None, GL_DYNAMIC_DRAW)
 
-        self.vao = glGenVertexArrays(1)
-        glBindVertexArray(self.vao)
+        # Con GL 4.4 el VBO queda mapeado de forma persistente: el generador escribe directamente ahí
+        self.trail_mapped = None
+        self.trail_fences = [None] * self.trail_slots  # Última lectura de cada slot por la GPU
+        if bool(glBufferStorage) and bool(glMapBufferRange):
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+            glBufferStorage(GL_ARRAY_BUFFER, total_bytes, None, flags)
+            ptr = glMapBufferRange(GL_ARRAY_BUFFER, 0, total_bytes, flags)
+            buf = (ctypes.c_float * (total_bytes // 4)).from_address(ptr)
+            self.trail_mapped = np.frombuffer(buf, dtype=np.float32).reshape(
+                (self.trail_slots, BANDS, DRAW_SAMPLES, 2))
+        else:
+            glBufferData(GL_ARRAY_BUFFER, total_bytes, None, GL_DYNAMIC_DRAW)
+
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
 
-    def render_oscilloscope(self, trail, color_base, energy, orbital=False, intensity_multiplier=1.0):
-        """Renderiza un osciloscopio con su estela"""
-        if len(trail) == 0:
+        # Tablas para glMultiDrawArrays: una línea por slot, por banda (se eligen los visibles al dibujar)
+        slot_firsts = np.arange(self.trail_slots, dtype=np.int32) * (BANDS * DRAW_SAMPLES)
+        self.trail_firsts = [slot_firsts + b * DRAW_SAMPLES for b in range(BANDS)]
+        self.trail_counts = np.full(HISTORY_LENGTH, DRAW_SAMPLES, dtype=np.int32)
+
+    def setup_gpu_synthesis(self):
+        """Modo 'gpu': textura de muestras + uniform array de parámetros, sin VBO de puntos"""
+        vs = shaders.compileShader(GPU_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(GPU_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.gpu_shader = shaders.compileProgram(vs, fs)
+
+        self.u_gpu = {
+            name: glGetUniformLocation(self.gpu_shader, name)
+            for name in ('uSamples', 'uTrailParams', 'uPoints', 'uHead', 'uFilled', 'uBandEnergy',
+                         'uBandIntensity', 'uBandColor', 'uTime', 'uPointMode')
+        }
+
+        # Anillo de bloques de audio: una fila por frame (mismo mecanismo que el espectrograma)
+        self.sample_ring = SpectrogramRing(bins=DRAW_SAMPLES, rows=HISTORY_LENGTH)
+        self.sample_row = np.zeros(DRAW_SAMPLES, dtype=np.float32)
+        self.trail_params = np.zeros((HISTORY_LENGTH, 4), dtype=np.float32)
+        self.trail_slots = HISTORY_LENGTH
+        self.trail_mapped = None
+
+        # Sin atributos: todo sale de gl_VertexID / gl_InstanceID (core profile exige un VAO)
+        self.gpu_vao = glGenVertexArrays(1)
+
+        glUseProgram(self.gpu_shader)
+        glUniform1i(self.u_gpu['uSamples'], 0)
+        glUniform1i(self.u_gpu['uPoints'], DRAW_SAMPLES)
+        glUniform3fv(self.u_gpu['uBandColor'], BANDS, np.array(BAND_COLORS, dtype=np.float32))
+        glUniform3f(self.u_gpu['uBandIntensity'], *BAND_INTENSITY)
+        glEnable(GL_PROGRAM_POINT_SIZE)
+
+    def render_gpu_synthesis(self, draw_trails=True, draw_tips=True):
+        """Todas las estelas de las tres bandas en un único draw instanciado"""
+        if self.trail_filled == 0:
             return
 
-        glBindVertexArray(self.vao)
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glUseProgram(self.gpu_shader)
+        glBindVertexArray(self.gpu_vao)
+        self.sample_ring.bind(0)
+
+        u = self.u_gpu
+        glUniform4fv(u['uTrailParams'], HISTORY_LENGTH, self.trail_params)
+        glUniform1i(u['uHead'], self.trail_head)
+        glUniform1i(u['uFilled'], self.trail_filled)
+        glUniform3f(u['uBandEnergy'], self.low_energy, self.mid_energy, self.high_energy)
+        glUniform1f(u['uTime'], (pygame.time.get_ticks() - self.start_time) / 1000.0)
+
+        if draw_trails:
+            # Con fósforo solo la traza nueva (edad 0): el resto ya está en la acumulación
+            trails = 1 if self.phosphor is not None else self.trail_filled
+            glUniform1i(u['uPointMode'], 0)
+            glDrawArraysInstanced(GL_LINE_STRIP, 0, DRAW_SAMPLES, trails * BANDS)
+
+        if draw_tips:
+            # Punto brillante al final de cada banda (solo el frame más reciente)
+            glUniform1i(u['uPointMode'], 1)
+            glDrawArraysInstanced(GL_POINTS, DRAW_SAMPLES - 1, 1, BANDS)
+
+    def wait_trail_fence(self, slot):
+        """Esperar solo a que la GPU termine la última lectura del slot que se va a sobrescribir"""
+        fence = self.trail_fences[slot]
+        if fence is not None:
+            glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1000000000)
+            glDeleteSync(fence)
+            self.trail_fences[slot] = None
+
+    def fence_oldest_trail(self):
+        """
+        Fence tras los draws del frame en el slot más antiguo de la estela: es el próximo
+        en salir de ella, así que la última fence que recibe marca su última lectura
+        """
+        oldest = (self.trail_head - self.trail_filled + 1) % self.trail_slots
+        if self.trail_fences[oldest] is not None:
+            glDeleteSync(self.trail_fences[oldest])
+        self.trail_fences[oldest] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+    def render_oscilloscope(self, band, color_base, energy, orbital=False, intensity_multiplier=1.0,
+                            draw_trails=True, draw_tips=True):
+        """Renderiza un osciloscopio con toda su estela en un solo multi-draw"""
+        if self.trail_filled == 0:
+            return
 
-        total = len(trail)
-
-        for i, points in enumerate(trail):
-            if len(points) == 0:
-                continue
-
-            # Fade muy gradual y suave
-            progress = (i + 1) / total
-            # Fade cúbico para desvanecimiento más suave
-            alpha = progress * progress * progress
-
-            # Intensificar con la energía de la banda (más sutil)
-            alpha *= (0.4 + energy * 0.4) * intensity_multiplier
-
-            # Color con fade
-            color = (
-                color_base[0] * alpha,
-                color_base[1] * alpha,
-                color_base[2] * alpha,
-                alpha
-            )
-
-            glUniform4f(self.u_color, *color)
-            glUniform1f(self.u_scale, 1.0)  # Escala global más grande
-
-            # Calcular offset orbital si está activado
-            if orbital:
-                # Tiempo basado en el frame actual
-                t = (pygame.time.get_ticks() - self.start_time) / 1000.0
-                # Radio de órbita basado en energía (más lejos del centro)
-                orbit_radius = 0.28 + energy * 0.3
-                # Velocidad de órbita (muy lenta, se acelera con energía)
-                orbit_speed = 0.08 + energy * 0.08
-                # Ángulo de órbita progresivo
-                orbit_angle = t * orbit_speed + (i / total) * 6.28
-
-                offset_x = np.cos(orbit_angle) * orbit_radius
-                offset_y = np.sin(orbit_angle) * orbit_radius
-
-                glUniform2f(self.u_offset, offset_x, offset_y)
+        # Calcular órbita si está activada
+        if orbital:
+            # Tiempo basado en el frame actual
+            t = (pygame.time.get_ticks() - self.start_time) / 1000.0
+            # Radio de órbita basado en energía (más lejos del centro)
+            glUniform1f(self.u_orbit_radius, 0.28 + energy * 0.3)
+            # Velocidad de órbita (muy lenta, se acelera con energía)
+            glUniform1f(self.u_orbit_angle, t * (0.08 + energy * 0.08))
+        else:
+            glUniform1f(self.u_orbit_radius, 0.0)  # Centro
+
+        if draw_trails:
+            # Intensificar con la energía de la banda (más sutil); el fade por estela va en el VS
+            alpha = (0.4 + energy * 0.4) * intensity_multiplier
+            glUniform4f(self.u_color,
+                       color_base[0] * alpha,
+                       color_base[1] * alpha,
+                       color_base[2] * alpha,
+                       alpha)
+            if self.phosphor is not None:
+                # Solo la traza nueva: el resto ya está en la acumulación
+                glDrawArrays(GL_LINE_STRIP, int(self.trail_firsts[band][self.trail_head]), DRAW_SAMPLES)
             else:
-                glUniform2f(self.u_offset, 0.0, 0.0)  # Centro
+                glMultiDrawArrays(GL_LINE_STRIP, self.trail_firsts[band][self.trail_visible],
+                                  self.trail_counts, self.trail_filled)
 
-            glBufferData(GL_ARRAY_BUFFER, points.nbytes, points, GL_DYNAMIC_DRAW)
-            glDrawArrays(GL_LINE_STRIP, 0, len(points))
+        if not draw_tips:
+            return
 
-            # Punto brillante al final (solo en el frame más reciente)
-            if i == total - 1:
-                glPointSize(5.0 + energy * 6.0)
-                glUniform4f(self.u_color,
-                           color_base[0] * 1.2,
-                           color_base[1] * 1.2,
-                           color_base[2] * 1.2,
-                           0.9)
-                glDrawArrays(GL_POINTS, len(points)-1, 1)
+        # Punto brillante al final (solo en el frame más reciente)
+        glPointSize(5.0 + energy * 6.0)
+        glUniform4f(self.u_color,
+                   color_base[0] * 1.2,
+                   color_base[1] * 1.2,
+                   color_base[2] * 1.2,
+                   0.9)
+        last = self.trail_head * BANDS * DRAW_SAMPLES + band * DRAW_SAMPLES + DRAW_SAMPLES - 1
+        glDrawArrays(GL_POINTS, last, 1)
 
     def render(self):
         w, h = self.screen.get_size()
         glViewport(0, 0, w, h)
         glClear(GL_COLOR_BUFFER_BIT)
-        glUseProgram(self.shader)
 
-        # Colores clásicos de osciloscopio
-        color_low = (0.2, 1.0, 0.3)    # Verde clásico (bajos)
-        color_mid = (0.2, 0.8, 1.0)    # Cyan (medios)
-        color_high = (1.0, 0.3, 0.8)   # Magenta (altos)
+        if self.phosphor is None:
+            self.render_scene()
+        else:
+            # Estelas en la acumulación (frame anterior decaído + traza nueva)
+            self.phosphor.begin(w, h)
+            self.render_scene(draw_tips=False)
+            self.phosphor.end()
+            glViewport(0, 0, w, h)
+            self.phosphor.present()
+            # Puntos brillantes directos a pantalla (no dejan estela)
+            self.render_scene(draw_trails=False)
+
+        if self.trail_mapped is not None and self.trail_filled > 0:
+            self.fence_oldest_trail()
+
+        pygame.display.flip()
+
+    def render_scene(self, draw_trails=True, draw_tips=True):
+        if SYNTH_MODE == 'gpu':
+            self.render_gpu_synthesis(draw_trails, draw_tips)
+            return
+
+        glUseProgram(self.shader)
+        glBindVertexArray(self.vao)
+        glUniform1f(self.u_scale, 1.0)  # Escala global más grande
+        glUniform1i(self.u_slot_stride, BANDS * DRAW_SAMPLES)
+        glUniform1i(self.u_history, self.trail_slots)
+        glUniform1i(self.u_head, self.trail_head)
+        glUniform1i(self.u_filled, self.trail_filled)
+        # Slots de la estela (los trail_filled más recientes del ring buffer)
+        self.trail_visible = (self.trail_head - np.arange(self.trail_filled)) % self.trail_slots
 
         # Renderizar los tres osciloscopios
         # Primero los bajos (atrás) - fijos en el centro - intensidad reducida
-        self.render_oscilloscope(self.trail_low, color_low, self.low_energy, orbital=False, intensity_multiplier=0.4)
+        self.render_oscilloscope(0, BAND_COLORS[0], self.low_energy, orbital=False,
+                                 intensity_multiplier=BAND_INTENSITY[0],
+                                 draw_trails=draw_trails, draw_tips=draw_tips)
 
         # Luego los medios (medio) - ORBITANDO alrededor del centro
-        self.render_oscilloscope(self.trail_mid, color_mid, self.mid_energy, orbital=True, intensity_multiplier=1.0)
+        self.render_oscilloscope(1, BAND_COLORS[1], self.mid_energy, orbital=True,
+                                 intensity_multiplier=BAND_INTENSITY[1],
+                                 draw_trails=draw_trails, draw_tips=draw_tips)
 
         # Por último los altos (adelante) - fijos en el centro
-        self.render_oscilloscope(self.trail_high, color_high, self.high_energy, orbital=False, intensity_multiplier=1.0)
-
-        pygame.display.flip()
+        self.render_oscilloscope(2, BAND_COLORS[2], self.high_energy, orbital=False,
+                                 intensity_multiplier=BAND_INTENSITY[2],
+                                 draw_trails=draw_trails, draw_tips=draw_tips)
 
     def run(self):
         running = True
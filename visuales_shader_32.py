@@ -9,6 +9,14 @@ Características:
 - Bounce suave sincronizado con kick MIDI (nota 60)
 - Efectos VFX de colores reactivos al audio de entrada
 - Estilo minimalista con glow y colores dinámicos
+
+RENDER_MODE = 'raster' dibuja los 13 cubos como geometría instanciada con depth
+test (coste casi nulo a cualquier resolución); 'raymarch' mantiene el SDF
+original (13 sdBox por paso, y otra vez x4 para la normal).
+
+El glow del kick es bloom de postfx.py (cadena de mips) sobre la escena: el kick
+empuja el color de los cubos por encima de 1.0 y la misma envolvente marca la
+intensidad del bloom. Sin kick el pase se salta y la escena se copia tal cual.
 """
 
 from __future__ import division
@@ -18,10 +26,20 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
+import ctypes
 import mido
+from postfx import PostChain
 
 # Configuración
 SAMPLES = 1024  # Menor buffer para latencia ultra baja
+RENDER_MODE = 'raster'  # 'raster' (cubos instanciados) o 'raymarch' (SDF por píxel)
+
+# Cruz de cubos (igual que GetDist): centro + 3 por brazo
+CUBE_SIZE = 0.3
+CUBE_SPACING = 1.2
+CUBES_PER_ARM = 3
+KICK_BOUNCE = 0.15
+BLOOM_KICK = 2.0    # Intensidad del bloom con el kick a tope (0 en reposo)
 
 # Notas MIDI
 KICK_NOTE = 60
@@ -39,11 +57,8 @@ void main() {
 }
 """
 
-FRAGMENT_SHADER = """
-#version 330 core
-in vec2 vUV;
-out vec4 fragColor;
-
+# Iluminación de los cubos y overlay de pantalla, comunes a los dos caminos
+SHADING_GLSL = """
 uniform float iTime;
 uniform vec2 iResolution;
 uniform float iLow;
@@ -52,22 +67,12 @@ uniform float iHigh;
 uniform float iVolume;
 uniform float iKickPulse;  // Bounce del kick MIDI
 
-#define MAX_STEPS 80
-#define MAX_DIST 50.0
-#define SURF_DIST 0.001
-
 // Rotación 2D
 mat2 rot(float a) {
     float s = sin(a), c = cos(a);
     return mat2(c, -s, s, c);
 }
 
-// SDF Caja
-float sdBox(vec3 p, vec3 b) {
-    vec3 q = abs(p) - b;
-    return length(max(q, 0.0)) + min(max(q.x, max(q.y, q.z)), 0.0);
-}
-
 // Paleta de colores vibrantes (Iquilez)
 vec3 palette(float t) {
     vec3 a = vec3(0.5, 0.5, 0.5);
@@ -77,6 +82,67 @@ vec3 palette(float t) {
     return a + b * cos(6.28318 * (c * t + d));
 }
 
+// Color de un punto p de un cubo con normal n, visto en la dirección rd
+vec3 shadeCube(vec3 p, vec3 n, vec3 rd) {
+    // Iluminación
+    vec3 lightPos = vec3(2.0, 3.0, -5.0);
+    vec3 l = normalize(lightPos - p);
+    float dif = clamp(dot(n, l), 0.2, 1.0);
+
+    // Color base con paleta reactiva al audio
+    float colorShift = iTime * 0.1 + iMid * 2.0;
+    vec3 baseCol = palette(length(p.xy) * 0.3 + colorShift);
+
+    // Fresnel
+    float fresnel = pow(1.0 - abs(dot(rd, n)), 3.0);
+
+    vec3 col = baseCol * dif;
+    col += fresnel * vec3(1.0) * 0.5;
+
+    // Emisión del kick (HDR: el halo lo añade el bloom)
+    col += vec3(1.0, 0.3, 0.6) * iKickPulse * 0.8;
+    return col;
+}
+
+// VFX de colores + viñeta, función solo del píxel de pantalla
+vec3 screenOverlay(vec3 col) {
+    // VFX de colores superpuestos (overlay) reactivo al audio
+    vec2 uvScreen = gl_FragCoord.xy / iResolution.xy;
+    float vfxIntensity = iVolume * 0.3;
+
+    // Efecto de ondas de color
+    float wave1 = sin(uvScreen.x * 10.0 + iTime * 2.0 + iLow * 5.0) * 0.5 + 0.5;
+    float wave2 = sin(uvScreen.y * 10.0 - iTime * 1.5 + iMid * 5.0) * 0.5 + 0.5;
+
+    vec3 vfxColor = palette(iTime * 0.2 + iHigh * 2.0);
+    vec3 vfxOverlay = vfxColor * wave1 * wave2 * vfxIntensity;
+
+    // Blend aditivo para efectos VFX
+    col += vfxOverlay;
+
+    // Vignette sutil
+    float vignette = pow(16.0 * uvScreen.x * uvScreen.y * (1.0 - uvScreen.x) * (1.0 - uvScreen.y), 0.2);
+    return col * vignette;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+
+#define MAX_STEPS 80
+#define MAX_DIST 50.0
+#define SURF_DIST 0.001
+
+{SHADING}
+
+// SDF Caja
+float sdBox(vec3 p, vec3 b) {
+    vec3 q = abs(p) - b;
+    return length(max(q, 0.0)) + min(max(q.x, max(q.y, q.z)), 0.0);
+}
+
 // Escena: 4 filas de cubos en forma de cruz
 float GetDist(vec3 p) {
     vec3 p_orig = p;
@@ -158,56 +224,83 @@ void main() {
 
     float d = RayMarch(ro, rd);
 
-    vec3 col = vec3(0.0);
+    // Fondo oscuro
+    vec3 col = vec3(0.02, 0.02, 0.05);
 
     if(d < MAX_DIST) {
         vec3 p = ro + rd * d;
-        vec3 n = GetNormal(p);
+        col = shadeCube(p, GetNormal(p), rd);
+    }
 
-        // Iluminación
-        vec3 lightPos = vec3(2.0, 3.0, -5.0);
-        vec3 l = normalize(lightPos - p);
-        float dif = clamp(dot(n, l), 0.2, 1.0);
+    fragColor = vec4(screenOverlay(col), 1.0);
+}
+""".replace('{SHADING}', SHADING_GLSL)
 
-        // Color base con paleta reactiva al audio
-        float colorShift = iTime * 0.1 + iMid * 2.0;
-        vec3 baseCol = palette(length(p.xy) * 0.3 + colorShift);
+# Camino rasterizado: los 13 cubos como un único draw instanciado con depth test.
+# La cámara reproduce la del raymarch (ro = (0, 0, -8), focal 1 sobre el alto
+# de pantalla, balanceo rot(sin(t * 0.1) * 0.1) en xy)
+CUBE_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 aPos;       // Cubo unidad [-1, 1]^3
+layout(location = 1) in vec3 aNormal;
+layout(location = 2) in vec4 aInstance;  // xyz = centro, w = medio lado (con bounce)
 
-        // Fresnel
-        float fresnel = pow(1.0 - abs(dot(rd, n)), 3.0);
+uniform float iTime;
+uniform vec2 iResolution;
 
-        col = baseCol * dif;
-        col += fresnel * vec3(1.0) * 0.5;
+out vec3 vWorld;
+out vec3 vNormal;
 
-        // Glow reactivo al kick
-        col += vec3(1.0, 0.3, 0.6) * iKickPulse * 0.8;
-    }
+#define NEAR 0.1
+#define FAR 50.0
 
-    // Fondo oscuro
-    vec3 bgCol = vec3(0.02, 0.02, 0.05);
-    col = mix(bgCol, col, step(0.01, d - MAX_DIST * 0.99));
+mat2 rot(float a) {
+    float s = sin(a), c = cos(a);
+    return mat2(c, -s, s, c);
+}
 
-    // VFX de colores superpuestos (overlay) reactivo al audio
-    vec2 uvScreen = gl_FragCoord.xy / iResolution.xy;
-    float vfxIntensity = iVolume * 0.3;
+void main() {
+    vec3 p = aInstance.xyz + aPos * aInstance.w;
+    vWorld = p;
+    vNormal = aNormal;
+
+    // Vista: inversa del balanceo del raymarch (rd.xy *= rot(a))
+    vec3 v = p - vec3(0.0, 0.0, -8.0);
+    v.xy = rot(sin(iTime * 0.1) * 0.1) * v.xy;
+
+    // Proyección: uv = v.xy / v.z, con uv.y en [-0.5, 0.5]
+    float aspect = iResolution.x / iResolution.y;
+    gl_Position = vec4(v.x * 2.0 / aspect, v.y * 2.0,
+                       (v.z * (FAR + NEAR) - 2.0 * FAR * NEAR) / (FAR - NEAR), v.z);
+}
+"""
 
-    // Efecto de ondas de color
-    float wave1 = sin(uvScreen.x * 10.0 + iTime * 2.0 + iLow * 5.0) * 0.5 + 0.5;
-    float wave2 = sin(uvScreen.y * 10.0 - iTime * 1.5 + iMid * 5.0) * 0.5 + 0.5;
+CUBE_FRAGMENT_SHADER = """
+#version 330 core
+in vec3 vWorld;
+in vec3 vNormal;
+out vec4 fragColor;
 
-    vec3 vfxColor = palette(iTime * 0.2 + iHigh * 2.0);
-    vec3 vfxOverlay = vfxColor * wave1 * wave2 * vfxIntensity;
+{SHADING}
 
-    // Blend aditivo para efectos VFX
-    col += vfxOverlay;
+void main() {
+    vec3 rd = normalize(vWorld - vec3(0.0, 0.0, -8.0));
+    fragColor = vec4(screenOverlay(shadeCube(vWorld, normalize(vNormal), rd)), 1.0);
+}
+""".replace('{SHADING}', SHADING_GLSL)
 
-    // Vignette sutil
-    float vignette = pow(16.0 * uvScreen.x * uvScreen.y * (1.0 - uvScreen.x) * (1.0 - uvScreen.y), 0.2);
-    col *= vignette;
+# Fondo del camino rasterizado: color plano + overlay (sin escena)
+BACKGROUND_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 vUV;
+out vec4 fragColor;
+
+{SHADING}
 
-    fragColor = vec4(col, 1.0);
+void main() {
+    fragColor = vec4(screenOverlay(vec3(0.02, 0.02, 0.05)), 1.0);
 }
-"""
+""".replace('{SHADING}', SHADING_GLSL)
 
 class ShaderVisualEngine:
     def __init__(self):
@@ -221,6 +314,7 @@ class ShaderVisualEngine:
         initial_h = 900
         initial_w = int(initial_h * self.aspect_ratio)
 
+        pygame.display.gl_set_attribute(pygame.GL_DEPTH_SIZE, 24)
         self.screen = pygame.display.set_mode(
             (initial_w, initial_h),
             DOUBLEBUF | OPENGL | RESIZABLE
@@ -242,6 +336,8 @@ class ShaderVisualEngine:
         self.setup_midi()
         self.setup_shaders()
         self.setup_quad()
+        if RENDER_MODE == 'raster':
+            self.setup_cubes()
         self.clock = pygame.time.Clock()
         self.start_time = pygame.time.get_ticks()
 
@@ -323,39 +419,110 @@ class ShaderVisualEngine:
         glEnableVertexAttribArray(0)
         glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
 
+    def setup_cubes(self):
+        """Cubo unidad (36 vértices con normal) + buffer de instancias (centro, medio lado)"""
+        faces = []
+        for axis in range(3):
+            for sign in (-1.0, 1.0):
+                n = np.zeros(3, dtype=np.float32); n[axis] = sign
+                # Antihorario visto desde fuera (la cámara mira a +z: x derecha, y arriba)
+                u = np.roll(np.abs(n), 1); v = np.cross(u, n)
+                corners = [n + su * u + sv * v for su, sv in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+                for i in (0, 1, 2, 0, 2, 3):
+                    faces.append(np.concatenate([corners[i], n]))
+        vertices = np.array(faces, dtype=np.float32)
+
+        centers = [(0.0, 0.0, 0.0)]
+        for i in range(1, CUBES_PER_ARM + 1):
+            d = CUBE_SPACING * i
+            centers += [(-d, 0.0, 0.0), (d, 0.0, 0.0), (0.0, d, 0.0), (0.0, -d, 0.0)]
+        self.cube_instances = np.zeros((len(centers), 4), dtype=np.float32)
+        self.cube_instances[:, :3] = centers
+
+        self.cube_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.cube_vao)
+        vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(12))
+
+        self.instance_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.cube_instances.nbytes, self.cube_instances, GL_DYNAMIC_DRAW)
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 4, GL_FLOAT, GL_FALSE, 0, None)
+        glVertexAttribDivisor(2, 1)
+        glBindVertexArray(0)
+
+    def _uniform_locs(self, program):
+        return {name: glGetUniformLocation(program, name)
+                for name in ('iTime', 'iResolution', 'iLow', 'iMid', 'iHigh', 'iVolume', 'iKickPulse')}
+
     def setup_shaders(self):
-        vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
-        fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-        self.shader = shaders.compileProgram(vs, fs)
-        self.locs = {
-            'iTime': glGetUniformLocation(self.shader, 'iTime'),
-            'iResolution': glGetUniformLocation(self.shader, 'iResolution'),
-            'iLow': glGetUniformLocation(self.shader, 'iLow'),
-            'iMid': glGetUniformLocation(self.shader, 'iMid'),
-            'iHigh': glGetUniformLocation(self.shader, 'iHigh'),
-            'iVolume': glGetUniformLocation(self.shader, 'iVolume'),
-            'iKickPulse': glGetUniformLocation(self.shader, 'iKickPulse')
-        }
+        if RENDER_MODE == 'raster':
+            # Fondo (quad) + cubos instanciados
+            vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
+            fs = shaders.compileShader(BACKGROUND_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+            self.shader = shaders.compileProgram(vs, fs)
+            vs = shaders.compileShader(CUBE_VERTEX_SHADER, GL_VERTEX_SHADER)
+            fs = shaders.compileShader(CUBE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+            self.cube_shader = shaders.compileProgram(vs, fs)
+            self.cube_locs = self._uniform_locs(self.cube_shader)
+        else:
+            vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
+            fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+            self.shader = shaders.compileProgram(vs, fs)
+        self.locs = self._uniform_locs(self.shader)
+
+        # Bloom con el kick; depth buffer para los cubos rasterizados
+        self.post = PostChain(['bloom'], depth=True,
+                              midi_map={'bloom.amount': ('kick_pulse', BLOOM_KICK)})
+        self.post.set('bloom', threshold=1.0, knee=0.5)
+
+    def set_uniforms(self, locs, t, w, h):
+        glUniform1f(locs['iTime'], t)
+        glUniform2f(locs['iResolution'], float(w), float(h))
+        glUniform1f(locs['iLow'], self.low_energy)
+        glUniform1f(locs['iMid'], self.mid_energy)
+        glUniform1f(locs['iHigh'], self.high_energy)
+        glUniform1f(locs['iVolume'], self.volume)
+        glUniform1f(locs['iKickPulse'], self.kick_pulse)
 
     def render(self):
         self.handle_midi()  # Procesar MIDI
         self.update_audio_vars()
         w, h = self.screen.get_size()
-        glViewport(0, 0, w, h)
+        self.post.begin(w, h)
         glUseProgram(self.shader)
 
         t = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        self.set_uniforms(self.locs, t, w, h)
 
-        glUniform1f(self.locs['iTime'], t)
-        glUniform2f(self.locs['iResolution'], float(w), float(h))
-        glUniform1f(self.locs['iLow'], self.low_energy)
-        glUniform1f(self.locs['iMid'], self.mid_energy)
-        glUniform1f(self.locs['iHigh'], self.high_energy)
-        glUniform1f(self.locs['iVolume'], self.volume)
-        glUniform1f(self.locs['iKickPulse'], self.kick_pulse)
-
+        # Raymarch: la escena entera; raster: solo el fondo
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+
+        if RENDER_MODE == 'raster':
+            # Bounce del kick por instancia (hoy igual para todas, como en GetDist)
+            self.cube_instances[:, 3] = CUBE_SIZE * (1.0 + self.kick_pulse * KICK_BOUNCE)
+            glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, self.cube_instances.nbytes, self.cube_instances)
+
+            glClear(GL_DEPTH_BUFFER_BIT)
+            glEnable(GL_DEPTH_TEST)
+            glEnable(GL_CULL_FACE)
+            glUseProgram(self.cube_shader)
+            self.set_uniforms(self.cube_locs, t, w, h)
+            glBindVertexArray(self.cube_vao)
+            glDrawArraysInstanced(GL_TRIANGLES, 0, 36, len(self.cube_instances))
+            glDisable(GL_CULL_FACE)
+            glDisable(GL_DEPTH_TEST)
+
+        self.post.apply_midi(self)
+        self.post.end(0, 0, w, h, t)
         pygame.display.flip()
 
     def run(self):
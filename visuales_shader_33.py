@@ -10,6 +10,8 @@ Características:
 - Paleta de colores de alto contraste (Neon/Dark)
 - Movimiento extremadamente suave
 - Reactividad sutil: El sonido "empuja" el fluido
+- Ruido de valor desde la textura compartida de noisetex.py (NOISE_TEXTURES):
+  una lectura por octava en lugar de cuatro hashes con sin()
 """
 
 from __future__ import division
@@ -19,8 +21,10 @@ from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 import numpy as np
+from noisetex import NoiseTextures, NOISE_TEX_GLSL
 
 SAMPLES = 1024
+NOISE_TEXTURES = True     # False = hash con sin() (el ruido original, para comparar)
 
 VERTEX_SHADER = """
 #version 330 core
@@ -40,12 +44,14 @@ uniform float iLow;
 uniform float iMid;
 uniform float iHigh;
 
+""" + NOISE_TEX_GLSL + """
 // === NOISE FUNCTIONS ===
 float random(in vec2 _st) {
     return fract(sin(dot(_st.xy, vec2(12.9898,78.233))) * 43758.5453123);
 }
 
 float noise(in vec2 _st) {
+    if (uNoiseTextures == 1) return noiseTex(_st);
     vec2 i = floor(_st);
     vec2 f = fract(_st);
     f = f * f * (3.0 - 2.0 * f);
@@ -177,6 +183,7 @@ class ShaderVisualEngine:
             'iMid': glGetUniformLocation(self.shader, 'iMid'),
             'iHigh': glGetUniformLocation(self.shader, 'iHigh')
         }
+        self.noise = NoiseTextures(self.shader, unit=1, enabled=NOISE_TEXTURES)
 
     def render(self):
         self.update_audio()
@@ -189,6 +196,7 @@ class ShaderVisualEngine:
         glUniform1f(self.locs['iLow'], self.low)
         glUniform1f(self.locs['iMid'], self.mid)
         glUniform1f(self.locs['iHigh'], self.high)
+        self.noise.bind()
 
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
@@ -9,6 +9,11 @@ Cambios V15:
 - MANTENIDO: Reactividad global (Brillo respira con la música).
 - MANTENIDO: Destellos de estrellas (Scintillation) con agudos.
 - MANTENIDO: Sistema orbital V14 (Anillos + Polvo).
+
+Render en dos pases: la nebulosa (VOLSTEPS x ITERATIONS por píxel) se marcha a
+1/VOLUME_SCALE de resolución en una textura float; la lente, la máscara del
+agujero y el disco se calculan a resolución completa y guían el upsample
+bilateral de la nebulosa, así el borde del agujero y el anillo siguen nítidos.
 """
 
 from __future__ import division
@@ -20,6 +25,7 @@ from OpenGL.GL import shaders
 import numpy as np
 
 SAMPLES = 1024
+VOLUME_SCALE = 2      # Píxeles por texel de la nebulosa (1 = resolución completa, 2 = 1/4 del coste, 4 = 1/16)
 
 VERTEX_SHADER = """
 #version 330 core
@@ -29,16 +35,15 @@ void main() {
 }
 """
 
-FRAGMENT_SHADER = """
-#version 330 core
-out vec4 fragColor;
-
+# Código común a los dos pases: uniforms, ajustes, coordenadas y lente
+COMMON_GLSL = """
 uniform float iTime;
 uniform vec2 iResolution;
 uniform float iLow;
 uniform float iMid;
 uniform float iHigh;
 uniform float iVolume;
+uniform float uVolumeScale;   // Píxeles de pantalla por texel de la nebulosa
 
 // === AJUSTES ===
 #define ITERATIONS 13
@@ -61,17 +66,32 @@ mat2 rot(float a) {
     return mat2(c,-s,s,c);
 }
 
-void main() {
-    vec2 uv = gl_FragCoord.xy / iResolution.xy - 0.5;
+vec2 screenUV(vec2 coord) {
+    vec2 uv = coord / iResolution.xy - 0.5;
     uv.y *= iResolution.y / iResolution.x;
-    float r = length(uv);
+    return uv;
+}
 
-    // === LENTE GRAVITACIONAL ESTÁTICA (LIMPIA) ===
-    // Sin ondas de choque, solo la curvatura física del agujero
+// === LENTE GRAVITACIONAL ESTÁTICA (LIMPIA) ===
+// Sin ondas de choque, solo la curvatura física del agujero
+vec2 lens(vec2 uv) {
+    float r = length(uv);
     float distortion = SPHERE_RAD * 0.15 / (r * r + 0.01);
-    vec2 uv_distorted = uv * (1.0 - distortion * 0.6);
-    
-    vec3 dir = vec3(uv_distorted * ZOOM, 1.0);
+    return uv * (1.0 - distortion * 0.6);
+}
+"""
+
+# Pase 1: nebulosa volumétrica a 1/VOLUME_SCALE de resolución (RGBA16F)
+# rgb = brillo acumulado, a = transmisión de la materia oscura
+VOLUME_FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+""" + COMMON_GLSL + """
+void main() {
+    // Centro del bloque de uVolumeScale x uVolumeScale píxeles de este texel
+    vec2 uv = screenUV(gl_FragCoord.xy * uVolumeScale);
+
+    vec3 dir = vec3(lens(uv) * ZOOM, 1.0);
     float time = iTime * SPEED;
     
     mat2 rotCam = rot(0.2);
@@ -80,13 +100,103 @@ void main() {
     vec3 from = vec3(1.0, 0.5, 0.5);
     from += vec3(time * 2.0, time, -2.0);
     
+    bool isHole = length(uv) < SPHERE_RAD;
+    
+    float s = 0.1;
+    float fade = 1.0;
+    float dark = 1.0;
+    vec3 v = vec3(0.0);
+    
+    // Reactividad Global: El universo respira con el volumen
+    float globalEnergy = 1.0 + iVolume * 2.0; 
+
+    for (int r = 0; r < VOLSTEPS; r++) {
+        vec3 p = from + s * dir * 0.5;
+        
+        // Oclusión Agujero Negro (el borde se suma a resolución completa)
+        if (isHole && s > SPHERE_Z) break;
+
+        // === NEBULOSA (FONDO) ===
+        vec3 pf = abs(vec3(TILE) - mod(p, vec3(TILE * 2.0)));
+        float pa, a = pa = 0.0;
+        for (int i = 0; i < ITERATIONS; i++) { 
+            pf = abs(pf) / dot(pf, pf) - FORMUPARAM; 
+            a += abs(length(pf) - pa);
+            pa = length(pf);
+        }
+        float dm = max(0.0, DARKMATTER - a * a * 0.001);
+        a *= a * a;
+        if (r > 6) { fade *= 1.0 - dm; dark *= 1.0 - dm; }
+        
+        // Destello de estrellas con Agudos
+        float starFlash = 1.0 + iHigh * 3.0 * float(r > 12); 
+        
+        v += vec3(s, s*s, s*s*s*s) * a * BRIGHTNESS * fade * globalEnergy * starFlash;
+        
+        fade *= DISTFADING;
+        s += STEPSIZE;
+    }
+
+    fragColor = vec4(v, dark);
+}
+"""
+
+# Pase 2: lente, agujero y disco a resolución completa + upsample de la nebulosa
+FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+""" + COMMON_GLSL + """
+uniform sampler2D uVolume;    // Nebulosa del pase 1
+
+// Upsample bilateral: los 2x2 texels vecinos con peso bilineal, por parecido de
+// la dirección tras la lente (donde la lente comprime, pesa el texel más cercano)
+// y solo los del mismo lado del borde del agujero. Sin ninguno válido, bilineal
+vec4 volumeUpsample(vec2 coord, vec2 uvLens, bool isHole) {
+    vec2 q = coord / uVolumeScale - 0.5;
+    ivec2 i0 = ivec2(floor(q));
+    vec2 f = q - vec2(i0);
+    ivec2 size = textureSize(uVolume, 0) - 1;
+    float sigma = uVolumeScale / iResolution.x;   // Un texel en unidades de uv
+
+    vec4 sum = vec4(0.0), plain = vec4(0.0);
+    float wsum = 0.0;
+    for (int k = 0; k < 4; k++) {
+        ivec2 o = ivec2(k & 1, k >> 1);
+        ivec2 tap = clamp(i0 + o, ivec2(0), size);
+        vec4 c = texelFetch(uVolume, tap, 0);
+        vec2 b = mix(1.0 - f, f, vec2(o));
+        float wb = b.x * b.y;
+
+        vec2 uvTap = screenUV((vec2(tap) + 0.5) * uVolumeScale);
+        vec2 dd = (lens(uvTap) - uvLens) / sigma;
+        float w = wb * exp(-0.5 * dot(dd, dd)) * float((length(uvTap) < SPHERE_RAD) == isHole);
+
+        sum += c * w;
+        wsum += w;
+        plain += c * wb;
+    }
+    return wsum > 1e-4 ? sum / wsum : plain;
+}
+
+void main() {
+    vec2 uv = screenUV(gl_FragCoord.xy);
+    vec2 uvLens = lens(uv);
+    
     float holeRadius = SPHERE_RAD;
     float distToCenter = length(uv); // UV originales para máscara perfecta
     bool isHole = distToCenter < holeRadius;
+
+    // === NEBULOSA (FONDO) ===
+    vec4 nebula = volumeUpsample(gl_FragCoord.xy, uvLens, isHole);
+    vec3 v = nebula.rgb;
+    
+    // La materia oscura atenúa desde el paso 7; del pase 1 solo llega la
+    // transmisión total, repartida por igual entre los pasos
+    float darkStep = pow(nebula.a, 1.0 / float(VOLSTEPS - 7));
+    float dark = 1.0;
     
     float s = 0.1;
     float fade = 1.0;
-    vec3 v = vec3(0.0);
     vec3 diskAcc = vec3(0.0);
     
     mat2 diskTilt = rot(1.0);
@@ -94,9 +204,17 @@ void main() {
     // Reactividad Global: El universo respira con el volumen
     float globalEnergy = 1.0 + iVolume * 2.0; 
 
-    for (int r = 0; r < VOLSTEPS; r++) {
-        vec3 p = from + s * dir * 0.5;
-        
+    // El disco es una losa fina y pDisk.y es lineal en s: si los dos extremos de la
+    // marcha quedan al mismo lado de la losa, ningún paso la toca y el bucle sobra
+    // (con VOLSTEPS 18 la marcha acaba en s = 1.8, antes de SPHERE_Z)
+    float sEnd = 0.1 + STEPSIZE * float(VOLSTEPS - 1);
+    vec2 yz0 = vec2(uv.y * 0.1, 0.1 - SPHERE_Z) * diskTilt;
+    vec2 yz1 = vec2(uv.y * sEnd, sEnd - SPHERE_Z) * diskTilt;
+    bool reachesDisk = min(yz0.x, yz1.x) < 0.05 && max(yz0.x, yz1.x) > -0.05;
+    bool reachesHole = isHole && sEnd > SPHERE_Z;
+    int steps = (reachesDisk || reachesHole) ? VOLSTEPS : 0;
+
+    for (int r = 0; r < steps; r++) {
         // === DISCO Y PARTÍCULAS ===
         float distFromHolePlane = s - SPHERE_Z;
         vec3 pDisk = vec3(uv * s, distFromHolePlane);
@@ -128,34 +246,18 @@ void main() {
                 vec3 layer1 = cRing * rings * dens * (0.5 + iLow);
                 vec3 layer2 = cSpark * sparkles * dens * (iHigh * 4.0);
                 
-                diskAcc += (layer1 + layer2) * 0.1 * fade * globalEnergy;
+                diskAcc += (layer1 + layer2) * 0.1 * fade * dark * globalEnergy;
             }
         }
         
         // Oclusión Agujero Negro
         if (isHole && s > SPHERE_Z) {
              float rim = smoothstep(holeRadius * 0.99, holeRadius, distToCenter);
-             v += vec3(0.1, 0.3, 0.8) * rim * 0.2 * fade;
+             v += vec3(0.1, 0.3, 0.8) * rim * 0.2 * fade * dark;
              break;
         }
-
-        // === NEBULOSA (FONDO) ===
-        vec3 pf = abs(vec3(TILE) - mod(p, vec3(TILE * 2.0)));
-        float pa, a = pa = 0.0;
-        for (int i = 0; i < ITERATIONS; i++) { 
-            pf = abs(pf) / dot(pf, pf) - FORMUPARAM; 
-            a += abs(length(pf) - pa);
-            pa = length(pf);
-        }
-        float dm = max(0.0, DARKMATTER - a * a * 0.001);
-        a *= a * a;
-        if (r > 6) fade *= 1.0 - dm; 
-        
-        // Destello de estrellas con Agudos
-        float starFlash = 1.0 + iHigh * 3.0 * float(r > 12); 
-        
-        v += vec3(s, s*s, s*s*s*s) * a * BRIGHTNESS * fade * globalEnergy * starFlash;
         
+        if (r > 6) dark *= darkStep;
         fade *= DISTFADING;
         s += STEPSIZE;
     }
@@ -235,29 +337,70 @@ class ShaderVisualEngine:
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
-        self.locs = {
-            'iTime': glGetUniformLocation(self.shader, 'iTime'),
-            'iResolution': glGetUniformLocation(self.shader, 'iResolution'),
-            'iLow': glGetUniformLocation(self.shader, 'iLow'),
-            'iMid': glGetUniformLocation(self.shader, 'iMid'),
-            'iHigh': glGetUniformLocation(self.shader, 'iHigh'),
-            'iVolume': glGetUniformLocation(self.shader, 'iVolume')
-        }
+        vfs = shaders.compileShader(VOLUME_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.volume_shader = shaders.compileProgram(vs, vfs)
+
+        names = ('iTime', 'iResolution', 'iLow', 'iMid', 'iHigh', 'iVolume', 'uVolumeScale')
+        self.locs = {name: glGetUniformLocation(self.shader, name) for name in names + ('uVolume',)}
+        self.volume_locs = {name: glGetUniformLocation(self.volume_shader, name) for name in names}
+
+        # FBO de la nebulosa (se crea/redimensiona en ensure_volume_fbo)
+        self.volume_fbo = None
+        self.volume_tex = None
+        self.volume_size = (0, 0)
+
+    def ensure_volume_fbo(self, w, h):
+        """Crea el FBO de la nebulosa o lo reasigna solo si cambia el tamaño"""
+        size = (max(1, -(-w // VOLUME_SCALE)), max(1, -(-h // VOLUME_SCALE)))
+        if self.volume_fbo is not None and self.volume_size == size:
+            return
+        if self.volume_fbo is None:
+            self.volume_fbo = glGenFramebuffers(1)
+            self.volume_tex = glGenTextures(1)
+
+        glBindTexture(GL_TEXTURE_2D, self.volume_tex)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, size[0], size[1], 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.volume_fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.volume_tex, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.volume_size = size
+
+    def set_uniforms(self, locs, w, h, t):
+        glUniform1f(locs['iTime'], t)
+        glUniform2f(locs['iResolution'], float(w), float(h))
+        glUniform1f(locs['iLow'], self.low)
+        glUniform1f(locs['iMid'], self.mid)
+        glUniform1f(locs['iHigh'], self.high)
+        glUniform1f(locs['iVolume'], self.volume)
+        glUniform1f(locs['uVolumeScale'], float(VOLUME_SCALE))
 
     def render(self):
         self.update_audio()
         w, h = self.screen.get_size()
+        t = (pygame.time.get_ticks() - self.start_time) / 1000.0
+        glBindVertexArray(self.vao)
+
+        # Pase 1: nebulosa a baja resolución
+        self.ensure_volume_fbo(w, h)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.volume_fbo)
+        glViewport(0, 0, self.volume_size[0], self.volume_size[1])
+        glUseProgram(self.volume_shader)
+        self.set_uniforms(self.volume_locs, w, h, t)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+
+        # Pase 2: lente, agujero, disco y upsample a resolución completa
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
         glViewport(0, 0, w, h)
         glUseProgram(self.shader)
-        
-        glUniform1f(self.locs['iTime'], (pygame.time.get_ticks() - self.start_time) / 1000.0)
-        glUniform2f(self.locs['iResolution'], float(w), float(h))
-        glUniform1f(self.locs['iLow'], self.low)
-        glUniform1f(self.locs['iMid'], self.mid)
-        glUniform1f(self.locs['iHigh'], self.high)
-        glUniform1f(self.locs['iVolume'], self.volume)
-
-        glBindVertexArray(self.vao)
+        self.set_uniforms(self.locs, w, h, t)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.volume_tex)
+        glUniform1i(self.locs['uVolume'], 0)
         glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
         pygame.display.flip()
 
@@ -10,6 +10,10 @@ Características:
 - Suelo reflectante "Wet Floor"
 - Aberración Cromática (RGB Split) reactiva al audio
 - Glow intenso en bordes (Bloom)
+
+OPTIMIZADO: El túnel se raymarchea una sola vez a una textura (RGBA16F) y el
+RGB split, las scanlines y la viñeta son un pase de post-proceso (antes se
+llamaba a render() tres veces por píxel, una por canal).
 """
 
 from __future__ import division
@@ -30,7 +34,7 @@ void main() {
 }
 """
 
-FRAGMENT_SHADER = """
+SCENE_FRAGMENT_SHADER = """
 #version 330 core
 out vec4 fragColor;
 
@@ -135,14 +139,32 @@ vec3 render(vec2 uv) {
 
 void main() {
     vec2 uv = (gl_FragCoord.xy - 0.5 * iResolution.xy) / iResolution.y;
+    fragColor = vec4(render(uv), 1.0);
+}
+"""
+
+# Post-proceso sobre el túnel ya renderizado: un texture() por canal
+POST_FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+
+uniform sampler2D iScene;
+uniform float iTime;
+uniform vec2 iResolution;
+uniform float iLow;
+
+void main() {
+    vec2 texUV = gl_FragCoord.xy / iResolution;
+    vec2 uv = (gl_FragCoord.xy - 0.5 * iResolution.xy) / iResolution.y;
     
     // Aberración Cromática (RGB Split) reactiva a los golpes
-    float split = 0.005 + iLow * 0.02;
+    // (split en unidades de uv = altura; en coordenadas de textura se divide por el ancho)
+    float split = (0.005 + iLow * 0.02) * iResolution.y / iResolution.x;
     
     vec3 col;
-    col.r = render(uv + vec2(split, 0.0)).r;
-    col.g = render(uv).g;
-    col.b = render(uv - vec2(split, 0.0)).b;
+    col.r = texture(iScene, texUV + vec2(split, 0.0)).r;
+    col.g = texture(iScene, texUV).g;
+    col.b = texture(iScene, texUV - vec2(split, 0.0)).b;
     
     // Scanlines sutiles
     col *= 0.9 + 0.1 * sin(gl_FragCoord.y * 0.5 + iTime * 10.0);
@@ -208,7 +230,7 @@ class ShaderVisualEngine:
 
     def setup_shaders(self):
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
-        fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        fs = shaders.compileShader(SCENE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
         self.locs = {
             'iTime': glGetUniformLocation(self.shader, 'iTime'),
@@ -218,20 +240,74 @@ class ShaderVisualEngine:
             'iHigh': glGetUniformLocation(self.shader, 'iHigh')
         }
 
+        vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(POST_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.post_shader = shaders.compileProgram(vs, fs)
+        self.post_locs = {
+            'iTime': glGetUniformLocation(self.post_shader, 'iTime'),
+            'iResolution': glGetUniformLocation(self.post_shader, 'iResolution'),
+            'iLow': glGetUniformLocation(self.post_shader, 'iLow')
+        }
+        glUseProgram(self.post_shader)
+        glUniform1i(glGetUniformLocation(self.post_shader, 'iScene'), 0)
+
+        # FBO del túnel (se crea/redimensiona en ensure_scene_fbo)
+        self.scene_fbo = None
+        self.scene_tex = None
+        self.scene_size = (0, 0)
+
+    def ensure_scene_fbo(self, w, h):
+        """
+        Crea el FBO del túnel o lo reasigna solo si cambia el tamaño.
+        HDR: la rejilla de neón pasa de 1.0 antes de la viñeta. Espejo en los bordes:
+        con graves fuertes el split se sale del frame y el túnel es simétrico en x,
+        así que el reflejo continúa la imagen
+        """
+        if self.scene_fbo is not None and self.scene_size == (w, h):
+            return
+        if self.scene_fbo is None:
+            self.scene_fbo = glGenFramebuffers(1)
+            self.scene_tex = glGenTextures(1)
+
+        glBindTexture(GL_TEXTURE_2D, self.scene_tex)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA16F, w, h, 0, GL_RGBA, GL_FLOAT, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_MIRRORED_REPEAT)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_MIRRORED_REPEAT)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.scene_fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.scene_tex, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        self.scene_size = (w, h)
+
     def render(self):
         self.update_audio()
         w, h = self.screen.get_size()
+        current_time = (pygame.time.get_ticks() - self.start_time) / 1000.0
+
+        # Pase 1: un solo raymarch por píxel
+        self.ensure_scene_fbo(w, h)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.scene_fbo)
         glViewport(0, 0, w, h)
         glUseProgram(self.shader)
-        
-        glUniform1f(self.locs['iTime'], (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.locs['iTime'], current_time)
         glUniform2f(self.locs['iResolution'], float(w), float(h))
         glUniform1f(self.locs['iLow'], self.low)
         glUniform1f(self.locs['iMid'], self.mid)
         glUniform1f(self.locs['iHigh'], self.high)
-
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+
+        # Pase 2: RGB split + scanlines + viñeta
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glUseProgram(self.post_shader)
+        glUniform1f(self.post_locs['iTime'], current_time)
+        glUniform2f(self.post_locs['iResolution'], float(w), float(h))
+        glUniform1f(self.post_locs['iLow'], self.low)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.scene_tex)
+        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
         pygame.display.flip()
 
     def run(self):
@@ -10,7 +10,12 @@ Características:
 - Paleta de colores dinámica rotativa.
 - Efectos de Glitch / Desplazamiento de UV reactivos a frecuencias altas y MIDI.
 - Navegación de cámara suave controlada por notas MIDI y bajos.
-- Iluminación volumétrica (glow) reactiva.
+- Espectro completo (SpectrumTexture de audio_textures.py) en el rim: un ecualizador
+  alrededor del eje del túnel (graves a la derecha, agudos a la izquierda).
+- Iluminación volumétrica (glow) reactiva: el rim emite por encima de 1.0 y el halo
+  es bloom de postfx.py (cadena de mips), con intensidad marcada por las notas MIDI.
+- OPTIMIZADO: Tubo envolvente (raybounds.py): el hueco central y el exterior no marchan (B = debug)
+- OPTIMIZADO: Prepass de profundidad a 1/4 con cono (depthprepass.py): el viaje por el túnel se marcha por bloques
 """
 
 from __future__ import division
@@ -22,9 +27,23 @@ from OpenGL.GL import shaders
 import numpy as np
 import mido
 import random
+from raybounds import RayBounds, BOUNDS_GLSL
+from depthprepass import DepthPrepass, PREPASS_GLSL
+from postfx import PostChain
+from audio_textures import SpectrumTexture
 
 # Configuración de Audio
 SAMPLES = 1024
+FFT_SIZE = 256          # Texels de la textura de espectro
+FFT_MAPPING = 'log'     # Ángulo alrededor del túnel -> banda (graves primero)
+SPECTRUM_UNIT = 1       # La unidad 0 es la del prepass de profundidad
+
+CAPTION = 'Preset 36: Mandelbrot Glitch 3D'
+TUNNEL_FOLD = 1.2    # Desplazamiento del fold de map() (abs(p.xy) - 1.2)
+BULB_REACH = 1.5     # Más allá de este radio el DE del mandelbulb no baja de SURF_DIST
+DEPTH_PREPASS = True # Marcha a 1/4 de resolución y el pase completo solo refina
+BLOOM_BASE = 0.4     # Bloom en reposo
+BLOOM_KICK = 2.0     # Bloom extra con una nota a velocidad máxima
 
 VERTEX_SHADER = """
 #version 330 core
@@ -43,6 +62,7 @@ uniform vec2 iResolution;
 uniform float iLow;
 uniform float iMid;
 uniform float iHigh;
+uniform sampler1D iSpectrum;  // Espectro completo (log)
 
 // MIDI Uniforms
 uniform float iGlitch;    // Intensidad del glitch (MIDI Note / Highs)
@@ -53,6 +73,7 @@ uniform float iMorph;     // Modificaci\u00f3n del fractal (Power)
 #define MAX_STEPS 64
 #define MAX_DIST 60.0
 #define SURF_DIST 0.005
+""" + BOUNDS_GLSL + PREPASS_GLSL + """
 
 // Funciones de utilidad
 mat2 rot(float a) {
@@ -117,9 +138,11 @@ float map(vec3 p) {
     return mandelbulb(q);
 }
 
-float rayMarch(vec3 ro, vec3 rd) {
-    float dO = 0.0;
+// Solo dentro del tubo envolvente
+float rayMarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float dO = tNear;
     float dS;
+    float tMax = min(tFar, MAX_DIST);
     
     // Dither inicial para romper banding
     dO += random(gl_FragCoord.xy) * 0.1;
@@ -128,7 +151,8 @@ float rayMarch(vec3 ro, vec3 rd) {
         vec3 p = ro + rd * dO;
         dS = map(p);
         dO += dS * 0.8; // Step m\u00e1s peque\u00f1o para m\u00e1s detalle
-        if(dO > MAX_DIST || dS < SURF_DIST) break;
+        if(dS < max(SURF_DIST, prepassCone(dO))) break;
+        if(dO > tMax) return MAX_DIST;
     }
     return dO;
 }
@@ -145,17 +169,19 @@ vec3 getNormal(vec3 p) {
 }
 
 void main() {
-    vec2 uv = (gl_FragCoord.xy - 0.5 * iResolution.xy) / iResolution.y;
+    vec2 uv = (prepassCoord() - 0.5 * iResolution.xy) / iResolution.y;
 
     // --- GLITCH EFFECT (VFX) ---
     // Distorsi\u00f3n fuerte en el UV basada en High Freqs y MIDI
     float glitchIntensity = iGlitch + iHigh * 0.5;
+    vec2 rayCoord = prepassCoord();   // Píxel con el mismo rayo en el prepass (sin tearing)
     
     if (glitchIntensity > 0.1) {
-        // Desplazamiento horizontal aleatorio (tearing)
+        // Desplazamiento horizontal aleatorio (tearing); el prepass marcha los rayos sin rasgar
         float noise = random(vec2(floor(uv.y * 20.0), iTime));
-        if (noise < glitchIntensity * 0.5) {
+        if (noise < glitchIntensity * 0.5 && !prepassWriting()) {
             uv.x += (random(vec2(iTime, uv.y)) - 0.5) * 0.2;
+            rayCoord.x = uv.x * iResolution.y + 0.5 * iResolution.x;
         }
         
         // Zoom glitch brusco
@@ -171,8 +197,16 @@ void main() {
     // Camera wobble muy suave y lento (sin audio)
     rd.xy *= rot(sin(iTime * 0.3) * 0.05);
 
-    // Render
-    float d = rayMarch(ro, rd);
+    // Render (sin cortar el tubo envolvente no hay nada que marchar)
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+
+    // Prepass a baja resolución: solo la distancia de partida del bloque
+    if (prepassWriting()) { fragColor = vec4(hit ? prepassDepth(rayMarch(ro, rd, tNear, tFar)) : MAX_DIST); return; }
+    // Las filas rasgadas leen el prepass desplazado con ellas; se resta el dither
+    float tStart = max(tNear, prepassStart(tNear, rayCoord) - 0.1);
+    float d = hit ? rayMarch(ro, rd, tStart, tFar) : MAX_DIST;
     vec3 col = vec3(0.0);
     
     if(d < MAX_DIST) {
@@ -196,9 +230,11 @@ void main() {
         
         col = baseCol * diff;
         
-        // Rim lighting reactivo (brillo en bordes)
+        // Rim lighting reactivo (brillo en bordes; HDR: el halo lo añade el bloom)
         float rim = pow(1.0 - max(dot(n, -rd), 0.0), 3.0);
         col += vec3(iLow, iMid*0.5, iHigh) * rim * 2.0;
+        // Banda del espectro según el ángulo en pantalla alrededor del eje del túnel
+        col += baseCol * rim * texture(iSpectrum, abs(atan(uv.y, uv.x)) / 3.14159).r * 2.0;
         
         // Fog para profundidad infinita
         float fogAmt = 1.0 - exp(-d * 0.05);
@@ -231,7 +267,7 @@ void main() {
     // Gamma
     col = pow(col, vec3(0.4545));
     
-    fragColor = vec4(col, 1.0);
+    fragColor = vec4(boundsDebugTint(col, !hit), 1.0);
 }
 """
 
@@ -248,7 +284,7 @@ class MandelbrotGlitchPreset:
         initial_w = int(initial_h * self.aspect_ratio)
 
         self.screen = pygame.display.set_mode((initial_w, initial_h), DOUBLEBUF | OPENGL | RESIZABLE)
-        pygame.display.set_caption('Preset 36: Mandelbrot Glitch 3D')
+        pygame.display.set_caption(CAPTION)
 
         # Audio Init
         self.audio_buffer = np.zeros(SAMPLES, dtype=np.float32)
@@ -330,6 +366,8 @@ class MandelbrotGlitchPreset:
         self.low  = self.low * 0.9 + np.mean(fft[0:10]) * 0.1
         self.mid  = self.mid * 0.9 + np.mean(fft[10:50]) * 0.1
         self.high = self.high * 0.8 + np.mean(fft[50:150]) * 0.15 # Decay más rápido en agudos para glitch
+        # Espectro completo para el rim
+        self.spectrum.update(fft / SAMPLES * 10.0)
 
     def setup_quad(self):
         vertices = np.array([-1.0, -1.0, 1.0, -1.0, -1.0, 1.0, 1.0, 1.0], dtype=np.float32)
@@ -345,7 +383,8 @@ class MandelbrotGlitchPreset:
         try:
             vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
             fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-            self.shader = shaders.compileProgram(vs, fs)
+            # Sin validación: sampler1D (espectro) y sampler2D (prepass) comparten unidad 0 hasta asignarlas
+            self.shader = shaders.compileProgram(vs, fs, validate=False)
             self.locs = {
                 'iTime': glGetUniformLocation(self.shader, 'iTime'),
                 'iResolution': glGetUniformLocation(self.shader, 'iResolution'),
@@ -355,8 +394,16 @@ class MandelbrotGlitchPreset:
                 'iGlitch': glGetUniformLocation(self.shader, 'iGlitch'),
                 'iColorShift': glGetUniformLocation(self.shader, 'iColorShift'),
                 'iZoom': glGetUniformLocation(self.shader, 'iZoom'),
-                'iMorph': glGetUniformLocation(self.shader, 'iMorph')
+                'iMorph': glGetUniformLocation(self.shader, 'iMorph'),
+                'iSpectrum': glGetUniformLocation(self.shader, 'iSpectrum')
             }
+            self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING, smoothing=0.3)
+            self.bounds = RayBounds(self.shader)
+            self.prepass = DepthPrepass(self.shader, enabled=DEPTH_PREPASS)
+            # Bloom del rim; la envolvente de notas (midi_glitch_val) hace de kick
+            self.post = PostChain(['bloom'],
+                                  midi_map={'bloom.amount': ('midi_glitch_val', BLOOM_KICK, BLOOM_BASE)})
+            self.post.set('bloom', threshold=1.0, knee=0.5)
         except Exception as e:
             print(f"Shader Error: {e}")
             pygame.quit()
@@ -367,7 +414,7 @@ class MandelbrotGlitchPreset:
         self.process_midi()
         
         w, h = self.screen.get_size()
-        glViewport(0, 0, w, h)
+        self.post.begin(w, h)
         glUseProgram(self.shader)
         
         time_sec = (pygame.time.get_ticks() - self.start_time) / 1000.0
@@ -386,9 +433,23 @@ class MandelbrotGlitchPreset:
         glUniform1f(self.locs['iColorShift'], self.midi_color_val)
         glUniform1f(self.locs['iZoom'], final_zoom)
         glUniform1f(self.locs['iMorph'], self.midi_morph_val)
+        self.spectrum.bind(SPECTRUM_UNIT)
+        glActiveTexture(GL_TEXTURE0)
+        glUniform1i(self.locs['iSpectrum'], SPECTRUM_UNIT)
+
+        # Tubo envolvente: el twist y el fold conservan |p.xy|, así que los bulbos
+        # (radio BULB_REACH alrededor de (±1.2, ±1.2)) quedan en esta corteza
+        corner = TUNNEL_FOLD * 2 ** 0.5
+        self.bounds.tube(corner - BULB_REACH, corner + BULB_REACH)
+        self.bounds.apply()
 
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        self.prepass.draw(lambda: glDrawArrays(GL_TRIANGLE_STRIP, 0, 4), (0, 0, w, h), 1.0 / h)
+        self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_STRIP, 0, 4), w * h)
+        self.post.apply_midi(self)
+        self.post.end(0, 0, w, h, time_sec)
+        if self.bounds.debug:
+            pygame.display.set_caption(CAPTION + self.bounds.label())
         pygame.display.flip()
 
     def run(self):
@@ -397,6 +458,9 @@ class MandelbrotGlitchPreset:
             for event in pygame.event.get():
                 if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
                     running = False
+                elif event.type == KEYDOWN and event.key == K_b:
+                    self.bounds.debug = not self.bounds.debug
+                    pygame.display.set_caption(CAPTION)
             self.render()
             self.clock.tick(60)
         pygame.quit()
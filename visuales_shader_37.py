@@ -6,10 +6,14 @@ Simulación de partículas de arena/polvo volumétrico que se comportan como
 bandadas (swarms) orgánicas, con iluminación de atardecer y rayos de sol (God Rays).
 
 Características:
-- Renderizado Volumétrico (Raymarching de densidad) para simular millones de partículas.
+- Partículas 3D reales en GPU (particles.py): transform feedback + point sprites.
+  El fragment shader solo pinta el cielo, el sol y el glitch (sin raymarching de volumen).
 - Movimiento de fluidos (Curl Noise) para imitar el comportamiento de bandadas.
+  El ruido 3D de las partículas sale de la textura compartida de noisetex.py (NOISE_TEXTURES).
 - Iluminación atmosférica con dispersión de luz (Sun Rays).
 - Reactividad suave: La música altera la densidad y el color, no sacude la cámara.
+  Cada grano brilla además con su propia banda del espectro completo
+  (SpectrumTexture de audio_textures.py, banda = semilla del grano).
 """
 
 from __future__ import division
@@ -21,8 +25,16 @@ from OpenGL.GL import shaders
 import numpy as np
 import mido
 import random
+from particles import ParticleSystem, random_state
+from noisetex import NoiseTextures, NOISE_TEX_GLSL
+from audio_textures import SpectrumTexture
 
 SAMPLES = 1024
+FFT_SIZE = 256          # Texels de la textura de espectro
+FFT_MAPPING = 'log'     # Más resolución en graves
+PARTICLE_COUNT = 40000
+SWARM_RADIUS = 3.0  # Radio de la capa hacia la que se agrupa la bandada
+NOISE_TEXTURES = True  # Ruido 3D desde textura (noisetex.py); False = hash con sin()
 
 VERTEX_SHADER = """
 #version 330 core
@@ -32,29 +44,14 @@ void main() {
 }
 """
 
-FRAGMENT_SHADER = """
-#version 330 core
-out vec4 fragColor;
-
-uniform float iTime;
-uniform vec2 iResolution;
-uniform float iLow;
-uniform float iMid;
-uniform float iHigh;
-
-// MIDI Params
-uniform float iTurbulence; // Modifica el ruido (CC)
-uniform float iSunIntensity; // Intensidad del sol (CC)
-uniform float iGlitch;     // Glitch visual (Note)
-
+NOISE_GLSL = NOISE_TEX_GLSL + """
 // --------------------------------------------------------
 // Noise & FBM Functions
 // --------------------------------------------------------
-mat2 rot(float a) { float s=sin(a), c=cos(a); return mat2(c,-s,s,c); }
-
 float hash(float n) { return fract(sin(n) * 43758.5453123); }
 
 float noise(vec3 x) {
+    if (uNoiseTextures == 1) return noiseTex(x);
     vec3 p = floor(x);
     vec3 f = fract(x);
     f = f*f*(3.0-2.0*f);
@@ -67,6 +64,7 @@ float noise(vec3 x) {
 
 // Fractal Brownian Motion para dar textura de "arena"
 float fbm(vec3 p) {
+    if (uNoiseTextures == 1) return fbmTex(p, 5);
     float f = 0.0;
     float w = 0.5;
     for(int i=0; i<5; i++) {
@@ -76,35 +74,25 @@ float fbm(vec3 p) {
     }
     return f;
 }
+"""
 
-// --------------------------------------------------------
-// Volumetric Map (Density)
-// --------------------------------------------------------
-float map(vec3 p) {
-    // Movimiento fluido (Flow)
-    vec3 q = p;
-    
-    // Desplazamiento lento por el viento/tiempo
-    q.x += iTime * 0.2;
-    q.y -= iTime * 0.1;
-    
-    // Deformación orgánica (Swarm behavior simulado)
-    // El audio (iLow) empuja las partículas suavemente
-    float flow = iTime * 0.5 + iLow * 0.1;
-    q.x += sin(q.z * 0.5 + flow) * 1.0;
-    q.z += cos(q.y * 0.5 + flow) * 1.0;
-    
-    // Densidad base: Esferas deformadas dispersas
-    float d = length(q) - 3.0;
-    
-    // Añadir textura de arena detallada
-    // iTurbulence añade caos a la formación
-    float sand = fbm(q * 2.0 + vec3(iTurbulence));
-    
-    // Forma final: Nube densa con huecos
-    return max(-(length(p) - 1.0), sand - 0.4); 
-}
+FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+
+uniform float iTime;
+uniform vec2 iResolution;
+uniform float iLow;
+uniform float iMid;
+uniform float iHigh;
+
+// MIDI Params
+uniform float iTurbulence; // Modifica el ruido (CC)
+uniform float iSunIntensity; // Intensidad del sol (CC)
+uniform float iGlitch;     // Glitch visual (Note)
 
+mat2 rot(float a) { float s=sin(a), c=cos(a); return mat2(c,-s,s,c); }
+""" + NOISE_GLSL + """
 // --------------------------------------------------------
 // Main Rendering
 // --------------------------------------------------------
@@ -119,43 +107,11 @@ void main() {
     ro.xz *= rot(iTime * 0.1);
     rd.xz *= rot(iTime * 0.1);
 
-    // --- Volumetric Marching ---
-    vec3 p = ro;
-    vec3 col = vec3(0.0);
-    float tot_density = 0.0;
-    
     // Posición del Sol
     vec3 sunPos = normalize(vec3(0.5, 0.4, 0.5));
     
-    // Raymarching de volumen (acumulativo)
-    // Simula luz atravesando polvo/arena
-    for(int i=0; i<64; i++) {
-        float dens = map(p);
-        
-        // Si estamos dentro de la "arena" (densidad > threshold)
-        if(dens > 0.01) {
-            float dens_factor = dens * 0.05; // Opacidad parcial
-            tot_density += dens_factor;
-            
-            // Color Arena/Oro
-            vec3 sandColor = vec3(0.9, 0.7, 0.4); // Dorado base
-            
-            // Variación de color con música (Sutil)
-            sandColor += vec3(iHigh * 0.5, iLow * 0.2, 0.0);
-            
-            // Iluminación direccional (Sol) dentro del volumen
-            float sunDif = clamp(dot(normalize(p), sunPos), 0.0, 1.0);
-            
-            // Acumular color
-            col += sandColor * dens_factor * (0.5 + sunDif * 2.0);
-            
-            // Auto-sombreado (densidad absorbe luz)
-            col *= 1.0 - tot_density * 0.1;
-        }
-        
-        p += rd * 0.15; // Step size
-        if(tot_density > 1.0) break; // Saturación
-    }
+    // La arena se dibuja encima como partículas
+    vec3 col = vec3(0.0);
     
     // --- Background & Sun ---
     vec3 bg = vec3(0.6, 0.4, 0.2) * 0.2; // Fondo atardecer oscuro
@@ -167,9 +123,7 @@ void main() {
     bg += vec3(1.0, 0.9, 0.6) * pow(sun, 50.0) * iSunIntensity; // Sol disco
     bg += vec3(1.0, 0.6, 0.3) * pow(sun, 5.0) * 0.5; // Sol glow
     
-    // God Rays (Simulado simple)
-    // Si miramos al sol y hay densidad, aumentamos el brillo
-    col += bg * (1.0 - tot_density * 0.8);
+    col += bg;
     
     // --- Glitch VFX (Natural/Organic) ---
     // Aberración cromática solo en golpes fuertes (iHigh)
@@ -191,6 +145,93 @@ void main() {
 }
 """
 
+# Bandada: flujo sin/cos del antiguo map() + turbulencia, atraída a una capa esférica
+PARTICLE_UPDATE = NOISE_GLSL + """
+uniform float iLow;
+uniform float iTurbulence;
+uniform float uRadius;
+
+void updateParticle(inout vec4 pos, inout vec4 vel) {
+    vec3 p = pos.xyz;
+
+    // Desplazamiento lento por el viento + deformación orgánica (iLow empuja suavemente)
+    float flow = uTime * 0.5 + iLow * 0.1;
+    vec3 v = vec3(0.2, -0.1, 0.0);
+    v += vec3(sin(p.z * 0.5 + flow), sin(p.x * 0.7 + flow * 1.3) * 0.3, cos(p.y * 0.5 + flow)) * 0.5;
+
+    // iTurbulence añade caos a la formación
+    vec3 n = vec3(noise(p * 1.5 + uTime * 0.3),
+                  noise(p * 1.5 + vec3(17.0, uTime * 0.3, 0.0)),
+                  noise(p * 1.5 + vec3(0.0, 31.0, uTime * 0.3))) - 0.5;
+    v += n * (0.5 + iTurbulence);
+
+    // Cohesión: atracción hacia la capa de radio uRadius
+    float r = length(p);
+    v += p / max(r, 1e-3) * (uRadius - r) * 0.3;
+
+    // Inercia suave (velocidad filtrada)
+    vel.xyz = mix(vel.xyz, v, clamp(uDelta * 2.0, 0.0, 1.0));
+    pos.xyz += vel.xyz * uDelta * 0.5;
+
+    // Vida: reaparece en una dirección aleatoria cerca de la capa
+    pos.w -= uDelta * 0.05;
+    if (pos.w < 0.0) {
+        float h = particleHash(vel.w * 53.7 + uTime);
+        vec3 dir = normalize(vec3(particleHash(h * 3.1), particleHash(h * 7.7), particleHash(h * 9.3)) - 0.5 + 1e-4);
+        pos.xyz = dir * uRadius * (0.4 + 1.2 * particleHash(h * 5.9));
+        vel.xyz = vec3(0.0);
+        pos.w = 1.0;
+    }
+}
+"""
+
+PARTICLE_RENDER = NOISE_GLSL + """
+uniform float iLow;
+uniform float iHigh;
+uniform sampler1D iSpectrum;  // Espectro completo (log); unidad 0, el ruido va en 1-3
+uniform float iTurbulence;
+uniform float uAspect;
+uniform float uPointScale;
+
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    vec3 p = pos.xyz;
+
+    // Cámara: ro = (0, 0, -4) rotando alrededor de y (igual que el fondo)
+    float a = uTime * 0.1;
+    mat2 r = mat2(cos(a), -sin(a), sin(a), cos(a));
+    vec3 ro = vec3(0.0, 0.0, -4.0);
+    ro.xz *= r;
+    vec3 d = p - ro;
+    d.xz = r * d.xz;
+
+    color = vec3(0.0);
+    size = 0.0;
+    if (d.z < 0.2) return vec4(0.0, 0.0, 2.0, 1.0);  // Detrás de la cámara: recortada
+
+    // Textura de arena: huecos donde el fbm es bajo (como el antiguo volumen)
+    float flow = uTime * 0.5 + iLow * 0.1;
+    vec3 q = p + vec3(uTime * 0.2, -uTime * 0.1, 0.0);
+    q.x += sin(q.z * 0.5 + flow);
+    q.z += cos(q.y * 0.5 + flow);
+    float dens = smoothstep(0.3, 0.55, fbm(q * 2.0 + vec3(iTurbulence)));
+
+    // Color Arena/Oro con variación sutil por música
+    vec3 sandColor = vec3(0.9, 0.7, 0.4) + vec3(iHigh * 0.5, iLow * 0.2, 0.0);
+    sandColor += vec3(0.6, 0.4, 0.2) * texture(iSpectrum, vel.w).r;  // Banda del grano
+
+    // Iluminación direccional (Sol)
+    vec3 sunPos = normalize(vec3(0.5, 0.4, 0.5));
+    float sunDif = clamp(dot(normalize(p), sunPos), 0.0, 1.0);
+
+    float fade = smoothstep(0.0, 0.1, pos.w) * smoothstep(1.0, 0.9, pos.w);
+    color = sandColor * (0.5 + sunDif * 2.0) * dens * fade;
+    size = clamp(24.0 / d.z, 2.0, 32.0) * uPointScale;
+
+    vec2 uv = d.xy / d.z;
+    return vec4(uv.x * 2.0 / uAspect, uv.y * 2.0, 0.0, 1.0);
+}
+"""
+
 class DesertSwarmPreset:
     def __init__(self):
         pygame.init()
@@ -218,8 +259,10 @@ class DesertSwarmPreset:
 
         self.setup_shaders()
         self.setup_quad()
+        self.setup_particles()
         self.clock = pygame.time.Clock()
         self.start_time = pygame.time.get_ticks()
+        self.last_ticks = self.start_time
 
     def connect_midi(self):
         try:
@@ -257,7 +300,9 @@ class DesertSwarmPreset:
 
     def update_audio(self):
         if len(self.audio_buffer) == 0: return
-        fft = np.abs(np.fft.rfft(self.audio_buffer))
+        # n = SAMPLES: el callback puede entregar otro tamaño y la tabla del espectro es para SAMPLES
+        fft = np.abs(np.fft.rfft(self.audio_buffer, SAMPLES))
+        self.spectrum.update(fft / SAMPLES * 10.0)
         self.low  = self.low * 0.95 + np.mean(fft[0:10]) * 0.05
         self.mid  = self.mid * 0.95 + np.mean(fft[10:50]) * 0.05
         self.high = self.high * 0.9 + np.mean(fft[50:150]) * 0.1
@@ -287,14 +332,37 @@ class DesertSwarmPreset:
             'iGlitch': glGetUniformLocation(self.shader, 'iGlitch')
         }
 
+    def setup_particles(self):
+        # Posiciones iniciales en un cascarón alrededor de SWARM_RADIUS
+        state = random_state(PARTICLE_COUNT, low=(-1.0, -1.0, -1.0), high=(1.0, 1.0, 1.0))
+        dirs = state[:, 0:3] / np.maximum(np.linalg.norm(state[:, 0:3], axis=1, keepdims=True), 1e-3)
+        radii = SWARM_RADIUS * np.random.uniform(0.4, 1.6, (PARTICLE_COUNT, 1))
+        state[:, 0:3] = dirs * radii
+        self.particles = ParticleSystem(PARTICLE_COUNT, PARTICLE_UPDATE, PARTICLE_RENDER, state)
+        self.noise = NoiseTextures([self.particles.update_shader, self.particles.render_shader],
+                                   unit=1, enabled=NOISE_TEXTURES)
+        self.spectrum = SpectrumTexture(SAMPLES // 2 + 1, size=FFT_SIZE, mapping=FFT_MAPPING, smoothing=0.3)
+        glUseProgram(self.particles.render_shader)
+        glUniform1i(glGetUniformLocation(self.particles.render_shader, 'iSpectrum'), 0)
+
     def render(self):
         self.update_audio()
         self.process_midi()
         w, h = self.screen.get_size()
+        ticks = pygame.time.get_ticks()
+        t = (ticks - self.start_time) / 1000.0
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Avanzar la bandada (transform feedback, sin rasterizar)
+        self.noise.bind()
+        self.particles.step(uTime=t, uDelta=dt, iLow=self.low, iTurbulence=self.midi_turbulence,
+                            uRadius=SWARM_RADIUS)
+
         glViewport(0, 0, w, h)
         glUseProgram(self.shader)
         
-        glUniform1f(self.locs['iTime'], (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.locs['iTime'], t)
         glUniform2f(self.locs['iResolution'], float(w), float(h))
         glUniform1f(self.locs['iLow'], self.low)
         glUniform1f(self.locs['iMid'], self.mid)
@@ -305,6 +373,11 @@ class DesertSwarmPreset:
 
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+
+        # Arena como sprites aditivos sobre el cielo
+        self.spectrum.bind(0)
+        self.particles.draw(uTime=t, iLow=self.low, iHigh=self.high, iTurbulence=self.midi_turbulence,
+                            uAspect=w / h, uPointScale=h / 900.0)
         pygame.display.flip()
 
     def run(self):
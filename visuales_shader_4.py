@@ -3,6 +3,9 @@
 Preset 4: Mandelbulb - 3D Fractal Organic Evolution
 Category: Fractal/SDF Advanced
 Evolves power and detail with kicks
+OPTIMIZADO: Pasos lejanos con el bulbo horneado en un volumen 128^3 (sdfvolume.py)
+OPTIMIZADO: Esfera envolvente (raybounds.py): el fondo no marcha (B = debug)
+OPTIMIZADO: Prepass de profundidad a 1/4 con cono (depthprepass.py): la aproximación se marcha por bloques
 """
 
 from __future__ import division
@@ -13,35 +16,21 @@ from OpenGL.GL import shaders
 import mido
 from sys import exit as exitsystem
 from numpy import array
+from sdfvolume import SDFVolume, SAMPLE_GLSL
+from raybounds import RayBounds, BOUNDS_GLSL
+from depthprepass import DepthPrepass, PREPASS_GLSL
 
 KICK_NOTE = 60
 CLOSEHAT_NOTE = 62
 TOM1_NOTE = 64
 TOM2_NOTE = 65
 
-VERTEX_SHADER = """
-#version 330 core
-layout(location = 0) in vec3 vPos;
-void main() { gl_Position = vec4(vPos, 1.0); }
-"""
-
-FRAGMENT_SHADER = """
-#version 330 core
-#define fragCoord gl_FragCoord.xy
-
-uniform float iTime;
-uniform vec2  iResolution;
-uniform float iKickPulse;
-uniform float iHatGlitch;
-uniform float iTom1Morph;
-uniform float iTom2Spin;
-
-out vec4 fragColor;
-
-float hash(vec2 p) {
-    return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453);
-}
+SDF_BOUNDS = 1.5     # Radio del bulbo (power 4-12) antes de escalar con Tom1
+POWER_STEP = 0.25    # El volumen se rehornea al cambiar la potencia en este paso
+CAPTION = 'Preset 4: Mandelbulb [9:16]'
+DEPTH_PREPASS = True # Marcha a 1/4 de resolución y el pase completo solo refina
 
+MANDELBULB_GLSL = """
 // Mandelbulb SDF
 float mandelbulb(vec3 pos, float power) {
     vec3 z = pos;
@@ -73,14 +62,39 @@ float mandelbulb(vec3 pos, float power) {
 
     return 0.5 * log(r) * r / dr;
 }
+"""
 
-float map(vec3 p) {
-    // Kick evolves power (4 to 12)
-    float power = 4.0 + iKickPulse * 8.0;
+# Función horneada: el bulbo sin escala ni glitch, con la potencia cuantizada
+SDF_GLSL = MANDELBULB_GLSL + """
+uniform float uPower;
+float sdf(vec3 p) { return mandelbulb(p, uPower); }
+"""
 
-    // Tom1 scales the bulb
-    float scale = 1.0 + iTom1Morph * 0.5;
+VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 vPos;
+void main() { gl_Position = vec4(vPos, 1.0); }
+"""
 
+FRAGMENT_SHADER = """
+#version 330 core
+#define fragCoord prepassCoord()
+
+uniform float iTime;
+uniform vec2  iResolution;
+uniform float iKickPulse;
+uniform float iHatGlitch;
+uniform float iTom1Morph;
+uniform float iTom2Spin;
+
+out vec4 fragColor;
+
+float hash(vec2 p) {
+    return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453);
+}
+
+""" + MANDELBULB_GLSL + SAMPLE_GLSL + BOUNDS_GLSL + PREPASS_GLSL + """
+vec3 warp(vec3 p) {
     // Hat distorts space
     if(iHatGlitch > 0.1) {
         p += vec3(
@@ -89,8 +103,30 @@ float map(vec3 p) {
             hash(p.xz + iTime + 20.0) - 0.5
         ) * iHatGlitch * 0.2;
     }
+    return p;
+}
 
-    return mandelbulb(p / scale, power) * scale;
+float map(vec3 p) {
+    // Kick evolves power (4 to 12)
+    float power = 4.0 + iKickPulse * 8.0;
+
+    // Tom1 scales the bulb
+    float scale = 1.0 + iTom1Morph * 0.5;
+
+    return mandelbulb(warp(p) / scale, power) * scale;
+}
+
+// Pasos lejanos con el volumen horneado; DE exacto solo cerca de la superficie.
+// Ya cerca se sigue con el DE exacto hasta alejarse de nuevo (sin pagar los dos)
+float mapFar(vec3 p, inout bool far) {
+    float scale = 1.0 + iTom1Morph * 0.5;
+    if (far && uSDFReady == 1) {
+        float d = sdfVolume(warp(p) / scale);
+        if (d > 2.0 * uSDFMargin) return d * scale;
+    }
+    float d = map(p);
+    far = d > 4.0 * uSDFMargin * scale;
+    return d;
 }
 
 vec3 calcNormal(vec3 p) {
@@ -103,14 +139,17 @@ vec3 calcNormal(vec3 p) {
     ));
 }
 
-float raymarch(vec3 ro, vec3 rd) {
-    float t = 0.0;
+// Solo dentro de la esfera envolvente
+float raymarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float t = tNear;
+    float tMax = min(tFar, 20.0);
+    bool far = true;
     for(int i = 0; i < 60; i++) {
         vec3 p = ro + rd * t;
-        float d = map(p);
-        if(d < 0.001) break;
+        float d = mapFar(p, far);
+        if(d < max(0.001, prepassCone(t))) break;
         t += d * 0.7;
-        if(t > 20.0) break;
+        if(t > tMax) return 20.0;
     }
     return t;
 }
@@ -145,7 +184,14 @@ void main()
     vec3 up = cross(forward, right);
     vec3 rd = normalize(forward + p.x * right + p.y * up);
 
-    float t = raymarch(ro, rd);
+    // Sin cortar la esfera envolvente no hay nada que marchar
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+
+    // Prepass a baja resolución: solo la distancia de partida del bloque
+    if (prepassWriting()) { fragColor = vec4(hit ? prepassDepth(raymarch(ro, rd, tNear, tFar)) : 20.0); return; }
+    float t = hit ? raymarch(ro, rd, prepassStart(tNear, fragCoord), tFar) : 20.0;
 
     vec3 color = vec3(0.0);
 
@@ -171,7 +217,7 @@ void main()
     color = color / (color + 1.0);
     color = pow(color, vec3(0.4545));
 
-    fragColor = vec4(color, 1.0);
+    fragColor = vec4(boundsDebugTint(color, !hit), 1.0);
 }
 """
 
@@ -201,11 +247,12 @@ class ShaderVisualEngine:
 
         pygame.display.gl_set_attribute(pygame.GL_SWAP_CONTROL, 1)
         self.screen = pygame.display.set_mode((initial_width, initial_height), DOUBLEBUF | OPENGL | RESIZABLE)
-        pygame.display.set_caption('Preset 4: Mandelbulb [9:16]')
+        pygame.display.set_caption(CAPTION)
 
         self.vertex_shader = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         self.fragment_shader = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
-        self.shader = shaders.compileProgram(self.vertex_shader, self.fragment_shader)
+        # Sin validación: sampler3D y sampler2D (prepass) comparten unidad 0 hasta asignarlas abajo
+        self.shader = shaders.compileProgram(self.vertex_shader, self.fragment_shader, validate=False)
 
         self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
@@ -213,6 +260,16 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_sdf_ready = glGetUniformLocation(self.shader, 'uSDFReady')
+
+        # Volumen SDF del bulbo (se rehornea al cambiar la potencia)
+        self.sdf_volume = SDFVolume(SDF_GLSL, SDF_BOUNDS)
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'uSDFVolume'), 0)
+        self.sdf_volume.set_uniforms(self.shader)
+        self.bounds = RayBounds(self.shader)
+        self.prepass = DepthPrepass(self.shader, unit=1, enabled=DEPTH_PREPASS)
+        glUniform1i(glGetUniformLocation(self.shader, 'uPrepassDepth'), 1)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -312,6 +369,10 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Misma potencia que map() en el shader, cuantizada
+        power = 4.0 + self.kick_pulse * 8.0
+        sdf_ready = self.sdf_volume.update({'uPower': round(power / POWER_STEP) * POWER_STEP})
+
         glViewport(vx, vy, vw, vh)
         # Dibujar shader principal
         glUseProgram(self.shader)
@@ -322,9 +383,20 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_hat, self.hat_glitch)
         glUniform1f(self.uni_tom1, self.tom1_morph)
         glUniform1f(self.uni_tom2, self.tom2_spin)
+        glUniform1i(self.uni_sdf_ready, int(sdf_ready))  # Volumen de otros parámetros: solo DE exacto
+        self.sdf_volume.bind(0)
+
+        # Esfera envolvente: el bulbo escalado (Tom1) + el desplazamiento del hat
+        scale = 1.0 + self.tom1_morph * 0.5
+        warp = self.hat_glitch * 0.1 * 3 ** 0.5 if self.hat_glitch > 0.1 else 0.0
+        self.bounds.sphere(SDF_BOUNDS * scale + warp + 0.01)
+        self.bounds.apply()
 
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.prepass.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), (vx, vy, vw, vh), 1.0 / vw)
+        self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), vw * vh)
+        if self.bounds.debug:
+            pygame.display.set_caption(CAPTION + self.bounds.label())
         pygame.display.flip()
 
     def run(self):
@@ -344,6 +416,9 @@ class ShaderVisualEngine:
                         self.tom1_morph = min(1.0, self.tom1_morph + 0.6)
                     elif event.key == K_y:
                         self.tom2_spin = min(1.0, self.tom2_spin + 0.7)
+                    elif event.key == K_b:
+                        self.bounds.debug = not self.bounds.debug
+                        pygame.display.set_caption(CAPTION)
 
             self.process_midi()
             self.update_params()
@@ -3,6 +3,8 @@
 Preset 6: Sierpinski Pyramid - Tetrahedral Fractal
 Category: Fractal/SDF Advanced
 3D triangular fractal evolution
+OPTIMIZADO: Pasos lejanos con la pirámide horneada en un volumen 128^3 (sdfvolume.py)
+OPTIMIZADO: Caja envolvente (raybounds.py): el fondo no marcha (B = debug)
 """
 
 from __future__ import division
@@ -12,8 +14,44 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from sdfvolume import SDFVolume, SAMPLE_GLSL
+from raybounds import RayBounds, BOUNDS_GLSL
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+SDF_BOUNDS = 1.2     # Tetraedro de vértices (±1, ±1, ±1)
+SCALE_STEP = 0.05    # El volumen se rehornea al cambiar la escala (Tom1) en este paso
+CAPTION = 'Preset 6: Sierpinski Pyramid [9:16]'
+
+SIERPINSKI_GLSL = """
+// Tetrahedron folding for Sierpinski
+vec3 tetraFold(vec3 p) {
+    if(p.x + p.y < 0.0) p.xy = -p.yx;
+    if(p.x + p.z < 0.0) p.xz = -p.zx;
+    if(p.y + p.z < 0.0) p.zy = -p.yz;
+    return p;
+}
+
+float sdTetrahedron(vec3 p, float r) {
+    float md = max(max(-p.x - p.y - p.z, p.x + p.y - p.z),
+                   max(-p.x + p.y + p.z, p.x - p.y + p.z));
+    return (md - r) / sqrt(3.0);
+}
+
+float sierpinski(vec3 p, int iterations, float scale) {
+    for(int i = 0; i < iterations; i++) {
+        p = tetraFold(p);
+        p = p * scale - vec3(scale - 1.0);
+    }
+    return sdTetrahedron(p, 1.0) * pow(scale, -float(iterations));
+}
+"""
+
+# Función horneada: la pirámide sin glitch, con iteraciones y escala cuantizada
+SDF_GLSL = SIERPINSKI_GLSL + """
+uniform int uIterations;
+uniform float uScale;
+float sdf(vec3 p) { return sierpinski(p, uIterations, uScale); }
+"""
 
 VERTEX_SHADER = """
 #version 330 core
@@ -33,34 +71,30 @@ out vec4 fragColor;
 
 float hash(vec2 p) { return fract(sin(dot(p, vec2(127.1, 311.7))) * 43758.5453); }
 
-// Tetrahedron folding for Sierpinski
-vec3 tetraFold(vec3 p) {
-    if(p.x + p.y < 0.0) p.xy = -p.yx;
-    if(p.x + p.z < 0.0) p.xz = -p.zx;
-    if(p.y + p.z < 0.0) p.zy = -p.yz;
+""" + SIERPINSKI_GLSL + SAMPLE_GLSL + BOUNDS_GLSL + """
+vec3 warp(vec3 p) {
+    if(iHatGlitch > 0.1) {
+        p += vec3(hash(p.xy + iTime), hash(p.yz + iTime), hash(p.xz + iTime) - 0.5) * iHatGlitch * 0.3;
+    }
     return p;
 }
 
-float sdTetrahedron(vec3 p, float r) {
-    float md = max(max(-p.x - p.y - p.z, p.x + p.y - p.z),
-                   max(-p.x + p.y + p.z, p.x - p.y + p.z));
-    return (md - r) / sqrt(3.0);
-}
-
 float map(vec3 p) {
     int iterations = 3 + int(iKickPulse * 5.0);
     float scale = 2.0 + iTom1Morph;
+    return sierpinski(warp(p), iterations, scale);
+}
 
-    if(iHatGlitch > 0.1) {
-        p += vec3(hash(p.xy + iTime), hash(p.yz + iTime), hash(p.xz + iTime) - 0.5) * iHatGlitch * 0.3;
-    }
-
-    for(int i = 0; i < iterations; i++) {
-        p = tetraFold(p);
-        p = p * scale - vec3(scale - 1.0);
+// Pasos lejanos con el volumen horneado; DE exacto solo cerca de la superficie.
+// Ya cerca se sigue con el DE exacto hasta alejarse de nuevo (sin pagar los dos)
+float mapFar(vec3 p, inout bool far) {
+    if (far && uSDFReady == 1) {
+        float d = sdfVolume(warp(p));
+        if (d > 2.0 * uSDFMargin) return d;
     }
-
-    return sdTetrahedron(p, 1.0) * pow(scale, -float(iterations));
+    float d = map(p);
+    far = d > 4.0 * uSDFMargin;
+    return d;
 }
 
 vec3 calcNormal(vec3 p) {
@@ -73,13 +107,16 @@ vec3 calcNormal(vec3 p) {
     ));
 }
 
-float raymarch(vec3 ro, vec3 rd) {
-    float t = 0.0;
+// Solo dentro de la caja envolvente
+float raymarch(vec3 ro, vec3 rd, float tNear, float tFar) {
+    float t = tNear;
+    float tMax = min(tFar, 20.0);
+    bool far = true;
     for(int i = 0; i < 60; i++) {
-        float d = map(ro + rd * t);
+        float d = mapFar(ro + rd * t, far);
         if(d < 0.0005) break;
         t += d * 0.5;
-        if(t > 20.0) break;
+        if(t > tMax) return 20.0;
     }
     return t;
 }
@@ -96,7 +133,11 @@ void main()
     vec3 up = cross(fw, rt);
     vec3 rd = normalize(fw + p.x * rt + p.y * up);
 
-    float t = raymarch(ro, rd);
+    // Sin cortar la caja envolvente no hay nada que marchar
+    float tNear, tFar;
+    bool hit = rayBounds(ro, rd, tNear, tFar);
+    if (boundsCounting(!hit)) { fragColor = vec4(0.0); return; }
+    float t = hit ? raymarch(ro, rd, tNear, tFar) : 20.0;
 
     vec3 color = vec3(0.0);
 
@@ -117,7 +158,7 @@ void main()
     color = color / (color + 1.0);
     color = pow(color, vec3(0.4545));
 
-    fragColor = vec4(color, 1.0);
+    fragColor = vec4(boundsDebugTint(color, !hit), 1.0);
 }
 """
 
@@ -143,7 +184,7 @@ class ShaderVisualEngine:
 
         pygame.display.gl_set_attribute(pygame.GL_SWAP_CONTROL, 1)
         self.screen = pygame.display.set_mode((int(900 * self.target_aspect), 900), DOUBLEBUF | OPENGL | RESIZABLE)
-        pygame.display.set_caption('Preset 6: Sierpinski Pyramid [9:16]')
+        pygame.display.set_caption(CAPTION)
 
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
@@ -155,6 +196,14 @@ class ShaderVisualEngine:
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
         self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
         self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+        self.uni_sdf_ready = glGetUniformLocation(self.shader, 'uSDFReady')
+
+        # Volumen SDF de la pirámide (se rehornea al cambiar iteraciones o escala)
+        self.sdf_volume = SDFVolume(SDF_GLSL, SDF_BOUNDS)
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'uSDFVolume'), 0)
+        self.sdf_volume.set_uniforms(self.shader)
+        self.bounds = RayBounds(self.shader)
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -233,6 +282,10 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
+        # Mismos parámetros que map() en el shader (escala cuantizada)
+        sdf_ready = self.sdf_volume.update({'uIterations': 3 + int(self.kick_pulse * 5.0),
+                                            'uScale': round((2.0 + self.tom1_morph) / SCALE_STEP) * SCALE_STEP})
+
         # Dibujar shader principal
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
@@ -242,8 +295,18 @@ class ShaderVisualEngine:
         glUniform1f(self.uni_hat, self.hat_glitch)
         glUniform1f(self.uni_tom1, self.tom1_morph)
         glUniform1f(self.uni_tom2, self.tom2_spin)
+        glUniform1i(self.uni_sdf_ready, int(sdf_ready))  # Volumen de otros parámetros: solo DE exacto
+        self.sdf_volume.bind(0)
+
+        # Caja envolvente: el tetraedro (±1 con cualquier escala) + el desplazamiento del hat
+        warp = self.hat_glitch * 0.3 if self.hat_glitch > 0.1 else 0.0
+        self.bounds.box(1.0 + warp + 0.01)
+        self.bounds.apply()
+
         glBindVertexArray(self.vao)
-        glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+        self.bounds.draw(lambda: glDrawArrays(GL_TRIANGLE_FAN, 0, 4), vw * vh)
+        if self.bounds.debug:
+            pygame.display.set_caption(CAPTION + self.bounds.label())
         pygame.display.flip()
 
     def run(self):
@@ -257,6 +320,9 @@ class ShaderVisualEngine:
                     elif event.key == K_h: self.hat_glitch = min(1.0, self.hat_glitch + 0.8)
                     elif event.key == K_t: self.tom1_morph = min(1.0, self.tom1_morph + 0.6)
                     elif event.key == K_y: self.tom2_spin = min(1.0, self.tom2_spin + 0.7)
+                    elif event.key == K_b:
+                        self.bounds.debug = not self.bounds.debug
+                        pygame.display.set_caption(CAPTION)
             self.process_midi(); self.update_params(); self.render(); self.clock.tick(60)
         if self.midi_input: self.midi_input.close()
         pygame.quit()
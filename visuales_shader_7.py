@@ -3,6 +3,10 @@
 Preset 7: GPU Curl Noise - Particle Flow Field
 Category: Particle/Flow Field
 Organic flowing particles driven by curl noise
+Partículas en GPU (particles.py): el estado se advecta con transform feedback
+y se dibuja como point sprites aditivos; el fragment shader solo pinta el fondo.
+El curl noise se hornea al arrancar en una textura 3D periódica (flowfield.py):
+partículas y fondo lo leen con un solo texture(), animado por el eje z.
 """
 
 from __future__ import division
@@ -12,8 +16,15 @@ from OpenGL.GL import *
 from OpenGL.GL import shaders
 import mido
 from numpy import array
+from particles import ParticleSystem, random_state
+from flowfield import FlowFieldTexture
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+PARTICLE_COUNT = 20000  # Activas: 40% en reposo, 100% con kick
+
+# Campo de curl horneado: celdas de ruido por tile (x, y, tiempo) y resolución de la textura
+FIELD_PERIOD = (4.0, 4.0, 16.0)  # En z: bucle de 16 / 0.2 = 80 s
+FIELD_SIZE = (64, 64, 64)
 
 VERTEX_SHADER = """
 #version 330 core
@@ -21,33 +32,29 @@ layout(location = 0) in vec3 vPos;
 void main() { gl_Position = vec4(vPos, 1.0); }
 """
 
-FRAGMENT_SHADER = """
-#version 330 core
-#define fragCoord gl_FragCoord.xy
-
-uniform float iTime;
-uniform vec2  iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+PERIOD_GLSL = "const vec3 FIELD_PERIOD = vec3(%.1f, %.1f, %.1f);\n" % FIELD_PERIOD
 
-out vec4 fragColor;
-
-// Noise functions
+HASH_GLSL = """
 vec3 hash3(vec3 p) {
     p = fract(p * vec3(443.897, 441.423, 437.195));
     p += dot(p, p.yzx + 19.19);
     return fract((p.xxy + p.yxx) * p.zyx);
 }
+"""
 
+# Horneado: ruido periódico (retículo envuelto con FIELD_PERIOD) y su curl
+FIELD_GLSL = PERIOD_GLSL + HASH_GLSL + """
 float noise3(vec3 p) {
     vec3 i = floor(p);
     vec3 f = fract(p);
     f = f * f * (3.0 - 2.0 * f);
 
+    #define H(o) hash3(mod(i + o, FIELD_PERIOD)).x
     return mix(
-        mix(mix(hash3(i + vec3(0,0,0)).x, hash3(i + vec3(1,0,0)).x, f.x),
-            mix(hash3(i + vec3(0,1,0)).x, hash3(i + vec3(1,1,0)).x, f.x), f.y),
-        mix(mix(hash3(i + vec3(0,0,1)).x, hash3(i + vec3(1,0,1)).x, f.x),
-            mix(hash3(i + vec3(0,1,1)).x, hash3(i + vec3(1,1,1)).x, f.x), f.y),
+        mix(mix(H(vec3(0,0,0)), H(vec3(1,0,0)), f.x),
+            mix(H(vec3(0,1,0)), H(vec3(1,1,0)), f.x), f.y),
+        mix(mix(H(vec3(0,0,1)), H(vec3(1,0,1)), f.x),
+            mix(H(vec3(0,1,1)), H(vec3(1,1,1)), f.x), f.y),
         f.z
     );
 }
@@ -73,27 +80,26 @@ vec3 curlNoise(vec3 p) {
     return curl;
 }
 
-// Simulate particle flow
-vec2 particleFlow(vec2 uv, float id) {
-    vec3 p = vec3(uv * 3.0, id * 2.0 + iTime * 0.2);
-
-    // Kick increases flow speed
-    float speed = 0.5 + iKickPulse * 2.0;
-    p += curlNoise(p) * speed * iTime * 0.1;
+vec4 flowField(vec3 p) { return vec4(curlNoise(p * FIELD_PERIOD), 0.0); }
+"""
 
-    // Tom1 modulates scale
-    p *= 1.0 + iTom1Morph;
+# Lectura del campo: un texture() por muestra (se repite fuera del tile)
+CURL_GLSL = PERIOD_GLSL + """
+uniform sampler3D uFlowField;  // Unidad 0
+vec3 curlNoise(vec3 p) { return texture(uFlowField, p / FIELD_PERIOD).xyz; }
+"""
 
-    // Tom2 adds rotation
-    float angle = iTom2Spin * 6.28;
-    float ca = cos(angle);
-    float sa = sin(angle);
-    p.xy = mat2(ca, -sa, sa, ca) * p.xy;
+FRAGMENT_SHADER = """
+#version 330 core
+#define fragCoord gl_FragCoord.xy
 
-    vec3 flow = curlNoise(p);
-    return uv + flow.xy * 0.1;
-}
+uniform float iTime;
+uniform vec2  iResolution;
+uniform float iKickPulse, iHatGlitch;
 
+out vec4 fragColor;
+""" + HASH_GLSL + CURL_GLSL + """
+// Fondo: las partículas se dibujan encima como sprites
 void main()
 {
     vec2 uv = fragCoord / iResolution.xy;
@@ -101,27 +107,6 @@ void main()
 
     vec3 color = vec3(0.0);
 
-    // Multiple particle layers
-    int numParticles = 20 + int(iKickPulse * 30.0);
-
-    for(int i = 0; i < 50; i++) {
-        if(i >= numParticles) break;
-
-        float id = float(i);
-        vec2 particleUV = particleFlow(uv, id);
-
-        // Wrap particles
-        particleUV = fract(particleUV);
-
-        vec2 particleP = (2.0 * particleUV * iResolution.xy - iResolution.xy) / iResolution.y;
-
-        // Particle glow
-        float dist = length(particleP - p);
-        float particle = 0.02 / (dist + 0.02);
-
-        color += particle * 0.02;
-    }
-
     // Hat glitch creates trails
     if(iHatGlitch > 0.1) {
         vec2 offset = vec2(hash3(vec3(uv * 10.0, iTime)).xy - 0.5) * iHatGlitch * 0.1;
@@ -148,6 +133,56 @@ void main()
 }
 """
 
+# Advección por curl noise en espacio uv [0, 1]^2 (con vuelta en los bordes)
+PARTICLE_UPDATE = CURL_GLSL + """
+uniform float uKick, uHat, uTom1, uTom2, uAspect;
+
+void updateParticle(inout vec4 pos, inout vec4 vel) {
+    // Campo en coordenadas isótropas (uv.y escalado por el aspecto)
+    vec3 p = vec3(pos.x * 3.0, pos.y * 3.0 / uAspect, uTime * 0.2);
+
+    // Tom1 modulates scale
+    p.xy *= 1.0 + uTom1;
+
+    // Tom2 adds rotation
+    float angle = uTom2 * 6.28;
+    float ca = cos(angle);
+    float sa = sin(angle);
+    p.xy = mat2(ca, -sa, sa, ca) * p.xy;
+
+    // Kick increases flow speed
+    float speed = 0.5 + uKick * 2.0;
+    vel.xy = curlNoise(p).xy * speed * 0.04;
+    pos.xy += vel.xy * vec2(1.0, uAspect) * uDelta;
+
+    // Hat glitch: saltos aleatorios
+    float r = particleHash(vel.w * 91.7 + uTime);
+    if (uHat > 0.1 && r > 0.98 - uHat * 0.02) {
+        pos.xy += (vec2(particleHash(r * 13.1), particleHash(r * 47.3)) - 0.5) * uHat * 0.1;
+    }
+
+    // Vida: reaparecen en posiciones nuevas para renovar el flujo
+    pos.w -= uDelta * 0.1;
+    if (pos.w < 0.0) {
+        pos.xy = vec2(particleHash(r * 12.9 + 1.0), particleHash(r * 78.2 + 2.0));
+        pos.w = 1.0;
+    }
+    pos.xy = fract(pos.xy);
+}
+"""
+
+PARTICLE_RENDER = """
+uniform float uKick, uPointScale;
+
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    float speed = clamp(length(vel.xy) * 25.0, 0.0, 1.0);
+    float fade = smoothstep(0.0, 0.1, pos.w) * smoothstep(1.0, 0.9, pos.w);
+    color = mix(vec3(0.5, 0.7, 1.0), vec3(1.0), speed) * (0.3 + uKick * 0.2) * fade;
+    size = (4.0 + uKick * 3.0) * uPointScale;
+    return vec4(pos.xy * 2.0 - 1.0, 0.0, 1.0);
+}
+"""
+
 
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
@@ -180,8 +215,16 @@ class ShaderVisualEngine:
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
         self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+
+        # Curl noise horneado una vez (textura 3D periódica)
+        self.flow_field = FlowFieldTexture(FIELD_GLSL, FIELD_SIZE)
+        glUseProgram(self.shader)
+        glUniform1i(glGetUniformLocation(self.shader, 'uFlowField'), 0)
+
+        # Partículas en GPU
+        state = random_state(PARTICLE_COUNT, low=(0.0, 0.0, 0.0), high=(1.0, 1.0, 0.0))
+        self.particles = ParticleSystem(PARTICLE_COUNT, PARTICLE_UPDATE, PARTICLE_RENDER, state)
+        self.last_ticks = pygame.time.get_ticks()
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -259,17 +302,29 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
+        ticks = pygame.time.get_ticks()
+        t = (ticks - self.start_time) / 1000.0
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Avanzar partículas (transform feedback, sin rasterizar)
+        self.flow_field.bind(0)
+        self.particles.step(uTime=t, uDelta=dt, uKick=self.kick_pulse, uHat=self.hat_glitch,
+                            uTom1=self.tom1_morph, uTom2=self.tom2_spin, uAspect=vw / vh)
+
+        # Dibujar fondo
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
+        glUniform1f(self.uni_time, t)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
         glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # Partículas activas como sprites aditivos
+        active = int(PARTICLE_COUNT * (0.4 + 0.6 * min(self.kick_pulse, 1.0)))
+        self.particles.draw(active, uKick=self.kick_pulse, uPointScale=vh / 900.0)
         pygame.display.flip()
 
     def run(self):
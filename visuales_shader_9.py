@@ -2,7 +2,9 @@
 """
 Preset 9: Swarm Intelligence - Boids Flocking Behavior
 Category: Particle/Flow Field
-GPU-simulated emergent swarm behavior
+Emergent swarm behavior: boids simulados una vez por frame en NumPy con una
+rejilla uniforme (particles.neighbor_pairs) en lugar de O(n²) por píxel.
+Boids como point sprites (particles.py) y conexiones entre vecinos como GL_LINES.
 """
 
 from __future__ import division
@@ -10,102 +12,38 @@ import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GL import shaders
+import ctypes
 import mido
+import numpy as np
 from numpy import array
+from particles import ParticleSystem, FLOATS_PER_PARTICLE, neighbor_pairs
 
 KICK_NOTE, CLOSEHAT_NOTE, TOM1_NOTE, TOM2_NOTE = 60, 62, 64, 65
+
+# Bandada
+BOID_COUNT = 2000            # Activos: 30% en reposo, 100% con kick
+NEIGHBOR_RADIUS = 0.05       # Radio de percepción (= celda de la rejilla)
+SEPARATION_RADIUS = 0.02
+LINK_RADIUS = 0.035          # Pares más cercanos que esto se unen con una línea
+MAX_LINKS = 6000
+WORLD = (1.0, 1920 / 1080)   # Dominio toroidal en unidades de ancho (9:16)
+
 VERTEX_SHADER = "#version 330 core\nlayout(location = 0) in vec3 vPos;\nvoid main() { gl_Position = vec4(vPos, 1.0); }"
 
 FRAGMENT_SHADER = """
 #version 330 core
 #define fragCoord gl_FragCoord.xy
-uniform float iTime;
 uniform vec2  iResolution;
-uniform float iKickPulse, iHatGlitch, iTom1Morph, iTom2Spin;
+uniform float iKickPulse;
 out vec4 fragColor;
 
-vec2 hash2(vec2 p) {
-    p = vec2(dot(p, vec2(127.1, 311.7)), dot(p, vec2(269.5, 183.3)));
-    return fract(sin(p) * 43758.5453);
-}
-
-// Boid simulation
-vec2 boidPosition(float id, float time) {
-    vec2 seed = hash2(vec2(id, 0.0));
-
-    // Flocking behavior params
-    float speed = 0.5 + iKickPulse * 1.5;
-    float cohesion = iTom1Morph * 0.5;
-    float alignment = iTom2Spin * 0.3;
-
-    vec2 pos = seed;
-
-    // Swirl motion
-    float angle = time * speed + seed.x * 6.28 + cohesion * 3.0;
-    float radius = 0.3 + 0.2 * sin(time * 0.5 + seed.y * 6.28);
-
-    pos += vec2(cos(angle), sin(angle)) * radius;
-
-    // Hat glitch scatters the swarm
-    if(iHatGlitch > 0.1) {
-        pos += (hash2(vec2(id, time)) - 0.5) * iHatGlitch * 0.5;
-    }
-
-    return pos;
-}
-
+// Fondo: los boids y sus conexiones se dibujan encima como geometría
 void main() {
     vec2 uv = fragCoord / iResolution.xy;
     vec2 p = (fragCoord - iResolution.xy * 0.5) / iResolution.x;
 
     vec3 color = vec3(0.0);
 
-    // Kick increases swarm size
-    int numBoids = 30 + int(iKickPulse * 70.0);
-
-    for(int i = 0; i < 50; i++) {
-        if(i >= numBoids) break;
-
-        float id = float(i);
-        vec2 boidPos = boidPosition(id, iTime);
-
-        // Wrap to screen
-        boidPos = fract(boidPos + 0.5) - 0.5;
-        boidPos *= 2.0;
-
-        // Boid glow
-        float dist = length(p - boidPos);
-        float boid = 0.015 / (dist + 0.015);
-
-        color += boid * (0.02 + iKickPulse * 0.03);
-
-        // Trailing effect
-        vec2 prevPos = boidPosition(id, iTime - 0.1);
-        prevPos = fract(prevPos + 0.5) - 0.5;
-        prevPos *= 2.0;
-        float trail = length(p - prevPos);
-        color += (0.01 / (trail + 0.01)) * 0.01;
-    }
-
-    // Connection lines between nearby boids
-    for(int i = 0; i < 20; i++) {
-        vec2 b1 = boidPosition(float(i), iTime);
-        b1 = fract(b1 + 0.5) - 0.5;
-        b1 *= 2.0;
-
-        for(int j = i + 1; j < 25; j++) {
-            vec2 b2 = boidPosition(float(j), iTime);
-            b2 = fract(b2 + 0.5) - 0.5;
-            b2 *= 2.0;
-
-            if(length(b1 - b2) < 0.3) {
-                // Line between boids
-                float lineProx = length(p - (b1 + b2) * 0.5);
-                color += 0.001 / (lineProx + 0.1);
-            }
-        }
-    }
-
     // Center attractor glow
     color += exp(-length(p) * 2.0) * 0.3 * iKickPulse;
 
@@ -119,6 +57,127 @@ void main() {
 }
 """
 
+# Boids: posición en el dominio WORLD, vel.xy = velocidad
+BOID_RENDER = """
+uniform float uKick, uPointScale;
+uniform vec2 uWorld;
+
+vec4 renderParticle(vec4 pos, vec4 vel, out vec3 color, out float size) {
+    float speed = clamp(length(vel.xy) * 3.0, 0.0, 1.0);
+    color = mix(vec3(0.3, 0.6, 1.0), vec3(1.0, 0.9, 0.8), speed) * (0.6 + uKick * 0.4);
+    size = (6.0 + uKick * 4.0) * uPointScale;
+    return vec4(pos.xy / uWorld * 2.0 - 1.0, 0.0, 1.0);
+}
+"""
+
+# Líneas (conexiones y estelas): posición + intensidad por vértice
+LINE_VERTEX = """
+#version 330 core
+layout(location = 0) in vec3 aLine;  // xy, intensidad
+uniform vec2 uWorld;
+out float vAlpha;
+void main() {
+    vAlpha = aLine.z;
+    gl_Position = vec4(aLine.xy / uWorld * 2.0 - 1.0, 0.0, 1.0);
+}
+"""
+
+LINE_FRAGMENT = """
+#version 330 core
+in float vAlpha;
+uniform vec3 uColor;
+out vec4 fragColor;
+void main() { fragColor = vec4(uColor * vAlpha, 1.0); }
+"""
+
+
+class BoidSwarm:
+    """
+    Boids (separación, alineación, cohesión) en NumPy vectorizado.
+    Los vecinos salen de la rejilla uniforme de neighbor_pairs: coste ~O(n·k)
+    con k vecinos medios, en lugar de O(n²).
+    """
+
+    def __init__(self, count, world=WORLD, seed=0):
+        rng = np.random.default_rng(seed)
+        self.world = np.array(world, dtype=np.float32)
+        self.pos = (rng.random((count, 2)) * self.world).astype(np.float32)
+        angle = rng.uniform(0.0, 2.0 * np.pi, count)
+        self.vel = (np.stack([np.cos(angle), np.sin(angle)], axis=1) * 0.1).astype(np.float32)
+        self.seed = rng.random(count).astype(np.float32)
+        self.rng = rng
+        self.pairs = (np.zeros(0, int), np.zeros(0, int), np.zeros((0, 2), np.float32), np.zeros(0, np.float32))
+        # Buffers reutilizados cada frame: aceleración y vértices de líneas (x, y, intensidad)
+        self.acc = np.zeros((count, 2), dtype=np.float32)
+        self.line_vertices = np.zeros(((MAX_LINKS + count) * 2, 3), dtype=np.float32)
+
+    def step(self, dt, active, separation, alignment, cohesion, max_speed, attract=0.0, scatter=0.0):
+        pos, vel = self.pos[:active], self.vel[:active]
+        i, j, delta, dist2 = self.pairs = neighbor_pairs(pos, NEIGHBOR_RADIUS, self.world)
+
+        # Cada par aporta a ambos extremos (delta apunta de i a j): un bincount por extremo
+        # y por eje, sin duplicar los pares ni apilar resultados
+        neighbors = np.bincount(i, minlength=active) + np.bincount(j, minlength=active)
+        count = np.maximum(neighbors, 1)
+        close = dist2 < SEPARATION_RADIUS ** 2
+        close_i, close_j = i[close], j[close]
+        push = SEPARATION_RADIUS / np.maximum(dist2[close], 1e-6)
+
+        acc = self.acc[:active]
+        for k in range(2):
+            d, v = delta[:, k], vel[:, k]
+            # Cohesión: hacia el centro de los vecinos. Alineación: hacia su velocidad media
+            coh = (np.bincount(i, d, active) - np.bincount(j, d, active)) / count
+            ali = (np.bincount(i, v[j], active) + np.bincount(j, v[i], active)) / count - v * (neighbors > 0)
+            # Separación: repulsión 1/d de los muy cercanos
+            d_close = d[close] * push
+            sep = np.bincount(close_j, d_close, active) - np.bincount(close_i, d_close, active)
+            acc[:, k] = sep * separation + ali * alignment + coh * cohesion / NEIGHBOR_RADIUS
+        if attract > 0.0:
+            # Atractor central (imagen mínima en el toro)
+            to_center = self.world * 0.5 - pos
+            acc += (to_center - self.world * np.round(to_center / self.world)) * attract
+        if scatter > 0.0:
+            acc += self.rng.normal(0.0, scatter, (active, 2))
+
+        vel += acc * dt
+        # Velocidad acotada: siempre en movimiento, nunca más que max_speed
+        speed = np.linalg.norm(vel, axis=1, keepdims=True)
+        vel *= np.clip(speed, max_speed * 0.3, max_speed) / np.maximum(speed, 1e-6)
+        pos += vel * dt
+        pos %= self.world
+
+    def state(self, active):
+        """Estado para ParticleSystem.upload (pos, vida=1, vel, semilla)"""
+        state = np.zeros((active, FLOATS_PER_PARTICLE), dtype=np.float32)
+        state[:, 0:2] = self.pos[:active]
+        state[:, 3] = 1.0
+        state[:, 4:6] = self.vel[:active]
+        state[:, 7] = self.seed[:active]
+        return state
+
+    def lines(self, active, trail=0.08):
+        """
+        Vértices GL_LINES (x, y, intensidad): conexiones entre vecinos cercanos + estelas.
+        Devuelve una vista de line_vertices (válida hasta la siguiente llamada)
+        """
+        i, j, delta, dist2 = self.pairs
+        link = np.flatnonzero(dist2 < LINK_RADIUS ** 2)[:MAX_LINKS]
+        links = self.line_vertices[:2 * len(link)].reshape(-1, 2, 3)
+        # Hacia pos_i + delta (imagen mínima): los pares que cruzan el borde se recortan en pantalla
+        links[:, 0, :2] = self.pos[i[link]]
+        links[:, 1, :2] = links[:, 0, :2] + delta[link]
+        links[:, :, 2] = ((1.0 - np.sqrt(dist2[link]) / LINK_RADIUS) * 0.25)[:, None]
+
+        # Estela: segmento hacia la posición anterior, apagándose
+        pos, vel = self.pos[:active], self.vel[:active]
+        trails = self.line_vertices[2 * len(link):2 * (len(link) + active)].reshape(-1, 2, 3)
+        trails[:, 0, :2] = pos
+        trails[:, 0, 2] = 0.12
+        trails[:, 1, :2] = pos - vel * trail
+        trails[:, 1, 2] = 0.0
+        return self.line_vertices[:2 * (len(link) + active)]
+
 
 FRANJA_VERTEX = "#version 330 core\nlayout(location = 0) in vec2 vPos;\nvoid main() { gl_Position = vec4(vPos, 0.0, 1.0); }"
 FRANJA_FRAGMENT = """
@@ -144,12 +203,27 @@ class ShaderVisualEngine:
         vs = shaders.compileShader(VERTEX_SHADER, GL_VERTEX_SHADER)
         fs = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
         self.shader = shaders.compileProgram(vs, fs)
-        self.uni_time = glGetUniformLocation(self.shader, 'iTime')
         self.uni_resolution = glGetUniformLocation(self.shader, 'iResolution')
         self.uni_kick = glGetUniformLocation(self.shader, 'iKickPulse')
-        self.uni_hat = glGetUniformLocation(self.shader, 'iHatGlitch')
-        self.uni_tom1 = glGetUniformLocation(self.shader, 'iTom1Morph')
-        self.uni_tom2 = glGetUniformLocation(self.shader, 'iTom2Spin')
+
+        # Bandada simulada en CPU; boids dibujados con el motor de partículas
+        self.swarm = BoidSwarm(BOID_COUNT)
+        self.particles = ParticleSystem(BOID_COUNT, None, BOID_RENDER, self.swarm.state(BOID_COUNT))
+        self.last_ticks = pygame.time.get_ticks()
+
+        # Líneas: buffer dinámico de tamaño máximo, se rellena con glBufferSubData
+        lvs = shaders.compileShader(LINE_VERTEX, GL_VERTEX_SHADER)
+        lfs = shaders.compileShader(LINE_FRAGMENT, GL_FRAGMENT_SHADER)
+        self.line_shader = shaders.compileProgram(lvs, lfs)
+        self.line_world = glGetUniformLocation(self.line_shader, 'uWorld')
+        self.line_color = glGetUniformLocation(self.line_shader, 'uColor')
+        self.line_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.line_vao)
+        self.line_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.line_vbo)
+        glBufferData(GL_ARRAY_BUFFER, (MAX_LINKS + BOID_COUNT) * 2 * 3 * 4, None, GL_DYNAMIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
 
         # Shader franjas
         fvs = shaders.compileShader(FRANJA_VERTEX, GL_VERTEX_SHADER)
@@ -225,17 +299,45 @@ class ShaderVisualEngine:
             glViewport(0, 0, vx, h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
             glViewport(vx + vw, 0, w - (vx + vw), h); glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
 
-        # Dibujar shader principal
+        ticks = pygame.time.get_ticks()
+        dt = min((ticks - self.last_ticks) / 1000.0, 0.05)
+        self.last_ticks = ticks
+
+        # Simular la bandada: Kick = tamaño y velocidad, Tom1 = cohesión,
+        # Tom2 = alineación, Hat = separación + dispersión
+        active = int(BOID_COUNT * (0.3 + 0.7 * min(self.kick_pulse, 1.0)))
+        self.swarm.step(dt, active,
+                        separation=1.0 + self.hat_glitch * 4.0,
+                        alignment=1.0 + self.tom2_spin * 4.0,
+                        cohesion=0.5 + self.tom1_morph * 3.0,
+                        max_speed=0.15 + self.kick_pulse * 0.35,
+                        attract=self.kick_pulse * 0.5,
+                        scatter=self.hat_glitch * 2.0 if self.hat_glitch > 0.1 else 0.0)
+        self.particles.upload(self.swarm.state(active))
+        lines = self.swarm.lines(active)
+
+        # Dibujar fondo
         glViewport(vx, vy, vw, vh)
         glUseProgram(self.shader)
-        glUniform1f(self.uni_time, (pygame.time.get_ticks() - self.start_time) / 1000.0)
         glUniform2f(self.uni_resolution, float(vw), float(vh))
         glUniform1f(self.uni_kick, self.kick_pulse)
-        glUniform1f(self.uni_hat, self.hat_glitch)
-        glUniform1f(self.uni_tom1, self.tom1_morph)
-        glUniform1f(self.uni_tom2, self.tom2_spin)
         glBindVertexArray(self.vao)
         glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+
+        # Conexiones y estelas (aditivas)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_ONE, GL_ONE)
+        glUseProgram(self.line_shader)
+        glUniform2f(self.line_world, *WORLD)
+        glUniform3f(self.line_color, 0.4, 0.7, 1.0)
+        glBindBuffer(GL_ARRAY_BUFFER, self.line_vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, lines.nbytes, lines)
+        glBindVertexArray(self.line_vao)
+        glDrawArrays(GL_LINES, 0, len(lines))
+        glDisable(GL_BLEND)
+
+        # Boids como sprites
+        self.particles.draw(active, uKick=self.kick_pulse, uWorld=WORLD, uPointScale=vh / 900.0)
         pygame.display.flip()
 
     def run(self):
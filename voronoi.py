@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Voronoi - Diagrama de Voronoi en GPU con Jump Flooding (JFA)
+Las semillas se dibujan como puntos en una textura y el campo "semilla más
+cercana" se propaga con pases ping-pong de paso decreciente (+1 de refinado).
+Coste por píxel constante e independiente del número de semillas: miles de
+celdas cuestan lo mismo que diez.
+
+El campo va a 1/scale de la resolución del viewport y el primer paso es la
+potencia de 2 por encima de la separación entre semillas (`spacing`): el
+alcance del JFA es casi el doble del primer paso, así que los pasos mayores
+solo repetirían trabajo. Con 200 semillas a 1080x1920 son 8 pases sobre
+270x480 en lugar de 11 sobre 540x960.
+
+Cada texel del campo guarda (semilla.x, semilla.y, índice, 1) con la posición
+en uv del viewport; w = 0 significa "sin semilla". Con `guard` el campo cubre
+además una banda de ese ancho (en unidades de ancho del viewport) alrededor del
+viewport: las semillas de fuera que aún poseen píxeles del borde entran en el
+campo en lugar de recortarse, y las celdas del borde no crecen de más.
+iVoronoiMap pasa uv del viewport a uv del campo (voronoiUV). voronoiCell()
+(VORONOI_GLSL) elige entre las semillas de los 2x2 texels vecinos la más
+cercana al píxel: el campo es de baja resolución, pero las fronteras y
+distancias son exactas a resolución completa.
+
+GLSL:
+
+    float edge;
+    vec4 cell = voronoiCell(uv, vec2(1.0, iResolution.y / iResolution.x), edge);
+    float dist = length((uv - cell.xy) * vec2(1.0, iResolution.y / iResolution.x));
+    float id = cell.z;        // edge: distancia a la frontera con la celda vecina
+    vec4 raw = texture(iVoronoi, voronoiUV(uv));   // Lectura directa del campo
+
+Python:
+
+    self.voronoi = JumpFloodVoronoi(max_seeds=4096, scale=4, guard=0.1)
+    ...
+    self.voronoi.ensure(vw, vh)
+    self.voronoi.update(seeds_uv, spacing)    # (n, 2) float32 en uv; índice = fila
+    self.voronoi.bind(0, self.shader)         # textura + iVoronoiMap del programa del preset
+"""
+
+from __future__ import division
+import ctypes
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+import numpy as np
+
+from feedback import FeedbackBuffer, QUAD_VERTEX_SHADER, create_fullscreen_quad
+
+SEED_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 aSeed;
+uniform vec4 uMap;            // uv del viewport -> uv del campo: uv * zw + xy
+out vec3 vSeed;
+void main() {
+    vSeed = vec3(aSeed, float(gl_VertexID));
+    gl_Position = vec4((aSeed * uMap.zw + uMap.xy) * 2.0 - 1.0, 0.0, 1.0);
+    gl_PointSize = 1.0;
+}
+"""
+
+SEED_FRAGMENT_SHADER = """
+#version 330 core
+in vec3 vSeed;
+out vec4 fragColor;
+void main() { fragColor = vec4(vSeed, 1.0); }
+"""
+
+VORONOI_GLSL = """
+uniform sampler2D iVoronoi;   // (semilla.xy, índice, 1) - Jump Flooding, GL_NEAREST
+uniform vec4 iVoronoiMap;     // uv del viewport -> uv del campo (banda de guarda): uv * zw + xy
+
+vec2 voronoiUV(vec2 uv) {
+    return uv * iVoronoiMap.zw + iVoronoiMap.xy;
+}
+
+// Semilla más cercana a uv entre las de los 2x2 texels del campo cuyos centros
+// lo rodean. metric pasa diferencias de uv a las unidades del preset; edge es la
+// distancia (en esas unidades) a la mediatriz con la segunda semilla más cercana
+vec4 voronoiCell(vec2 uv, vec2 metric, out float edge) {
+    ivec2 size = textureSize(iVoronoi, 0);
+    ivec2 c = ivec2(floor(voronoiUV(uv) * vec2(size) - 0.5));
+    vec4 best = vec4(0.0), second = vec4(0.0);
+    float d1 = 1e20, d2 = 1e20;
+    for (int y = 0; y <= 1; y++) {
+        for (int x = 0; x <= 1; x++) {
+            vec4 s = texelFetch(iVoronoi, clamp(c + ivec2(x, y), ivec2(0), size - 1), 0);
+            if (s.w == 0.0 || (d1 < 1e20 && s.z == best.z) || (d2 < 1e20 && s.z == second.z)) continue;
+            vec2 d = (uv - s.xy) * metric;
+            float dist = dot(d, d);
+            if (dist < d1) {
+                second = best; d2 = d1;
+                best = s; d1 = dist;
+            } else if (dist < d2) {
+                second = s; d2 = dist;
+            }
+        }
+    }
+    vec2 a = best.xy * metric, b = second.xy * metric;
+    edge = d2 < 1e20 ? dot(uv * metric - (a + b) * 0.5, normalize(a - b)) : 1e20;
+    return best;
+}
+"""
+
+# Un pase JFA: la mejor de las 9 semillas a distancia uStep (en texels)
+JFA_FRAGMENT_SHADER = """
+#version 330 core
+out vec4 fragColor;
+uniform sampler2D uField;
+uniform int uStep;
+uniform vec4 uMap;            // uv del viewport -> uv del campo
+
+void main() {
+    ivec2 size = textureSize(uField, 0);
+    ivec2 pix = ivec2(gl_FragCoord.xy);
+    vec2 pos = gl_FragCoord.xy;
+
+    vec4 best = vec4(0.0);
+    float bestDist = 1e20;
+    for (int y = -1; y <= 1; y++) {
+        for (int x = -1; x <= 1; x++) {
+            ivec2 q = pix + ivec2(x, y) * uStep;
+            if (any(lessThan(q, ivec2(0))) || any(greaterThanEqual(q, size))) continue;
+            vec4 s = texelFetch(uField, q, 0);
+            if (s.w == 0.0) continue;
+            // Distancia en píxeles (campo no cuadrado)
+            vec2 d = (s.xy * uMap.zw + uMap.xy) * vec2(size) - pos;
+            float dist = dot(d, d);
+            if (dist < bestDist) {
+                bestDist = dist;
+                best = s;
+            }
+        }
+    }
+    fragColor = best;
+}
+"""
+
+
+class JumpFloodVoronoi:
+    """Campo de semilla más cercana (RGBA32F, GL_NEAREST) reconstruido con JFA"""
+
+    def __init__(self, max_seeds, scale=4, guard=0.0):
+        self.max_seeds = max_seeds
+        self.scale = scale              # Píxeles de pantalla por texel del campo
+        self.guard = guard              # Banda alrededor del viewport, en unidades de ancho
+        self.width = self.height = 0
+        self.texels_per_uv = 0.0        # Texels del campo por unidad de ancho del viewport
+        self.map = (0.0, 0.0, 1.0, 1.0) # uv del viewport -> uv del campo (offset.xy, escala.xy)
+        self.map_locs = {}              # Programa -> location de iVoronoiMap
+        self.steps = []
+        self.field = FeedbackBuffer(GL_RGBA32F, filter=GL_NEAREST)
+        self.quad_vao = create_fullscreen_quad()
+
+        vs = shaders.compileShader(SEED_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(SEED_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.seed_shader = shaders.compileProgram(vs, fs)
+
+        vs = shaders.compileShader(QUAD_VERTEX_SHADER, GL_VERTEX_SHADER)
+        fs = shaders.compileShader(JFA_FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+        self.jfa_shader = shaders.compileProgram(vs, fs)
+        self.u_field = glGetUniformLocation(self.jfa_shader, 'uField')
+        self.u_step = glGetUniformLocation(self.jfa_shader, 'uStep')
+        self.u_jfa_map = glGetUniformLocation(self.jfa_shader, 'uMap')
+        self.u_seed_map = glGetUniformLocation(self.seed_shader, 'uMap')
+
+        self.seed_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.seed_vao)
+        self.seed_vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.seed_vbo)
+        glBufferData(GL_ARRAY_BUFFER, max_seeds * 2 * 4, None, GL_DYNAMIC_DRAW)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        glBindVertexArray(0)
+
+    @property
+    def texture(self):
+        return self.field.texture
+
+    def ensure(self, w, h):
+        """Campo a 1/scale del viewport (w, h) + banda; reasigna solo si cambia el tamaño. True si se reasignó"""
+        margin = int(np.ceil(self.guard * w))
+        width = max(1, -(-(w + 2 * margin) // self.scale))
+        height = max(1, -(-(h + 2 * margin) // self.scale))
+        # Píxeles de pantalla cubiertos por el campo (múltiplo de scale, centrado en el viewport)
+        fw, fh = width * self.scale, height * self.scale
+        self.map = ((fw - w) * 0.5 / fw, (fh - h) * 0.5 / fh, w / fw, h / fh)
+        self.texels_per_uv = w / self.scale
+        if not self.field.ensure(width, height):
+            return False
+        self.width, self.height = width, height
+        # Pasos: N/2, N/4, ..., 1 y un pase extra de 1 (JFA+1, corrige casi todos los errores)
+        n = 1 << int(np.ceil(np.log2(max(width, height, 2))))
+        self.steps = [n >> k for k in range(1, int(np.log2(n)) + 1)] + [1]
+        return True
+
+    def bind(self, unit, program):
+        """Liga el campo en `unit` y sube iVoronoiMap al programa del preset (en uso)"""
+        self.field.bind_previous(unit)
+        if program not in self.map_locs:
+            self.map_locs[program] = glGetUniformLocation(program, 'iVoronoiMap')
+        glUniform4f(self.map_locs[program], *self.map)
+
+    def update(self, seeds, spacing=None):
+        """
+        Dibuja las semillas (n, 2) en uv del viewport y propaga el campo (tras ensure()).
+        Las que caen fuera del viewport y de la banda de guarda se recortan.
+        `spacing`: separación entre semillas vecinas en unidades de ancho (uv x);
+        el primer paso es la potencia de 2 por encima en texels. Sin él, pasos completos.
+        """
+        seeds = np.ascontiguousarray(seeds[:self.max_seeds], dtype=np.float32)
+        steps = self.steps
+        if spacing is not None:
+            first = 1 << int(np.ceil(np.log2(max(spacing * self.texels_per_uv, 1.0))))
+            steps = [s for s in steps[:-1] if s <= first] + [1]
+        viewport = glGetIntegerv(GL_VIEWPORT)
+        blend = glIsEnabled(GL_BLEND)
+        glDisable(GL_BLEND)
+
+        # Semillas sobre un campo vacío (w = 0)
+        self.field.begin()
+        clear_color = glGetFloatv(GL_COLOR_CLEAR_VALUE)
+        glClearColor(0.0, 0.0, 0.0, 0.0)
+        glClear(GL_COLOR_BUFFER_BIT)
+        glClearColor(*clear_color)
+        if len(seeds):
+            glUseProgram(self.seed_shader)
+            glUniform4f(self.u_seed_map, *self.map)
+            glBindBuffer(GL_ARRAY_BUFFER, self.seed_vbo)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, seeds.nbytes, seeds)
+            glBindVertexArray(self.seed_vao)
+            glDrawArrays(GL_POINTS, 0, len(seeds))
+        self.field.end()
+
+        # Pases ping-pong de paso decreciente + 1 (sin semillas el campo ya está vacío)
+        if not len(seeds):
+            steps = []
+        glUseProgram(self.jfa_shader)
+        glUniform1i(self.u_field, 0)
+        glUniform4f(self.u_jfa_map, *self.map)
+        glBindVertexArray(self.quad_vao)
+        for step in steps:
+            self.field.begin()
+            self.field.bind_previous(0)
+            glUniform1i(self.u_step, step)
+            glDrawArrays(GL_TRIANGLE_FAN, 0, 4)
+            self.field.end()
+
+        if blend:
+            glEnable(GL_BLEND)
+        glViewport(*viewport)
+
+    def read(self):
+        """Copia del campo en CPU (height, width, 4), para comprobaciones"""
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        data = glGetTexImage(GL_TEXTURE_2D, 0, GL_RGBA, GL_FLOAT)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        return np.asarray(data, dtype=np.float32).reshape(self.height, self.width, 4)